@@ -1,10 +1,13 @@
 from flask import Blueprint, request, jsonify
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from werkzeug.security import check_password_hash, generate_password_hash
-from werkzeug.utils import secure_filename
 from sqlalchemy import func
-from models import db, Mechanic, Order, OrderComment, TimeLog, CustomWorkItem, CustomPartItem, WorkOrderAssignment, Category, Part
+from models import db, Mechanic, Order, OrderComment, TimeLog, CustomWorkItem, CustomPartItem, WorkOrderAssignment, Category, Part, OrderEvent
 from auth import generate_jwt_token, require_auth, get_jwt_identity
+from services.order_events import record_order_event
+from services.part_search import bump_part_numbers_version, apply_part_number_added
+from services.photo_pipeline import save_upload, enqueue_photo_job, wake_photo_worker
+import config
 import jwt
 import os
 import json
@@ -115,6 +118,58 @@ def get_mechanic_orders():
     return jsonify([order.to_dict() for order in orders])
 
 
+@mechanic_bp.route('/orders/sync', methods=['GET'])
+@require_auth
+def sync_mechanic_orders():
+    """Дельта-синхронизация: заказы механика, изменённые после updated_since, и удалённые из его списка"""
+    mechanic_id = get_jwt_identity()
+    updated_since = request.args.get('updated_since')
+    
+    since = None
+    if updated_since:
+        try:
+            since = datetime.fromisoformat(updated_since.replace('Z', '+00:00'))
+        except ValueError:
+            return jsonify({'error': 'Неверный формат updated_since'}), 400
+        if since.tzinfo:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    # Курсор фиксируется до чтения: изменения во время запроса попадут в следующую синхронизацию
+    cursor = datetime.utcnow()
+    
+    # События старше срока хранения удалены, надгробия могли потеряться - отдаём полный список
+    retention_cutoff = cursor - timedelta(days=config.ORDER_EVENTS_RETENTION_DAYS)
+    reset = since is None or since < retention_cutoff
+    
+    query = db.session.query(Order).filter(
+        Order.assigned_mechanic_id == mechanic_id
+    )
+    deleted = []
+    
+    if not reset:
+        window_start = since - timedelta(seconds=config.MECHANIC_SYNC_OVERLAP_SECONDS)
+        query = query.filter(Order.updated_at > window_start)
+        tombstones = db.session.query(OrderEvent.order_id).filter(
+            OrderEvent.mechanic_id == mechanic_id,
+            OrderEvent.event_type.in_(('reassigned', 'deleted')),
+            OrderEvent.created_at > window_start
+        ).distinct().all()
+        deleted = [order_id for (order_id,) in tombstones]
+    
+    orders = query.order_by(Order.updated_at).all()
+    
+    # Заказ могли забрать и вернуть механику в пределах окна - он остаётся в списке
+    current_ids = {order.id for order in orders}
+    deleted = sorted(order_id for order_id in deleted if order_id not in current_ids)
+    
+    return jsonify({
+        'orders': [order.to_dict() for order in orders],
+        'deleted': deleted,
+        'cursor': cursor.isoformat(),
+        'reset': reset
+    })
+
+
 @mechanic_bp.route('/orders/<int:order_id>', methods=['GET'])
 @require_auth
 def get_mechanic_order_details(order_id):
@@ -176,6 +231,7 @@ def update_order_status(order_id):
         }
         assignment.status = status_map[data['status']]
     
+    record_order_event(order.id, 'updated', mechanic_id)
     db.session.commit()
     return jsonify(order.to_dict())
 
@@ -201,6 +257,7 @@ def add_comment(order_id):
     order = db.session.query(Order).get(order_id)
     if order:
         order.comments_count += 1
+        record_order_event(order.id, 'updated', order.assigned_mechanic_id)
     
     db.session.commit()
     return jsonify(comment.to_dict()), 201
@@ -267,6 +324,7 @@ def stop_timer(order_id):
     order = db.session.query(Order).get(order_id)
     if order:
         order.total_time_minutes += time_log.duration_minutes
+        record_order_event(order.id, 'updated', order.assigned_mechanic_id)
     
     db.session.commit()
     return jsonify(time_log.to_dict())
@@ -297,6 +355,7 @@ def add_manual_time(order_id):
     order = db.session.query(Order).get(order_id)
     if order:
         order.total_time_minutes += time_log.duration_minutes
+        record_order_event(order.id, 'updated', order.assigned_mechanic_id)
     
     db.session.commit()
     return jsonify(time_log.to_dict()), 201
@@ -336,6 +395,12 @@ def add_custom_work(order_id):
     )
     
     db.session.add(work)
+    
+    order = db.session.query(Order).get(order_id)
+    if order:
+        order.updated_at = datetime.utcnow()
+        record_order_event(order.id, 'updated', order.assigned_mechanic_id)
+    
     db.session.commit()
     return jsonify(work.to_dict()), 201
 
@@ -360,7 +425,17 @@ def add_custom_part(order_id):
     )
     
     db.session.add(part)
+    
+    order = db.session.query(Order).get(order_id)
+    if order:
+        order.updated_at = datetime.utcnow()
+        record_order_event(order.id, 'updated', order.assigned_mechanic_id)
+    
+    # Номер запчасти попадает в поиск деталей; версия каталога (и снимки для бота) не меняется
+    versions = bump_part_numbers_version() if part.part_number else None
     db.session.commit()
+    if versions:
+        apply_part_number_added(versions, part.part_number, part.name)
     return jsonify(part.to_dict()), 201
 
 
@@ -558,16 +633,12 @@ def create_order():
         part_names = ', '.join([p.name_ru for p in parts])
         
         photo_url = None
+        photo_path = None
         if 'photo' in request.files:
             file = request.files['photo']
             if file and file.filename:
-                upload_folder = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'uploads')
-                os.makedirs(upload_folder, exist_ok=True)
-                
-                filename = secure_filename(f"order_{datetime.utcnow().timestamp()}_{file.filename}")
-                filepath = os.path.join(upload_folder, filename)
-                file.save(filepath)
-                photo_url = f"/static/uploads/{filename}"
+                # Сжатие и миниатюры делает фоновый воркер; до этого отдаётся исходник
+                photo_path, photo_url = save_upload(file)
         
         is_original = part_type == 'original'
         
@@ -586,7 +657,13 @@ def create_order():
         )
         
         db.session.add(order)
+        db.session.flush()
+        record_order_event(order.id, 'created', mechanic_id)
+        if photo_path:
+            enqueue_photo_job(order.id, photo_path)
         db.session.commit()
+        if photo_path:
+            wake_photo_worker()
         
         logger.info(f"Order created by mechanic {mechanic.name}: ID={order.id}")
         
@@ -1,6 +1,7 @@
 import logging
 from flask import request, jsonify
-from models import db, Order
+from models import db, Order, Part
+from services.order_events import record_order_event
 
 logger = logging.getLogger(__name__)
 
@@ -25,9 +26,12 @@ def sanitize_legacy_parts_payload(parts_list):
 
 
 def sanitize_parts_payload(parts_payload):
-    """Sanitize modern parts payload format."""
-    from models import Part
+    """
+    Sanitize modern parts payload format.
     
+    All catalog partIds are resolved with a single IN query, so the cost
+    does not grow with the number of line items.
+    """
     if not isinstance(parts_payload, list) or not parts_payload:
         raise ValueError('parts должен быть непустым массивом')
     sanitized = []
@@ -70,19 +74,8 @@ def sanitize_parts_payload(parts_payload):
         if is_custom:
             if not resolved_name:
                 raise ValueError('name обязателен для кастомной детали')
-        else:
-            if part_id:
-                part = Part.query.get(part_id)
-                if not part:
-                    from app import ensure_part_catalog_seeded
-                    ensure_part_catalog_seeded()
-                    part = Part.query.get(part_id)
-                if not part:
-                    raise ValueError(f'Деталь с id {part_id} не найдена')
-                if not resolved_name:
-                    resolved_name = part.name_ru
-            elif not resolved_name:
-                raise ValueError('Для детали необходимо указать name или partId')
+        elif not part_id and not resolved_name:
+            raise ValueError('Для детали необходимо указать name или partId')
         sanitized.append({
             'partId': part_id,
             'name': resolved_name,
@@ -91,9 +84,26 @@ def sanitize_parts_payload(parts_payload):
             'isCustom': is_custom,
             'note': note_value
         })
+    
+    catalog_ids = {item['partId'] for item in sanitized if item['partId'] and not item['isCustom']}
+    if catalog_ids:
+        part_names = _resolve_part_names(catalog_ids)
+        for item in sanitized:
+            if item['isCustom'] or not item['partId']:
+                continue
+            if item['partId'] not in part_names:
+                raise ValueError(f"Деталь с id {item['partId']} не найдена")
+            if not item['name']:
+                item['name'] = part_names[item['partId']]
     return sanitized
 
 
+def _resolve_part_names(part_ids):
+    """{id: name_ru} для существующих деталей каталога - один запрос на весь заказ"""
+    rows = db.session.query(Part.id, Part.name_ru).filter(Part.id.in_(part_ids)).all()
+    return {part_id: name_ru for part_id, name_ru in rows}
+
+
 def create_order(enable_car_number, allow_any_car_number, normalize_car_number, is_valid_car_number):
     """
     Create a new order.
@@ -176,6 +186,8 @@ def create_order(enable_car_number, allow_any_car_number, normalize_car_number,
             order.vin = order.car_number
 
         db.session.add(order)
+        db.session.flush()
+        record_order_event(order.id, 'created', order.assigned_mechanic_id)
         db.session.commit()
 
         logger.info(f"Order created: ID={order.id}, mechanic={order.mechanic_name}")
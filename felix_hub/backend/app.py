@@ -1,17 +1,19 @@
+import io
 import os
+import tempfile
 import sys
 import logging
 import re
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify, render_template, send_file
+from flask import Flask, request, jsonify, render_template, send_file, send_from_directory, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 import pandas as pd
 from sqlalchemy import text, func
+from sqlalchemy.orm import selectinload
 import asyncio
-import time
 from collections import OrderedDict
-from threading import Event, Lock, Thread
+from threading import Event, Thread
 from werkzeug.security import generate_password_hash
 
 # Add backend directory to path for imports
@@ -21,10 +23,28 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 import config
 
 from models import (db, Order, Category, Part, Mechanic, OrderComment, 
-                    TimeLog, CustomWorkItem, CustomPartItem, WorkOrderAssignment, NotificationLog)
-from utils.notifier import notify_order_ready, notify_order_status_changed, notify_mechanic_assignment
-from utils.printer import print_order_with_fallback, print_test_receipt
-from services.telegram import notify_mechanic_status_change
+                    TimeLog, CustomWorkItem, CustomPartItem, WorkOrderAssignment, NotificationLog, PrintJob)
+from utils.notifier import (notify_order_ready, notify_order_status_changed, notify_mechanic_assignment,
+                            build_status_digests, send_status_digests)
+from utils.printer import print_test_receipt, get_printer_session, PRINTER_ENABLED
+from utils.compression import init_compression
+from utils.pdf_renderer import (get_order_pdf, receipt_etag, order_snapshot, write_receipts_pdf,
+                                collect_pick_list, write_pick_list_pdf)
+from services.telegram import (notify_mechanic_status_change, build_mechanic_status_digests,
+                               send_mechanic_status_digests)
+from services.order_events import record_order_event, get_changes_since
+from services.catalog_io import (CATALOG_FORMATS, CatalogImportError, read_catalog_rows, import_catalog,
+                                 iter_catalog_csv, iter_catalog_json, seed_catalog)
+from services.part_search import (search_parts, bump_catalog_version, apply_part_saved, apply_part_deleted,
+                                  apply_catalog_changed, invalidate_part_index)
+from services.catalog_snapshot import CATALOG_SNAPSHOT_LANGUAGES, get_catalog_document
+from services.print_queue import enqueue_print_job, enqueue_print_jobs, wake_print_worker, init_print_queue
+from services.photo_pipeline import init_photo_pipeline
+from services.order_search import search_orders, init_order_search
+from services.order_parts import DEMAND_PERIODS, init_order_parts, part_demand, top_parts, demand_by_category
+from services.webhook_dispatch import UpdateDispatcher
+from services.update_dedup import create_update_store
+from services.inbound_updates import enqueue_update, queue_depth
 
 load_dotenv()
 
@@ -32,11 +52,18 @@ load_dotenv()
 try:
     from telegram import Update
     from telegram.ext import Application
+    from services.bot_persistence import create_bot_persistence, process_update_with_state
+    from services.inline_reply import InlineReply, InlineReplyRequest, run_with_inline_reply
     # Import bot setup_handlers
     sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bot'))
-    from bot import setup_handlers
+    # bot.py делает `from config import ...` и должен получить свой config, а не backend/config.py
+    _backend_config = sys.modules.pop('config')
+    try:
+        from bot import setup_handlers, application_builder
+    finally:
+        sys.modules['config'] = _backend_config
     TELEGRAM_AVAILABLE = True
-except ImportError as e:
+except (ImportError, ValueError) as e:
     logging.warning(f"Telegram bot modules not available: {e}")
     TELEGRAM_AVAILABLE = False
 
@@ -77,6 +104,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Сжатие ответов (gzip/brotli) и предсжатая статика админки
+init_compression(app)
+init_print_queue(app)
+init_photo_pipeline(app)
+init_order_search()
+init_order_parts()
+
 
 def str_to_bool(value, default=False):
     if value is None:
@@ -197,10 +231,9 @@ def get_canonical_part_catalog():
     return _CANONICAL_PART_CATEGORIES_CACHE
 
 
-def ensure_part_catalog_seeded():
-    categories_map = get_canonical_part_catalog()
-    changed = False
-    for sort_index, (display_name, part_names) in enumerate(categories_map.items(), start=1):
+def _canonical_catalog_rows():
+    rows = []
+    for sort_index, (display_name, part_names) in enumerate(get_canonical_part_catalog().items(), start=1):
         stripped = display_name.strip()
         icon = ''
         name_ru = stripped
@@ -209,135 +242,27 @@ def ensure_part_catalog_seeded():
             if icon_candidate:
                 icon = icon_candidate
             name_ru = name_candidate or stripped
-        if not icon:
-            icon = '🔧'
-        category = Category.query.filter_by(name_ru=name_ru).first()
-        if not category:
-            category = Category(
-                name_ru=name_ru,
-                icon=icon,
-                sort_order=sort_index
-            )
-            db.session.add(category)
-            db.session.flush()
-            changed = True
-        else:
-            updated = False
-            if icon and category.icon != icon:
-                category.icon = icon
-                updated = True
-            if category.sort_order != sort_index:
-                category.sort_order = sort_index
-                updated = True
-            if updated:
-                changed = True
-        existing_parts = {part.name_ru: part for part in category.parts}
         for part_order, part_name in enumerate(part_names, start=1):
-            part = existing_parts.get(part_name)
-            if not part:
-                db.session.add(Part(
-                    category_id=category.id,
-                    name_ru=part_name,
-                    is_common=True,
-                    sort_order=part_order
-                ))
-                changed = True
-            else:
-                updated = False
-                if part.sort_order != part_order:
-                    part.sort_order = part_order
-                    updated = True
-                if part.is_common is False:
-                    part.is_common = True
-                    updated = True
-                if updated:
-                    changed = True
-    if changed:
-        db.session.commit()
+            rows.append({
+                'category': name_ru,
+                'category_icon': icon or '🔧',
+                'category_sort_order': sort_index,
+                'name_ru': part_name,
+                'is_common': True,
+                'sort_order': part_order
+            })
+    return rows
 
 
-def sanitize_legacy_parts_payload(parts_list):
-    if not isinstance(parts_list, list) or not parts_list:
-        raise ValueError('selected_parts должен быть непустым массивом')
-    sanitized = []
-    for part in parts_list:
-        if not isinstance(part, str) or not part.strip():
-            raise ValueError('selected_parts должен содержать строковые значения')
-        sanitized.append({
-            'partId': None,
-            'name': part.strip(),
-            'quantity': 1,
-            'price': None,
-            'isCustom': False,
-            'note': None
-        })
-    return sanitized
-
-
-def sanitize_parts_payload(parts_payload):
-    if not isinstance(parts_payload, list) or not parts_payload:
-        raise ValueError('parts должен быть непустым массивом')
-    sanitized = []
-    for index, raw in enumerate(parts_payload, start=1):
-        if not isinstance(raw, dict):
-            raise ValueError('Каждая запись в parts должна быть объектом')
-        part_id = raw.get('partId')
-        if part_id is not None:
-            try:
-                part_id = int(part_id)
-            except (TypeError, ValueError):
-                raise ValueError('partId должен быть числом')
-        is_custom = bool(raw.get('isCustom', False))
-        name_value = raw.get('name')
-        if isinstance(name_value, str):
-            name_value = name_value.strip()
-        note_value = raw.get('note')
-        if isinstance(note_value, str):
-            note_value = note_value.strip()
-        elif note_value is not None:
-            note_value = str(note_value)
-        if note_value == '':
-            note_value = None
-        quantity_raw = raw.get('quantity', 1)
-        try:
-            quantity = int(quantity_raw)
-        except (TypeError, ValueError):
-            raise ValueError('quantity должен быть целым числом')
-        if quantity <= 0:
-            raise ValueError('quantity должен быть положительным числом')
-        price_raw = raw.get('price')
-        if price_raw is not None:
-            try:
-                price = float(price_raw)
-            except (TypeError, ValueError):
-                raise ValueError('price должен быть числом')
-        else:
-            price = None
-        resolved_name = name_value if name_value else None
-        if is_custom:
-            if not resolved_name:
-                raise ValueError('name обязателен для кастомной детали')
-        else:
-            if part_id:
-                part = Part.query.get(part_id)
-                if not part:
-                    ensure_part_catalog_seeded()
-                    part = Part.query.get(part_id)
-                if not part:
-                    raise ValueError(f'Деталь с id {part_id} не найдена')
-                if not resolved_name:
-                    resolved_name = part.name_ru
-            elif not resolved_name:
-                raise ValueError('Для детали необходимо указать name или partId')
-        sanitized.append({
-            'partId': part_id,
-            'name': resolved_name,
-            'quantity': quantity,
-            'price': price,
-            'isCustom': is_custom,
-            'note': note_value
-        })
-    return sanitized
+def ensure_part_catalog_seeded(force=False):
+    """
+    Засеять канонический каталог одним пакетным upsert.
+    
+    Вызывается при деплое (init_db.py) и локальном запуске; если отпечаток
+    каталога не изменился, стоит одного запроса к catalog_meta.
+    """
+    return seed_catalog(_canonical_catalog_rows(), force=force)
+
 
 def _build_orders_response():
     query = Order.query
@@ -445,6 +370,16 @@ def internal_error(error):
     return jsonify({'error': 'Внутренняя ошибка сервера'}), 500
 
 
+def _webhook_stats():
+    if config.WEBHOOK_PROCESSING != 'queue':
+        return webhook_dispatcher.stats()
+    try:
+        return {'mode': 'queue', 'queued': queue_depth()}
+    except Exception:
+        db.session.rollback()
+        return {'mode': 'queue', 'queued': None}
+
+
 @app.route('/health')
 def health_check():
     """Health check для Railway"""
@@ -458,6 +393,7 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'database': db_status,
+        'webhook': _webhook_stats(),
         'timestamp': datetime.utcnow().isoformat()
     }), 200
 
@@ -525,6 +461,20 @@ def get_orders_stats():
             return jsonify({'error': 'Ошибка получения статистики'}), 500
 
 
+@app.route('/api/orders/changes', methods=['GET'])
+def get_order_changes():
+    """Лента изменений заказов: версия и события после since"""
+    since = request.args.get('since', type=int)
+    wait = request.args.get('wait', 0, type=int)
+    wait = min(max(wait, 0), config.CHANGE_FEED_MAX_WAIT)
+    
+    try:
+        return jsonify(get_changes_since(since, wait=wait)), 200
+    except Exception as e:
+        logger.error(f"Error fetching order changes: {e}")
+        return jsonify({'error': 'Ошибка получения изменений'}), 500
+
+
 @app.route('/export')
 def export_orders():
     """Экспорт заказов в Excel"""
@@ -653,6 +603,31 @@ def get_orders():
             return jsonify({'error': 'Ошибка получения заказов'}), 500
 
 
+@app.route('/api/orders/search', methods=['GET'])
+def search_orders_route():
+    """Поиск заказов по фрагменту номера машины, VIN, деталям и комментариям"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Параметр q обязателен'}), 400
+    
+    try:
+        orders, has_more = search_orders(
+            query,
+            status=request.args.get('status'),
+            mechanic=request.args.get('mechanic'),
+            limit=request.args.get('limit', type=int),
+            offset=request.args.get('offset', 0, type=int)
+        )
+        return jsonify({
+            'query': query,
+            'orders': [order.to_dict() for order in orders],
+            'has_more': has_more
+        }), 200
+    except Exception as e:
+        logger.error(f"Error searching orders for '{query}': {e}")
+        return jsonify({'error': 'Ошибка поиска заказов'}), 500
+
+
 @app.route('/api/orders/<int:order_id>', methods=['GET'])
 def get_order(order_id):
     try:
@@ -682,22 +657,18 @@ def update_order(order_id):
             return jsonify({'error': 'Невалидный JSON'}), 400
         
         old_status = order.status
+        print_job = None
         
         if 'status' in data:
             new_status = data['status']
             order.status = new_status
             
             if new_status == 'готов':
-                # Печать чека
-                print_success = print_order_with_fallback(order)
+                # Печать чека в фоне; printed выставит воркер после печати
+                print_job = enqueue_print_job(order.id)
                 
                 # Уведомление
                 notify_order_ready(order)
-                
-                # Отметить как напечатанный если печать была успешной
-                if print_success:
-                    order.printed = True
-                    logger.info(f"Order {order_id} marked as printed automatically")
             elif new_status in ['в работе', 'выдан']:
                 notify_order_status_changed(order, old_status, new_status)
             
@@ -771,8 +742,12 @@ def update_order(order_id):
         if 'photo_url' in data:
             order.photo_url = data['photo_url']
         
+        record_order_event(order.id, 'updated', order.assigned_mechanic_id)
         db.session.commit()
         
+        if print_job:
+            wake_print_worker()
+        
         logger.info(f"Order updated: ID={order_id}, status={order.status}")
         
         return jsonify(order.to_dict()), 200
@@ -783,6 +758,99 @@ def update_order(order_id):
         return jsonify({'error': 'Ошибка обновления заказа'}), 500
 
 
+BULK_UPDATE_MAX_ORDERS = 500
+
+
+def _send_bulk_notifications(customer_digests, mechanic_digests):
+    """Отправка сводных уведомлений после коммита (в тестах - синхронно)"""
+    def send():
+        with app.app_context():
+            try:
+                send_status_digests(customer_digests)
+                send_mechanic_status_digests(mechanic_digests, db_session=db.session)
+            except Exception as e:
+                logger.error(f"Error sending bulk status notifications: {e}")
+            finally:
+                db.session.remove()
+    
+    if not customer_digests and not mechanic_digests:
+        return
+    if app.testing:
+        send()
+    else:
+        Thread(target=send, name='bulk-notify', daemon=True).start()
+
+
+@app.route('/api/orders/bulk', methods=['PATCH'])
+def bulk_update_orders():
+    """Смена статуса многих заказов одной транзакцией"""
+    try:
+        data = request.get_json(silent=True)
+        
+        if not data:
+            return jsonify({'error': 'Невалидный JSON'}), 400
+        
+        order_ids = data.get('order_ids')
+        new_status = data.get('status')
+        
+        if not isinstance(order_ids, list) or not order_ids or not all(isinstance(i, int) for i in order_ids):
+            return jsonify({'error': 'order_ids должен быть непустым списком чисел'}), 400
+        if len(order_ids) > BULK_UPDATE_MAX_ORDERS:
+            return jsonify({'error': f'Не более {BULK_UPDATE_MAX_ORDERS} заказов за раз'}), 400
+        if new_status not in ORDER_STATUS_SEQUENCE:
+            return jsonify({'error': f"status должен быть одним из: {', '.join(ORDER_STATUS_SEQUENCE)}"}), 400
+        
+        order_ids = list(dict.fromkeys(order_ids))
+        orders = Order.query.options(selectinload(Order.assigned_mechanic)).filter(
+            Order.id.in_(order_ids)
+        ).order_by(Order.id).all()
+        found_ids = {order.id for order in orders}
+        
+        changes = []
+        for order in orders:
+            if order.status == new_status:
+                continue
+            changes.append((order, order.status, new_status))
+            order.status = new_status
+            record_order_event(order.id, 'updated', order.assigned_mechanic_id)
+        
+        print_jobs = []
+        if new_status == 'готов' and changes:
+            # Печать чеков в фоне; printed выставит воркер после печати
+            print_jobs = enqueue_print_jobs([order.id for order, _, _ in changes])
+        
+        # Тексты собираем до коммита, пока заказы загружены; одно сообщение на получателя
+        customer_digests = build_status_digests(changes)
+        mechanic_digests = build_mechanic_status_digests(changes)
+        
+        db.session.commit()
+        
+        if print_jobs:
+            wake_print_worker()
+        _send_bulk_notifications(customer_digests, mechanic_digests)
+        
+        updated_ids = [order.id for order, _, _ in changes]
+        updated_set = set(updated_ids)
+        logger.info(f"Bulk status update to '{new_status}': {len(updated_ids)} order(s)")
+        
+        return jsonify({
+            'status': new_status,
+            'updated': updated_ids,
+            'unchanged': [order.id for order in orders if order.id not in updated_set],
+            'not_found': [order_id for order_id in order_ids if order_id not in found_ids],
+            'print_jobs': [job.to_dict() for job in print_jobs],
+            'notifications': {
+                'customers': len(customer_digests),
+                'mechanics': len(mechanic_digests)
+            }
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error in bulk order update: {e}")
+        return jsonify({'error': 'Ошибка массового обновления заказов'}), 500
+
+
 @app.route('/api/orders/<int:order_id>', methods=['DELETE'])
 def delete_order(order_id):
     try:
@@ -791,6 +859,7 @@ def delete_order(order_id):
         if not order:
             return jsonify({'error': 'Заказ не найден'}), 404
         
+        record_order_event(order.id, 'deleted', order.assigned_mechanic_id)
         db.session.delete(order)
         db.session.commit()
         
@@ -813,14 +882,14 @@ def print_order_manually(order_id):
         if not order:
             return jsonify({'error': 'Заказ не найден'}), 404
         
-        success = print_order_with_fallback(order)
+        job = enqueue_print_job(order.id)
+        db.session.commit()
+        wake_print_worker()
         
-        if success:
-            order.printed = True
-            db.session.commit()
-            return jsonify({'message': 'Чек отправлен на печать'}), 200
-        else:
-            return jsonify({'error': 'Ошибка печати'}), 500
+        return jsonify({
+            'message': 'Чек поставлен в очередь печати',
+            'job': job.to_dict()
+        }), 202
         
     except Exception as e:
         db.session.rollback()
@@ -828,6 +897,199 @@ def print_order_manually(order_id):
         return jsonify({'error': 'Ошибка печати заказа'}), 500
 
 
+@app.route('/api/orders/<int:order_id>/receipt.pdf', methods=['GET'])
+def get_order_receipt_pdf(order_id):
+    """PDF-чек заказа (кешируется до следующего изменения заказа)"""
+    try:
+        order = Order.query.get(order_id)
+        
+        if not order:
+            return jsonify({'error': 'Заказ не найден'}), 404
+        
+        etag = receipt_etag(order)
+        # Проверяем до рендера, чтобы повторный запрос ничего не стоил
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        
+        response = send_file(
+            io.BytesIO(get_order_pdf(order)),
+            mimetype='application/pdf',
+            as_attachment=request.args.get('download') == '1',
+            download_name=f'felix_order_{order_id}.pdf',
+            etag=etag,
+            max_age=0
+        )
+        response.cache_control.private = True
+        return response
+        
+    except Exception as e:
+        logger.error(f"Error rendering PDF for order {order_id}: {e}")
+        return jsonify({'error': 'Ошибка создания PDF'}), 500
+
+
+@app.route('/media/photos/<path:filename>', methods=['GET'])
+def get_order_photo(filename):
+    """Обработанное фото заказа: имя файла — хеш содержимого, поэтому кешируется надолго"""
+    response = send_from_directory(config.PHOTO_STORAGE_DIR, filename, max_age=config.PHOTO_CACHE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+PDF_EXPORT_LAYOUTS = ('receipts', 'picklist')
+PDF_EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+def _iter_spooled_file(spool):
+    """Отдать временный файл частями и закрыть его"""
+    try:
+        spool.seek(0)
+        while True:
+            chunk = spool.read(PDF_EXPORT_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        spool.close()
+
+
+@app.route('/export/pdf', methods=['GET'])
+def export_orders_pdf():
+    """Пакетный PDF: чеки по одному на страницу или сводный список запчастей"""
+    layout = request.args.get('layout', 'receipts')
+    if layout not in PDF_EXPORT_LAYOUTS:
+        return jsonify({'error': f"layout должен быть одним из: {', '.join(PDF_EXPORT_LAYOUTS)}"}), 400
+    
+    status = request.args.get('status')
+    days = request.args.get('days', type=int)
+    page = request.args.get('page', 1, type=int)
+    if page < 1:
+        return jsonify({'error': 'page должен быть положительным числом'}), 400
+    
+    if days:
+        query = Order.query.filter(Order.created_at >= datetime.now() - timedelta(days=days))
+        period = f'{days}d'
+    else:
+        # По умолчанию - заказы за один день (сегодня)
+        try:
+            day = datetime.strptime(request.args['date'], '%Y-%m-%d') if request.args.get('date') else datetime.now()
+        except ValueError:
+            return jsonify({'error': 'date должен быть в формате YYYY-MM-DD'}), 400
+        day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
+        query = Order.query.filter(
+            Order.created_at >= day_start,
+            Order.created_at < day_start + timedelta(days=1)
+        )
+        period = day_start.strftime('%Y%m%d')
+    
+    if status:
+        query = query.filter(Order.status == status)
+    
+    filename = f'felix_{layout}_{period}.pdf'
+    page_count = 1
+    if layout == 'receipts':
+        # reportlab держит страницы в памяти до save(): в одном документе
+        # не больше PDF_EXPORT_MAX_ORDERS чеков, остальные - через ?page=N
+        total = query.count()
+        per_document = config.PDF_EXPORT_MAX_ORDERS
+        page_count = max(1, -(-total // per_document))
+        if page > page_count:
+            return jsonify({'error': f'Страница {page} не найдена, всего страниц: {page_count}'}), 404
+        query = query.order_by(Order.id).offset((page - 1) * per_document).limit(per_document)
+        if page_count > 1:
+            filename = f'felix_{layout}_{period}_{page}of{page_count}.pdf'
+    else:
+        query = query.order_by(Order.id)
+    
+    # yield_per читает заказы пачками, а не все сразу
+    orders = query.yield_per(100)
+    
+    # Маленький документ остаётся в памяти, большой уходит на диск
+    spool = tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024)
+    try:
+        if layout == 'receipts':
+            count = write_receipts_pdf((order_snapshot(order) for order in orders), spool)
+        else:
+            count = write_pick_list_pdf(collect_pick_list(orders), spool)
+        size = spool.tell()
+    except Exception as e:
+        spool.close()
+        logger.error(f"Error exporting orders PDF ({layout}): {e}")
+        return jsonify({'error': 'Ошибка создания PDF'}), 500
+    
+    logger.info(f"PDF export ({layout}): {count} item(s), {size} bytes")
+    
+    response = app.response_class(_iter_spooled_file(spool), mimetype='application/pdf')
+    response.headers['Content-Length'] = str(size)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['X-Page'] = str(page if layout == 'receipts' else 1)
+    response.headers['X-Page-Count'] = str(page_count)
+    return response
+
+
+@app.route('/api/orders/print-batch', methods=['POST'])
+def print_orders_batch_route():
+    """Пакетная перепечатка: заказы по списку ID или за день (по умолчанию сегодня)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        order_ids = data.get('order_ids')
+        
+        if order_ids is not None:
+            if not isinstance(order_ids, list) or not all(isinstance(i, int) for i in order_ids):
+                return jsonify({'error': 'order_ids должен быть списком чисел'}), 400
+            query = Order.query.filter(Order.id.in_(order_ids))
+        else:
+            try:
+                day = datetime.strptime(data['date'], '%Y-%m-%d') if data.get('date') else datetime.now()
+            except (TypeError, ValueError):
+                return jsonify({'error': 'date должен быть в формате YYYY-MM-DD'}), 400
+            day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
+            query = Order.query.filter(
+                Order.created_at >= day_start,
+                Order.created_at < day_start + timedelta(days=1)
+            )
+        
+        orders = query.order_by(Order.id).limit(500).all()
+        if not orders:
+            return jsonify({'error': 'Нет заказов для печати'}), 404
+        
+        jobs = enqueue_print_jobs([order.id for order in orders])
+        db.session.commit()
+        wake_print_worker()
+        
+        logger.info(f"Batch print queued for {len(jobs)} order(s)")
+        
+        return jsonify({
+            'message': f'В очередь печати поставлено чеков: {len(jobs)}',
+            'jobs': [job.to_dict() for job in jobs]
+        }), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error queueing batch print: {e}")
+        return jsonify({'error': 'Ошибка пакетной печати'}), 500
+
+
+@app.route('/api/orders/<int:order_id>/print-jobs', methods=['GET'])
+def get_order_print_jobs(order_id):
+    """История заданий печати заказа"""
+    jobs = PrintJob.query.filter_by(order_id=order_id).order_by(PrintJob.id.desc()).all()
+    return jsonify([job.to_dict() for job in jobs]), 200
+
+
+@app.route('/api/print-jobs/<int:job_id>', methods=['GET'])
+def get_print_job(job_id):
+    """Статус задания печати"""
+    job = db.session.get(PrintJob, job_id)
+    
+    if not job:
+        return jsonify({'error': 'Задание печати не найдено'}), 404
+    
+    return jsonify(job.to_dict()), 200
+
+
 @app.route('/api/printer/test', methods=['POST'])
 def test_printer():
     """Тестовая печать для проверки принтера"""
@@ -844,6 +1106,15 @@ def test_printer():
         return jsonify({'error': 'Ошибка печати'}), 500
 
 
+@app.route('/api/printer/status', methods=['GET'])
+def printer_status():
+    """Состояние термопринтера по данным фоновой проверки"""
+    if not PRINTER_ENABLED:
+        return jsonify({'enabled': False}), 200
+    
+    return jsonify({'enabled': True, **get_printer_session().status()}), 200
+
+
 # === Категории ===
 
 @app.route('/api/categories', methods=['GET'])
@@ -857,6 +1128,30 @@ def get_categories():
         return jsonify({'error': 'Ошибка получения категорий'}), 500
 
 
+@app.route('/api/catalog/snapshot', methods=['GET'])
+def get_catalog_snapshot():
+    """Весь каталог одним документом: категории и частые детали на языке lang"""
+    lang = request.args.get('lang', 'ru')
+    if lang not in CATALOG_SNAPSHOT_LANGUAGES:
+        return jsonify({'error': f"Параметр lang должен быть одним из: {', '.join(CATALOG_SNAPSHOT_LANGUAGES)}"}), 400
+    
+    try:
+        document = get_catalog_document(lang)
+        # Сериализованный документ кешируется по версии каталога, ответ 304 ничего не стоит
+        # Сжатый ответ отдаётся со слабым ETag - сравниваем слабо
+        if request.if_none_match.contains_weak(document.etag):
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(document.body, status=200, mimetype='application/json')
+        response.set_etag(document.etag)
+        response.headers['X-Catalog-Version'] = document.version
+        response.cache_control.no_cache = True
+        return response
+    except Exception as e:
+        logger.error(f"Error building catalog snapshot for '{lang}': {e}")
+        return jsonify({'error': 'Ошибка получения каталога'}), 500
+
+
 @app.route('/api/categories/<int:category_id>', methods=['GET'])
 def get_category(category_id):
     """Получение одной категории"""
@@ -888,7 +1183,9 @@ def create_category():
         )
         
         db.session.add(category)
+        versions = bump_catalog_version()
         db.session.commit()
+        apply_catalog_changed(versions)
         
         logger.info(f"Category created: ID={category.id}, name={category.name_ru}")
         return jsonify(category.to_dict()), 201
@@ -924,7 +1221,9 @@ def update_category(category_id):
         if 'sort_order' in data:
             category.sort_order = data['sort_order']
         
+        versions = bump_catalog_version()
         db.session.commit()
+        apply_catalog_changed(versions)
         
         logger.info(f"Category updated: ID={category_id}")
         return jsonify(category.to_dict()), 200
@@ -952,7 +1251,10 @@ def delete_category(category_id):
             }), 400
         
         db.session.delete(category)
+        bump_catalog_version()
         db.session.commit()
+        # Детали категории удалены каскадом - индекс поиска собирается заново
+        invalidate_part_index()
         
         logger.info(f"Category deleted: ID={category_id}")
         return '', 204
@@ -983,6 +1285,25 @@ def get_parts():
         return jsonify({'error': 'Ошибка получения деталей'}), 500
 
 
+@app.route('/api/parts/search', methods=['GET'])
+def search_parts_route():
+    """Поиск деталей по началу слов (ru/he/en) и номерам запчастей"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Параметр q обязателен'}), 400
+    
+    try:
+        results = search_parts(
+            query,
+            limit=request.args.get('limit', type=int),
+            category_id=request.args.get('category_id', type=int)
+        )
+        return jsonify({'query': query, 'results': results}), 200
+    except Exception as e:
+        logger.error(f"Error searching parts for '{query}': {e}")
+        return jsonify({'error': 'Ошибка поиска деталей'}), 500
+
+
 @app.route('/api/parts/<int:part_id>', methods=['GET'])
 def get_part(part_id):
     """Получение одной детали"""
@@ -1020,7 +1341,9 @@ def create_part():
         )
         
         db.session.add(part)
+        versions = bump_catalog_version()
         db.session.commit()
+        apply_part_saved(versions, part)
         
         logger.info(f"Part created: ID={part.id}, name={part.name_ru}")
         return jsonify(part.to_dict()), 201
@@ -1062,7 +1385,9 @@ def update_part(part_id):
         if 'sort_order' in data:
             part.sort_order = data['sort_order']
         
+        versions = bump_catalog_version()
         db.session.commit()
+        apply_part_saved(versions, part)
         
         logger.info(f"Part updated: ID={part_id}")
         return jsonify(part.to_dict()), 200
@@ -1083,7 +1408,9 @@ def delete_part(part_id):
             return jsonify({'error': 'Деталь не найдена'}), 404
         
         db.session.delete(part)
+        versions = bump_catalog_version()
         db.session.commit()
+        apply_part_deleted(versions, part_id)
         
         logger.info(f"Part deleted: ID={part_id}")
         return '', 204
@@ -1094,6 +1421,59 @@ def delete_part(part_id):
         return jsonify({'error': 'Ошибка удаления детали'}), 500
 
 
+@app.route('/api/catalog/import', methods=['POST'])
+def import_catalog_route():
+    """Массовый импорт каталога из CSV/JSON (файл в поле file или тело запроса)"""
+    upload = request.files.get('file')
+    fmt = request.args.get('format')
+    if not fmt:
+        filename = upload.filename if upload else ''
+        if filename.lower().endswith('.csv') or request.mimetype == 'text/csv':
+            fmt = 'csv'
+        else:
+            fmt = 'json'
+    if fmt not in CATALOG_FORMATS:
+        return jsonify({'error': f"format должен быть одним из: {', '.join(CATALOG_FORMATS)}"}), 400
+    
+    data = upload.read() if upload else request.get_data()
+    if not data:
+        return jsonify({'error': 'Пустой файл импорта'}), 400
+    
+    try:
+        rows = read_catalog_rows(data, fmt)
+        stats = import_catalog(rows, dry_run=request.args.get('dry_run') == '1')
+    except CatalogImportError as e:
+        return jsonify({'error': f'Ошибка формата файла: {e}'}), 400
+    except Exception as e:
+        logger.error(f"Error importing catalog: {e}")
+        return jsonify({'error': 'Ошибка импорта каталога'}), 500
+    
+    return jsonify(stats), 200
+
+
+@app.route('/api/catalog/export', methods=['GET'])
+def export_catalog_route():
+    """Потоковый экспорт каталога в формате импорта"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in CATALOG_FORMATS:
+        return jsonify({'error': f"format должен быть одним из: {', '.join(CATALOG_FORMATS)}"}), 400
+    
+    if fmt == 'csv':
+        # BOM, чтобы Excel открыл кириллицу и иврит в UTF-8
+        chunks = iter_catalog_csv()
+        body = stream_with_context(('\ufeff' + chunk if i == 0 else chunk) for i, chunk in enumerate(chunks))
+        mimetype = 'text/csv'
+    else:
+        body = stream_with_context(iter_catalog_json())
+        mimetype = 'application/json'
+    
+    response = app.response_class(body, mimetype=mimetype)
+    response.headers['Content-Disposition'] = (
+        f'attachment; filename=felix_catalog_{datetime.now().strftime("%Y%m%d")}.{fmt}'
+    )
+    return response
+
+
 # === Управление механиками ===
 
 @app.route('/api/admin/mechanics', methods=['GET'])
@@ -1227,6 +1607,98 @@ def get_mechanic_stats(mechanic_id):
         return jsonify({'error': 'Ошибка получения статистики механика'}), 500
 
 
+# === Аналитика запчастей ===
+
+ANALYTICS_DEFAULT_DAYS = 30
+
+
+def _parse_analytics_range():
+    """
+    Период отчёта из start/end (YYYY-MM-DD, end включительно) или days.
+    
+    Returns:
+        (start, end) - полуинтервал [start, end)
+    
+    Raises:
+        ValueError: неверный формат даты или пустой период
+    """
+    try:
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d') if request.args.get('start') else None
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d') + timedelta(days=1) if request.args.get('end') else None
+    except ValueError:
+        raise ValueError('start и end должны быть в формате YYYY-MM-DD')
+    
+    if end is None:
+        end = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    if start is None:
+        days = request.args.get('days', ANALYTICS_DEFAULT_DAYS, type=int)
+        start = end - timedelta(days=max(days, 1))
+    if start >= end:
+        raise ValueError('start должен быть раньше end')
+    return start, end
+
+
+def _analytics_period_payload(start, end):
+    return {'start': start.date().isoformat(), 'end': (end - timedelta(days=1)).date().isoformat()}
+
+
+@app.route('/api/analytics/parts/demand', methods=['GET'])
+def get_part_demand():
+    """Спрос на запчасти по дням/неделям/месяцам (опционально по детали или категории)"""
+    period = request.args.get('period', 'day')
+    if period not in DEMAND_PERIODS:
+        return jsonify({'error': f"period должен быть одним из: {', '.join(DEMAND_PERIODS)}"}), 400
+    try:
+        start, end = _parse_analytics_range()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        series = part_demand(
+            start, end, period,
+            category=request.args.get('category'),
+            part_id=request.args.get('part_id', type=int),
+            name=request.args.get('name')
+        )
+        return jsonify({**_analytics_period_payload(start, end), 'period': period, 'series': series}), 200
+    except Exception as e:
+        logger.error(f"Error fetching part demand: {e}")
+        return jsonify({'error': 'Ошибка получения аналитики'}), 500
+
+
+@app.route('/api/analytics/parts/top', methods=['GET'])
+def get_top_parts():
+    """Самые заказываемые запчасти за период"""
+    try:
+        start, end = _parse_analytics_range()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        parts = top_parts(start, end, category=request.args.get('category'), limit=limit)
+        return jsonify({**_analytics_period_payload(start, end), 'parts': parts}), 200
+    except Exception as e:
+        logger.error(f"Error fetching top parts: {e}")
+        return jsonify({'error': 'Ошибка получения аналитики'}), 500
+
+
+@app.route('/api/analytics/parts/categories', methods=['GET'])
+def get_part_demand_by_category():
+    """Спрос на запчасти по категориям за период"""
+    try:
+        start, end = _parse_analytics_range()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        categories = demand_by_category(start, end)
+        return jsonify({**_analytics_period_payload(start, end), 'categories': categories}), 200
+    except Exception as e:
+        logger.error(f"Error fetching part demand by category: {e}")
+        return jsonify({'error': 'Ошибка получения аналитики'}), 500
+
+
 # === Назначение заказов ===
 
 @app.route('/api/admin/orders/<int:order_id>/assign', methods=['POST'])
@@ -1254,6 +1726,7 @@ def assign_order(order_id):
             return jsonify({'error': 'Механик неактивен'}), 400
         
         # Обновить заказ
+        previous_mechanic_id = order.assigned_mechanic_id
         order.assigned_mechanic_id = mechanic_id
         if order.work_status == 'новый' or not order.work_status:
             order.work_status = 'назначен'
@@ -1267,6 +1740,9 @@ def assign_order(order_id):
         )
         
         db.session.add(assignment)
+        if previous_mechanic_id and previous_mechanic_id != mechanic_id:
+            record_order_event(order.id, 'reassigned', previous_mechanic_id)
+        record_order_event(order.id, 'assigned', mechanic_id)
         db.session.commit()
         
         logger.info(f"Order {order_id} assigned to mechanic {mechanic_id}")
@@ -1311,6 +1787,8 @@ def reassign_order(order_id):
         if not new_mechanic.active:
             return jsonify({'error': 'Механик неактивен'}), 400
         
+        previous_mechanic_id = order.assigned_mechanic_id
+        
         # Закрыть старое назначение если есть
         if order.assigned_mechanic_id:
             old_assignment = WorkOrderAssignment.query.filter_by(
@@ -1334,6 +1812,9 @@ def reassign_order(order_id):
         order.work_status = 'назначен'
         
         db.session.add(assignment)
+        if previous_mechanic_id and previous_mechanic_id != new_mechanic_id:
+            record_order_event(order.id, 'reassigned', previous_mechanic_id)
+        record_order_event(order.id, 'assigned', new_mechanic_id)
         db.session.commit()
         
         logger.info(f"Order {order_id} reassigned to mechanic {new_mechanic_id}")
@@ -1358,44 +1839,30 @@ def reassign_order(order_id):
 telegram_app = None
 telegram_loop = None
 telegram_thread = None
-_processed_updates = OrderedDict()
-_processed_updates_lock = Lock()
-PROCESSED_UPDATES_TTL = 60 * 15  # 15 минут
-PROCESSED_UPDATES_MAX_SIZE = 2048
-
-
-def _cleanup_processed_updates(now=None):
-    if now is None:
-        now = time.time()
-    while _processed_updates:
-        first_key, first_timestamp = next(iter(_processed_updates.items()))
-        if now - first_timestamp > PROCESSED_UPDATES_TTL:
-            _processed_updates.popitem(last=False)
-        else:
-            break
+# Фильтр повторной доставки: memory / database / redis (UPDATE_DEDUP_BACKEND)
+update_store = create_update_store()
+# Ограничение параллельной обработки обновлений на event loop бота
+webhook_dispatcher = UpdateDispatcher(config.WEBHOOK_MAX_IN_FLIGHT, config.WEBHOOK_MAX_QUEUE)
 
 
 def _register_update(update_id):
     if update_id is None:
         return True
-    update_key = str(update_id)
-    now = time.time()
-    with _processed_updates_lock:
-        _cleanup_processed_updates(now)
-        if update_key in _processed_updates:
-            return False
-        _processed_updates[update_key] = now
-        while len(_processed_updates) > PROCESSED_UPDATES_MAX_SIZE:
-            _processed_updates.popitem(last=False)
-    return True
+    try:
+        return update_store.register(str(update_id))
+    except Exception as e:
+        # Лучше обработать обновление дважды, чем потерять его
+        logger.error(f"❌ Update dedup store error ({update_store.name}): {e}")
+        return True
 
 
 def _release_update(update_id):
     if update_id is None:
         return
-    update_key = str(update_id)
-    with _processed_updates_lock:
-        _processed_updates.pop(update_key, None)
+    try:
+        update_store.release(str(update_id))
+    except Exception as e:
+        logger.error(f"❌ Update dedup store error ({update_store.name}): {e}")
 
 
 def _log_update_result(future, update_identifier):
@@ -1435,10 +1902,15 @@ def setup_telegram_webhook():
             write_timeout=10.0,
         )
         
-        telegram_app = Application.builder()\
-            .token(TELEGRAM_TOKEN)\
-            .request(request_config)\
-            .build()
+        # Общее состояние диалогов: следующее нажатие может прийти в другой воркер.
+        # Апдейты разных чатов обрабатываются параллельно, одного чата — по очереди
+        telegram_app = application_builder(
+            TELEGRAM_TOKEN,
+            persistence=create_bot_persistence(app),
+            max_concurrent_updates=config.WEBHOOK_MAX_IN_FLIGHT
+        ).request(
+            InlineReplyRequest(request_config) if config.WEBHOOK_INLINE_REPLY_BUDGET_MS > 0 else request_config
+        ).build()
         
         setup_handlers(telegram_app)
         
@@ -1468,8 +1940,8 @@ def setup_telegram_webhook():
         future = asyncio.run_coroutine_threadsafe(init_and_set_webhook(), telegram_loop)
         future.result(timeout=30.0)
         
-        with _processed_updates_lock:
-            _processed_updates.clear()
+        update_store.clear()
+        webhook_dispatcher.bind(telegram_loop)
         
         logger.info("✅ Telegram application initialized for webhook mode")
     
@@ -1481,13 +1953,17 @@ def setup_telegram_webhook():
 @app.route('/webhook', methods=['POST'])
 def telegram_webhook():
     """Endpoint для приёма обновлений от Telegram"""
-    if not telegram_app or not telegram_loop:
-        logger.error("❌ Webhook called but telegram_app is not configured")
-        return jsonify({'error': 'Bot not configured'}), 500
+    # В режиме очереди обновление только сохраняется, обрабатывает update_worker.py
+    queue_mode = config.WEBHOOK_PROCESSING == 'queue'
     
-    if not telegram_loop.is_running():
-        logger.error("❌ Telegram event loop is not running")
-        return jsonify({'error': 'Bot not ready'}), 503
+    if not queue_mode:
+        if not telegram_app or not telegram_loop:
+            logger.error("❌ Webhook called but telegram_app is not configured")
+            return jsonify({'error': 'Bot not configured'}), 500
+        
+        if not telegram_loop.is_running():
+            logger.error("❌ Telegram event loop is not running")
+            return jsonify({'error': 'Bot not ready'}), 503
     
     try:
         update_data = request.get_json()
@@ -1505,20 +1981,45 @@ def telegram_webhook():
         
         logger.info(f"📨 Received webhook update: {update_identifier}")
         
+        if queue_mode:
+            try:
+                enqueue_update(update_data)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                _release_update(update_id_value)
+                raise
+            return jsonify({'ok': True, 'queued': True}), 200
+        
         update = Update.de_json(update_data, telegram_app.bot)
         
+        # Нажатие кнопки: query.answer() можно вернуть прямо в ответе на webhook
+        inline_reply = None
+        if update.callback_query and isinstance(telegram_app.bot.request, InlineReplyRequest):
+            inline_reply = InlineReply()
+        
+        def process():
+            coroutine = process_update_with_state(telegram_app, update)
+            return run_with_inline_reply(inline_reply, coroutine) if inline_reply else coroutine
+        
         try:
-            future = asyncio.run_coroutine_threadsafe(
-                telegram_app.process_update(update),
-                telegram_loop
-            )
+            admitted = webhook_dispatcher.submit(process, update_identifier, on_done=_log_update_result)
         except Exception:
             _release_update(update_id_value)
             raise
         
-        future.add_done_callback(
-            lambda fut, uid=update_identifier: _log_update_result(fut, uid)
-        )
+        if not admitted:
+            # Очередь заполнена: Telegram повторит доставку позже
+            _release_update(update_id_value)
+            logger.warning(f"⏳ Update {update_identifier} rejected: webhook queue is full")
+            response = jsonify({'error': 'Too many updates in progress'})
+            response.headers['Retry-After'] = str(config.WEBHOOK_RETRY_AFTER_SECONDS)
+            return response, 429
+        
+        if inline_reply:
+            method_call = inline_reply.wait(config.WEBHOOK_INLINE_REPLY_BUDGET_MS / 1000)
+            if method_call:
+                return jsonify(method_call), 200
         
         return jsonify({'ok': True}), 200
     
@@ -1539,6 +2040,7 @@ def cleanup_telegram_app():
     except Exception as e:
         logger.error(f"❌ Error shutting down telegram app: {e}", exc_info=True)
     finally:
+        webhook_dispatcher.reset()
         if telegram_loop:
             try:
                 if telegram_loop.is_running():
@@ -1555,13 +2057,13 @@ def cleanup_telegram_app():
         telegram_app = None
         telegram_loop = None
         telegram_thread = None
-        with _processed_updates_lock:
-            _processed_updates.clear()
+        update_store.clear()
 
 
 # Инициализировать webhook при старте приложения
-with app.app_context():
-    setup_telegram_webhook()
+if config.TELEGRAM_WEBHOOK_SETUP:
+    with app.app_context():
+        setup_telegram_webhook()
 
 # Зарегистрировать cleanup при завершении
 import atexit
@@ -1572,6 +2074,7 @@ if __name__ == '__main__':
     # Создать таблицы если их нет
     with app.app_context():
         db.create_all()
+        ensure_part_catalog_seeded()
         logger.info("Database initialized")
     
     # Production: gunicorn управляет запуском
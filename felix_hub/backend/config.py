@@ -124,6 +124,149 @@ ADMIN_CHAT_IDS = os.getenv('ADMIN_CHAT_IDS', '').strip()
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'https://felix-hub.example.com')
 
 
+# ============================================================================
+# Response Compression
+# ============================================================================
+
+# Negotiated gzip/brotli compression for JSON/HTML responses and static assets
+COMPRESSION_ENABLED = str_to_bool(os.getenv('COMPRESSION_ENABLED'), default=True)
+# Responses smaller than this (bytes) are sent as-is
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', 6))
+
+
+# ============================================================================
+# Order Change Feed
+# ============================================================================
+
+# Upper bound for long-poll wait (seconds). Keep clients on wait=0 with sync
+# gunicorn workers: a waiting request occupies a whole worker.
+CHANGE_FEED_MAX_WAIT = int(os.getenv('CHANGE_FEED_MAX_WAIT', 25))
+CHANGE_FEED_POLL_INTERVAL = float(os.getenv('CHANGE_FEED_POLL_INTERVAL', 1.0))
+CHANGE_FEED_MAX_EVENTS = int(os.getenv('CHANGE_FEED_MAX_EVENTS', 200))
+ORDER_EVENTS_RETENTION_DAYS = int(os.getenv('ORDER_EVENTS_RETENTION_DAYS', 7))
+# Mechanic delta sync re-reads this many seconds before the client cursor so
+# that transactions committed late with an earlier updated_at are not missed
+MECHANIC_SYNC_OVERLAP_SECONDS = int(os.getenv('MECHANIC_SYNC_OVERLAP_SECONDS', 5))
+
+
+# ============================================================================
+# Print Queue
+# ============================================================================
+
+# Receipts are printed by a background worker thread, never inside a request
+PRINT_WORKER_ENABLED = str_to_bool(os.getenv('PRINT_WORKER_ENABLED'), default=True)
+PRINT_WORKER_POLL_INTERVAL = float(os.getenv('PRINT_WORKER_POLL_INTERVAL', 2.0))
+# Thermal printer attempts before falling back to PDF
+PRINT_JOB_MAX_ATTEMPTS = int(os.getenv('PRINT_JOB_MAX_ATTEMPTS', 3))
+# Retry delay doubles after each failed attempt
+PRINT_RETRY_BACKOFF_SECONDS = int(os.getenv('PRINT_RETRY_BACKOFF_SECONDS', 5))
+# Jobs stuck in 'printing' longer than this (worker died) are requeued
+PRINT_JOB_STALE_SECONDS = int(os.getenv('PRINT_JOB_STALE_SECONDS', 300))
+# Due jobs printed together over one printer connection
+PRINT_BATCH_SIZE = int(os.getenv('PRINT_BATCH_SIZE', 20))
+
+
+# ============================================================================
+# Order Photos
+# ============================================================================
+
+# Uploaded photos are compressed and thumbnailed by a background worker thread
+PHOTO_WORKER_ENABLED = str_to_bool(os.getenv('PHOTO_WORKER_ENABLED'), default=True)
+PHOTO_WORKER_POLL_INTERVAL = float(os.getenv('PHOTO_WORKER_POLL_INTERVAL', 5.0))
+PHOTO_JOB_MAX_ATTEMPTS = int(os.getenv('PHOTO_JOB_MAX_ATTEMPTS', 3))
+PHOTO_RETRY_BACKOFF_SECONDS = int(os.getenv('PHOTO_RETRY_BACKOFF_SECONDS', 10))
+# Jobs stuck in 'processing' longer than this (worker died) are requeued
+PHOTO_JOB_STALE_SECONDS = int(os.getenv('PHOTO_JOB_STALE_SECONDS', 300))
+# Processed images, named by the SHA-256 of the uploaded bytes
+PHOTO_STORAGE_DIR = os.getenv(
+    'PHOTO_STORAGE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'media', 'photos')
+)
+# Longest edge of the main image and of the admin list thumbnail (pixels)
+PHOTO_MAX_EDGE = int(os.getenv('PHOTO_MAX_EDGE', 1600))
+PHOTO_THUMBNAIL_EDGE = int(os.getenv('PHOTO_THUMBNAIL_EDGE', 240))
+PHOTO_JPEG_QUALITY = int(os.getenv('PHOTO_JPEG_QUALITY', 82))
+# Content-addressed files never change, so browsers may keep them for a year
+PHOTO_CACHE_MAX_AGE = int(os.getenv('PHOTO_CACHE_MAX_AGE', 365 * 24 * 3600))
+
+
+# ============================================================================
+# PDF Receipts
+# ============================================================================
+
+# Worker processes for PDF rendering per app process (0 = render inline)
+PDF_RENDER_WORKERS = int(os.getenv('PDF_RENDER_WORKERS', 1))
+PDF_RENDER_TIMEOUT = int(os.getenv('PDF_RENDER_TIMEOUT', 30))
+# Rendered receipts kept in memory, keyed on order id + updated_at
+PDF_CACHE_SIZE = int(os.getenv('PDF_CACHE_SIZE', 64))
+# Orders per batch receipts document (/export/pdf); reportlab keeps every
+# page in memory until the document is saved, larger exports use ?page=N
+PDF_EXPORT_MAX_ORDERS = int(os.getenv('PDF_EXPORT_MAX_ORDERS', 200))
+# Unicode TTF font with Cyrillic; DejaVu Sans is looked up automatically
+PDF_FONT_PATH = os.getenv('PDF_FONT_PATH')
+PDF_FONT_BOLD_PATH = os.getenv('PDF_FONT_BOLD_PATH')
+
+
+# ============================================================================
+# Parts Search
+# ============================================================================
+
+# How often a process checks whether another process changed the catalog
+PART_SEARCH_VERSION_CHECK_SECONDS = float(os.getenv('PART_SEARCH_VERSION_CHECK_SECONDS', 5))
+PART_SEARCH_MAX_RESULTS = int(os.getenv('PART_SEARCH_MAX_RESULTS', 20))
+
+
+# ============================================================================
+# Order Search
+# ============================================================================
+
+ORDER_SEARCH_MAX_RESULTS = int(os.getenv('ORDER_SEARCH_MAX_RESULTS', 100))
+
+
+# ============================================================================
+# Telegram Webhook
+# ============================================================================
+
+# Updates processed concurrently on the bot event loop (per worker)
+WEBHOOK_MAX_IN_FLIGHT = int(os.getenv('WEBHOOK_MAX_IN_FLIGHT', 8))
+# Updates waiting for a free slot; beyond this the webhook answers 429
+WEBHOOK_MAX_QUEUE = int(os.getenv('WEBHOOK_MAX_QUEUE', 100))
+WEBHOOK_RETRY_AFTER_SECONDS = int(os.getenv('WEBHOOK_RETRY_AFTER_SECONDS', 5))
+# How long the webhook waits for a button tap's answerCallbackQuery to return
+# it in the HTTP response instead of a separate Bot API request (0 disables)
+WEBHOOK_INLINE_REPLY_BUDGET_MS = int(os.getenv('WEBHOOK_INLINE_REPLY_BUDGET_MS', 250))
+
+# 'inline': the web worker processes updates itself; 'queue': the webhook only
+# stores them in inbound_updates and update_worker.py processes them
+WEBHOOK_PROCESSING = os.getenv('WEBHOOK_PROCESSING', 'inline').lower()
+# Whether importing the app registers the webhook with Telegram (off in update_worker.py)
+TELEGRAM_WEBHOOK_SETUP = str_to_bool(os.getenv('TELEGRAM_WEBHOOK_SETUP'), default=True)
+
+# Where accepted update ids are remembered: 'memory' (per worker), 'database'
+# (processed_updates table, shared by all workers) or 'redis'
+UPDATE_DEDUP_BACKEND = os.getenv('UPDATE_DEDUP_BACKEND', 'database')
+UPDATE_DEDUP_REDIS_URL = os.getenv('UPDATE_DEDUP_REDIS_URL') or os.getenv('REDIS_URL')
+UPDATE_DEDUP_TTL_SECONDS = int(os.getenv('UPDATE_DEDUP_TTL_SECONDS', 60 * 15))
+UPDATE_DEDUP_MAX_SIZE = int(os.getenv('UPDATE_DEDUP_MAX_SIZE', 2048))
+UPDATE_DEDUP_PRUNE_SECONDS = float(os.getenv('UPDATE_DEDUP_PRUNE_SECONDS', 60))
+
+# Inbound update queue consumer (update_worker.py)
+INBOUND_UPDATE_PARALLELISM = int(os.getenv('INBOUND_UPDATE_PARALLELISM', 4))
+INBOUND_UPDATE_POLL_INTERVAL = float(os.getenv('INBOUND_UPDATE_POLL_INTERVAL', 0.5))
+INBOUND_UPDATE_MAX_ATTEMPTS = int(os.getenv('INBOUND_UPDATE_MAX_ATTEMPTS', 3))
+INBOUND_UPDATE_RETRY_BACKOFF_SECONDS = int(os.getenv('INBOUND_UPDATE_RETRY_BACKOFF_SECONDS', 2))
+# Claimed updates older than this are considered abandoned by a dead consumer
+INBOUND_UPDATE_STALE_SECONDS = int(os.getenv('INBOUND_UPDATE_STALE_SECONDS', 300))
+INBOUND_UPDATE_RETENTION_HOURS = int(os.getenv('INBOUND_UPDATE_RETENTION_HOURS', 24))
+
+# Conversation state and user_data of the bot kept in the bot_state table, so
+# consecutive updates of one mechanic may be handled by different workers
+BOT_PERSISTENCE_ENABLED = str_to_bool(os.getenv('BOT_PERSISTENCE_ENABLED'), default=True)
+# user_data checked this recently is not re-read when a handler asks for it
+BOT_STATE_READ_CACHE_SECONDS = float(os.getenv('BOT_STATE_READ_CACHE_SECONDS', 1.0))
+
+
 # ============================================================================
 # Logging
 # ============================================================================
@@ -4,8 +4,15 @@ import sys
 # Add backend directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from app import app, db
+from app import app, db, ensure_part_catalog_seeded
+from services.order_search import backfill_order_search_documents
+from services.order_parts import backfill_order_parts
 from models import Order, Category, Part
+from migrations.run_migrations import load_migration
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+# Миграции, добавляющие колонки в уже существующие таблицы
+COLUMN_MIGRATIONS = ('007_create_inbound_updates_table.py', '009_create_photo_jobs_table.py')
 
 def init_database():
     """Создать таблицы и заполнить начальными данными"""
@@ -14,6 +21,11 @@ def init_database():
         db.create_all()
         print("✅ Таблицы созданы")
         
+        # create_all не добавляет колонки в существующие таблицы:
+        # их добавляют миграции (повторный запуск безопасен)
+        for migration in COLUMN_MIGRATIONS:
+            load_migration(os.path.join(MIGRATIONS_DIR, migration)).apply()
+        
         # Проверить, есть ли уже данные
         if Category.query.count() == 0:
             # Добавить базовые категории
@@ -29,6 +41,20 @@ def init_database():
             db.session.commit()
             print("✅ Добавлены базовые категории")
         
+        # Канонический каталог: пропускается, если отпечаток не изменился
+        if ensure_part_catalog_seeded():
+            print("✅ Канонический каталог обновлён")
+        
+        # Поисковые документы для заказов, созданных до появления поиска
+        indexed = backfill_order_search_documents()
+        if indexed:
+            print(f"✅ Проиндексировано заказов для поиска: {indexed}")
+        
+        # Позиции заказов для аналитики спроса
+        backfilled = backfill_order_parts()
+        if backfilled:
+            print(f"✅ Перенесено позиций заказов в order_parts: {backfilled}")
+        
         print("✅ База данных готова!")
 
 if __name__ == '__main__':
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Bulk catalog import/export from the command line.
+
+Usage:
+    python manage_catalog.py import supplier.csv [--dry-run]
+    python manage_catalog.py import catalog.json
+    python manage_catalog.py export catalog.csv
+"""
+
+import argparse
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from services.catalog_io import (CATALOG_FORMATS, CatalogImportError, read_catalog_rows,
+                                 import_catalog, iter_catalog_csv, iter_catalog_json)
+
+
+def _detect_format(path, fmt):
+    if fmt:
+        return fmt
+    return 'csv' if path.lower().endswith('.csv') else 'json'
+
+
+def run_import(path, fmt=None, dry_run=False):
+    """Import categories and parts from a CSV/JSON file"""
+    fmt = _detect_format(path, fmt)
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    with app.app_context():
+        try:
+            stats = import_catalog(read_catalog_rows(data, fmt), dry_run=dry_run)
+        except CatalogImportError as e:
+            print(f"❌ Invalid file: {e}")
+            return False
+
+    print(f"{'Dry run' if dry_run else 'Import'} finished:")
+    print(f"  Categories: +{stats['categories_created']} created, {stats['categories_updated']} updated")
+    print(f"  Parts: +{stats['parts_created']} created, {stats['parts_updated']} updated, "
+          f"{stats['parts_unchanged']} unchanged")
+    for error in stats['errors'][:20]:
+        print(f"  ⚠️  row {error['row']}: {error['error']}")
+    if len(stats['errors']) > 20:
+        print(f"  ... and {len(stats['errors']) - 20} more errors")
+    return True
+
+
+def run_export(path, fmt=None):
+    """Export the catalog to a CSV/JSON file in the import format"""
+    fmt = _detect_format(path, fmt)
+    with app.app_context(), open(path, 'w', encoding='utf-8', newline='') as f:
+        for chunk in (iter_catalog_csv() if fmt == 'csv' else iter_catalog_json()):
+            f.write(chunk)
+    print(f"✅ Catalog exported to {path}")
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk catalog import/export')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='Upsert categories and parts from a file')
+    import_parser.add_argument('path')
+    import_parser.add_argument('--format', choices=CATALOG_FORMATS)
+    import_parser.add_argument('--dry-run', action='store_true', help='Validate and count without saving')
+
+    export_parser = subparsers.add_parser('export', help='Write the catalog to a file')
+    export_parser.add_argument('path')
+    export_parser.add_argument('--format', choices=CATALOG_FORMATS)
+
+    args = parser.parse_args()
+    if args.command == 'import':
+        success = run_import(args.path, args.format, args.dry_run)
+    else:
+        success = run_export(args.path, args.format)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Migration 003: Add indexes for mechanic delta sync
+This migration adds the (assigned_mechanic_id, updated_at) index on orders and
+the (mechanic_id, created_at) index on order_events used for tombstones.
+"""
+
+import sys
+import os
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from sqlalchemy import text, inspect
+
+
+INDEXES = [
+    ('orders', 'idx_orders_mechanic_updated', 'assigned_mechanic_id, updated_at'),
+    ('order_events', 'idx_order_events_mechanic', 'mechanic_id, created_at'),
+]
+
+
+def apply():
+    """Apply the migration - create delta sync indexes"""
+    with app.app_context():
+        inspector = inspect(db.engine)
+        existing_tables = inspector.get_table_names()
+        
+        for table, index_name, columns in INDEXES:
+            if table not in existing_tables:
+                print(f"❌ {table} table does not exist. Run init_db.py first.")
+                return False
+            
+            existing_indexes = [idx['name'] for idx in inspector.get_indexes(table)]
+            if index_name in existing_indexes:
+                print(f"⚠️  {index_name} already exists. Skipping.")
+                continue
+            
+            with db.engine.connect() as conn:
+                conn.execute(text(f'CREATE INDEX {index_name} ON {table}({columns})'))
+                conn.commit()
+            print(f"   - Created index {index_name}")
+        
+        print("✅ Migration 003 applied successfully!")
+        return True
+
+
+def rollback():
+    """Rollback the migration - drop delta sync indexes"""
+    with app.app_context():
+        print("Rolling back migration 003...")
+        
+        with db.engine.connect() as conn:
+            for _, index_name, _ in INDEXES:
+                conn.execute(text(f'DROP INDEX IF EXISTS {index_name}'))
+                conn.commit()
+                print(f"   - Dropped index {index_name}")
+        
+        print("✅ Migration 003 rolled back successfully!")
+        return True
+
+
+if __name__ == '__main__':
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == 'rollback':
+        rollback()
+    else:
+        apply()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Migration 004: Create order search documents
+This migration creates the order_search_documents table with its full-text
+index (FTS5 trigram table on SQLite, pg_trgm GIN index on PostgreSQL) and
+indexes all existing orders.
+"""
+
+import sys
+import os
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import OrderSearchDocument
+from services.order_search import backfill_order_search_documents
+from sqlalchemy import inspect
+
+
+def apply():
+    """Apply the migration - create the search table and index existing orders"""
+    with app.app_context():
+        inspector = inspect(db.engine)
+        if 'orders' not in inspector.get_table_names():
+            print("❌ orders table does not exist. Run init_db.py first.")
+            return False
+        
+        if 'order_search_documents' in inspector.get_table_names():
+            print("⚠️  order_search_documents already exists. Indexing missing orders only.")
+        else:
+            # create() fires the after_create DDL that builds the full-text index
+            OrderSearchDocument.__table__.create(db.engine)
+            print("   - Created table order_search_documents")
+        
+        indexed = backfill_order_search_documents()
+        print(f"   - Indexed {indexed} order(s)")
+        
+        print("✅ Migration 004 applied successfully!")
+        return True
+
+
+def rollback():
+    """Rollback the migration - drop the search table and its index"""
+    with app.app_context():
+        print("Rolling back migration 004...")
+        
+        OrderSearchDocument.__table__.drop(db.engine, checkfirst=True)
+        print("   - Dropped table order_search_documents")
+        
+        print("✅ Migration 004 rolled back successfully!")
+        return True
+
+
+if __name__ == '__main__':
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == 'rollback':
+        rollback()
+    else:
+        apply()
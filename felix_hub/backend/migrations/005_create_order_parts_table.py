@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Migration 005: Create order_parts table
+This migration creates the normalized order_parts table (one row per part of
+Order.selected_parts) with its analytics indexes and backfills existing orders.
+"""
+
+import sys
+import os
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import OrderPart
+from services.order_parts import backfill_order_parts
+from sqlalchemy import inspect
+
+
+def apply():
+    """Apply the migration - create order_parts and backfill it"""
+    with app.app_context():
+        inspector = inspect(db.engine)
+        if 'orders' not in inspector.get_table_names():
+            print("❌ orders table does not exist. Run init_db.py first.")
+            return False
+        
+        if 'order_parts' in inspector.get_table_names():
+            print("⚠️  order_parts already exists. Backfilling missing orders only.")
+        else:
+            # create() also creates the indexes declared on the model
+            OrderPart.__table__.create(db.engine)
+            print("   - Created table order_parts with indexes")
+        
+        rows = backfill_order_parts()
+        print(f"   - Backfilled {rows} row(s)")
+        
+        print("✅ Migration 005 applied successfully!")
+        return True
+
+
+def rollback():
+    """Rollback the migration - drop order_parts"""
+    with app.app_context():
+        print("Rolling back migration 005...")
+        
+        OrderPart.__table__.drop(db.engine, checkfirst=True)
+        print("   - Dropped table order_parts")
+        
+        print("✅ Migration 005 rolled back successfully!")
+        return True
+
+
+if __name__ == '__main__':
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == 'rollback':
+        rollback()
+    else:
+        apply()
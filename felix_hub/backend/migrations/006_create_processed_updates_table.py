@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Migration 006: Create processed_updates table
+This migration creates the table that remembers accepted Telegram webhook
+update ids, so every worker rejects redeliveries (UPDATE_DEDUP_BACKEND=database).
+"""
+
+import sys
+import os
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import ProcessedUpdate
+from sqlalchemy import inspect
+
+
+def apply():
+    """Apply the migration - create processed_updates"""
+    with app.app_context():
+        inspector = inspect(db.engine)
+        if 'processed_updates' in inspector.get_table_names():
+            print("⚠️  processed_updates already exists. Skipping.")
+            return True
+        
+        ProcessedUpdate.__table__.create(db.engine)
+        print("   - Created table processed_updates")
+        
+        print("✅ Migration 006 applied successfully!")
+        return True
+
+
+def rollback():
+    """Rollback the migration - drop processed_updates"""
+    with app.app_context():
+        print("Rolling back migration 006...")
+        
+        ProcessedUpdate.__table__.drop(db.engine, checkfirst=True)
+        print("   - Dropped table processed_updates")
+        
+        print("✅ Migration 006 rolled back successfully!")
+        return True
+
+
+if __name__ == '__main__':
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == 'rollback':
+        rollback()
+    else:
+        apply()
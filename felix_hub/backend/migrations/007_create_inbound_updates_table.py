@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Migration 007: Create inbound_updates table
+This migration creates the durable queue of raw Telegram webhook updates
+used when WEBHOOK_PROCESSING=queue (drained by update_worker.py). On an
+existing table it adds chat_id and next_attempt_at, which keep the updates
+of one chat in order and delay retries.
+"""
+
+import sys
+import os
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import InboundUpdate
+from sqlalchemy import inspect, text
+
+
+def apply():
+    """Apply the migration - create inbound_updates"""
+    with app.app_context():
+        inspector = inspect(db.engine)
+        if 'inbound_updates' not in inspector.get_table_names():
+            InboundUpdate.__table__.create(db.engine)
+            print("   - Created table inbound_updates")
+        else:
+            print("⚠️  inbound_updates already exists. Checking columns.")
+            columns = [col['name'] for col in inspector.get_columns('inbound_updates')]
+            with db.engine.connect() as conn:
+                if 'chat_id' not in columns:
+                    conn.execute(text('ALTER TABLE inbound_updates ADD COLUMN chat_id BIGINT'))
+                    print("   - Added column inbound_updates.chat_id (BIGINT)")
+                if 'next_attempt_at' not in columns:
+                    conn.execute(text('ALTER TABLE inbound_updates ADD COLUMN next_attempt_at TIMESTAMP'))
+                    print("   - Added column inbound_updates.next_attempt_at (TIMESTAMP)")
+                conn.commit()
+            indexes = [index['name'] for index in inspector.get_indexes('inbound_updates')]
+            for index in InboundUpdate.__table__.indexes:
+                if index.name not in indexes:
+                    index.create(db.engine)
+                    print(f"   - Created index {index.name}")
+        
+        print("✅ Migration 007 applied successfully!")
+        return True
+
+
+def rollback():
+    """Rollback the migration - drop inbound_updates"""
+    with app.app_context():
+        print("Rolling back migration 007...")
+        
+        InboundUpdate.__table__.drop(db.engine, checkfirst=True)
+        print("   - Dropped table inbound_updates")
+        
+        print("✅ Migration 007 rolled back successfully!")
+        return True
+
+
+if __name__ == '__main__':
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == 'rollback':
+        rollback()
+    else:
+        apply()
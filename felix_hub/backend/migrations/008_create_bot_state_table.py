@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Migration 008: Create bot_state table
+This migration creates the table holding the bot's user_data and conversation
+states, shared by every process that handles Telegram updates.
+"""
+
+import sys
+import os
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import BotState
+from sqlalchemy import inspect
+
+
+def apply():
+    """Apply the migration - create bot_state"""
+    with app.app_context():
+        inspector = inspect(db.engine)
+        if 'bot_state' in inspector.get_table_names():
+            print("⚠️  bot_state already exists. Skipping.")
+            return True
+        
+        BotState.__table__.create(db.engine)
+        print("   - Created table bot_state")
+        
+        print("✅ Migration 008 applied successfully!")
+        return True
+
+
+def rollback():
+    """Rollback the migration - drop bot_state"""
+    with app.app_context():
+        print("Rolling back migration 008...")
+        
+        BotState.__table__.drop(db.engine, checkfirst=True)
+        print("   - Dropped table bot_state")
+        
+        print("✅ Migration 008 rolled back successfully!")
+        return True
+
+
+if __name__ == '__main__':
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == 'rollback':
+        rollback()
+    else:
+        apply()
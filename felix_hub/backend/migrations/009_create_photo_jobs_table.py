@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Migration 009: Create photo_jobs table and add orders.photo_thumb_url
+This migration creates the queue of uploaded order photos processed by the
+background photo worker (compressed main image + thumbnail) and the column
+the admin list reads the thumbnail from.
+"""
+
+import sys
+import os
+
+# Add backend directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db
+from models import PhotoJob
+from sqlalchemy import text, inspect
+
+
+def apply():
+    """Apply the migration - create photo_jobs and add photo_thumb_url"""
+    with app.app_context():
+        inspector = inspect(db.engine)
+
+        if 'orders' not in inspector.get_table_names():
+            print("❌ Orders table does not exist. Run init_db.py first.")
+            return False
+
+        columns = [col['name'] for col in inspector.get_columns('orders')]
+        if 'photo_thumb_url' in columns:
+            print("⚠️  photo_thumb_url column already exists. Skipping.")
+        else:
+            with db.engine.connect() as conn:
+                conn.execute(text('ALTER TABLE orders ADD COLUMN photo_thumb_url VARCHAR(250)'))
+                conn.commit()
+            print("   - Added column orders.photo_thumb_url (VARCHAR(250))")
+
+        if 'photo_jobs' in inspector.get_table_names():
+            print("⚠️  photo_jobs already exists. Skipping.")
+        else:
+            PhotoJob.__table__.create(db.engine)
+            print("   - Created table photo_jobs")
+
+        print("✅ Migration 009 applied successfully!")
+        return True
+
+
+def rollback():
+    """Rollback the migration - drop photo_jobs and photo_thumb_url"""
+    with app.app_context():
+        print("Rolling back migration 009...")
+
+        PhotoJob.__table__.drop(db.engine, checkfirst=True)
+        print("   - Dropped table photo_jobs")
+
+        inspector = inspect(db.engine)
+        if 'orders' in inspector.get_table_names():
+            columns = [col['name'] for col in inspector.get_columns('orders')]
+            if 'photo_thumb_url' in columns:
+                with db.engine.connect() as conn:
+                    conn.execute(text('ALTER TABLE orders DROP COLUMN photo_thumb_url'))
+                    conn.commit()
+                print("   - Dropped column orders.photo_thumb_url")
+
+        print("✅ Migration 009 rolled back successfully!")
+        return True
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'rollback':
+        rollback()
+    else:
+        apply()
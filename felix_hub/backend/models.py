@@ -1,6 +1,7 @@
+import sqlite3
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from sqlalchemy import Index
+from sqlalchemy import DDL, Index, event
 
 db = SQLAlchemy()
 
@@ -53,6 +54,15 @@ class Part(db.Model):
         }
 
 
+# Служебные значения каталога (отпечаток засеянного канонического каталога)
+class CatalogMeta(db.Model):
+    __tablename__ = 'catalog_meta'
+    
+    key = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.String(255), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class Mechanic(db.Model):
     __tablename__ = 'mechanics'
     
@@ -102,6 +112,8 @@ class Order(db.Model):
     selected_parts = db.Column(db.JSON, nullable=False)
     is_original = db.Column(db.Boolean, default=False)
     photo_url = db.Column(db.String(250), nullable=True)
+    # Миниатюра для списка заказов; пусто, пока фото не обработано
+    photo_thumb_url = db.Column(db.String(250), nullable=True)
     status = db.Column(db.String(50), default="новый")
     printed = db.Column(db.Boolean, default=False)
     language = db.Column(db.String(5), default='ru')
@@ -119,6 +131,12 @@ class Order(db.Model):
     time_logs = db.relationship('TimeLog', back_populates='order', order_by='TimeLog.started_at.desc()', cascade='all, delete-orphan')
     custom_works = db.relationship('CustomWorkItem', back_populates='order', cascade='all, delete-orphan')
     custom_parts = db.relationship('CustomPartItem', back_populates='order', cascade='all, delete-orphan')
+    order_parts = db.relationship('OrderPart', cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        # Дельта-синхронизация механика: WHERE assigned_mechanic_id = ? AND updated_at > ?
+        Index('idx_orders_mechanic_updated', 'assigned_mechanic_id', 'updated_at'),
+    )
     
     @property
     def preferred_car_number(self):
@@ -247,6 +265,7 @@ class Order(db.Model):
             'part_type': part_type,
             'is_original': self.is_original,
             'photo_url': self.photo_url,
+            'photo_thumb_url': self.photo_thumb_url,
             'status': self.status,
             'printed': self.printed,
             'language': self.language,
@@ -412,6 +431,43 @@ class CustomPartItem(db.Model):
         }
 
 
+
+# Позиции заказа из selected_parts в виде строк: агрегаты спроса считаются SQL по индексам
+class OrderPart(db.Model):
+    __tablename__ = 'order_parts'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    # Без внешнего ключа: удаление детали из каталога не трогает историю заказов
+    part_id = db.Column(db.Integer, nullable=True)
+    name = db.Column(db.String(200), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=1)
+    price = db.Column(db.Float, nullable=True)
+    is_custom = db.Column(db.Boolean, nullable=False, default=False)
+    # Копии полей заказа, чтобы отчёты по периоду и категории не делали JOIN
+    category = db.Column(db.String(120), nullable=True)
+    ordered_at = db.Column(db.DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index('idx_order_parts_order', 'order_id'),
+        Index('idx_order_parts_ordered', 'ordered_at'),
+        Index('idx_order_parts_part', 'part_id', 'ordered_at'),
+        Index('idx_order_parts_category', 'category', 'ordered_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'part_id': self.part_id,
+            'name': self.name,
+            'quantity': self.quantity,
+            'price': self.price,
+            'is_custom': self.is_custom,
+            'category': self.category,
+            'ordered_at': self.ordered_at.isoformat() if self.ordered_at else None
+        }
+
 class NotificationLog(db.Model):
     __tablename__ = 'notification_logs'
     
@@ -441,3 +497,200 @@ class NotificationLog(db.Model):
             'success': self.success,
             'error_message': self.error_message
         }
+
+
+class OrderEvent(db.Model):
+    __tablename__ = 'order_events'
+    
+    # id служит глобальной версией ленты изменений заказов
+    id = db.Column(db.Integer, primary_key=True)
+    # Без внешнего ключа: событие удаления должно пережить сам заказ
+    order_id = db.Column(db.Integer, nullable=False)
+    event_type = db.Column(db.String(20), nullable=False)
+    mechanic_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('idx_order_events_created', 'created_at'),
+        Index('idx_order_events_mechanic', 'mechanic_id', 'created_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'version': self.id,
+            'order_id': self.order_id,
+            'event_type': self.event_type,
+            'mechanic_id': self.mechanic_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class PrintJob(db.Model):
+    __tablename__ = 'print_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Без внешнего ключа: история печати не мешает удалению заказа
+    order_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    last_error = db.Column(db.Text, nullable=True)
+    pdf_path = db.Column(db.String(250), nullable=True)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index('idx_print_jobs_pending', 'status', 'next_attempt_at'),
+        Index('idx_print_jobs_order', 'order_id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'last_error': self.last_error,
+            'pdf_path': self.pdf_path,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+# Обработка фото заказа: сжатие и миниатюры вне запроса
+class PhotoJob(db.Model):
+    __tablename__ = 'photo_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Без внешнего ключа: файлы фото переживают удаление заказа
+    order_id = db.Column(db.Integer, nullable=False)
+    # Исходный файл в static/uploads; удаляется после обработки
+    source_path = db.Column(db.String(250), nullable=False)
+    content_hash = db.Column(db.String(64), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    last_error = db.Column(db.Text, nullable=True)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index('idx_photo_jobs_pending', 'status', 'next_attempt_at'),
+        Index('idx_photo_jobs_order', 'order_id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'content_hash': self.content_hash,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+# Принятые webhook-обновления Telegram: общий для всех воркеров фильтр повторной доставки
+class ProcessedUpdate(db.Model):
+    __tablename__ = 'processed_updates'
+    
+    update_id = db.Column(db.String(32), primary_key=True)
+    received_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('idx_processed_updates_received', 'received_at'),
+    )
+
+
+# Входящая очередь обновлений Telegram: webhook пишет сырой JSON, worker-процесс обрабатывает
+class InboundUpdate(db.Model):
+    __tablename__ = 'inbound_updates'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    update_id = db.Column(db.BigInteger, nullable=True)
+    # Чат (или пользователь) апдейта: апдейты одного чата обрабатываются строго по очереди
+    chat_id = db.Column(db.BigInteger, nullable=True)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Повтор после ошибки не раньше этого времени (None - сразу)
+    next_attempt_at = db.Column(db.DateTime, nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index('idx_inbound_updates_status', 'status', 'id'),
+        Index('idx_inbound_updates_chat', 'chat_id', 'status', 'id'),
+    )
+
+
+# Состояние диалогов бота (user_data и шаг ConversationHandler), общее для всех воркеров
+class BotState(db.Model):
+    __tablename__ = 'bot_state'
+    
+    # kind: 'user' или 'conversation'; key: id пользователя или имя диалога с ключом
+    kind = db.Column(db.String(20), primary_key=True)
+    key = db.Column(db.String(200), primary_key=True)
+    data = db.Column(db.Text, nullable=False)
+    # Растёт при каждой записи: воркер перечитывает data, только если версия сменилась
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# Поисковый документ заказа: номер машины, VIN, детали и комментарии одной строкой
+class OrderSearchDocument(db.Model):
+    __tablename__ = 'order_search_documents'
+    
+    # Без внешнего ключа: документ удаляется вместе с заказом в services/order_search.py
+    order_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    document = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# Триграммный токенизатор FTS5 появился в SQLite 3.34
+SQLITE_HAS_TRIGRAM = sqlite3.sqlite_version_info >= (3, 34, 0)
+
+
+def _sqlite_with_trigram(ddl, target, bind, **kw):
+    return bind.dialect.name == 'sqlite' and SQLITE_HAS_TRIGRAM
+
+
+# SQLite: внешняя FTS5-таблица с триграммами, синхронизируется триггерами
+_ORDER_SEARCH_SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS order_search_fts USING fts5("
+    "document, content='order_search_documents', content_rowid='order_id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS order_search_fts_ai AFTER INSERT ON order_search_documents BEGIN "
+    "INSERT INTO order_search_fts(rowid, document) VALUES (new.order_id, new.document); END",
+    "CREATE TRIGGER IF NOT EXISTS order_search_fts_ad AFTER DELETE ON order_search_documents BEGIN "
+    "INSERT INTO order_search_fts(order_search_fts, rowid, document) VALUES ('delete', old.order_id, old.document); END",
+    "CREATE TRIGGER IF NOT EXISTS order_search_fts_au AFTER UPDATE ON order_search_documents BEGIN "
+    "INSERT INTO order_search_fts(order_search_fts, rowid, document) VALUES ('delete', old.order_id, old.document); "
+    "INSERT INTO order_search_fts(rowid, document) VALUES (new.order_id, new.document); END",
+)
+# PostgreSQL: GIN-индекс pg_trgm обслуживает LIKE '%фрагмент%'
+_ORDER_SEARCH_POSTGRES_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS idx_order_search_trgm ON order_search_documents "
+    "USING gin (document gin_trgm_ops)",
+)
+
+for _statement in _ORDER_SEARCH_SQLITE_DDL:
+    event.listen(OrderSearchDocument.__table__, 'after_create', DDL(_statement).execute_if(callable_=_sqlite_with_trigram))
+for _statement in _ORDER_SEARCH_POSTGRES_DDL:
+    event.listen(OrderSearchDocument.__table__, 'after_create', DDL(_statement).execute_if(dialect='postgresql'))
+event.listen(
+    OrderSearchDocument.__table__, 'before_drop',
+    DDL("DROP TABLE IF EXISTS order_search_fts").execute_if(callable_=_sqlite_with_trigram)
+)
@@ -0,0 +1,316 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from telegram.ext import BasePersistence, ConversationHandler, PersistenceInput
+
+# Add backend directory to path for config import
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import config
+from models import db, BotState
+
+logger = logging.getLogger(__name__)
+
+_DELETED = object()
+
+
+def _conversation_row_key(name: str, key: tuple) -> str:
+    return f"{name}:{json.dumps(list(key))}"
+
+
+def _conversation_key(handler: ConversationHandler, update) -> Optional[tuple]:
+    """The key ConversationHandler builds for this update, or None if it has none."""
+    chat = update.effective_chat
+    user = update.effective_user
+    key = []
+    if handler.per_chat:
+        if chat is None:
+            return None
+        key.append(chat.id)
+    if handler.per_user:
+        if user is None:
+            return None
+        key.append(user.id)
+    if handler.per_message:
+        query = update.callback_query
+        if query is None:
+            return None
+        key.append(query.inline_message_id or query.message.message_id)
+    return tuple(key)
+
+
+def _persistent_conversations(application) -> Iterable[ConversationHandler]:
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            if isinstance(handler, ConversationHandler) and handler.persistent:
+                yield handler
+
+
+class SQLPersistence(BasePersistence):
+    """
+    Bot state shared by every process through the bot_state table.
+
+    Nothing is loaded at startup. Before an update is handled,
+    load_update_state() checks the versions of the rows it touches (the
+    user's user_data and its conversation keys) with one query and fetches
+    data only for rows another process changed since this one last saw
+    them; the application's own dicts act as the read cache.
+
+    Writes are coalesced: the update_* calls PTB makes for one
+    update_persistence() run are staged and written in a single
+    transaction.
+    """
+
+    def __init__(self, flask_app, update_interval: float = 60, read_cache_seconds: float = 1.0):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval
+        )
+        self.flask_app = flask_app
+        self.read_cache_seconds = read_cache_seconds
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self._checked_at: Dict[Tuple[str, str], float] = {}
+        self._pending: Dict[Tuple[str, str], object] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    # --- database access (runs in a worker thread) ---
+
+    def _read(self, keys: List[Tuple[str, str]], known: Dict[Tuple[str, str], int]) -> Dict[Tuple[str, str], tuple]:
+        """(version, data) of the changed rows among ``keys``; (None, None) for rows that are gone."""
+        with self.flask_app.app_context():
+            try:
+                versions = {
+                    (kind, key): version
+                    for kind, key, version in db.session.execute(
+                        select(BotState.kind, BotState.key, BotState.version)
+                        .where(tuple_(BotState.kind, BotState.key).in_(keys))
+                    )
+                }
+                changed = [row_key for row_key, version in versions.items() if known.get(row_key) != version]
+                result = {row_key: (None, None) for row_key in keys if row_key not in versions and row_key in known}
+                if changed:
+                    for kind, key, version, data in db.session.execute(
+                        select(BotState.kind, BotState.key, BotState.version, BotState.data)
+                        .where(tuple_(BotState.kind, BotState.key).in_(changed))
+                    ):
+                        result[(kind, key)] = (version, json.loads(data))
+                return result
+            finally:
+                db.session.remove()
+
+    def _upsert(self, dialect_name: str, kind: str, key: str, data: str):
+        dialect_insert = postgresql.insert if dialect_name == 'postgresql' else sqlite.insert
+        statement = dialect_insert(BotState).values(
+            kind=kind, key=key, data=data, version=1, updated_at=datetime.utcnow()
+        )
+        return statement.on_conflict_do_update(
+            index_elements=[BotState.kind, BotState.key],
+            set_={
+                'data': statement.excluded.data,
+                'version': BotState.version + 1,
+                'updated_at': statement.excluded.updated_at,
+            }
+        ).returning(BotState.version)
+
+    def _write(self, batch: Dict[Tuple[str, str], object]) -> Dict[Tuple[str, str], Optional[int]]:
+        """Write staged rows in one transaction; returns the new version of each row."""
+        versions = {}
+        with self.flask_app.app_context():
+            engine = db.engine
+            with engine.begin() as conn:
+                for (kind, key), value in batch.items():
+                    if value is _DELETED:
+                        conn.execute(delete(BotState).where(BotState.kind == kind, BotState.key == key))
+                        versions[(kind, key)] = None
+                    else:
+                        payload = json.dumps(value, ensure_ascii=False)
+                        versions[(kind, key)] = conn.execute(
+                            self._upsert(engine.dialect.name, kind, key, payload)
+                        ).scalar()
+        return versions
+
+    # --- coalesced writes ---
+
+    async def _stage(self, row_key: Tuple[str, str], value):
+        self._pending[row_key] = value
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_pending())
+        await asyncio.shield(self._flush_task)
+
+    async def _flush_pending(self):
+        # Let the other update_* calls of the same run stage their rows first
+        await asyncio.sleep(0)
+        while self._pending:
+            batch, self._pending = self._pending, {}
+            try:
+                versions = await asyncio.to_thread(self._write, batch)
+            except Exception:
+                # Keep the rows for the next run; newer staged values win
+                self._pending = {**batch, **self._pending}
+                raise
+            now = time.monotonic()
+            for row_key, version in versions.items():
+                if version is None:
+                    self._versions.pop(row_key, None)
+                else:
+                    self._versions[row_key] = version
+                self._checked_at[row_key] = now
+
+    # --- loading ---
+
+    async def load_update_state(self, application, update):
+        """Bring user_data and conversation states of this update up to date (one query if unchanged)."""
+        targets = {}
+        user = update.effective_user
+        if user is not None:
+            targets[('user', str(user.id))] = ('user', user.id)
+        for handler in _persistent_conversations(application):
+            key = _conversation_key(handler, update)
+            if key is not None:
+                targets[('conversation', _conversation_row_key(handler.name, key))] = (handler, key)
+        if not targets:
+            return
+
+        rows = await asyncio.to_thread(self._read, list(targets), dict(self._versions))
+        now = time.monotonic()
+        for row_key in targets:
+            self._checked_at[row_key] = now
+        for row_key, (version, data) in rows.items():
+            target, key = targets[row_key]
+            if target == 'user':
+                user_data = application.user_data[key]
+                user_data.clear()
+                if data:
+                    user_data.update(data)
+            else:
+                # ConversationHandler keeps its states in a TrackingDict; writing
+                # through .data / update_no_track avoids re-persisting them
+                conversations = target._conversations
+                if data is None:
+                    conversations.data.pop(key, None)
+                else:
+                    conversations.update_no_track({key: data})
+            if version is None:
+                self._versions.pop(row_key, None)
+            else:
+                self._versions[row_key] = version
+
+    # --- BasePersistence ---
+
+    async def get_user_data(self):
+        return {}
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name):
+        return {}
+
+    async def update_conversation(self, name, key, new_state):
+        row_key = ('conversation', _conversation_row_key(name, key))
+        await self._stage(row_key, _DELETED if new_state is None else new_state)
+
+    async def update_user_data(self, user_id, data):
+        await self._stage(('user', str(user_id)), dict(data))
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def drop_user_data(self, user_id):
+        await self._stage(('user', str(user_id)), _DELETED)
+
+    async def refresh_user_data(self, user_id, user_data):
+        """Re-read user_data unless it was checked within read_cache_seconds (polling mode path)."""
+        row_key = ('user', str(user_id))
+        if time.monotonic() - self._checked_at.get(row_key, 0) < self.read_cache_seconds:
+            return
+        rows = await asyncio.to_thread(self._read, [row_key], dict(self._versions))
+        self._checked_at[row_key] = time.monotonic()
+        if row_key in rows:
+            version, data = rows[row_key]
+            user_data.clear()
+            if data:
+                user_data.update(data)
+            if version is None:
+                self._versions.pop(row_key, None)
+            else:
+                self._versions[row_key] = version
+
+    def forget_user_data(self, user_id):
+        """The user's data was unloaded from memory; read it again on their next update."""
+        row_key = ('user', str(user_id))
+        self._versions.pop(row_key, None)
+        self._checked_at.pop(row_key, None)
+
+    def forget_conversation(self, name, key):
+        """The conversation state was unloaded from memory; read it again on the next update."""
+        row_key = ('conversation', _conversation_row_key(name, key))
+        self._versions.pop(row_key, None)
+        self._checked_at.pop(row_key, None)
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    async def flush(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        if self._pending:
+            await self._flush_pending()
+
+
+def create_bot_persistence(flask_app) -> Optional[SQLPersistence]:
+    """Persistence for the webhook / queue worker Application, or None if disabled."""
+    if not config.BOT_PERSISTENCE_ENABLED:
+        return None
+    return SQLPersistence(flask_app, read_cache_seconds=config.BOT_STATE_READ_CACHE_SECONDS)
+
+
+async def process_update_with_state(application, update):
+    """
+    Process one update against shared state.
+
+    Loads the state this update needs, runs the handlers and writes back
+    what they changed, so the next update of the same mechanic sees it on
+    whichever process receives it. The whole sequence runs through the
+    application's update processor, which keeps updates of one chat in
+    order while other chats proceed concurrently.
+    """
+    persistence = getattr(application, 'persistence', None)
+
+    async def run():
+        if isinstance(persistence, SQLPersistence):
+            await persistence.load_update_state(application, update)
+        await application.process_update(update)
+        if isinstance(persistence, SQLPersistence):
+            await application.update_persistence()
+
+    processor = getattr(application, 'update_processor', None)
+    if processor is None:
+        await run()
+    else:
+        await processor.process_update(update, run())
@@ -0,0 +1,363 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+import logging
+from collections import OrderedDict
+from typing import Iterator, List, Tuple
+
+from sqlalchemy import insert, select, update
+
+# Add backend directory to path for config import
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import config
+from models import db, Category, Part, CatalogMeta
+from services.part_search import bump_catalog_version, invalidate_part_index
+
+logger = logging.getLogger(__name__)
+
+# Flat row layout shared by import and export (one row per part)
+CATALOG_COLUMNS = (
+    'category', 'category_he', 'category_en', 'category_icon', 'category_sort_order',
+    'name_ru', 'name_he', 'name_en', 'is_common', 'sort_order'
+)
+CATALOG_FORMATS = ('csv', 'json')
+
+# Rows written to the export stream per chunk
+EXPORT_CHUNK_ROWS = 500
+
+CATEGORY_FIELDS = {
+    'category_he': 'name_he', 'category_en': 'name_en',
+    'category_icon': 'icon', 'category_sort_order': 'sort_order'
+}
+PART_FIELDS = ('name_he', 'name_en', 'is_common', 'sort_order')
+
+# CatalogMeta key holding the fingerprint of the last seeded canonical catalog
+SEED_FINGERPRINT_KEY = 'canonical_catalog_fingerprint'
+
+
+class CatalogImportError(ValueError):
+    """Raised when an import file cannot be parsed at all."""
+
+
+def read_catalog_rows(data, fmt: str) -> List[dict]:
+    """
+    Parse an import file into flat row dicts.
+
+    Args:
+        data: File contents (bytes or str)
+        fmt: 'csv' (header row with CATALOG_COLUMNS) or 'json' (a list of
+            row objects, or an object with a 'parts' list)
+
+    Raises:
+        CatalogImportError: Unknown format or malformed file
+    """
+    if fmt not in CATALOG_FORMATS:
+        raise CatalogImportError(f"Unsupported format: {fmt}")
+
+    if isinstance(data, bytes):
+        try:
+            # utf-8-sig drops the BOM that Excel puts into CSV exports
+            data = data.decode('utf-8-sig')
+        except UnicodeDecodeError as e:
+            raise CatalogImportError(f"File is not valid UTF-8: {e}")
+
+    if fmt == 'csv':
+        reader = csv.DictReader(io.StringIO(data))
+        if not reader.fieldnames or 'name_ru' not in reader.fieldnames or 'category' not in reader.fieldnames:
+            raise CatalogImportError("CSV header must contain 'category' and 'name_ru'")
+        return list(reader)
+
+    try:
+        payload = json.loads(data)
+    except ValueError as e:
+        raise CatalogImportError(f"Invalid JSON: {e}")
+    if isinstance(payload, dict):
+        payload = payload.get('parts')
+    if not isinstance(payload, list) or not all(isinstance(row, dict) for row in payload):
+        raise CatalogImportError("JSON must be a list of rows or an object with a 'parts' list")
+    return payload
+
+
+def _clean(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _parse_int(value):
+    value = _clean(value)
+    return int(value) if value is not None else None
+
+
+def _normalize_rows(rows) -> Tuple[OrderedDict, OrderedDict, List[dict]]:
+    """Validate rows and fold duplicates (the last row wins)."""
+    categories = OrderedDict()
+    parts = OrderedDict()
+    errors = []
+
+    for line, row in enumerate(rows, start=1):
+        category_name = _clean(row.get('category'))
+        name_ru = _clean(row.get('name_ru'))
+        if not category_name or not name_ru:
+            errors.append({'row': line, 'error': "'category' and 'name_ru' are required"})
+            continue
+        if len(category_name) > 120 or len(name_ru) > 200:
+            errors.append({'row': line, 'error': 'Name is too long'})
+            continue
+
+        try:
+            sort_order = _parse_int(row.get('sort_order'))
+            category_sort_order = _parse_int(row.get('category_sort_order'))
+        except ValueError:
+            errors.append({'row': line, 'error': 'sort_order must be an integer'})
+            continue
+
+        is_common = row.get('is_common')
+        if isinstance(is_common, str):
+            is_common = config.str_to_bool(is_common) if is_common.strip() else None
+        elif is_common is not None:
+            is_common = bool(is_common)
+
+        category = categories.setdefault(category_name, {'name_ru': category_name})
+        for column, field in CATEGORY_FIELDS.items():
+            value = category_sort_order if field == 'sort_order' else _clean(row.get(column))
+            if value is not None:
+                category[field] = value
+
+        parts[(category_name, name_ru)] = {
+            'name_ru': name_ru,
+            'name_he': _clean(row.get('name_he')),
+            'name_en': _clean(row.get('name_en')),
+            'is_common': is_common,
+            'sort_order': sort_order,
+        }
+
+    return categories, parts, errors
+
+
+def _load_category_ids(names) -> dict:
+    # name_ru is not unique in the schema; the oldest category wins, as in filter_by().first()
+    ids = {}
+    for category_id, name_ru in db.session.execute(
+        select(Category.id, Category.name_ru).where(Category.name_ru.in_(names)).order_by(Category.id.desc())
+    ):
+        ids[name_ru] = category_id
+    return ids
+
+
+def import_catalog(rows, dry_run: bool = False) -> dict:
+    """
+    Upsert categories and parts from flat rows with set-based statements.
+
+    Categories are matched on name_ru, parts on (category, name_ru). Empty
+    cells never overwrite existing values. Each table is read once and
+    written with one executemany INSERT and one bulk UPDATE; everything is
+    committed in a single transaction (or rolled back on dry_run).
+
+    Returns:
+        Dict with created/updated/unchanged counters and per-row errors
+    """
+    categories, parts, errors = _normalize_rows(rows)
+    stats = {
+        'categories_created': 0, 'categories_updated': 0,
+        'parts_created': 0, 'parts_updated': 0, 'parts_unchanged': 0,
+        'errors': errors,
+        'dry_run': dry_run,
+    }
+    if not parts:
+        return stats
+
+    try:
+        # --- categories ---
+        existing = {
+            row.name_ru: row
+            for row in db.session.execute(
+                select(Category.id, Category.name_ru, Category.name_he, Category.name_en,
+                       Category.icon, Category.sort_order)
+                .where(Category.name_ru.in_(list(categories)))
+                .order_by(Category.id.desc())
+            )
+        }
+        next_sort = (db.session.execute(select(db.func.max(Category.sort_order))).scalar() or 0) + 1
+
+        new_categories = []
+        category_updates = []
+        for name_ru, values in categories.items():
+            current = existing.get(name_ru)
+            if current is None:
+                new_categories.append({
+                    'name_ru': name_ru,
+                    'name_he': values.get('name_he'),
+                    'name_en': values.get('name_en'),
+                    'icon': values.get('icon') or '🔧',
+                    'sort_order': values.get('sort_order', next_sort),
+                })
+                next_sort += 1
+                continue
+            changed = {
+                field: value for field, value in values.items()
+                if field != 'name_ru' and getattr(current, field) != value
+            }
+            if changed:
+                category_updates.append({'id': current.id, **changed})
+
+        if new_categories:
+            db.session.execute(insert(Category), new_categories)
+        if category_updates:
+            db.session.execute(update(Category), category_updates)
+        stats['categories_created'] = len(new_categories)
+        stats['categories_updated'] = len(category_updates)
+
+        category_ids = _load_category_ids(list(categories)) if new_categories else {
+            name_ru: row.id for name_ru, row in existing.items()
+        }
+
+        # --- parts ---
+        existing_parts = {}
+        for row in db.session.execute(
+            select(Part.id, Part.category_id, Part.name_ru, Part.name_he, Part.name_en,
+                   Part.is_common, Part.sort_order)
+            .where(Part.category_id.in_(list(category_ids.values())))
+            .order_by(Part.id.desc())
+        ):
+            existing_parts[(row.category_id, row.name_ru)] = row
+
+        new_parts = []
+        part_updates = []
+        positions = {}
+        for (category_name, name_ru), values in parts.items():
+            category_id = category_ids[category_name]
+            positions[category_id] = positions.get(category_id, 0) + 1
+            current = existing_parts.get((category_id, name_ru))
+            if current is None:
+                new_parts.append({
+                    'category_id': category_id,
+                    'name_ru': name_ru,
+                    'name_he': values['name_he'],
+                    'name_en': values['name_en'],
+                    'is_common': True if values['is_common'] is None else values['is_common'],
+                    'sort_order': positions[category_id] if values['sort_order'] is None else values['sort_order'],
+                })
+                continue
+            changed = {
+                field: values[field] for field in PART_FIELDS
+                if values[field] is not None and getattr(current, field) != values[field]
+            }
+            if changed:
+                part_updates.append({'id': current.id, **changed})
+            else:
+                stats['parts_unchanged'] += 1
+
+        if new_parts:
+            db.session.execute(insert(Part), new_parts)
+        if part_updates:
+            db.session.execute(update(Part), part_updates)
+        stats['parts_created'] = len(new_parts)
+        stats['parts_updated'] = len(part_updates)
+
+        if dry_run:
+            db.session.rollback()
+        else:
+            if new_categories or category_updates or new_parts or part_updates:
+                bump_catalog_version()
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if new_parts or part_updates:
+        invalidate_part_index()
+    logger.info(
+        f"Catalog import{' (dry run)' if dry_run else ''}: "
+        f"categories +{stats['categories_created']}/~{stats['categories_updated']}, "
+        f"parts +{stats['parts_created']}/~{stats['parts_updated']}, errors {len(errors)}"
+    )
+    return stats
+
+
+def catalog_fingerprint(rows) -> str:
+    """Stable hash of import rows; equal catalogs give equal fingerprints."""
+    payload = json.dumps(rows, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def seed_catalog(rows, force: bool = False) -> bool:
+    """
+    Upsert a canonical catalog unless it was already seeded.
+
+    The fingerprint of ``rows`` is stored in CatalogMeta in the same
+    transaction as the import, so an unchanged catalog costs one primary-key
+    lookup and a changed one is applied exactly once.
+
+    Returns:
+        True if the import ran, False if the stored fingerprint matched
+    """
+    fingerprint = catalog_fingerprint(rows)
+    meta = db.session.get(CatalogMeta, SEED_FINGERPRINT_KEY)
+    if meta is not None and meta.value == fingerprint and not force:
+        return False
+
+    if meta is None:
+        meta = CatalogMeta(key=SEED_FINGERPRINT_KEY)
+        db.session.add(meta)
+    meta.value = fingerprint
+
+    stats = import_catalog(rows)
+    db.session.commit()
+    logger.info(
+        f"Canonical catalog seeded: categories +{stats['categories_created']}, "
+        f"parts +{stats['parts_created']}/~{stats['parts_updated']}"
+    )
+    return True
+
+
+def _iter_export_rows() -> Iterator[dict]:
+    statement = (
+        select(
+            Category.name_ru.label('category'), Category.name_he.label('category_he'),
+            Category.name_en.label('category_en'), Category.icon.label('category_icon'),
+            Category.sort_order.label('category_sort_order'),
+            Part.name_ru, Part.name_he, Part.name_en, Part.is_common, Part.sort_order
+        )
+        .join(Part, Part.category_id == Category.id)
+        .order_by(Category.sort_order, Category.id, Part.sort_order, Part.id)
+        .execution_options(yield_per=1000)
+    )
+    for row in db.session.execute(statement):
+        yield row._asdict()
+
+
+def iter_catalog_csv() -> Iterator[str]:
+    """Stream the catalog as CSV in chunks of EXPORT_CHUNK_ROWS rows."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CATALOG_COLUMNS)
+    writer.writeheader()
+    count = 0
+    for row in _iter_export_rows():
+        writer.writerow(row)
+        count += 1
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_catalog_json() -> Iterator[str]:
+    """Stream the catalog as a JSON array of rows accepted by import_catalog."""
+    yield '['
+    chunk = []
+    first = True
+    for row in _iter_export_rows():
+        chunk.append(json.dumps(row, ensure_ascii=False))
+        if len(chunk) >= EXPORT_CHUNK_ROWS:
+            yield ('' if first else ',') + ','.join(chunk)
+            first = False
+            chunk = []
+    if chunk:
+        yield ('' if first else ',') + ','.join(chunk)
+    yield ']'
@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import hashlib
+import logging
+from threading import Lock
+from typing import Dict, NamedTuple
+
+from sqlalchemy import select
+
+# Add backend directory to path for config import
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from models import db, Category, Part
+from services.part_search import read_catalog_version
+
+logger = logging.getLogger(__name__)
+
+CATALOG_SNAPSHOT_LANGUAGES = ('ru', 'he', 'en')
+
+
+class CatalogDocument(NamedTuple):
+    version: str
+    etag: str
+    body: bytes
+
+
+_cache: Dict[str, CatalogDocument] = {}
+_cache_lock = Lock()
+
+
+def build_catalog_document(lang: str, version: str) -> bytes:
+    """
+    Serialize the catalog for one language (two queries).
+
+    Only common parts are included, each with the name in ``lang`` falling
+    back to Russian, in the same order as /api/categories and /api/parts.
+    """
+    parts_by_category = {}
+    for part_id, category_id, name_ru, name_lang in db.session.execute(
+        select(Part.id, Part.category_id, Part.name_ru, getattr(Part, f'name_{lang}'))
+        .where(Part.is_common.is_(True))
+        .order_by(Part.sort_order, Part.id)
+    ):
+        name = name_lang or name_ru
+        if name:
+            parts_by_category.setdefault(category_id, []).append({'id': part_id, 'name': name})
+
+    categories = [
+        {
+            'id': category_id,
+            'name': name_lang or name_ru,
+            'name_ru': name_ru,
+            'icon': icon,
+            'parts': parts_by_category.get(category_id, []),
+        }
+        for category_id, name_ru, name_lang, icon in db.session.execute(
+            select(Category.id, Category.name_ru, getattr(Category, f'name_{lang}'), Category.icon)
+            .order_by(Category.sort_order, Category.id)
+        )
+    ]
+
+    document = {'version': version, 'lang': lang, 'categories': categories}
+    return json.dumps(document, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def get_catalog_document(lang: str) -> CatalogDocument:
+    """
+    The serialized catalog for ``lang``, rebuilt only when the catalog version changed.
+
+    The version check is a single primary-key read, so every process
+    serves the current catalog. Without a stored version (a catalog that
+    was never changed through the API) nothing is cached.
+    """
+    version = read_catalog_version()
+    cached = _cache.get(lang)
+    if cached is not None and version and cached.version == version:
+        return cached
+
+    body = build_catalog_document(lang, version)
+    document = CatalogDocument(
+        version=version,
+        etag=f"catalog-{lang}-{hashlib.sha1(body).hexdigest()[:16]}",
+        body=body
+    )
+    if version:
+        with _cache_lock:
+            _cache[lang] = document
+        logger.info(f"Catalog snapshot built for '{lang}': version {version[:8]}, {len(body)} bytes")
+    return document
+
+
+def clear_catalog_documents():
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,232 @@
+import os
+import sys
+import json
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, delete, exists, func, or_, select
+from sqlalchemy.orm import aliased
+
+# Add backend directory to path for config import
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import config
+from models import db, InboundUpdate
+from services.job_queue import claim_next_job, requeue_stale_jobs
+
+logger = logging.getLogger(__name__)
+
+INBOUND_UPDATE_STATUSES = ('queued', 'processing', 'done', 'failed')
+
+# How often the consumer requeues stale claims and prunes finished rows
+MAINTENANCE_INTERVAL_SECONDS = 60
+
+
+def update_chat_id(payload: dict) -> Optional[int]:
+    """
+    Chat of a raw update, or its sender when there is no chat.
+
+    Updates with the same value are processed strictly in arrival order;
+    None means the update may run alongside any other.
+    """
+    for key, value in payload.items():
+        if key == 'update_id' or not isinstance(value, dict):
+            continue
+        message = value.get('message')
+        chat = value.get('chat') or (message.get('chat') if isinstance(message, dict) else None)
+        sender = chat or value.get('from') or value.get('user')
+        if isinstance(sender, dict) and isinstance(sender.get('id'), int):
+            return sender['id']
+    return None
+
+
+def enqueue_update(payload: dict) -> InboundUpdate:
+    """
+    Add a raw Telegram update to the current session; the caller commits.
+
+    The payload is stored as received, so the consumer can rebuild the
+    Update object with whatever library version it runs.
+    """
+    update_id = payload.get('update_id')
+    entry = InboundUpdate(
+        update_id=update_id if isinstance(update_id, int) else None,
+        chat_id=update_chat_id(payload),
+        payload=json.dumps(payload, ensure_ascii=False),
+        status='queued',
+        attempts=0
+    )
+    db.session.add(entry)
+    return entry
+
+
+def queue_depth() -> int:
+    """Number of updates waiting for the consumer."""
+    return db.session.execute(
+        select(func.count()).select_from(InboundUpdate).where(InboundUpdate.status == 'queued')
+    ).scalar()
+
+
+def _claimable(now: datetime):
+    """
+    Queued, due rows whose chat has no earlier row still waiting or running.
+
+    Holding back the rest of a chat keeps its updates in arrival order no
+    matter how many consumers run, and a failed update keeps its place.
+    """
+    earlier = aliased(InboundUpdate)
+    blocked = exists().where(
+        earlier.chat_id == InboundUpdate.chat_id,
+        or_(
+            earlier.status == 'processing',
+            and_(earlier.status == 'queued', earlier.id < InboundUpdate.id)
+        )
+    )
+    return and_(
+        InboundUpdate.status == 'queued',
+        or_(InboundUpdate.next_attempt_at.is_(None), InboundUpdate.next_attempt_at <= now),
+        or_(InboundUpdate.chat_id.is_(None), ~blocked)
+    )
+
+
+def claim_next_update() -> Optional[InboundUpdate]:
+    """
+    Atomically move the oldest claimable update to 'processing'.
+
+    The conditional UPDATE repeats the check, so the claim is safe across
+    consumer processes and no chat ever has two rows in 'processing'.
+    """
+    now = datetime.utcnow()
+    return claim_next_job(InboundUpdate, _claimable(now), {'status': 'processing', 'claimed_at': now})
+
+
+def finish_update(entry_id: int, error: Optional[str] = None):
+    """
+    Record the outcome of a claimed update.
+
+    A failed update goes back to the queue with exponential backoff until
+    it has used INBOUND_UPDATE_MAX_ATTEMPTS attempts; later updates of its
+    chat wait for it.
+    """
+    entry = db.session.get(InboundUpdate, entry_id)
+    if entry is None:
+        return
+    if error is None:
+        entry.status = 'done'
+        entry.last_error = None
+        entry.finished_at = datetime.utcnow()
+    elif entry.attempts < config.INBOUND_UPDATE_MAX_ATTEMPTS:
+        delay = config.INBOUND_UPDATE_RETRY_BACKOFF_SECONDS * (2 ** (entry.attempts - 1))
+        entry.status = 'queued'
+        entry.last_error = error
+        entry.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+    else:
+        entry.status = 'failed'
+        entry.last_error = error
+        entry.finished_at = datetime.utcnow()
+        logger.error(f"Inbound update {entry.update_id} failed after {entry.attempts} attempt(s): {error}")
+    db.session.commit()
+
+
+def requeue_stale_updates() -> int:
+    """Return updates left in 'processing' by a dead consumer to the queue."""
+    return requeue_stale_jobs(InboundUpdate, 'processing', InboundUpdate.claimed_at,
+                              config.INBOUND_UPDATE_STALE_SECONDS)
+
+
+def prune_finished_updates() -> int:
+    """Delete done/failed rows older than INBOUND_UPDATE_RETENTION_HOURS."""
+    cutoff = datetime.utcnow() - timedelta(hours=config.INBOUND_UPDATE_RETENTION_HOURS)
+    deleted = db.session.execute(
+        delete(InboundUpdate)
+        .where(InboundUpdate.status.in_(('done', 'failed')), InboundUpdate.finished_at < cutoff)
+    ).rowcount
+    db.session.commit()
+    return deleted
+
+
+def _claim_payload(flask_app):
+    with flask_app.app_context():
+        try:
+            entry = claim_next_update()
+            return (entry.id, entry.payload) if entry else None
+        finally:
+            db.session.remove()
+
+
+def _finish(flask_app, entry_id, error):
+    with flask_app.app_context():
+        try:
+            finish_update(entry_id, error)
+        finally:
+            db.session.remove()
+
+
+def _maintain(flask_app):
+    with flask_app.app_context():
+        try:
+            requeue_stale_updates()
+            prune_finished_updates()
+        finally:
+            db.session.remove()
+
+
+async def _consume(name, flask_app, application, stop: asyncio.Event):
+    from telegram import Update
+    from services.bot_persistence import process_update_with_state
+
+    while not stop.is_set():
+        try:
+            claimed = await asyncio.to_thread(_claim_payload, flask_app)
+        except Exception as e:
+            logger.error(f"{name}: could not claim an update: {e}")
+            claimed = None
+        if claimed is None:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=config.INBOUND_UPDATE_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        entry_id, payload = claimed
+        error = None
+        try:
+            update_data = Update.de_json(json.loads(payload), application.bot)
+            await process_update_with_state(application, update_data)
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            logger.error(f"{name}: inbound update #{entry_id} crashed: {e}", exc_info=True)
+        await asyncio.to_thread(_finish, flask_app, entry_id, error)
+
+
+async def consume_updates(flask_app, application, parallelism: Optional[int] = None,
+                          stop: Optional[asyncio.Event] = None):
+    """
+    Drain the inbound queue with ``parallelism`` concurrent consumers.
+
+    Database calls run in worker threads so a slow query never blocks the
+    handlers already running on the loop. Returns when ``stop`` is set.
+    """
+    parallelism = max(1, parallelism or config.INBOUND_UPDATE_PARALLELISM)
+    stop = stop or asyncio.Event()
+
+    await application.initialize()
+    consumers = [
+        asyncio.create_task(_consume(f"consumer-{number}", flask_app, application, stop))
+        for number in range(parallelism)
+    ]
+    logger.info(f"Inbound update consumer started (pid={os.getpid()}, parallelism={parallelism})")
+    try:
+        while not stop.is_set():
+            try:
+                await asyncio.to_thread(_maintain, flask_app)
+            except Exception as e:
+                logger.error(f"Inbound queue maintenance error: {e}")
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=MAINTENANCE_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        stop.set()
+        await asyncio.gather(*consumers, return_exceptions=True)
+        await application.shutdown()
@@ -0,0 +1,100 @@
+import logging
+from contextvars import ContextVar
+from threading import Event, Lock
+from typing import Optional
+
+from telegram.request import BaseRequest
+
+logger = logging.getLogger(__name__)
+
+# Methods whose result handlers never use, so a faked "true" is safe to return
+INLINE_REPLY_METHODS = frozenset({'answerCallbackQuery'})
+
+_INLINE_RESULT = b'{"ok":true,"result":true}'
+
+_current_reply: ContextVar[Optional['InlineReply']] = ContextVar('inline_reply', default=None)
+
+
+class InlineReply:
+    """
+    Hand-off of one Bot API call from an update's handlers to the webhook response.
+
+    Telegram executes a method returned in the body of the webhook HTTP
+    response, which saves the outbound request. Only the first call an
+    update makes is considered, and only while the request thread is still
+    waiting for it; after that every call goes out normally.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._ready = Event()
+        self._open = True
+        self._payload: Optional[dict] = None
+
+    def offer(self, endpoint: str, parameters: dict) -> bool:
+        """Called on the bot loop with the first Bot API call; True if it was taken."""
+        with self._lock:
+            if not self._open:
+                return False
+            self._open = False
+            if endpoint in INLINE_REPLY_METHODS:
+                self._payload = {'method': endpoint, **parameters}
+            self._ready.set()
+            return self._payload is not None
+
+    def close(self):
+        """No call will be offered any more (the update finished or the response went out)."""
+        with self._lock:
+            self._open = False
+            self._ready.set()
+
+    def wait(self, timeout: float) -> Optional[dict]:
+        """Wait up to ``timeout`` seconds for the call; returns the response body or None."""
+        self._ready.wait(timeout)
+        with self._lock:
+            self._open = False
+            return self._payload
+
+
+async def run_with_inline_reply(reply: InlineReply, coroutine):
+    """Await ``coroutine`` with ``reply`` as the target for its first Bot API call."""
+    _current_reply.set(reply)
+    try:
+        return await coroutine
+    finally:
+        reply.close()
+
+
+class InlineReplyRequest(BaseRequest):
+    """
+    Request wrapper that diverts an eligible first call into the webhook response.
+
+    Outside run_with_inline_reply() (polling, the queue worker, notifications)
+    it simply delegates to the wrapped request.
+    """
+
+    def __init__(self, inner: BaseRequest):
+        self.inner = inner
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return self.inner.read_timeout
+
+    async def initialize(self):
+        await self.inner.initialize()
+
+    async def shutdown(self):
+        await self.inner.shutdown()
+
+    async def do_request(self, url, method, request_data=None, **timeouts):
+        reply = _current_reply.get()
+        if reply is not None:
+            _current_reply.set(None)
+            if request_data is not None and not request_data.contains_files:
+                endpoint = url.rsplit('/', 1)[-1]
+                if reply.offer(endpoint, request_data.parameters):
+                    logger.debug(f"{endpoint} returned in the webhook response")
+                    return 200, _INLINE_RESULT
+            else:
+                reply.close()
+        return await self.inner.do_request(url, method, request_data, **timeouts)
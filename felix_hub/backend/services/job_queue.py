@@ -0,0 +1,132 @@
+import os
+import sys
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import select, update
+
+# Add backend directory to path for config import
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from models import db
+
+logger = logging.getLogger(__name__)
+
+
+def claim_next_job(model, claimable, values: dict):
+    """
+    Atomically move the oldest claimable row of ``model`` out of the queue.
+
+    The candidate is read first and then claimed with a conditional UPDATE
+    that repeats ``claimable``, so the claim is safe across processes: only
+    one of them sees rowcount == 1 for a given row. ``values`` sets the
+    running status and timestamps; attempts is incremented.
+
+    Returns:
+        The claimed row, or None if nothing is claimable.
+    """
+    while True:
+        candidate = db.session.execute(
+            select(model.id).where(claimable).order_by(model.id).limit(1)
+        ).scalar()
+        if candidate is None:
+            db.session.rollback()
+            return None
+
+        claimed = db.session.execute(
+            update(model)
+            .where(model.id == candidate, claimable)
+            .values(attempts=model.attempts + 1, **values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+
+        if claimed:
+            return db.session.get(model, candidate)
+
+
+def requeue_stale_jobs(model, running_status: str, claimed_column, stale_seconds: int,
+                       values: Optional[dict] = None) -> int:
+    """
+    Return rows left in ``running_status`` by a dead worker to the queue.
+
+    A row is stale when ``claimed_column`` is older than ``stale_seconds``.
+    ``values`` is written along with status='queued'.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    requeued = db.session.execute(
+        update(model)
+        .where(model.status == running_status, claimed_column < cutoff)
+        .values(status='queued', **(values or {}))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    if requeued:
+        logger.warning(f"Requeued {requeued} stale {model.__tablename__} row(s)")
+    return requeued
+
+
+class JobWorker:
+    """
+    Background thread that drains one queue inside the app context.
+
+    ``process`` handles a batch and returns the processed jobs; the thread
+    calls it until it returns nothing, then sleeps ``poll_interval()``
+    seconds or until wake(). One thread per process, also after gunicorn
+    forks the workers.
+    """
+
+    def __init__(self, name: str, process: Callable[[], list], poll_interval: Callable[[], float]):
+        self.name = name
+        self._process = process
+        self._poll_interval = poll_interval
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wake_event = threading.Event()
+
+    def wake(self):
+        """Wake the worker without waiting for the next poll interval."""
+        self._wake_event.set()
+
+    def _loop(self, app):
+        logger.info(f"{self.name.capitalize()} worker started (pid={os.getpid()})")
+        while True:
+            self._wake_event.wait(self._poll_interval())
+            self._wake_event.clear()
+            try:
+                with app.app_context():
+                    while self._process():
+                        pass
+                    db.session.remove()
+            except Exception as e:
+                logger.error(f"{self.name.capitalize()} worker error: {e}")
+
+    def _running(self, pid: int) -> bool:
+        return self._pid == pid and self._thread is not None and self._thread.is_alive()
+
+    def ensure_started(self, app):
+        """Start the worker thread once per process."""
+        pid = os.getpid()
+        if self._running(pid):
+            return
+        with self._lock:
+            if self._running(pid):
+                return
+            self._thread = threading.Thread(
+                target=self._loop,
+                args=(app,),
+                name=f'{self.name}-worker',
+                daemon=True
+            )
+            self._thread.start()
+            self._pid = pid
+
+    def start_on_first_request(self, app):
+        """Start the worker lazily on the first request of each process."""
+        @app.before_request
+        def _start_worker():
+            # В тестах задания обрабатываются синхронно, без потока
+            if not app.testing:
+                self.ensure_started(app)
@@ -0,0 +1,112 @@
+import os
+import sys
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func
+
+# Add backend directory to path for config import
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import config
+from models import db, OrderEvent
+
+logger = logging.getLogger(__name__)
+
+ORDER_EVENT_TYPES = ('created', 'updated', 'assigned', 'reassigned', 'deleted')
+
+_last_prune_at = 0.0
+PRUNE_INTERVAL = 60 * 60  # seconds
+
+
+def record_order_event(order_id: int, event_type: str, mechanic_id: Optional[int] = None):
+    """
+    Add an order change event to the current session.
+
+    The event is committed together with the order change by the caller,
+    so the feed never announces a change that was rolled back.
+
+    Args:
+        order_id: ID of the changed order
+        event_type: One of ORDER_EVENT_TYPES
+        mechanic_id: Mechanic affected by the change (previous mechanic
+            for 'reassigned' and 'deleted')
+    """
+    if event_type not in ORDER_EVENT_TYPES:
+        raise ValueError(f"Unknown order event type: {event_type}")
+
+    db.session.add(OrderEvent(
+        order_id=order_id,
+        event_type=event_type,
+        mechanic_id=mechanic_id
+    ))
+    _maybe_prune_events()
+
+
+def _maybe_prune_events():
+    """Delete events older than the retention period, at most once an hour per process."""
+    global _last_prune_at
+    now = time.time()
+    if now - _last_prune_at < PRUNE_INTERVAL:
+        return
+    _last_prune_at = now
+    cutoff = datetime.utcnow() - timedelta(days=config.ORDER_EVENTS_RETENTION_DAYS)
+    try:
+        deleted = OrderEvent.query.filter(OrderEvent.created_at < cutoff).delete(synchronize_session=False)
+        if deleted:
+            logger.info(f"Pruned {deleted} order event(s) older than {cutoff.isoformat()}")
+    except Exception as e:
+        logger.warning(f"Failed to prune order events: {e}")
+
+
+def get_current_version() -> int:
+    """Return the latest order change version (MAX(id), primary key lookup)."""
+    return db.session.query(func.max(OrderEvent.id)).scalar() or 0
+
+
+def get_changes_since(since: Optional[int], wait: float = 0) -> dict:
+    """
+    Return order changes newer than ``since``.
+
+    With ``wait`` > 0 the call long-polls: it re-checks the version every
+    CHANGE_FEED_POLL_INTERVAL seconds until something changes or the wait
+    expires. Without ``since`` only the current version is returned, which
+    clients use as their starting point.
+    """
+    deadline = time.monotonic() + max(wait, 0)
+    version = get_current_version()
+    while since is not None and version <= since and time.monotonic() < deadline:
+        # Закрыть транзакцию, чтобы увидеть коммиты других воркеров
+        db.session.rollback()
+        time.sleep(config.CHANGE_FEED_POLL_INTERVAL)
+        version = get_current_version()
+
+    if since is None or version <= since:
+        return {
+            'version': version,
+            'changed': False,
+            'truncated': False,
+            'events': []
+        }
+
+    limit = config.CHANGE_FEED_MAX_EVENTS
+    events = (
+        OrderEvent.query
+        .filter(OrderEvent.id > since)
+        .order_by(OrderEvent.id)
+        .limit(limit + 1)
+        .all()
+    )
+    truncated = len(events) > limit
+    if not truncated:
+        oldest = db.session.query(func.min(OrderEvent.id)).scalar()
+        # События между since и самым старым уже удалены - клиенту нужен полный refetch
+        truncated = oldest is not None and since < oldest - 1
+
+    return {
+        'version': version,
+        'changed': True,
+        'truncated': truncated,
+        'events': [event.to_dict() for event in events[:limit]]
+    }
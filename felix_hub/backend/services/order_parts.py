@@ -0,0 +1,217 @@
+import os
+import sys
+import logging
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import case, delete, event, func, insert, inspect, select
+
+# Add backend directory to path for config import
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from models import db, Order, OrderPart
+
+logger = logging.getLogger(__name__)
+
+# Order columns copied into order_parts
+ORDER_PART_SOURCE_FIELDS = ('selected_parts', 'category', 'created_at')
+
+DEMAND_PERIODS = ('day', 'week', 'month')
+
+BACKFILL_BATCH_SIZE = 1000
+
+_SESSION_KEY = 'order_parts_dirty'
+
+
+def order_part_rows(order) -> List[dict]:
+    """order_parts rows for the order's selected_parts (custom part items excluded)."""
+    rows = []
+    for item in order._normalized_selected_parts():
+        if not item.get('name'):
+            continue
+        rows.append({
+            'order_id': order.id,
+            'part_id': item['partId'],
+            'name': item['name'][:200],
+            'quantity': item['quantity'],
+            'price': item['price'],
+            'is_custom': item['isCustom'],
+            'category': order.category,
+            'ordered_at': order.created_at or datetime.utcnow(),
+        })
+    return rows
+
+
+def sync_order_parts(order_ids: Iterable[int]) -> int:
+    """
+    Rewrite order_parts of the given orders from their selected_parts.
+
+    One DELETE and one executemany INSERT in the current session; the
+    caller commits.
+
+    Returns:
+        Number of rows written
+    """
+    order_ids = sorted(set(order_ids))
+    if not order_ids:
+        return 0
+
+    orders = db.session.execute(select(Order).where(Order.id.in_(order_ids))).scalars().all()
+    rows = [row for order in orders for row in order_part_rows(order)]
+
+    db.session.execute(delete(OrderPart).where(OrderPart.order_id.in_(order_ids)))
+    if rows:
+        db.session.execute(insert(OrderPart), rows)
+    return len(rows)
+
+
+def backfill_order_parts(batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    Fill order_parts for orders written before the table existed.
+
+    Walks orders by id in batches; an order that has no rows yet is synced.
+    Orders with an empty selected_parts are re-checked on every run, which
+    is a cheap anti-join.
+    """
+    total = 0
+    last_id = 0
+    while True:
+        order_ids = db.session.execute(
+            select(Order.id)
+            .where(Order.id > last_id, ~select(OrderPart.id).where(OrderPart.order_id == Order.id).exists())
+            .order_by(Order.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not order_ids:
+            break
+        total += sync_order_parts(order_ids)
+        db.session.commit()
+        last_id = order_ids[-1]
+    if total:
+        logger.info(f"Order parts: backfilled {total} row(s)")
+    return total
+
+
+def _period_expression(period: str):
+    """Bucket label of ordered_at: 'YYYY-MM-DD' (day, Monday of the week) or 'YYYY-MM'."""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        if period == 'month':
+            return func.to_char(OrderPart.ordered_at, 'YYYY-MM')
+        return func.to_char(func.date_trunc(period, OrderPart.ordered_at), 'YYYY-MM-DD')
+    if period == 'month':
+        return func.strftime('%Y-%m', OrderPart.ordered_at)
+    if period == 'week':
+        return func.date(OrderPart.ordered_at, 'weekday 0', '-6 days')
+    return func.date(OrderPart.ordered_at)
+
+
+def _range_filters(start: datetime, end: datetime, category: Optional[str] = None) -> list:
+    filters = [OrderPart.ordered_at >= start, OrderPart.ordered_at < end]
+    if category:
+        filters.append(OrderPart.category == category)
+    return filters
+
+
+def part_demand(start: datetime, end: datetime, period: str = 'day', category: Optional[str] = None,
+                part_id: Optional[int] = None, name: Optional[str] = None) -> List[dict]:
+    """
+    Ordered quantity per period bucket.
+
+    Args:
+        start, end: Half-open range of order creation time
+        period: One of DEMAND_PERIODS
+        category: Only parts ordered under this category
+        part_id / name: Only this catalog part / part name
+    """
+    if period not in DEMAND_PERIODS:
+        raise ValueError(f"Unknown period: {period}")
+
+    bucket = _period_expression(period).label('period')
+    statement = (
+        select(bucket, func.sum(OrderPart.quantity), func.count(func.distinct(OrderPart.order_id)))
+        .where(*_range_filters(start, end, category))
+        .group_by(bucket)
+        .order_by(bucket)
+    )
+    if part_id is not None:
+        statement = statement.where(OrderPart.part_id == part_id)
+    if name:
+        statement = statement.where(OrderPart.name == name)
+
+    return [
+        {'period': label, 'quantity': int(quantity or 0), 'orders': orders}
+        for label, quantity, orders in db.session.execute(statement)
+    ]
+
+
+def top_parts(start: datetime, end: datetime, category: Optional[str] = None, limit: int = 20) -> List[dict]:
+    """Most ordered parts; catalog parts are grouped by id, the rest by name."""
+    name_key = case((OrderPart.part_id.is_(None), OrderPart.name), else_=None)
+    quantity = func.sum(OrderPart.quantity)
+    statement = (
+        select(OrderPart.part_id, func.max(OrderPart.name), quantity,
+               func.count(func.distinct(OrderPart.order_id)))
+        .where(*_range_filters(start, end, category))
+        .group_by(OrderPart.part_id, name_key)
+        .order_by(quantity.desc(), func.max(OrderPart.name))
+        .limit(limit)
+    )
+    return [
+        {'part_id': part_id, 'name': name, 'quantity': int(total or 0), 'orders': orders}
+        for part_id, name, total, orders in db.session.execute(statement)
+    ]
+
+
+def demand_by_category(start: datetime, end: datetime) -> List[dict]:
+    """Ordered quantity and number of orders per order category."""
+    quantity = func.sum(OrderPart.quantity)
+    statement = (
+        select(OrderPart.category, quantity, func.count(func.distinct(OrderPart.order_id)))
+        .where(*_range_filters(start, end))
+        .group_by(OrderPart.category)
+        .order_by(quantity.desc())
+    )
+    return [
+        {'category': category, 'quantity': int(total or 0), 'orders': orders}
+        for category, total, orders in db.session.execute(statement)
+    ]
+
+
+def _track_changed_orders(session, flush_context):
+    """after_flush: remember orders whose parts, category or date changed."""
+    dirty = session.info.setdefault(_SESSION_KEY, set())
+    for obj in session.new:
+        if isinstance(obj, Order):
+            dirty.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Order):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in ORDER_PART_SOURCE_FIELDS):
+                dirty.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Order):
+            # The relationship cascade already deleted its rows
+            dirty.discard(obj.id)
+    if not dirty:
+        session.info.pop(_SESSION_KEY, None)
+
+
+def _sync_before_commit(session):
+    """before_commit: write order_parts in the same transaction as the order."""
+    # before_commit runs ahead of the commit's own flush
+    session.flush()
+    while session.info.get(_SESSION_KEY):
+        sync_order_parts(session.info.pop(_SESSION_KEY))
+        session.flush()
+
+
+def _forget_changed_orders(session):
+    session.info.pop(_SESSION_KEY, None)
+
+
+def init_order_parts():
+    """Keep order_parts in sync with Order.selected_parts on every commit."""
+    if event.contains(db.session, 'after_flush', _track_changed_orders):
+        return
+    event.listen(db.session, 'after_flush', _track_changed_orders)
+    event.listen(db.session, 'before_commit', _sync_before_commit)
+    event.listen(db.session, 'after_rollback', _forget_changed_orders)
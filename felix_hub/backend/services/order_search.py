@@ -0,0 +1,253 @@
+import os
+import re
+import sys
+import logging
+import unicodedata
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import column, delete, event, insert, inspect, select, table, update
+from sqlalchemy.orm import selectinload
+
+# Add backend directory to path for config import
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import config
+from models import (db, Order, OrderComment, CustomPartItem, OrderSearchDocument,
+                    SQLITE_HAS_TRIGRAM)
+
+logger = logging.getLogger(__name__)
+
+# Order columns that end up in the search document; status changes and the
+# like do not rebuild it
+SEARCH_ORDER_FIELDS = ('mechanic_name', 'category', 'car_number', 'vin', 'selected_parts')
+
+# FTS5 trigram queries need at least three characters per term
+TRIGRAM_MIN_LENGTH = 3
+
+BACKFILL_BATCH_SIZE = 1000
+
+_SESSION_KEY = 'order_search_dirty'
+_NON_ALNUM = re.compile(r'[\W_]+')
+_QUERY_TERMS = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def _normalize_word(word: str) -> str:
+    return _NON_ALNUM.sub('', word)
+
+
+def normalize_search_text(value) -> str:
+    """
+    Lowercase, fold ё to е and strip punctuation inside words.
+
+    '12-345-67' becomes '1234567' and 'Колодки,' becomes 'колодки', so plates,
+    VINs and part numbers match however they were typed.
+    """
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFKC', str(value)).lower().replace('ё', 'е')
+    return ' '.join(word for word in map(_normalize_word, value.split()) if word)
+
+
+def parse_search_query(query: str) -> List[str]:
+    """Split a query into normalized terms; "quoted phrases" stay one term."""
+    terms = []
+    for phrase, word in _QUERY_TERMS.findall(query or ''):
+        term = normalize_search_text(phrase if phrase else word)
+        if term:
+            terms.append(term)
+    return terms
+
+
+def build_order_document(order, comments: Iterable[str] = (), custom_parts: Iterable[tuple] = ()) -> str:
+    """
+    Search text of one order.
+
+    Args:
+        order: Order
+        comments: Comment texts
+        custom_parts: (name, part_number) pairs
+    """
+    values = [f'#{order.id}', order.mechanic_name, order.category, order.car_number, order.vin]
+    values.extend(order.get_part_names())
+    for name, part_number in custom_parts:
+        values.extend((name, part_number))
+    values.extend(comments)
+    return ' '.join(filter(None, (normalize_search_text(value) for value in values)))
+
+
+def refresh_order_documents(order_ids: Iterable[int]) -> int:
+    """
+    Rebuild the search documents of the given orders in the current session.
+
+    Reads orders, comments and custom parts with one query each and writes
+    documents with one executemany INSERT and one bulk UPDATE; documents of
+    orders that no longer exist are deleted. The caller commits.
+
+    Returns:
+        Number of documents written
+    """
+    order_ids = sorted(set(order_ids))
+    if not order_ids:
+        return 0
+
+    orders = db.session.execute(select(Order).where(Order.id.in_(order_ids))).scalars().all()
+
+    comments = {}
+    for order_id, comment in db.session.execute(
+        select(OrderComment.order_id, OrderComment.comment)
+        .where(OrderComment.order_id.in_(order_ids))
+        .order_by(OrderComment.id)
+    ):
+        comments.setdefault(order_id, []).append(comment)
+
+    custom_parts = {}
+    for order_id, name, part_number in db.session.execute(
+        select(CustomPartItem.order_id, CustomPartItem.name, CustomPartItem.part_number)
+        .where(CustomPartItem.order_id.in_(order_ids))
+        .order_by(CustomPartItem.id)
+    ):
+        custom_parts.setdefault(order_id, []).append((name, part_number))
+
+    existing = set(db.session.execute(
+        select(OrderSearchDocument.order_id).where(OrderSearchDocument.order_id.in_(order_ids))
+    ).scalars())
+
+    new_documents = []
+    updated_documents = []
+    for order in orders:
+        row = {
+            'order_id': order.id,
+            'document': build_order_document(order, comments.get(order.id, ()), custom_parts.get(order.id, ())),
+        }
+        (updated_documents if order.id in existing else new_documents).append(row)
+
+    if new_documents:
+        db.session.execute(insert(OrderSearchDocument), new_documents)
+    if updated_documents:
+        db.session.execute(update(OrderSearchDocument), updated_documents)
+
+    stale = existing - {order.id for order in orders}
+    if stale:
+        db.session.execute(delete(OrderSearchDocument).where(OrderSearchDocument.order_id.in_(stale)))
+    return len(new_documents) + len(updated_documents)
+
+
+def backfill_order_search_documents(batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Create documents for orders that have none (deploys, first run)."""
+    total = 0
+    while True:
+        order_ids = db.session.execute(
+            select(Order.id)
+            .outerjoin(OrderSearchDocument, OrderSearchDocument.order_id == Order.id)
+            .where(OrderSearchDocument.order_id.is_(None))
+            .order_by(Order.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not order_ids:
+            break
+        total += refresh_order_documents(order_ids)
+        db.session.commit()
+    if total:
+        logger.info(f"Order search: indexed {total} order(s)")
+    return total
+
+
+def _use_fts() -> bool:
+    return db.session.get_bind().dialect.name == 'sqlite' and SQLITE_HAS_TRIGRAM
+
+
+# FTS5 table created by the DDL in models.py (SQLite only)
+_order_search_fts = table('order_search_fts', column('rowid'), column('order_search_fts'))
+
+
+def search_orders(query: str, status: Optional[str] = None, mechanic: Optional[str] = None,
+                  limit: Optional[int] = None, offset: int = 0) -> Tuple[List[Order], bool]:
+    """
+    Orders whose document contains every query term, newest first.
+
+    On SQLite, terms of three or more characters go through the FTS5 trigram
+    table, which then drives the query in rowid order and stops at the limit;
+    shorter terms are checked with LIKE. On PostgreSQL every term is a LIKE
+    served by the pg_trgm GIN index.
+
+    Returns:
+        (orders, has_more)
+    """
+    terms = parse_search_query(query)
+    if not terms:
+        return [], False
+
+    use_fts = _use_fts()
+    fts_terms = [term for term in terms if use_fts and len(term) >= TRIGRAM_MIN_LENGTH]
+    like_terms = [term for term in terms if term not in fts_terms]
+
+    statement = select(Order).options(selectinload(Order.custom_parts))
+    if fts_terms:
+        # Terms only contain letters, digits and spaces, so quoting is safe
+        match = ' AND '.join(f'"{term}"' for term in fts_terms)
+        statement = (
+            statement
+            .join(_order_search_fts, _order_search_fts.c.rowid == Order.id)
+            .where(_order_search_fts.c.order_search_fts.op('MATCH')(match))
+            .order_by(_order_search_fts.c.rowid.desc())
+        )
+    else:
+        statement = statement.order_by(Order.id.desc())
+    if like_terms:
+        statement = (
+            statement
+            .join(OrderSearchDocument, OrderSearchDocument.order_id == Order.id)
+            .where(*(OrderSearchDocument.document.like(f'%{term}%') for term in like_terms))
+        )
+    if status:
+        statement = statement.where(Order.status == status)
+    if mechanic:
+        statement = statement.where(Order.mechanic_name == mechanic)
+
+    limit = max(1, min(limit or config.ORDER_SEARCH_MAX_RESULTS, config.ORDER_SEARCH_MAX_RESULTS))
+    orders = db.session.execute(statement.limit(limit + 1).offset(max(offset, 0))).scalars().all()
+    return orders[:limit], len(orders) > limit
+
+
+def _track_changed_orders(session, flush_context):
+    """after_flush: remember orders whose search text may have changed."""
+    dirty = session.info.setdefault(_SESSION_KEY, set())
+    for obj in session.new:
+        if isinstance(obj, Order):
+            dirty.add(obj.id)
+        elif isinstance(obj, (OrderComment, CustomPartItem)):
+            dirty.add(obj.order_id)
+    for obj in session.dirty:
+        if isinstance(obj, Order):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in SEARCH_ORDER_FIELDS):
+                dirty.add(obj.id)
+        elif isinstance(obj, (OrderComment, CustomPartItem)) and session.is_modified(obj):
+            dirty.add(obj.order_id)
+    for obj in session.deleted:
+        if isinstance(obj, (Order, OrderComment, CustomPartItem)):
+            dirty.add(obj.id if isinstance(obj, Order) else obj.order_id)
+    dirty.discard(None)
+    if not dirty:
+        session.info.pop(_SESSION_KEY, None)
+
+
+def _refresh_before_commit(session):
+    """before_commit: write documents in the same transaction as the change."""
+    # before_commit runs ahead of the commit's own flush
+    session.flush()
+    while session.info.get(_SESSION_KEY):
+        refresh_order_documents(session.info.pop(_SESSION_KEY))
+        session.flush()
+
+
+def _forget_changed_orders(session):
+    session.info.pop(_SESSION_KEY, None)
+
+
+def init_order_search():
+    """Keep order search documents in sync with every session commit."""
+    if event.contains(db.session, 'after_flush', _track_changed_orders):
+        return
+    event.listen(db.session, 'after_flush', _track_changed_orders)
+    event.listen(db.session, 'before_commit', _refresh_before_commit)
+    event.listen(db.session, 'after_rollback', _forget_changed_orders)
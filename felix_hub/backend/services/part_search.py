@@ -0,0 +1,382 @@
+import os
+import re
+import sys
+import time
+import uuid
+import heapq
+import logging
+import unicodedata
+from bisect import bisect_left, insort
+from threading import RLock
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import select
+
+# Add backend directory to path for config import
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import config
+from models import db, Part, CatalogMeta, CustomPartItem
+
+logger = logging.getLogger(__name__)
+
+# CatalogMeta key changed by every catalog write; other processes compare it
+# with the version their index was built from and rebuild on mismatch
+CATALOG_VERSION_KEY = 'catalog_version'
+# Changed when mechanics add part numbers: rebuilds other indexes without
+# touching catalog_version (and the catalog snapshots keyed on it)
+PART_NUMBERS_VERSION_KEY = 'part_numbers_version'
+
+_HEBREW_MARKS = re.compile(r'[\u0591-\u05C7]')
+_NON_WORD = re.compile(r'[^\w]+')
+_NON_ALNUM = re.compile(r'[\W_]+')
+
+
+def normalize_text(value) -> str:
+    """Lowercase, fold ё to е, drop Hebrew niqqud and punctuation."""
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFKC', str(value)).lower().replace('ё', 'е')
+    value = _HEBREW_MARKS.sub('', value)
+    return _NON_WORD.sub(' ', value).replace('_', ' ').strip()
+
+
+def normalize_part_number(value) -> str:
+    """Part number without separators: '1K0-615 301' -> '1k0615301'."""
+    if not value:
+        return ''
+    return _NON_ALNUM.sub('', unicodedata.normalize('NFKC', str(value)).lower())
+
+
+class PartSearchIndex:
+    """
+    Token-prefix index over catalog part names (ru/he/en) and part numbers.
+
+    Every token maps to the set of documents containing it; a sorted token
+    list gives the prefix range for a query token with two bisects. A second
+    sorted list of whole names finds exact and leading-name matches the same
+    way, so ranking never scans the names of every candidate.
+    """
+
+    def __init__(self):
+        self._lock = RLock()
+        self._docs: Dict[tuple, dict] = {}
+        self._doc_tokens: Dict[tuple, Set[str]] = {}
+        self._doc_names: Dict[tuple, List[str]] = {}
+        self._order: Dict[tuple, tuple] = {}
+        self._postings: Dict[str, Set[tuple]] = {}
+        self._tokens: List[str] = []
+        self._names: List[tuple] = []
+        self.version: Optional[str] = None
+        self.part_numbers_version: Optional[str] = None
+        self.checked_at = 0.0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self._doc_tokens.clear()
+            self._doc_names.clear()
+            self._order.clear()
+            self._postings.clear()
+            self._tokens = []
+            self._names = []
+
+    def add(self, key: tuple, doc: dict, texts: Iterable[str] = (), part_numbers: Iterable[str] = (),
+            keep_sorted: bool = True):
+        """
+        Add or replace a document.
+
+        Bulk loaders pass keep_sorted=False and call resort() once at the end
+        instead of paying for an insort per new token.
+        """
+        tokens = set()
+        names = set()
+        for text in texts:
+            normalized = normalize_text(text)
+            if normalized:
+                tokens.update(normalized.split())
+                names.add(normalized)
+        for number in part_numbers:
+            normalized = normalize_part_number(number)
+            if normalized:
+                tokens.add(normalized)
+                names.add(normalized)
+
+        with self._lock:
+            self.remove(key)
+            self._docs[key] = doc
+            self._doc_tokens[key] = tokens
+            self._doc_names[key] = sorted(names)
+            # Static part of the ranking: catalog parts before part numbers,
+            # common parts first, then catalog order
+            self._order[key] = (
+                doc['type'] != 'part',
+                not doc.get('is_common', True),
+                doc.get('sort_order') or 0,
+                min(names) if names else '',
+                key
+            )
+            for token in tokens:
+                posting = self._postings.get(token)
+                if posting is None:
+                    posting = self._postings[token] = set()
+                    if keep_sorted:
+                        insort(self._tokens, token)
+                posting.add(key)
+            if keep_sorted:
+                for name in names:
+                    insort(self._names, (name, key))
+
+    def remove(self, key: tuple):
+        """Remove a document if present."""
+        with self._lock:
+            self._docs.pop(key, None)
+            self._order.pop(key, None)
+            for name in self._doc_names.pop(key, ()):
+                position = bisect_left(self._names, (name, key))
+                if position < len(self._names) and self._names[position] == (name, key):
+                    self._names.pop(position)
+            for token in self._doc_tokens.pop(key, ()):
+                posting = self._postings.get(token)
+                if posting is None:
+                    continue
+                posting.discard(key)
+                if not posting:
+                    del self._postings[token]
+                    # During a bulk load (keep_sorted=False) the token list is still empty
+                    position = bisect_left(self._tokens, token)
+                    if position < len(self._tokens) and self._tokens[position] == token:
+                        self._tokens.pop(position)
+
+    def resort(self):
+        with self._lock:
+            self._tokens = sorted(self._postings)
+            self._names = sorted(
+                (name, key) for key, names in self._doc_names.items() for name in names
+            )
+
+    def _prefix_range(self, prefix: str) -> List[str]:
+        start = bisect_left(self._tokens, prefix)
+        return self._tokens[start:bisect_left(self._tokens, prefix + '\uffff', start)]
+
+    def _prefix_matches(self, prefix: str) -> Set[tuple]:
+        matches = set()
+        for token in self._prefix_range(prefix):
+            matches |= self._postings[token]
+        return matches
+
+    def _name_matches(self, phrase: str, exact: Set[tuple], leading: Set[tuple]):
+        """Collect keys whose whole name equals or starts with the phrase."""
+        start = bisect_left(self._names, (phrase,))
+        end = bisect_left(self._names, (phrase + '\uffff',), start)
+        for name, key in self._names[start:end]:
+            (exact if name == phrase else leading).add(key)
+
+    def search(self, query: str, limit: int = 20, category_id: Optional[int] = None) -> List[dict]:
+        """
+        Documents whose tokens start with every query token.
+
+        A compact query ('1K0-615') additionally matches part numbers
+        regardless of separators. Exact and leading name matches rank first,
+        then common parts, then catalog order.
+        """
+        words = normalize_text(query).split()
+        compact = normalize_part_number(query)
+        if not words and not compact:
+            return []
+
+        with self._lock:
+            candidates = None
+            # Narrowest prefix first: an empty intersection stops early
+            for _, word in sorted((len(self._prefix_range(word)), word) for word in set(words)):
+                matches = self._prefix_matches(word)
+                candidates = matches if candidates is None else candidates & matches
+                if not candidates:
+                    break
+            candidates = set(candidates or ())
+            if compact and len(words) != 1:
+                candidates |= self._prefix_matches(compact)
+            if category_id is not None:
+                candidates = {key for key in candidates if self._docs[key].get('category_id') == category_id}
+
+            exact, leading = set(), set()
+            if words:
+                self._name_matches(' '.join(words), exact, leading)
+            if compact:
+                self._name_matches(compact, exact, leading)
+
+            keys = []
+            by_order = self._order.__getitem__
+            for tier in (exact, leading - exact, candidates):
+                tier = tier & candidates
+                tier.difference_update(keys)
+                keys += heapq.nsmallest(limit - len(keys), tier, key=by_order)
+                if len(keys) >= limit:
+                    break
+            docs = [self._docs[key] for key in keys]
+
+        return [dict(doc) for doc in docs]
+
+
+_index = PartSearchIndex()
+
+
+def _part_doc(part) -> dict:
+    return {
+        'type': 'part',
+        'id': part.id,
+        'category_id': part.category_id,
+        'name_ru': part.name_ru,
+        'name_he': part.name_he,
+        'name_en': part.name_en,
+        'is_common': part.is_common,
+        'sort_order': part.sort_order,
+    }
+
+
+def _index_part(part, keep_sorted=True):
+    _index.add(('part', part.id), _part_doc(part), texts=(part.name_ru, part.name_he, part.name_en),
+               keep_sorted=keep_sorted)
+
+
+def _index_part_number(number, name, uses=1, keep_sorted=True):
+    normalized = normalize_part_number(number)
+    if not normalized:
+        return
+    key = ('part_number', normalized)
+    existing = _index._docs.get(key)
+    _index.add(key, {
+        'type': 'part_number',
+        'part_number': number.strip(),
+        'name': name,
+        'uses': uses + (existing['uses'] if existing else 0),
+    }, texts=(name,), part_numbers=(number,), keep_sorted=keep_sorted)
+
+
+def read_catalog_version() -> str:
+    return db.session.execute(
+        select(CatalogMeta.value).where(CatalogMeta.key == CATALOG_VERSION_KEY)
+    ).scalar() or ''
+
+
+def read_index_versions() -> tuple:
+    """(catalog_version, part_numbers_version) in one query."""
+    values = dict(db.session.execute(
+        select(CatalogMeta.key, CatalogMeta.value)
+        .where(CatalogMeta.key.in_((CATALOG_VERSION_KEY, PART_NUMBERS_VERSION_KEY)))
+    ).all())
+    return values.get(CATALOG_VERSION_KEY) or '', values.get(PART_NUMBERS_VERSION_KEY) or ''
+
+
+def rebuild_part_index(versions: Optional[tuple] = None):
+    """Load all parts and part numbers into a fresh index (two queries)."""
+    started = time.perf_counter()
+    version, part_numbers_version = read_index_versions() if versions is None else versions
+
+    with _index._lock:
+        _index.clear()
+        for part in db.session.execute(
+            select(Part.id, Part.category_id, Part.name_ru, Part.name_he, Part.name_en,
+                   Part.is_common, Part.sort_order)
+        ):
+            _index_part(part, keep_sorted=False)
+
+        # One document per normalized number; later rows win, so a part
+        # number shows its most recent spelling and name
+        part_numbers = {}
+        for number, name in db.session.execute(
+            select(CustomPartItem.part_number, CustomPartItem.name)
+            .where(CustomPartItem.part_number.isnot(None))
+            .order_by(CustomPartItem.id)
+        ):
+            normalized = normalize_part_number(number)
+            if normalized:
+                uses = part_numbers[normalized][2] + 1 if normalized in part_numbers else 1
+                part_numbers[normalized] = (number, name, uses)
+        for number, name, uses in part_numbers.values():
+            _index_part_number(number, name, uses=uses, keep_sorted=False)
+
+        _index.resort()
+        _index.version = version
+        _index.part_numbers_version = part_numbers_version
+        _index.checked_at = time.monotonic()
+
+    logger.info(f"Part search index rebuilt: {len(_index)} docs in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+
+def get_part_index() -> PartSearchIndex:
+    """The process index, rebuilt if another process changed the catalog."""
+    now = time.monotonic()
+    if _index.version is None or now - _index.checked_at >= config.PART_SEARCH_VERSION_CHECK_SECONDS:
+        versions = read_index_versions()
+        if versions != (_index.version, _index.part_numbers_version):
+            rebuild_part_index(versions)
+        _index.checked_at = now
+    return _index
+
+
+def search_parts(query: str, limit: Optional[int] = None, category_id: Optional[int] = None) -> List[dict]:
+    limit = min(limit or config.PART_SEARCH_MAX_RESULTS, config.PART_SEARCH_MAX_RESULTS)
+    return get_part_index().search(query, limit=limit, category_id=category_id)
+
+
+def _bump_version(key: str) -> tuple:
+    meta = db.session.get(CatalogMeta, key)
+    old_version = meta.value if meta else ''
+    if meta is None:
+        meta = CatalogMeta(key=key)
+        db.session.add(meta)
+    meta.value = uuid.uuid4().hex
+    return old_version, meta.value
+
+
+def bump_catalog_version() -> tuple:
+    """
+    Stage a new catalog version in the current session.
+
+    Commit it together with the catalog change, then pass the returned
+    (old, new) pair to one of the apply_* helpers.
+    """
+    return _bump_version(CATALOG_VERSION_KEY)
+
+
+def bump_part_numbers_version() -> tuple:
+    """Like bump_catalog_version(), for part numbers added by mechanics."""
+    return _bump_version(PART_NUMBERS_VERSION_KEY)
+
+
+def _apply(versions: tuple, change, attribute: str = 'version'):
+    old_version, new_version = versions
+    with _index._lock:
+        if getattr(_index, attribute) == old_version:
+            change()
+            setattr(_index, attribute, new_version)
+        else:
+            # The index had already fallen behind; rebuild on the next search
+            _index.version = None
+
+
+def apply_part_saved(versions: tuple, part):
+    """Update the index in place after a committed part create/update."""
+    _apply(versions, lambda: _index_part(part))
+
+
+def apply_part_deleted(versions: tuple, part_id: int):
+    _apply(versions, lambda: _index.remove(('part', part_id)))
+
+
+def apply_part_number_added(versions: tuple, number: str, name: str):
+    """Update the index in place after a committed part number; versions come from bump_part_numbers_version()."""
+    _apply(versions, lambda: _index_part_number(number, name), attribute='part_numbers_version')
+
+
+def apply_catalog_changed(versions: tuple):
+    """Advance the index version after a change it does not hold (categories)."""
+    _apply(versions, lambda: None)
+
+
+def invalidate_part_index():
+    """Force a full rebuild on the next search (bulk imports, category deletes)."""
+    _index.version = None
@@ -0,0 +1,268 @@
+import io
+import os
+import sys
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_
+from PIL import Image, ImageOps, UnidentifiedImageError
+from werkzeug.utils import secure_filename
+
+# Add backend directory to path for config import
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import config
+from models import db, Order, PhotoJob
+from services.order_events import record_order_event
+from services.job_queue import JobWorker, claim_next_job, requeue_stale_jobs
+
+logger = logging.getLogger(__name__)
+
+PHOTO_JOB_STATUSES = ('queued', 'processing', 'done', 'failed')
+PHOTO_URL_PREFIX = '/media/photos'
+UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'uploads')
+
+
+def save_upload(file) -> Tuple[str, str]:
+    """
+    Store an uploaded photo as-is so the order can be saved right away.
+
+    Returns:
+        (path on disk, URL under /static/uploads). The URL is served until
+        the photo worker replaces it with the processed image.
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    filename = secure_filename(f"order_{datetime.utcnow().timestamp()}_{file.filename}")
+    path = os.path.join(UPLOAD_DIR, filename)
+    file.save(path)
+    return path, f"/static/uploads/{filename}"
+
+
+def enqueue_photo_job(order_id: int, source_path: str) -> PhotoJob:
+    """
+    Add a processing job for the order's uploaded photo to the current session.
+
+    The caller commits together with the order and then calls
+    wake_photo_worker().
+    """
+    job = PhotoJob(
+        order_id=order_id,
+        source_path=source_path,
+        status='queued',
+        attempts=0,
+        max_attempts=config.PHOTO_JOB_MAX_ATTEMPTS,
+        next_attempt_at=datetime.utcnow()
+    )
+    db.session.add(job)
+    return job
+
+
+def wake_photo_worker():
+    """Wake the worker without waiting for the next poll interval."""
+    _worker.wake()
+
+
+def photo_filenames(content_hash: str) -> Tuple[str, str]:
+    """File names of the main image and the thumbnail for a content hash."""
+    return f"{content_hash}.jpg", f"{content_hash}_{config.PHOTO_THUMBNAIL_EDGE}.jpg"
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """RGB copy of the image; transparent areas become white instead of black."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _encode_jpeg(image: Image.Image, progressive: bool) -> bytes:
+    buffer = io.BytesIO()
+    # EXIF is not copied: orientation is already applied and GPS data stays private
+    image.save(buffer, 'JPEG', quality=config.PHOTO_JPEG_QUALITY, optimize=True, progressive=progressive)
+    return buffer.getvalue()
+
+
+def render_photo(data: bytes) -> Tuple[bytes, bytes]:
+    """
+    Decode an uploaded photo and encode the main image and the thumbnail.
+
+    JPEG sources are decoded at a reduced scale (draft mode) close to
+    PHOTO_MAX_EDGE, which avoids decoding a 12 MP phone photo at full size.
+
+    Returns:
+        (main JPEG, thumbnail JPEG)
+    """
+    max_edge = config.PHOTO_MAX_EDGE
+    with Image.open(io.BytesIO(data)) as source:
+        ratio = max_edge / max(source.size)
+        if ratio < 1:
+            source.draft('RGB', (int(source.width * ratio), int(source.height * ratio)))
+        image = _flatten(ImageOps.exif_transpose(source))
+
+    image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    main = _encode_jpeg(image, progressive=True)
+
+    edge = config.PHOTO_THUMBNAIL_EDGE
+    image.thumbnail((edge, edge), Image.LANCZOS)
+    thumbnail = _encode_jpeg(image, progressive=False)
+    return main, thumbnail
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def store_photo(data: bytes) -> Tuple[str, bool]:
+    """
+    Write the processed images of ``data`` unless this content is already stored.
+
+    Returns:
+        (content hash, whether new files were rendered)
+    """
+    content_hash = hashlib.sha256(data).hexdigest()
+    main_name, thumbnail_name = photo_filenames(content_hash)
+    main_path = os.path.join(config.PHOTO_STORAGE_DIR, main_name)
+    thumbnail_path = os.path.join(config.PHOTO_STORAGE_DIR, thumbnail_name)
+    if os.path.exists(main_path) and os.path.exists(thumbnail_path):
+        return content_hash, False
+
+    main, thumbnail = render_photo(data)
+    os.makedirs(config.PHOTO_STORAGE_DIR, exist_ok=True)
+    _write_atomic(main_path, main)
+    _write_atomic(thumbnail_path, thumbnail)
+    logger.info(
+        f"Photo {content_hash[:12]} stored: {len(data)} -> {len(main)} bytes, "
+        f"thumbnail {len(thumbnail)} bytes"
+    )
+    return content_hash, True
+
+
+def _requeue_stale_jobs(now: datetime):
+    """Return jobs left in 'processing' by a dead worker back to the queue."""
+    requeue_stale_jobs(PhotoJob, 'processing', PhotoJob.updated_at, config.PHOTO_JOB_STALE_SECONDS,
+                       {'next_attempt_at': now})
+
+
+def _claim_next_job(now: datetime) -> Optional[PhotoJob]:
+    """Atomically move the oldest due job from 'queued' to 'processing' (safe across workers)."""
+    return claim_next_job(
+        PhotoJob,
+        and_(PhotoJob.status == 'queued', PhotoJob.next_attempt_at <= now),
+        {'status': 'processing', 'updated_at': now}
+    )
+
+
+def _fail(job: PhotoJob, error: str):
+    job.status = 'failed'
+    job.last_error = error
+    job.finished_at = datetime.utcnow()
+    logger.error(f"Photo job {job.id}: order {job.order_id}: {error}")
+
+
+def _run_job(job: PhotoJob):
+    order = db.session.get(Order, job.order_id)
+    if order is None:
+        _fail(job, 'Заказ не найден')
+        return
+
+    try:
+        with open(job.source_path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        _fail(job, 'Исходный файл не найден')
+        return
+
+    try:
+        job.content_hash, _ = store_photo(data)
+    except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+        # Повторять бессмысленно: у заказа остаётся исходный файл
+        _fail(job, f'Не удалось прочитать изображение: {e}')
+        return
+
+    main_name, thumbnail_name = photo_filenames(job.content_hash)
+    order.photo_url = f"{PHOTO_URL_PREFIX}/{main_name}"
+    order.photo_thumb_url = f"{PHOTO_URL_PREFIX}/{thumbnail_name}"
+    record_order_event(order.id, 'updated', order.assigned_mechanic_id)
+
+    job.status = 'done'
+    job.last_error = None
+    job.finished_at = datetime.utcnow()
+
+
+def _remove_source(job: PhotoJob):
+    try:
+        os.remove(job.source_path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Photo job {job.id}: could not remove {job.source_path}: {e}")
+
+
+def process_photo_jobs(limit: int = 10) -> List[PhotoJob]:
+    """
+    Claim and process up to ``limit`` due photo jobs, one commit per job.
+
+    Returns:
+        The processed jobs (empty if the queue has nothing due).
+    """
+    now = datetime.utcnow()
+    _requeue_stale_jobs(now)
+
+    jobs = []
+    while len(jobs) < limit:
+        job = _claim_next_job(now)
+        if job is None:
+            break
+        jobs.append(job)
+
+        try:
+            _run_job(job)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(PhotoJob, job.id)
+            jobs[-1] = job
+            job.last_error = str(e)
+            if job.attempts < job.max_attempts:
+                delay = config.PHOTO_RETRY_BACKOFF_SECONDS * (2 ** (job.attempts - 1))
+                job.status = 'queued'
+                job.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+                logger.warning(f"Photo job {job.id}: attempt {job.attempts}/{job.max_attempts} failed: {e}")
+            else:
+                _fail(job, str(e))
+            db.session.commit()
+            continue
+
+        # Исходник удаляется только после коммита новой ссылки
+        if job.status == 'done':
+            _remove_source(job)
+    return jobs
+
+
+def process_next_photo_job() -> Optional[PhotoJob]:
+    """Claim and process one due photo job; None if nothing is due."""
+    jobs = process_photo_jobs(limit=1)
+    return jobs[0] if jobs else None
+
+
+_worker = JobWorker('photo', lambda: process_photo_jobs(), lambda: config.PHOTO_WORKER_POLL_INTERVAL)
+
+
+def ensure_photo_worker(app):
+    """Start the worker thread once per process (also after gunicorn fork)."""
+    _worker.ensure_started(app)
+
+
+def init_photo_pipeline(app):
+    """Start the photo worker lazily on the first request of each process."""
+    if not config.PHOTO_WORKER_ENABLED:
+        logger.info("Photo worker disabled (PHOTO_WORKER_ENABLED=false)")
+        return
+    _worker.start_on_first_request(app)
@@ -0,0 +1,230 @@
+import os
+import sys
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import and_
+
+# Add backend directory to path for config import
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import config
+from models import db, Order, PrintJob
+from services.order_events import record_order_event
+from services.job_queue import JobWorker, claim_next_job, requeue_stale_jobs
+from utils import printer, pdf_renderer
+
+logger = logging.getLogger(__name__)
+
+PRINT_JOB_STATUSES = ('queued', 'printing', 'done', 'pdf_fallback', 'failed')
+ACTIVE_STATUSES = ('queued', 'printing')
+
+def enqueue_print_job(order_id: int) -> PrintJob:
+    """
+    Add a print job for the order to the current session.
+
+    The caller commits together with the order change and then calls
+    wake_print_worker(). If the order already has a queued or running
+    job, that job is returned instead of creating a duplicate.
+    """
+    existing = PrintJob.query.filter(
+        PrintJob.order_id == order_id,
+        PrintJob.status.in_(ACTIVE_STATUSES)
+    ).first()
+    if existing:
+        return existing
+
+    job = PrintJob(
+        order_id=order_id,
+        status='queued',
+        attempts=0,
+        max_attempts=config.PRINT_JOB_MAX_ATTEMPTS,
+        next_attempt_at=datetime.utcnow()
+    )
+    db.session.add(job)
+    return job
+
+
+def enqueue_print_jobs(order_ids: List[int]) -> List[PrintJob]:
+    """
+    Batch variant of enqueue_print_job: one query for active jobs of all orders.
+
+    Returns:
+        One job per order id (existing active job or a new one), in input order.
+    """
+    active = {
+        job.order_id: job
+        for job in PrintJob.query.filter(
+            PrintJob.order_id.in_(order_ids),
+            PrintJob.status.in_(ACTIVE_STATUSES)
+        ).all()
+    }
+
+    now = datetime.utcnow()
+    jobs = []
+    for order_id in order_ids:
+        job = active.get(order_id)
+        if job is None:
+            job = PrintJob(
+                order_id=order_id,
+                status='queued',
+                attempts=0,
+                max_attempts=config.PRINT_JOB_MAX_ATTEMPTS,
+                next_attempt_at=now
+            )
+            db.session.add(job)
+            active[order_id] = job
+        jobs.append(job)
+    return jobs
+
+
+def wake_print_worker():
+    """Wake the worker without waiting for the next poll interval."""
+    _worker.wake()
+
+
+def _requeue_stale_jobs(now: datetime):
+    """Return jobs left in 'printing' by a dead worker back to the queue."""
+    requeue_stale_jobs(PrintJob, 'printing', PrintJob.updated_at, config.PRINT_JOB_STALE_SECONDS,
+                       {'next_attempt_at': now})
+
+
+def _claim_next_job(now: datetime) -> Optional[PrintJob]:
+    """Atomically move the oldest due job from 'queued' to 'printing' (safe across gunicorn workers)."""
+    return claim_next_job(
+        PrintJob,
+        and_(PrintJob.status == 'queued', PrintJob.next_attempt_at <= now),
+        {'status': 'printing', 'updated_at': now}
+    )
+
+
+def _mark_order_printed(order: Order):
+    order.printed = True
+    record_order_event(order.id, 'updated', order.assigned_mechanic_id)
+
+
+def _fallback_to_pdf(job: PrintJob, order: Order):
+    # Отметка раньше рендера: кеш PDF привязан к updated_at, который она меняет
+    was_printed = order.printed
+    order.printed = True
+    db.session.flush()
+    try:
+        # Рендер прогревает кеш: админ скачивает готовый PDF по ссылке
+        pdf_renderer.get_order_pdf(order)
+    except Exception as e:
+        order.printed = was_printed
+        job.status = 'failed'
+        job.last_error = f'Не удалось напечатать ни одним методом: {e}'
+        logger.error(f"Print job {job.id}: order {order.id} could not be printed: {e}")
+    else:
+        job.status = 'pdf_fallback'
+        job.pdf_path = f"/api/orders/{order.id}/receipt.pdf"
+        record_order_event(order.id, 'updated', order.assigned_mechanic_id)
+        logger.info(f"Print job {job.id}: PDF fallback for order {order.id}")
+    job.finished_at = datetime.utcnow()
+
+
+def _run_jobs(jobs):
+    orders = {
+        order.id: order
+        for order in Order.query.filter(Order.id.in_([job.order_id for job in jobs])).all()
+    }
+
+    printable = []
+    for job in jobs:
+        order = orders.get(job.order_id)
+        if order is None:
+            job.status = 'failed'
+            job.last_error = 'Заказ не найден'
+            job.finished_at = datetime.utcnow()
+        elif not printer.PRINTER_ENABLED:
+            # Термопринтер отключен - повторы бессмысленны, сразу PDF
+            _fallback_to_pdf(job, order)
+        else:
+            printable.append((job, order))
+
+    if not printable:
+        return
+
+    # Все чеки пачки уходят через одно подключение
+    results = printer.print_orders_batch([order for _, order in printable])
+    for job, order in printable:
+        if results.get(order.id):
+            job.status = 'done'
+            job.last_error = None
+            job.finished_at = datetime.utcnow()
+            _mark_order_printed(order)
+            logger.info(f"Print job {job.id}: order {order.id} printed")
+        else:
+            _schedule_retry(job, order)
+
+
+def _schedule_retry(job: PrintJob, order: Order):
+    job.last_error = 'Термопринтер недоступен'
+    if job.attempts < job.max_attempts:
+        delay = config.PRINT_RETRY_BACKOFF_SECONDS * (2 ** (job.attempts - 1))
+        job.status = 'queued'
+        job.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        logger.warning(
+            f"Print job {job.id}: attempt {job.attempts}/{job.max_attempts} failed, "
+            f"retry in {delay}s"
+        )
+    else:
+        _fallback_to_pdf(job, order)
+
+
+def process_print_jobs(limit: Optional[int] = None) -> List[PrintJob]:
+    """
+    Claim up to ``limit`` due print jobs and print them over one connection.
+
+    Returns:
+        The processed jobs (empty if the queue has nothing due).
+    """
+    limit = limit or config.PRINT_BATCH_SIZE
+    now = datetime.utcnow()
+    _requeue_stale_jobs(now)
+
+    jobs = []
+    while len(jobs) < limit:
+        job = _claim_next_job(now)
+        if job is None:
+            break
+        jobs.append(job)
+    if not jobs:
+        return []
+
+    try:
+        _run_jobs(jobs)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Print jobs {[job.id for job in jobs]} crashed: {e}")
+        jobs = [db.session.get(PrintJob, job.id) for job in jobs]
+        for job in jobs:
+            job.status = 'queued' if job.attempts < job.max_attempts else 'failed'
+            job.last_error = str(e)
+            job.next_attempt_at = datetime.utcnow() + timedelta(seconds=config.PRINT_RETRY_BACKOFF_SECONDS)
+        db.session.commit()
+    return jobs
+
+
+def process_next_print_job() -> Optional[PrintJob]:
+    """Claim and process one due print job; None if nothing is due."""
+    jobs = process_print_jobs(limit=1)
+    return jobs[0] if jobs else None
+
+
+_worker = JobWorker('print', lambda: process_print_jobs(), lambda: config.PRINT_WORKER_POLL_INTERVAL)
+
+
+def ensure_print_worker(app):
+    """Start the worker thread once per process (also after gunicorn fork)."""
+    _worker.ensure_started(app)
+
+
+def init_print_queue(app):
+    """Start the print worker lazily on the first request of each process."""
+    if not config.PRINT_WORKER_ENABLED:
+        logger.info("Print worker disabled (PRINT_WORKER_ENABLED=false)")
+        return
+    _worker.start_on_first_request(app)
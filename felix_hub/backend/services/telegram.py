@@ -165,6 +165,143 @@ def _generate_mechanic_order_link(order_id: int) -> str:
     return f"{base_url}/#/mechanic/orders/{order_id}"
 
 
+STATUS_EMOJI = {
+    'новый': '🆕',
+    'в работе': '⏳',
+    'готов': '✅',
+    'выдан': '📦'
+}
+
+# Orders listed in one digest message (Telegram caps messages at 4096 chars)
+DIGEST_MAX_ORDERS = 30
+
+
+def _format_mechanic_status_message(order, old_status: str, new_status: str) -> str:
+    """Format a single order status change message for a mechanic."""
+    emoji = STATUS_EMOJI.get(new_status, '❓')
+    parts_text, car_identifier = _format_order_summary(order)
+    mechanic_link = _generate_mechanic_order_link(order.id)
+    
+    return (
+        f"{emoji} <b>Статус заказа изменён</b>\n\n"
+        f"📋 <b>Заказ #{order.id}</b>\n"
+        f"🚗 <b>Номер авто:</b> {car_identifier}\n"
+        f"📂 <b>Категория:</b> {order.category}\n\n"
+        f"<b>Было:</b> <i>{old_status}</i>\n"
+        f"<b>Стало:</b> <b>{new_status}</b>\n\n"
+        f"<b>Запчасти:</b>\n{parts_text}\n\n"
+        f"🔗 <a href='{mechanic_link}'>Открыть заказ</a>"
+    )
+
+
+def _format_mechanic_status_digest(changes) -> str:
+    """Format several status changes for one mechanic as a single message."""
+    lines = []
+    for order, old_status, new_status in changes[:DIGEST_MAX_ORDERS]:
+        _, car_identifier = _format_order_summary(order)
+        lines.append(
+            f"{STATUS_EMOJI.get(new_status, '❓')} "
+            f"<a href='{_generate_mechanic_order_link(order.id)}'>Заказ #{order.id}</a> "
+            f"({car_identifier}): <i>{old_status}</i> → <b>{new_status}</b>"
+        )
+    if len(changes) > DIGEST_MAX_ORDERS:
+        lines.append(f"... и ещё {len(changes) - DIGEST_MAX_ORDERS}")
+    return f"📋 <b>Статус заказов изменён: {len(changes)}</b>\n\n" + "\n".join(lines)
+
+
+def build_mechanic_status_digests(changes) -> List[dict]:
+    """
+    Group order status changes by assigned mechanic, one message per mechanic.
+    
+    Messages are rendered while the orders are still loaded, so they can be
+    sent after the transaction is committed (or from another thread).
+    
+    Args:
+        changes: List of (order, old_status, new_status) tuples
+        
+    Returns:
+        List of dicts with mechanic_id, telegram_id, order_ids, statuses
+        (order_id -> new status) and message
+    """
+    if not _is_mechanic_notifs_enabled():
+        return []
+    
+    by_mechanic = {}
+    for order, old_status, new_status in changes:
+        if old_status != new_status and order.assigned_mechanic:
+            by_mechanic.setdefault(order.assigned_mechanic.id, []).append((order, old_status, new_status))
+    
+    digests = []
+    for mechanic_id, mechanic_changes in by_mechanic.items():
+        mechanic = mechanic_changes[0][0].assigned_mechanic
+        if len(mechanic_changes) == 1:
+            message = _format_mechanic_status_message(*mechanic_changes[0])
+        else:
+            message = _format_mechanic_status_digest(mechanic_changes)
+        digests.append({
+            'mechanic_id': mechanic_id,
+            'telegram_id': mechanic.telegram_id or '',
+            'statuses': {order.id: new_status for order, _, new_status in mechanic_changes},
+            'message': message
+        })
+    return digests
+
+
+def send_mechanic_status_digests(digests: List[dict], db_session=None) -> dict:
+    """
+    Send digests built by build_mechanic_status_digests.
+    
+    Every order in a digest gets its own NotificationLog row; all rows are
+    committed at once.
+    
+    Returns:
+        Dict with 'success' and 'failed' message counts
+    """
+    results = {'success': 0, 'failed': 0}
+    if not digests:
+        return results
+    
+    bot_token = _get_bot_token()
+    
+    for digest in digests:
+        if not digest['telegram_id']:
+            logger.warning(f"Mechanic {digest['mechanic_id']} has no telegram_id, digest skipped")
+            success, error = False, "Mechanic has no telegram_id"
+        elif not bot_token:
+            logger.error("TELEGRAM_BOT_TOKEN not configured")
+            success, error = False, "TELEGRAM_BOT_TOKEN not configured"
+        else:
+            success = _send_telegram_message(digest['telegram_id'], digest['message'])
+            error = None if success else "Failed to send"
+        
+        results['success' if success else 'failed'] += 1
+        
+        if db_session:
+            from models import NotificationLog
+            for order_id, new_status in digest['statuses'].items():
+                db_session.add(NotificationLog(
+                    notification_type='mechanic_status_change',
+                    order_id=order_id,
+                    mechanic_id=digest['mechanic_id'],
+                    telegram_id=digest['telegram_id'],
+                    message_hash=f"mechanic_status_change:{order_id}:{digest['mechanic_id']}:{new_status}",
+                    success=success,
+                    error_message=error
+                ))
+    
+    if db_session:
+        try:
+            db_session.commit()
+        except Exception as e:
+            db_session.rollback()
+            logger.error(f"Error logging mechanic digest notifications: {e}")
+    
+    logger.info(
+        f"Mechanic status digests sent: success={results['success']}, failed={results['failed']}"
+    )
+    return results
+
+
 def notify_mechanic_status_change(order, old_status: str, new_status: str, mechanic, db_session=None) -> bool:
     """
     Notify mechanic about order status change.
@@ -214,30 +351,7 @@ def notify_mechanic_status_change(order, old_status: str, new_status: str, mecha
         return False
     
     try:
-        # Status emoji mapping
-        status_emoji = {
-            'новый': '🆕',
-            'в работе': '⏳',
-            'готов': '✅',
-            'выдан': '📦'
-        }
-        emoji = status_emoji.get(new_status, '❓')
-        
-        # Format order details
-        parts_text, car_identifier = _format_order_summary(order)
-        mechanic_link = _generate_mechanic_order_link(order.id)
-        
-        # Build message
-        message = (
-            f"{emoji} <b>Статус заказа изменён</b>\n\n"
-            f"📋 <b>Заказ #{order.id}</b>\n"
-            f"🚗 <b>Номер авто:</b> {car_identifier}\n"
-            f"📂 <b>Категория:</b> {order.category}\n\n"
-            f"<b>Было:</b> <i>{old_status}</i>\n"
-            f"<b>Стало:</b> <b>{new_status}</b>\n\n"
-            f"<b>Запчасти:</b>\n{parts_text}\n\n"
-            f"🔗 <a href='{mechanic_link}'>Открыть заказ</a>"
-        )
+        message = _format_mechanic_status_message(order, old_status, new_status)
         
         # Send notification with retry logic
         success = _send_telegram_message(telegram_id, message)
@@ -0,0 +1,187 @@
+import os
+import sys
+import time
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Optional
+
+from sqlalchemy import delete
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Add backend directory to path for config import
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import config
+from models import db, ProcessedUpdate
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+UPDATE_DEDUP_BACKENDS = ('memory', 'database', 'redis')
+
+
+class UpdateDedupStore(ABC):
+    """
+    Remembers accepted Telegram update ids for ``ttl`` seconds.
+
+    register() is the atomic check-and-set used by the webhook: it returns
+    False when the update was already accepted, by this process or (for the
+    shared backends) by any other worker.
+    """
+
+    name = 'base'
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+
+    @abstractmethod
+    def register(self, update_key: str) -> bool:
+        """Accept an update id; False if it was already accepted within the TTL."""
+
+    @abstractmethod
+    def release(self, update_key: str):
+        """Forget an update that was not processed, so a redelivery is accepted."""
+
+    def clear(self):
+        """
+        Drop process-local state.
+
+        Shared backends keep their entries, so a restarted worker still
+        recognizes updates that another worker already accepted.
+        """
+
+
+class MemoryUpdateStore(UpdateDedupStore):
+    """Per-process store: an insertion-ordered dict trimmed by TTL and size."""
+
+    name = 'memory'
+
+    def __init__(self, ttl: int, max_size: int):
+        super().__init__(ttl)
+        self.max_size = max_size
+        self._lock = Lock()
+        self._updates = OrderedDict()
+
+    def _cleanup(self, now: float):
+        while self._updates:
+            first_timestamp = next(iter(self._updates.values()))
+            if now - first_timestamp <= self.ttl:
+                break
+            self._updates.popitem(last=False)
+
+    def register(self, update_key: str) -> bool:
+        now = time.time()
+        with self._lock:
+            self._cleanup(now)
+            if update_key in self._updates:
+                return False
+            self._updates[update_key] = now
+            while len(self._updates) > self.max_size:
+                self._updates.popitem(last=False)
+        return True
+
+    def release(self, update_key: str):
+        with self._lock:
+            self._updates.pop(update_key, None)
+
+    def clear(self):
+        with self._lock:
+            self._updates.clear()
+
+
+class DatabaseUpdateStore(UpdateDedupStore):
+    """
+    Store shared by all workers through the processed_updates table.
+
+    register() is one primary-key upsert that only overwrites an expired
+    row, so the row count tells whether the update is new. It runs on its
+    own connection and commits immediately, independent of the request
+    session. Expired rows are deleted at most once per ``prune_interval``.
+    """
+
+    name = 'database'
+
+    def __init__(self, ttl: int, prune_interval: float):
+        super().__init__(ttl)
+        self.prune_interval = prune_interval
+        self._pruned_at = 0.0
+
+    def _upsert(self, dialect_name: str, update_key: str, now: datetime, cutoff: datetime):
+        dialect_insert = postgresql.insert if dialect_name == 'postgresql' else sqlite.insert
+        statement = dialect_insert(ProcessedUpdate).values(update_id=update_key, received_at=now)
+        return statement.on_conflict_do_update(
+            index_elements=[ProcessedUpdate.update_id],
+            set_={'received_at': statement.excluded.received_at},
+            where=ProcessedUpdate.received_at < cutoff
+        )
+
+    def register(self, update_key: str) -> bool:
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.ttl)
+        engine = db.engine
+        with engine.begin() as conn:
+            accepted = conn.execute(self._upsert(engine.dialect.name, update_key, now, cutoff)).rowcount == 1
+            if time.monotonic() - self._pruned_at >= self.prune_interval:
+                self._pruned_at = time.monotonic()
+                conn.execute(delete(ProcessedUpdate).where(ProcessedUpdate.received_at < cutoff))
+        return accepted
+
+    def release(self, update_key: str):
+        with db.engine.begin() as conn:
+            conn.execute(delete(ProcessedUpdate).where(ProcessedUpdate.update_id == update_key))
+
+
+class RedisUpdateStore(UpdateDedupStore):
+    """
+    Store shared by all workers through a Redis-compatible server.
+
+    Uses SET NX EX, so any client with a redis-py style
+    ``set(name, value, nx=, ex=)`` / ``delete(name)`` works, including an
+    in-process stand-in.
+    """
+
+    name = 'redis'
+
+    def __init__(self, ttl: int, client, prefix: str = 'felix:update:'):
+        super().__init__(ttl)
+        self.client = client
+        self.prefix = prefix
+
+    def register(self, update_key: str) -> bool:
+        return bool(self.client.set(self.prefix + update_key, '1', nx=True, ex=self.ttl))
+
+    def release(self, update_key: str):
+        self.client.delete(self.prefix + update_key)
+
+
+def create_update_store(backend: Optional[str] = None) -> UpdateDedupStore:
+    """
+    Build the store selected by UPDATE_DEDUP_BACKEND.
+
+    'redis' falls back to 'database' when the redis package or
+    UPDATE_DEDUP_REDIS_URL is missing.
+    """
+    backend = (backend or config.UPDATE_DEDUP_BACKEND).lower()
+    ttl = config.UPDATE_DEDUP_TTL_SECONDS
+
+    if backend not in UPDATE_DEDUP_BACKENDS:
+        logger.warning(f"Unknown UPDATE_DEDUP_BACKEND '{backend}', using 'database'")
+        backend = 'database'
+
+    if backend == 'redis':
+        if REDIS_AVAILABLE and config.UPDATE_DEDUP_REDIS_URL:
+            return RedisUpdateStore(ttl, redis.Redis.from_url(config.UPDATE_DEDUP_REDIS_URL))
+        logger.warning("Redis dedup backend unavailable (package or UPDATE_DEDUP_REDIS_URL missing), using 'database'")
+        backend = 'database'
+
+    if backend == 'database':
+        return DatabaseUpdateStore(ttl, config.UPDATE_DEDUP_PRUNE_SECONDS)
+    return MemoryUpdateStore(ttl, config.UPDATE_DEDUP_MAX_SIZE)
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+from collections import deque
+from threading import Lock
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDispatcher:
+    """
+    Bounded hand-off of webhook updates to the bot event loop.
+
+    At most ``max_in_flight`` updates run on the loop at once; up to
+    ``max_queue`` more wait in a FIFO and start as running ones finish.
+    Anything beyond that is refused so the webhook can answer 429 and let
+    Telegram redeliver later, instead of piling unbounded work onto the
+    single loop thread.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self._lock = Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending = deque()
+        self._in_flight = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+        self._max_queue_depth = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Attach the event loop the updates run on and drop any leftover state."""
+        with self._lock:
+            self._loop = loop
+            self._pending.clear()
+            self._in_flight = 0
+
+    def reset(self):
+        """Detach from the loop; queued updates are dropped (Telegram redelivers them)."""
+        with self._lock:
+            dropped = len(self._pending)
+            self._loop = None
+            self._pending.clear()
+            self._in_flight = 0
+        if dropped:
+            logger.warning(f"Webhook dispatcher stopped with {dropped} queued update(s)")
+
+    def submit(self, coroutine_factory: Callable, identifier: str,
+               on_done: Optional[Callable] = None) -> bool:
+        """
+        Admit an update for processing.
+
+        Args:
+            coroutine_factory: Zero-argument callable returning the coroutine
+                to run; called only when the update gets a slot
+            identifier: Update id for logs
+            on_done: Called with (future, identifier) once the coroutine finishes
+
+        Returns:
+            False if the dispatcher is saturated (or not bound) and the update
+            was not admitted
+        """
+        with self._lock:
+            if self._loop is None:
+                return False
+            if self._in_flight >= self.max_in_flight:
+                if len(self._pending) >= self.max_queue:
+                    self._rejected += 1
+                    return False
+                self._pending.append((coroutine_factory, identifier, on_done))
+                self._max_queue_depth = max(self._max_queue_depth, len(self._pending))
+                self._admitted += 1
+                return True
+            self._in_flight += 1
+            self._admitted += 1
+            loop = self._loop
+
+        try:
+            self._start(loop, coroutine_factory, identifier, on_done)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+                self._admitted -= 1
+            raise
+        return True
+
+    def _start(self, loop, coroutine_factory, identifier, on_done):
+        future = asyncio.run_coroutine_threadsafe(coroutine_factory(), loop)
+        future.add_done_callback(lambda fut: self._finished(loop, fut, identifier, on_done))
+
+    def _finished(self, loop, future, identifier, on_done):
+        # Runs on the loop thread; hands the freed slot to the oldest queued update
+        failed = future.cancelled() or future.exception() is not None
+        with self._lock:
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+
+        if on_done is not None:
+            on_done(future, identifier)
+
+        while True:
+            with self._lock:
+                if self._loop is not loop:
+                    return
+                if not self._pending:
+                    self._in_flight -= 1
+                    return
+                next_update = self._pending.popleft()
+            try:
+                self._start(loop, *next_update)
+                return
+            except Exception as exc:
+                logger.error(f"❌ Could not start queued update {next_update[1]}: {exc}")
+                with self._lock:
+                    self._failed += 1
+
+    def stats(self) -> dict:
+        """Current depth and lifetime counters (per process)."""
+        with self._lock:
+            return {
+                'in_flight': self._in_flight,
+                'queued': len(self._pending),
+                'max_in_flight': self.max_in_flight,
+                'max_queue': self.max_queue,
+                'max_queue_depth': self._max_queue_depth,
+                'admitted': self._admitted,
+                'rejected': self._rejected,
+                'completed': self._completed,
+                'failed': self._failed,
+            }
@@ -1,10 +1,14 @@
 // API базовый URL
 const API_URL = '/api/orders';
 const MECHANICS_API_URL = '/api/admin/mechanics';
+const CHANGES_API_URL = '/api/orders/changes';
+const CHANGES_POLL_INTERVAL = 5000;
 
 // Глобальные переменные
 let mechanics = [];
 let currentSection = 'orders';
+let ordersVersion = null;
+let visibleOrders = [];
 
 // Управление секциями
 function showSection(section) {
@@ -342,23 +346,21 @@ async function loadOrders() {
     const mechanic = document.getElementById('filter-mechanic').value;
     const search = document.getElementById('search').value;
     
-    let url = API_URL + '?';
-    if (status) url += `status=${status}&`;
-    if (mechanic) url += `mechanic=${mechanic}&`;
+    const params = new URLSearchParams();
+    if (status) params.set('status', status);
+    if (mechanic) params.set('mechanic', mechanic);
+    if (search.trim()) params.set('q', search.trim());
+    
+    // Поиск по номеру, VIN, деталям и комментариям выполняется на сервере
+    const url = (search.trim() ? `${API_URL}/search` : API_URL) + '?' + params;
     
     try {
         const response = await fetch(url);
-        const orders = await response.json();
-        
-        // Фильтрация по поиску на клиенте
-        const filtered = search 
-            ? orders.filter(o => 
-                o.vin.toLowerCase().includes(search.toLowerCase()) || 
-                o.id.toString().includes(search)
-              )
-            : orders;
+        const data = await response.json();
+        const orders = search.trim() ? data.orders : data;
         
-        renderOrders(filtered);
+        visibleOrders = orders;
+        renderOrders(orders);
         loadStats();
     } catch (error) {
         console.error('Ошибка загрузки заказов:', error);
@@ -385,6 +387,7 @@ function renderOrders(orders) {
             <td><code>${order.vin}</code></td>
             <td>
                 <button class="btn btn-sm btn-link" onclick="showOrderDetails(${order.id})">
+                    ${orderPhotoPreview(order)}
                     ${order.selected_parts.length} шт.
                 </button>
             </td>
@@ -407,6 +410,9 @@ function renderOrders(orders) {
                     <button class="btn btn-sm btn-primary" onclick="printOrder(${order.id})" title="Печать">
                         🖨️
                     </button>
+                    <a class="btn btn-sm btn-secondary" href="${API_URL}/${order.id}/receipt.pdf" target="_blank" rel="noopener" title="PDF-чек">
+                        📄
+                    </a>
                     <button class="btn btn-sm btn-danger" onclick="deleteOrder(${order.id})" title="Удалить">
                         🗑️
                     </button>
@@ -416,6 +422,14 @@ function renderOrders(orders) {
     `).join('');
 }
 
+// Миниатюра фото в списке; оригинал грузится только в карточке заказа
+function orderPhotoPreview(order) {
+    if (order.photo_thumb_url) {
+        return `<img src="${order.photo_thumb_url}" class="order-thumb" loading="lazy" alt="Фото">`;
+    }
+    return order.photo_url ? '📷' : '';
+}
+
 // Обновление статуса заказа
 async function updateStatus(orderId, newStatus) {
     try {
@@ -438,6 +452,32 @@ async function updateStatus(orderId, newStatus) {
     }
 }
 
+// Массовая выдача: все показанные заказы в статусе "готов" одним запросом
+async function issueReadyOrders() {
+    const orderIds = visibleOrders.filter(o => o.status === 'готов').map(o => o.id);
+    if (orderIds.length === 0) {
+        showNotification('Нет готовых заказов', 'info');
+        return;
+    }
+    if (!confirm(`Отметить выданными заказов: ${orderIds.length}?`)) return;
+    
+    try {
+        const response = await fetch(`${API_URL}/bulk`, {
+            method: 'PATCH',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({ order_ids: orderIds, status: 'выдан' })
+        });
+        
+        if (!response.ok) throw new Error('Ошибка обновления');
+        const result = await response.json();
+        showNotification(`Выдано заказов: ${result.updated.length}`, 'success');
+    } catch (error) {
+        console.error('Ошибка массового обновления:', error);
+        showNotification('Ошибка массового обновления', 'danger');
+    }
+    loadOrders();
+}
+
 // Показ деталей заказа
 async function showOrderDetails(orderId) {
     try {
@@ -446,7 +486,7 @@ async function showOrderDetails(orderId) {
         
         const parts = order.selected_parts.map(p => `<li>${p}</li>`).join('');
         const photo = order.photo_url 
-            ? `<img src="${order.photo_url}" class="img-fluid mt-2" alt="Фото детали">`
+            ? `<a href="${order.photo_url}" target="_blank" rel="noopener"><img src="${order.photo_url}" class="img-fluid mt-2" alt="Фото детали"></a>`
             : '<p class="text-muted">Фото не загружено</p>';
         
         const assignedMechanic = order.assigned_mechanic_id 
@@ -507,7 +547,7 @@ async function printOrder(orderId) {
     try {
         const response = await fetch(`${API_URL}/${orderId}/print`, { method: 'POST' });
         if (response.ok) {
-            showNotification(`Заказ #${orderId} отправлен на печать`, 'success');
+            showNotification(`Заказ #${orderId} поставлен в очередь печати`, 'success');
         }
     } catch (error) {
         console.error('Ошибка печати:', error);
@@ -531,6 +571,25 @@ async function deleteOrder(orderId) {
     }
 }
 
+// Лента изменений: список перезагружается только если заказы изменились
+async function pollOrderChanges() {
+    try {
+        const url = ordersVersion === null ? CHANGES_API_URL : `${CHANGES_API_URL}?since=${ordersVersion}`;
+        const response = await fetch(url);
+        if (!response.ok) return;
+        const feed = await response.json();
+        
+        const changed = ordersVersion !== null && feed.changed;
+        ordersVersion = feed.version;
+        
+        if (changed && currentSection === 'orders') {
+            loadOrders();
+        }
+    } catch (error) {
+        console.error('Ошибка проверки изменений:', error);
+    }
+}
+
 // Экспорт в Excel
 function exportOrders() {
     const days = prompt('За сколько дней экспортировать заказы?', '30');
@@ -539,6 +598,16 @@ function exportOrders() {
     }
 }
 
+// Сборочный лист за день: запчасти по категориям с учётом фильтра статуса
+function exportPickList() {
+    const date = prompt('За какой день собрать PDF? (ГГГГ-ММ-ДД)', new Date().toISOString().slice(0, 10));
+    if (!date) return;
+    const params = new URLSearchParams({ layout: 'picklist', date });
+    const status = document.getElementById('filter-status').value;
+    if (status) params.set('status', status);
+    window.location.href = `/export/pdf?${params}`;
+}
+
 // Сброс фильтров
 function resetFilters() {
     document.getElementById('filter-status').value = '';
@@ -554,14 +623,12 @@ function showNotification(message, type = 'info') {
 }
 
 // Загрузка при старте
-document.addEventListener('DOMContentLoaded', () => {
+document.addEventListener('DOMContentLoaded', async () => {
     loadMechanics();
+    // Сначала запомнить версию, чтобы не пропустить изменения во время загрузки списка
+    await pollOrderChanges();
     loadOrders();
     
-    // Автообновление каждые 30 секунд
-    setInterval(() => {
-        if (currentSection === 'orders') {
-            loadOrders();
-        }
-    }, 30000);
+    // Дешёвая проверка версии вместо полной перезагрузки списка и статистики
+    setInterval(pollOrderChanges, CHANGES_POLL_INTERVAL);
 });
@@ -49,11 +49,21 @@ const I18N = {
         'he': '❌ אפס מסננים',
         'en': '❌ Reset Filters'
     },
+    'issue_ready_orders': {
+        'ru': '📦 Выдать все готовые',
+        'he': '📦 מסור את כל המוכנות',
+        'en': '📦 Issue all ready'
+    },
     'export_excel': {
         'ru': '📤 Экспорт в Excel',
         'he': '📤 ייצוא ל-Excel',
         'en': '📤 Export to Excel'
     },
+    'export_pick_list': {
+        'ru': '🧾 Сборочный лист (PDF)',
+        'he': '🧾 רשימת ליקוט (PDF)',
+        'en': '🧾 Pick list (PDF)'
+    },
     'refresh': {
         'ru': '🔄 Обновить',
         'he': '🔄 רענן',
@@ -110,9 +120,9 @@ const I18N = {
         'en': 'Mechanic name'
     },
     'search_placeholder': {
-        'ru': 'VIN или ID',
-        'he': 'VIN או מזהה',
-        'en': 'VIN or ID'
+        'ru': 'Номер, VIN, деталь или комментарий',
+        'he': 'מספר רכב, VIN, חלק או הערה',
+        'en': 'Plate, VIN, part or comment'
     },
     'loading': {
         'ru': 'Загрузка...',
@@ -109,10 +109,18 @@ def test_status_change_to_ready_marks_printed(client):
     response = client.patch(f'/api/orders/{order_id}',
                            json={'status': 'готов'})
     assert response.status_code == 200
+    updated_order = json.loads(response.data)
+    assert updated_order['status'] == 'готов'
+    
+    # Печать идёт в фоне - обрабатываем задание синхронно
+    from services.print_queue import process_next_print_job
+    job = process_next_print_job()
+    assert job is not None
+    assert job.order_id == order_id
     
     # Проверяем, что printed установлен в True
+    response = client.get(f'/api/orders/{order_id}')
     updated_order = json.loads(response.data)
-    assert updated_order['status'] == 'готов'
     assert updated_order['printed'] == True
 
 
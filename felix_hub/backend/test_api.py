@@ -69,7 +69,7 @@ def test_api():
         
         print(f"\nTesting POST /api/orders/{order_id}/print...")
         response = client.post(f'/api/orders/{order_id}/print')
-        assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+        assert response.status_code == 202, f"Expected 202, got {response.status_code}"
         print(f"✓ Print endpoint triggered for order {order_id}")
         
         print(f"\nTesting DELETE /api/orders/{order_id}...")
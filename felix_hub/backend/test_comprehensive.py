@@ -122,7 +122,7 @@ def test_comprehensive():
         print("\n6. Testing Print Endpoint (POST /api/orders/<id>/print)")
         print("-" * 60)
         response = client.post(f'/api/orders/{order["id"]}/print')
-        assert response.status_code == 200
+        assert response.status_code == 202
         result = json.loads(response.data)
         print(f"✅ Print endpoint triggered: {result['message']}")
         
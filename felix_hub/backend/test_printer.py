@@ -12,9 +12,16 @@ from utils.printer import (
     print_order_receipt,
     print_test_receipt,
     generate_order_pdf,
-    print_order_with_fallback
+    print_order_with_fallback,
+    PrinterSession,
+    PrinterOfflineError,
+    render_order_receipt,
+    print_orders_batch,
+    reset_printer_session
 )
 
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden_receipts')
+
 
 class TestPrinterFunctions(unittest.TestCase):
     
@@ -179,5 +186,174 @@ class TestPrinterFunctions(unittest.TestCase):
         mock_pdf.assert_called_once_with(self.mock_order)
 
 
+
+class TestPrinterSession(unittest.TestCase):
+    
+    def setUp(self):
+        self.session = PrinterSession('192.168.0.50', 9100, timeout=1, probe_interval=60, idle_timeout=60)
+    
+    def tearDown(self):
+        self.session.close()
+    
+    @patch('escpos.printer.Network')
+    def test_connection_is_reused(self, mock_network):
+        """Test consecutive receipts share one warm connection"""
+        mock_printer = MagicMock()
+        mock_network.return_value = mock_printer
+        
+        with self.session.connection() as printer:
+            printer.text("1\n")
+        with self.session.connection() as printer:
+            printer.text("2\n")
+        
+        mock_network.assert_called_once_with('192.168.0.50', port=9100, timeout=1)
+        mock_printer.open.assert_called_once()
+        self.assertTrue(self.session.online)
+    
+    @patch('escpos.printer.Network')
+    def test_offline_printer_fails_fast(self, mock_network):
+        """Test no connect attempt is made while the printer is known offline"""
+        mock_network.return_value.open.side_effect = OSError("Connection refused")
+        
+        with self.assertRaises(OSError):
+            with self.session.connection():
+                pass
+        self.assertFalse(self.session.online)
+        
+        with self.assertRaises(PrinterOfflineError):
+            with self.session.connection():
+                pass
+        mock_network.assert_called_once()
+    
+    @patch('socket.create_connection')
+    @patch('escpos.printer.Network')
+    def test_probe_brings_printer_back(self, mock_network, mock_create_connection):
+        """Test a successful probe lets the next receipt connect again"""
+        mock_network.return_value.open.side_effect = [OSError("Connection refused"), None]
+        
+        with self.assertRaises(OSError):
+            with self.session.connection():
+                pass
+        
+        self.assertTrue(self.session.probe())
+        with self.session.connection():
+            pass
+        self.assertEqual(mock_network.call_count, 2)
+    
+    @patch('escpos.printer.Network')
+    def test_stale_connection_error_closes_socket(self, mock_network):
+        """Test a write error on a reused socket reconnects instead of marking offline"""
+        with self.session.connection():
+            pass
+        
+        with self.assertRaises(OSError):
+            with self.session.connection():
+                raise OSError("Broken pipe")
+        
+        mock_network.return_value.close.assert_called_once()
+        self.assertTrue(self.session.online)
+        
+        with self.session.connection():
+            pass
+        self.assertEqual(mock_network.call_count, 2)
+
+
+
+class TestReceiptRenderer(unittest.TestCase):
+    """
+    Чек сверяется с эталонными файлами в golden_receipts/.
+    После намеренного изменения макета перегенерировать:
+    UPDATE_GOLDEN_RECEIPTS=1 python -m pytest test_printer.py
+    """
+    
+    printed_at = datetime(2023, 10, 29, 15, 0, 0)
+    
+    def _make_order(self, order_id, parts, **overrides):
+        order = Mock()
+        order.id = order_id
+        order.mechanic_name = "Иван Иванов"
+        order.car_number = "AB1234CD"
+        order.vin = "WVWZZZ1KZBW123456"
+        order.preferred_car_number = "AB1234CD"
+        order.category = "Двигатель"
+        order.get_part_names = Mock(return_value=parts)
+        order.is_original = True
+        order.status = "готов"
+        order.photo_url = None
+        order.created_at = datetime(2023, 10, 29, 14, 30, 0)
+        for key, value in overrides.items():
+            setattr(order, key, value)
+        return order
+    
+    def _assert_golden(self, name, payload):
+        path = os.path.join(GOLDEN_DIR, name)
+        if os.getenv('UPDATE_GOLDEN_RECEIPTS'):
+            os.makedirs(GOLDEN_DIR, exist_ok=True)
+            with open(path, 'wb') as fh:
+                fh.write(payload)
+        with open(path, 'rb') as fh:
+            self.assertEqual(payload, fh.read(), f"Receipt differs from {name}")
+    
+    def test_render_matches_golden(self):
+        """Test the full ESC/POS stream of a typical receipt"""
+        order = self._make_order(123, ["Фильтр масляный оригинальный", "Свечи зажигания NGK"])
+        self._assert_golden('order_basic.bin', render_order_receipt(order, printed_at=self.printed_at))
+    
+    def test_render_long_parts_matches_golden(self):
+        """Test wrapping of long part names and the photo/non-original lines"""
+        order = self._make_order(
+            456,
+            ["Комплект ремня ГРМ с роликами и помпой оригинальный усиленный", "Антифриз"],
+            is_original=False,
+            photo_url="https://example.com/photo.jpg"
+        )
+        self._assert_golden('order_long_parts.bin', render_order_receipt(order, printed_at=self.printed_at))
+    
+    def test_render_is_deterministic(self):
+        """Test the same order renders to identical bytes"""
+        order = self._make_order(123, ["Антифриз"])
+        self.assertEqual(
+            render_order_receipt(order, printed_at=self.printed_at),
+            render_order_receipt(order, printed_at=self.printed_at)
+        )
+    
+    @patch('utils.printer.PRINTER_ENABLED', True)
+    @patch('escpos.printer.Network')
+    def test_batch_uses_one_connection(self, mock_network):
+        """Test batch printing sends each receipt as one write over one connection"""
+        reset_printer_session()
+        try:
+            mock_printer = MagicMock()
+            mock_network.return_value = mock_printer
+            orders = [self._make_order(i, ["Антифриз"]) for i in (1, 2, 3)]
+            
+            results = print_orders_batch(orders)
+            
+            self.assertEqual(results, {1: True, 2: True, 3: True})
+            mock_network.assert_called_once()
+            self.assertEqual(mock_printer._raw.call_count, 3)
+            for call in mock_printer._raw.call_args_list:
+                self.assertIsInstance(call.args[0], bytes)
+        finally:
+            reset_printer_session()
+    
+    @patch('utils.printer.PRINTER_ENABLED', True)
+    @patch('escpos.printer.Network')
+    def test_batch_stops_on_write_error(self, mock_network):
+        """Test receipts after a failed write are reported as not printed"""
+        reset_printer_session()
+        try:
+            mock_printer = MagicMock()
+            mock_printer._raw.side_effect = [None, OSError("Broken pipe"), None]
+            mock_network.return_value = mock_printer
+            orders = [self._make_order(i, ["Антифриз"]) for i in (1, 2, 3)]
+            
+            results = print_orders_batch(orders)
+            
+            self.assertEqual(results, {1: True, 2: False, 3: False})
+        finally:
+            reset_printer_session()
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Telegram bot worker process.
+
+With WEBHOOK_PROCESSING=queue it drains the inbound update queue filled by
+/webhook. When WEBHOOK_URL is set without the queue, the web process handles
+updates itself and this worker stays idle: polling would delete the webhook.
+Without a webhook it runs the bot in polling mode as before.
+
+Usage:
+    python update_worker.py [--parallelism 4]
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# The web process owns the webhook registration; the worker must not reset it
+os.environ['TELEGRAM_WEBHOOK_SETUP'] = 'false'
+
+import config
+from app import app, TELEGRAM_AVAILABLE
+
+
+def run_queue_consumer(parallelism=None):
+    """Process queued webhook updates until SIGTERM/SIGINT"""
+    from bot import setup_handlers, application_builder
+    from services.inbound_updates import consume_updates
+    from services.bot_persistence import create_bot_persistence
+
+    if not config.TELEGRAM_BOT_TOKEN:
+        print("❌ TELEGRAM_TOKEN is not set")
+        return False
+
+    application = application_builder(
+        config.TELEGRAM_BOT_TOKEN,
+        persistence=create_bot_persistence(app),
+        max_concurrent_updates=parallelism or config.INBOUND_UPDATE_PARALLELISM
+    ).build()
+    setup_handlers(application)
+
+    async def run():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        await consume_updates(app, application, parallelism, stop)
+
+    asyncio.run(run())
+    return True
+
+
+def wait_idle():
+    """Webhook mode without the queue: keep the process alive, receive nothing"""
+    print("ℹ️  WEBHOOK_URL is set: the web process receives updates, polling is disabled")
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    stop.wait()
+    return True
+
+
+def worker_mode():
+    """'queue', 'webhook' (idle) or 'polling': only one process may receive updates"""
+    if config.WEBHOOK_PROCESSING == 'queue':
+        return 'queue'
+    if os.environ.get('WEBHOOK_URL'):
+        return 'webhook'
+    return 'polling'
+
+
+def run_polling():
+    """Previous behaviour: the bot polls Telegram itself"""
+    from bot import main
+    main()
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Telegram bot worker')
+    parser.add_argument('--parallelism', type=int, help='Updates processed concurrently (queue mode)')
+    args = parser.parse_args()
+
+    if not TELEGRAM_AVAILABLE:
+        print("❌ python-telegram-bot is not installed")
+        sys.exit(1)
+
+    mode = worker_mode()
+    if mode == 'queue':
+        success = run_queue_consumer(args.parallelism)
+    elif mode == 'webhook':
+        success = wait_idle()
+    else:
+        success = run_polling()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,173 @@
+"""
+HTTP response compression for Felix Hub backend.
+
+Negotiates gzip/brotli with the client via Accept-Encoding and compresses
+JSON/HTML responses above a size threshold. Static admin assets are
+compressed once and served from an in-memory cache keyed on file mtime.
+"""
+import gzip
+import logging
+import os
+import sys
+from threading import Lock
+
+from flask import request
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import config
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/javascript',
+    'text/html',
+    'text/css',
+    'text/csv',
+    'text/plain',
+    'image/svg+xml',
+}
+
+# Статика админки, которую сжимаем заранее и держим в памяти
+PRECOMPRESSED_STATIC_ASSETS = ('admin.js', 'catalog.js', 'style.css', 'i18n.js')
+
+# Brotli quality: быстрый режим для динамики, максимальный для статики
+BROTLI_DYNAMIC_QUALITY = 4
+BROTLI_STATIC_QUALITY = 11
+
+_static_cache = {}
+_static_cache_lock = Lock()
+
+
+def _compress(data: bytes, encoding: str, static: bool = False) -> bytes:
+    if encoding == 'br':
+        quality = BROTLI_STATIC_QUALITY if static else BROTLI_DYNAMIC_QUALITY
+        return brotli.compress(data, quality=quality)
+    level = 9 if static else config.COMPRESSION_LEVEL
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def choose_encoding(accept_encodings) -> str | None:
+    """
+    Выбрать кодировку с наибольшим q из Accept-Encoding клиента.
+
+    При равных q предпочитается br: он сжимает лучше.
+    """
+    candidates = (['br'] if BROTLI_AVAILABLE else []) + ['gzip']
+    best = max(candidates, key=accept_encodings.quality)
+    if accept_encodings.quality(best) > 0:
+        return best
+    return None
+
+
+def get_precompressed_asset(path: str, encoding: str) -> bytes | None:
+    """Вернуть сжатую версию статического файла, пересжимая только при изменении mtime."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cache_key = (path, encoding)
+    with _static_cache_lock:
+        cached = _static_cache.get(cache_key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    with open(path, 'rb') as fh:
+        payload = _compress(fh.read(), encoding, static=True)
+    with _static_cache_lock:
+        _static_cache[cache_key] = (mtime, payload)
+    return payload
+
+
+def precompress_static_assets(static_folder: str) -> int:
+    """Прогреть кеш сжатой статики при старте приложения."""
+    encodings = ['gzip'] + (['br'] if BROTLI_AVAILABLE else [])
+    count = 0
+    for filename in PRECOMPRESSED_STATIC_ASSETS:
+        path = os.path.join(static_folder, filename)
+        for encoding in encodings:
+            if get_precompressed_asset(path, encoding) is not None:
+                count += 1
+    logger.info(f"Precompressed {count} static asset variant(s)")
+    return count
+
+
+def _compress_static_response(app, response, encoding):
+    filename = (request.view_args or {}).get('filename')
+    if filename not in PRECOMPRESSED_STATIC_ASSETS:
+        return response
+    payload = get_precompressed_asset(os.path.join(app.static_folder, filename), encoding)
+    if payload is None:
+        return response
+    response.close()
+    response.direct_passthrough = False
+    response.set_data(payload)
+    return response
+
+
+def compress_response(app, response):
+    """after_request hook: сжать ответ, если клиент это поддерживает."""
+    if not config.COMPRESSION_ENABLED:
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+    if request.method == 'HEAD':
+        return response
+    encoding = choose_encoding(request.accept_encodings)
+    if not encoding:
+        return response
+
+    if request.endpoint == 'static':
+        compressed = _compress_static_response(app, response, encoding)
+        if compressed.direct_passthrough:
+            return compressed
+    else:
+        if response.direct_passthrough or response.is_streamed:
+            return response
+        data = response.get_data()
+        if len(data) < config.COMPRESSION_MIN_SIZE:
+            return response
+        response.set_data(_compress(data, encoding))
+
+    response.headers['Content-Encoding'] = encoding
+    # Разные представления одного ресурса - ETag становится слабым (как в nginx),
+    # поэтому условные запросы сравнивают ETag через contains_weak
+    etag, _ = response.get_etag()
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """Подключить сжатие ответов к Flask-приложению."""
+    if not config.COMPRESSION_ENABLED:
+        logger.info("Response compression disabled (COMPRESSION_ENABLED=false)")
+        return
+
+    @app.after_request
+    def _compress_after_request(response):
+        try:
+            return compress_response(app, response)
+        except Exception as e:
+            logger.error(f"Response compression failed: {e}")
+            return response
+
+    try:
+        precompress_static_assets(app.static_folder)
+    except Exception as e:
+        logger.warning(f"Unable to precompress static assets: {e}")
+
+    logger.info(
+        f"Response compression enabled (min_size={config.COMPRESSION_MIN_SIZE}, "
+        f"brotli={'yes' if BROTLI_AVAILABLE else 'no'})"
+    )
@@ -23,6 +23,19 @@ BOT_TOKEN = os.getenv('BOT_TOKEN')
 TELEGRAM_API_URL = f"https://api.telegram.org/bot{BOT_TOKEN}"
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'https://felix-hub.example.com')
 
+STATUS_EMOJI = {
+    'новый': '🆕',
+    'в работе': '⏳',
+    'готов': '✅',
+    'выдан': '📦'
+}
+
+# Статусы, о которых механик-заказчик получает сообщение
+CUSTOMER_NOTIFY_STATUSES = ('готов', 'выдан')
+
+# Сколько заказов перечислять в сводном сообщении (лимит Telegram - 4096 символов)
+DIGEST_MAX_ORDERS = 30
+
 
 def _extract_vehicle_identifiers(order):
     car_number = getattr(order, 'preferred_car_number', None) or getattr(order, 'car_number', None)
@@ -123,6 +136,19 @@ def notify_order_ready(order) -> bool:
     Returns:
         bool: True если уведомление отправлено успешно
     """
+    message = _format_order_ready_message(order)
+    
+    success = send_telegram_notification(order.telegram_id, message)
+    
+    if success:
+        logger.info(f"Уведомление о готовности заказа №{order.id} отправлено")
+    else:
+        logger.warning(f"Не удалось отправить уведомление о заказе №{order.id}")
+    
+    return success
+
+
+def _format_order_ready_message(order) -> str:
     lang = getattr(order, 'language', 'ru') or 'ru'
     part_names = _get_order_part_names(order)
     parts_list = "\n".join([f"  • {part}" for part in part_names]) or "  • —"
@@ -139,14 +165,7 @@ def notify_order_ready(order) -> bool:
     if vin_value and car_number and vin_value != car_number:
         message += f"\n🚗 VIN: {vin_value}"
     
-    success = send_telegram_notification(order.telegram_id, message)
-    
-    if success:
-        logger.info(f"Уведомление о готовности заказа №{order.id} отправлено")
-    else:
-        logger.warning(f"Не удалось отправить уведомление о заказе №{order.id}")
-    
-    return success
+    return message
 
 
 def notify_order_status_changed(order, old_status: str, new_status: str) -> bool:
@@ -161,14 +180,17 @@ def notify_order_status_changed(order, old_status: str, new_status: str) -> bool
     Returns:
         bool: True если уведомление отправлено
     """
-    status_emoji = {
-        'новый': '🆕',
-        'в работе': '⏳',
-        'готов': '✅',
-        'выдан': '📦'
-    }
+    if new_status in CUSTOMER_NOTIFY_STATUSES:
+        return send_telegram_notification(
+            order.telegram_id,
+            _format_status_changed_message(order, old_status, new_status)
+        )
     
-    emoji = status_emoji.get(new_status, '❓')
+    return True
+
+
+def _format_status_changed_message(order, old_status: str, new_status: str) -> str:
+    emoji = STATUS_EMOJI.get(new_status, '❓')
     
     message = (
         f"{emoji} <b>Статус заказа №{order.id} изменён</b>\n\n"
@@ -179,10 +201,73 @@ def notify_order_status_changed(order, old_status: str, new_status: str) -> bool
     if vehicle_details:
         message += vehicle_details
     
-    if new_status in ['готов', 'выдан']:
-        return send_telegram_notification(order.telegram_id, message)
+    return message
+
+
+def _format_status_digest_message(changes) -> str:
+    lines = []
+    for order, old_status, new_status in changes[:DIGEST_MAX_ORDERS]:
+        car_number, vin_value = _extract_vehicle_identifiers(order)
+        lines.append(
+            f"{STATUS_EMOJI.get(new_status, '❓')} Заказ №{order.id} "
+            f"({car_number or vin_value or '—'}): <b>{new_status}</b>"
+        )
+    if len(changes) > DIGEST_MAX_ORDERS:
+        lines.append(f"... и ещё {len(changes) - DIGEST_MAX_ORDERS}")
+    
+    message = f"📋 <b>Изменён статус заказов: {len(changes)}</b>\n\n" + "\n".join(lines)
+    if any(new_status == 'готов' for _, _, new_status in changes):
+        message += "\n\nЗабери запчасти у кладовщика! 🔧"
+    return message
+
+
+def build_status_digests(changes) -> dict:
+    """
+    Собирает уведомления о смене статуса: одно сообщение на получателя.
+    
+    Если у получателя один заказ, сообщение такое же, как при обычном
+    PATCH; несколько заказов сворачиваются в одну сводку.
     
-    return True
+    Args:
+        changes: Список кортежей (order, old_status, new_status)
+        
+    Returns:
+        dict: {telegram_id: текст сообщения}
+    """
+    by_recipient = {}
+    for order, old_status, new_status in changes:
+        if new_status in CUSTOMER_NOTIFY_STATUSES and order.telegram_id:
+            by_recipient.setdefault(order.telegram_id, []).append((order, old_status, new_status))
+    
+    digests = {}
+    for telegram_id, recipient_changes in by_recipient.items():
+        if len(recipient_changes) == 1:
+            order, old_status, new_status = recipient_changes[0]
+            if new_status == 'готов':
+                digests[telegram_id] = _format_order_ready_message(order)
+            else:
+                digests[telegram_id] = _format_status_changed_message(order, old_status, new_status)
+        else:
+            digests[telegram_id] = _format_status_digest_message(recipient_changes)
+    return digests
+
+
+def send_status_digests(digests: dict) -> dict:
+    """
+    Отправляет подготовленные сводки (см. build_status_digests).
+    
+    Returns:
+        dict: Статистика отправки {'success': int, 'failed': int}
+    """
+    results = {'success': 0, 'failed': 0}
+    
+    for telegram_id, message in digests.items():
+        if send_telegram_notification(telegram_id, message):
+            results['success'] += 1
+        else:
+            results['failed'] += 1
+    
+    return results
 
 
 def send_order_delayed_notification(order) -> bool:
@@ -0,0 +1,431 @@
+"""
+PDF-чеки заказов для обычного принтера.
+
+Шрифт с кириллицей регистрируется один раз на процесс, PDF собирается в
+памяти (BytesIO) без временных файлов. Рендеринг может выполняться в пуле
+процессов: в пул передаётся простой словарь-снимок заказа, а не ORM-объект.
+Готовые PDF кешируются по (order.id, order.updated_at).
+
+Для пакетных документов (чеки за день, сводный список запчастей) заказы
+потребляются по одному из итератора, а страницы пишутся со сжатием. Чеки
+выгружаются документами не больше PDF_EXPORT_MAX_ORDERS заказов.
+"""
+import io
+import logging
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import Iterable, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import config
+from utils.printer import _extract_part_names
+
+logger = logging.getLogger(__name__)
+
+FONT_REGULAR = 'FelixSans'
+FONT_BOLD = 'FelixSans-Bold'
+
+# Где искать TTF с кириллицей, если PDF_FONT_PATH не задан
+FONT_CANDIDATES = (
+    (
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'fonts', 'DejaVuSans.ttf'),
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'fonts', 'DejaVuSans-Bold.ttf'),
+    ),
+    ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'),
+    ('/usr/share/fonts/dejavu/DejaVuSans.ttf', '/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf'),
+    ('/usr/share/fonts/TTF/DejaVuSans.ttf', '/usr/share/fonts/TTF/DejaVuSans-Bold.ttf'),
+)
+
+_fonts = None
+_fonts_lock = Lock()
+
+_executor = None
+_executor_pid = None
+_executor_lock = Lock()
+
+_cache = OrderedDict()
+_cache_lock = Lock()
+
+
+def _find_font_files() -> Optional[Tuple[str, str]]:
+    if config.PDF_FONT_PATH:
+        bold = config.PDF_FONT_BOLD_PATH or config.PDF_FONT_PATH
+        if os.path.exists(config.PDF_FONT_PATH):
+            return config.PDF_FONT_PATH, bold if os.path.exists(bold) else config.PDF_FONT_PATH
+        logger.warning(f"PDF_FONT_PATH не найден: {config.PDF_FONT_PATH}")
+    for regular, bold in FONT_CANDIDATES:
+        if os.path.exists(regular):
+            return regular, bold if os.path.exists(bold) else regular
+    return None
+
+
+def register_fonts() -> Tuple[str, str]:
+    """
+    Зарегистрировать TTF-шрифт один раз на процесс.
+
+    Returns:
+        tuple: Имена обычного и жирного шрифта для setFont
+    """
+    global _fonts
+    if _fonts is not None:
+        return _fonts
+    with _fonts_lock:
+        if _fonts is not None:
+            return _fonts
+
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+
+        files = _find_font_files()
+        if files:
+            try:
+                pdfmetrics.registerFont(TTFont(FONT_REGULAR, files[0]))
+                pdfmetrics.registerFont(TTFont(FONT_BOLD, files[1]))
+                _fonts = (FONT_REGULAR, FONT_BOLD)
+                logger.info(f"PDF-шрифт зарегистрирован: {files[0]}")
+                return _fonts
+            except Exception as e:
+                logger.error(f"Не удалось зарегистрировать шрифт {files[0]}: {e}")
+
+        logger.warning("TTF-шрифт с кириллицей не найден, PDF будет с Helvetica (без кириллицы)")
+        _fonts = ('Helvetica', 'Helvetica-Bold')
+        return _fonts
+
+
+def order_snapshot(order) -> dict:
+    """Снимок полей заказа для чека (можно передать в другой процесс)."""
+    car_number = (
+        getattr(order, 'preferred_car_number', None)
+        or getattr(order, 'car_number', None)
+        or getattr(order, 'vin', None)
+    )
+    vin = getattr(order, 'vin', None)
+    return {
+        'id': order.id,
+        'created_at': order.created_at.strftime('%d.%m.%Y %H:%M') if order.created_at else '',
+        'mechanic_name': order.mechanic_name,
+        'car_number': car_number,
+        'vin': vin if vin and vin != car_number else None,
+        'category': order.category,
+        'parts': _extract_part_names(order),
+        'is_original': bool(order.is_original),
+        'status': order.status or '',
+    }
+
+
+def draw_receipt(c, snapshot: dict, fonts: Tuple[str, str]):
+    """
+    Нарисовать чек заказа, начиная с текущей страницы canvas.
+
+    Длинный список запчастей продолжается на следующих страницах; последняя
+    страница чека остаётся открытой, showPage() вызывает вызывающий код.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+
+    regular, bold = fonts
+    width, height = A4
+    bottom = 25*mm
+
+    def continue_on_next_page():
+        c.showPage()
+        c.setFont(bold, 12)
+        c.drawString(50*mm, height - 30*mm, f"Заказ №{snapshot['id']} (продолжение)")
+        c.setFont(regular, 11)
+        return height - 40*mm
+
+    y = height - 50*mm
+
+    # Заголовок
+    c.setFont(bold, 20)
+    c.drawCentredString(width/2, y, "СТО Felix")
+    y -= 10*mm
+
+    c.setFont(regular, 12)
+    c.drawCentredString(width/2, y, "Автосервис премиум класса")
+    y -= 15*mm
+
+    # Информация о заказе
+    c.setFont(bold, 14)
+    c.drawString(50*mm, y, f"Заказ №{snapshot['id']}")
+    y -= 8*mm
+
+    c.setFont(regular, 11)
+    c.drawString(50*mm, y, f"Дата: {snapshot['created_at']}")
+    y -= 6*mm
+    c.drawString(50*mm, y, f"Механик: {snapshot['mechanic_name']}")
+    y -= 6*mm
+    if snapshot['car_number']:
+        c.drawString(50*mm, y, f"Номер авто: {snapshot['car_number']}")
+        y -= 6*mm
+    if snapshot['vin']:
+        c.drawString(50*mm, y, f"VIN: {snapshot['vin']}")
+        y -= 6*mm
+    c.drawString(50*mm, y, f"Категория: {snapshot['category']}")
+    y -= 10*mm
+
+    # Линия
+    c.line(50*mm, y, width-50*mm, y)
+    y -= 8*mm
+
+    # Список деталей
+    c.setFont(bold, 12)
+    c.drawString(50*mm, y, "Запчасти:")
+    y -= 8*mm
+
+    c.setFont(regular, 11)
+    for i, part in enumerate(snapshot['parts'], 1):
+        if y < bottom:
+            y = continue_on_next_page()
+        c.drawString(50*mm, y, f"{i}. {part}")
+        y -= 6*mm
+    if not snapshot['parts']:
+        c.drawString(50*mm, y, "—")
+        y -= 6*mm
+
+    # Итог и футер (около 40 мм) не разрываются
+    if y < bottom + 40*mm:
+        y = continue_on_next_page()
+
+    y -= 5*mm
+    c.line(50*mm, y, width-50*mm, y)
+    y -= 8*mm
+
+    # Дополнительная информация
+    c.drawString(50*mm, y, f"Тип: {'Оригинал' if snapshot['is_original'] else 'Не оригинал'}")
+    y -= 6*mm
+    c.drawString(50*mm, y, f"Статус: {snapshot['status'].upper()}")
+    y -= 15*mm
+
+    # Футер
+    c.setFont(regular, 10)
+    c.drawCentredString(width/2, y, "Спасибо за работу!")
+    y -= 5*mm
+    c.drawCentredString(width/2, y, "Felix Auto Service")
+
+
+def render_receipt_pdf(snapshot: dict) -> bytes:
+    """
+    Собрать PDF-чек в памяти.
+
+    Функция верхнего уровня без ORM - её можно выполнять в пуле процессов.
+    invariant=1 убирает дату создания и случайный ID из PDF, поэтому
+    одинаковый заказ даёт одинаковые байты.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+    c.setTitle(f"Заказ №{snapshot['id']}")
+    draw_receipt(c, snapshot, register_fonts())
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    """Пул процессов текущего процесса (создаётся лениво, после fork gunicorn)."""
+    global _executor, _executor_pid
+    if config.PDF_RENDER_WORKERS <= 0:
+        return None
+    pid = os.getpid()
+    with _executor_lock:
+        if _executor is None or _executor_pid != pid:
+            import multiprocessing
+            # spawn: дочерний процесс не наследует потоки и соединения gunicorn-воркера
+            _executor = ProcessPoolExecutor(
+                max_workers=config.PDF_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            _executor_pid = pid
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def render_snapshot(snapshot: dict) -> bytes:
+    """Отрендерить снимок в пуле процессов, при сбое пула - в текущем процессе."""
+    executor = _get_executor()
+    if executor is None:
+        return render_receipt_pdf(snapshot)
+    try:
+        return executor.submit(render_receipt_pdf, snapshot).result(timeout=config.PDF_RENDER_TIMEOUT)
+    except BrokenProcessPool as e:
+        logger.error(f"Пул рендеринга PDF сломан, пересоздаю: {e}")
+        _reset_executor()
+        return render_receipt_pdf(snapshot)
+
+
+def receipt_etag(order) -> str:
+    """ETag PDF-чека: меняется вместе с updated_at заказа."""
+    version = order.updated_at.strftime('%Y%m%d%H%M%S%f') if order.updated_at else '0'
+    return f"order-{order.id}-{version}"
+
+
+def get_order_pdf(order) -> bytes:
+    """
+    PDF-чек заказа из кеша или свежий рендер.
+
+    Args:
+        order: Объект Order
+
+    Returns:
+        bytes: Содержимое PDF
+    """
+    key = receipt_etag(order)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+
+    pdf = render_snapshot(order_snapshot(order))
+
+    with _cache_lock:
+        _cache[key] = pdf
+        _cache.move_to_end(key)
+        while len(_cache) > config.PDF_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return pdf
+
+
+def write_receipts_pdf(snapshots: Iterable[dict], output, title: str = "Чеки заказов") -> int:
+    """
+    Записать многостраничный PDF: каждый чек с новой страницы.
+
+    reportlab держит страницы в памяти до save(), поэтому вызывающий код
+    ограничивает число чеков в документе (PDF_EXPORT_MAX_ORDERS).
+
+    Args:
+        snapshots: Итератор снимков заказов (order_snapshot), читается по одному
+        output: Файлоподобный объект для записи
+        title: Заголовок документа
+
+    Returns:
+        int: Количество чеков
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    fonts = register_fonts()
+    c = canvas.Canvas(output, pagesize=A4, invariant=1, pageCompression=1)
+    c.setTitle(title)
+
+    count = 0
+    for snapshot in snapshots:
+        draw_receipt(c, snapshot, fonts)
+        c.showPage()
+        count += 1
+
+    if count == 0:
+        _draw_empty_page(c, fonts, title)
+        c.showPage()
+    c.save()
+    return count
+
+
+def collect_pick_list(orders: Iterable) -> dict:
+    """
+    Свести запчасти заказов по категориям.
+
+    Returns:
+        dict: {категория: {запчасть: {'quantity': n, 'orders': [id, ...]}}}
+    """
+    pick_list = {}
+    for order in orders:
+        category = pick_list.setdefault(order.category or '—', {})
+        for item in order._normalized_selected_parts():
+            name = item.get('name') or '—'
+            entry = category.setdefault(name, {'quantity': 0, 'orders': []})
+            entry['quantity'] += item.get('quantity') or 1
+            if order.id not in entry['orders']:
+                entry['orders'].append(order.id)
+    return pick_list
+
+
+def write_pick_list_pdf(pick_list: dict, output, title: str = "Сводный список запчастей") -> int:
+    """
+    Записать сводный список запчастей, сгруппированный по категориям.
+
+    Returns:
+        int: Количество позиций
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.pdfgen import canvas
+
+    regular, bold = register_fonts()
+    width, height = A4
+    left, right, bottom = 20*mm, width - 20*mm, 20*mm
+
+    c = canvas.Canvas(output, pagesize=A4, invariant=1, pageCompression=1)
+    c.setTitle(title)
+
+    def start_page():
+        c.setFont(bold, 16)
+        c.drawString(left, height - 20*mm, title)
+        return height - 32*mm
+
+    y = start_page()
+    count = 0
+    for category in sorted(pick_list):
+        parts = pick_list[category]
+        if y < bottom + 20*mm:
+            c.showPage()
+            y = start_page()
+        c.setFont(bold, 13)
+        c.drawString(left, y, category)
+        y -= 7*mm
+
+        for name in sorted(parts):
+            entry = parts[name]
+            if y < bottom:
+                c.showPage()
+                y = start_page()
+            order_ids = entry['orders']
+            refs = ', '.join(f"#{order_id}" for order_id in order_ids[:8])
+            if len(order_ids) > 8:
+                refs += f" +{len(order_ids) - 8}"
+            c.setFont(regular, 11)
+            c.drawString(left + 5*mm, y, name[:60])
+            c.drawRightString(right, y, f"× {entry['quantity']}")
+            y -= 5*mm
+            c.setFont(regular, 8)
+            c.drawString(left + 5*mm, y, f"Заказы: {refs}")
+            y -= 6*mm
+            count += 1
+        y -= 3*mm
+
+    if count == 0:
+        c.setFont(regular, 12)
+        c.drawString(left, y, "Нет заказов")
+    c.showPage()
+    c.save()
+    return count
+
+
+def _draw_empty_page(c, fonts, title):
+    from reportlab.lib.pagesizes import A4
+
+    width, height = A4
+    c.setFont(fonts[1], 16)
+    c.drawCentredString(width/2, height/2 + 20, title)
+    c.setFont(fonts[0], 12)
+    c.drawCentredString(width/2, height/2, "Нет заказов")
+
+
+def clear_pdf_cache():
+    """Очистить кеш PDF-чеков."""
+    with _cache_lock:
+        _cache.clear()
@@ -1,7 +1,12 @@
 import os
+import socket
 import logging
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -10,6 +15,189 @@ PRINTER_IP = os.getenv('PRINTER_IP', '192.168.0.50')
 PRINTER_PORT = int(os.getenv('PRINTER_PORT', 9100))
 PRINTER_ENABLED = os.getenv('PRINTER_ENABLED', 'false').lower() == 'true'
 RECEIPT_WIDTH = int(os.getenv('RECEIPT_WIDTH', 32))  # 32 символа для 58мм, 48 для 80мм
+PRINTER_TIMEOUT = float(os.getenv('PRINTER_TIMEOUT', 5))  # таймаут подключения и записи, сек
+PRINTER_PROBE_INTERVAL = float(os.getenv('PRINTER_PROBE_INTERVAL', 15))  # период фоновой проверки, сек
+PRINTER_IDLE_TIMEOUT = float(os.getenv('PRINTER_IDLE_TIMEOUT', 60))  # закрыть простаивающее соединение, сек
+
+
+class PrinterOfflineError(Exception):
+    """Принтер заведомо недоступен - подключение не выполнялось."""
+
+
+class PrinterSession:
+    """
+    Тёплое соединение с ESC/POS-принтером и фоновая проверка его доступности.
+    
+    Сокет остаётся открытым между чеками и закрывается после PRINTER_IDLE_TIMEOUT
+    простоя, чтобы не держать принтер занятым. Пока принтер считается недоступным,
+    connection() сразу бросает PrinterOfflineError без попытки подключения;
+    фоновый поток раз в probe_interval проверяет TCP-порт и возвращает принтер
+    в строй, как только он ответит.
+    """
+    
+    def __init__(self, host: str, port: int, timeout: float = PRINTER_TIMEOUT,
+                 probe_interval: float = PRINTER_PROBE_INTERVAL,
+                 idle_timeout: float = PRINTER_IDLE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.probe_interval = probe_interval
+        self.idle_timeout = idle_timeout
+        
+        self._lock = threading.RLock()
+        self._printer = None
+        self._last_used = 0.0
+        self._online = None  # None - состояние ещё неизвестно
+        self._checked_at = 0.0
+        self._last_error = None
+        self._probe_thread = None
+        self._probe_pid = None
+        self._stop_event = threading.Event()
+    
+    @property
+    def online(self) -> Optional[bool]:
+        return self._online
+    
+    def status(self) -> dict:
+        """Состояние принтера для API."""
+        return {
+            'host': self.host,
+            'port': self.port,
+            'online': self._online,
+            'connected': self._printer is not None,
+            'last_error': self._last_error,
+            'checked_seconds_ago': round(time.monotonic() - self._checked_at, 1) if self._checked_at else None
+        }
+    
+    def _set_state(self, online: bool, error: Optional[str] = None):
+        if online and self._online is False:
+            logger.info(f"Принтер {self.host}:{self.port} снова доступен")
+        elif not online and self._online is not False:
+            logger.warning(f"Принтер {self.host}:{self.port} недоступен: {error}")
+        self._online = online
+        self._checked_at = time.monotonic()
+        self._last_error = error
+    
+    def _known_offline(self) -> bool:
+        # После probe_interval разрешаем попытку, даже если фоновая проверка не успела
+        return self._online is False and time.monotonic() - self._checked_at < self.probe_interval
+    
+    def probe(self) -> bool:
+        """Проверить доступность TCP-порта принтера коротким подключением."""
+        try:
+            with socket.create_connection((self.host, self.port), timeout=self.timeout):
+                pass
+        except OSError as e:
+            self._set_state(False, str(e))
+            return False
+        self._set_state(True)
+        return True
+    
+    def _open(self):
+        from escpos.printer import Network
+        
+        printer = Network(self.host, port=self.port, timeout=self.timeout)
+        printer.open()
+        logger.info(f"Подключение к принтеру {self.host}:{self.port}")
+        return printer
+    
+    def _close_locked(self):
+        if self._printer is None:
+            return
+        try:
+            self._printer.close()
+        except Exception as e:
+            logger.debug(f"Ошибка закрытия соединения с принтером: {e}")
+        self._printer = None
+    
+    def close(self):
+        """Закрыть соединение и остановить фоновую проверку."""
+        self._stop_event.set()
+        with self._lock:
+            self._close_locked()
+    
+    @contextmanager
+    def connection(self):
+        """
+        Выдать подключённый принтер под блокировкой сессии.
+        
+        Raises:
+            PrinterOfflineError: принтер заведомо недоступен
+        """
+        self._ensure_probe_thread()
+        with self._lock:
+            if self._known_offline():
+                raise PrinterOfflineError(f"Принтер {self.host}:{self.port} недоступен: {self._last_error}")
+            
+            reused = self._printer is not None
+            if not reused:
+                try:
+                    self._printer = self._open()
+                except Exception as e:
+                    self._set_state(False, str(e))
+                    raise
+            
+            try:
+                yield self._printer
+            except Exception as e:
+                self._close_locked()
+                # Ошибка на старом сокете не означает, что принтер выключен - решит проверка
+                if not reused:
+                    self._set_state(False, str(e))
+                raise
+            
+            self._last_used = time.monotonic()
+            self._set_state(True)
+    
+    def _ensure_probe_thread(self):
+        pid = os.getpid()
+        if self._probe_pid == pid and self._probe_thread is not None and self._probe_thread.is_alive():
+            return
+        self._probe_thread = threading.Thread(
+            target=self._probe_loop,
+            name='printer-probe',
+            daemon=True
+        )
+        self._probe_pid = pid
+        self._probe_thread.start()
+    
+    def _probe_loop(self):
+        while not self._stop_event.wait(self.probe_interval):
+            # Идёт печать - соединение живо, проверка не нужна
+            if not self._lock.acquire(blocking=False):
+                continue
+            try:
+                connected = self._printer is not None
+                if connected and time.monotonic() - self._last_used >= self.idle_timeout:
+                    self._close_locked()
+            finally:
+                self._lock.release()
+            if not connected:
+                self.probe()
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_printer_session() -> PrinterSession:
+    """Сессия принтера текущего процесса (пересоздаётся при смене адреса)."""
+    global _session
+    with _session_lock:
+        if _session is None or (_session.host, _session.port) != (PRINTER_IP, PRINTER_PORT):
+            if _session is not None:
+                _session.close()
+            _session = PrinterSession(PRINTER_IP, PRINTER_PORT)
+        return _session
+
+
+def reset_printer_session():
+    """Закрыть и забыть сессию принтера."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
 
 
 def _extract_part_names(order):
@@ -52,82 +240,17 @@ def print_order_receipt(order) -> bool:
         return False
     
     try:
-        from escpos.printer import Network
-        
-        # Подключение к принтеру
-        printer = Network(PRINTER_IP, port=PRINTER_PORT)
-        logger.info(f"Подключение к принтеру {PRINTER_IP}:{PRINTER_PORT}")
-        
-        # --- ЗАГОЛОВОК ---
-        printer.set(align='center', bold=True, double_height=True, double_width=True)
-        printer.text("СТО Felix\n")
-        
-        printer.set(align='center', bold=False, double_height=False, double_width=False)
-        printer.text("Автосервис премиум класса\n")
-        printer.text("=" * RECEIPT_WIDTH + "\n")
-        
-        # --- ИНФОРМАЦИЯ О ЗАКАЗЕ ---
-        printer.set(align='left', bold=True)
-        printer.text(f"Заказ №{order.id}\n")
-        
-        printer.set(bold=False)
-        printer.text(f"Дата: {order.created_at.strftime('%d.%m.%Y %H:%M')}\n")
-        printer.text(f"Механик: {order.mechanic_name}\n")
-        car_number_value = getattr(order, 'preferred_car_number', None) or getattr(order, 'car_number', None) or getattr(order, 'vin', None)
-        if car_number_value:
-            printer.text(f"Номер авто: {car_number_value}\n")
-        if getattr(order, 'vin', None) and order.vin != car_number_value:
-            printer.text(f"VIN: {order.vin}\n")
-        printer.text(f"Категория: {order.category}\n")
-        printer.text("=" * RECEIPT_WIDTH + "\n")
-        
-        # --- СПИСОК ДЕТАЛЕЙ ---
-        printer.set(bold=True)
-        printer.text("Запчасти:\n")
-        printer.set(bold=False)
-        
-        part_names = _extract_part_names(order)
-        for i, part in enumerate(part_names, 1):
-            # Перенос длинных названий
-            lines = wrap_text(part, RECEIPT_WIDTH - 4)
-            for j, line in enumerate(lines):
-                if j == 0:
-                    printer.text(f"{i}. {line}\n")
-                else:
-                    printer.text(f"   {line}\n")
-        if not part_names:
-            printer.text("—\n")
-        
-        printer.text("=" * RECEIPT_WIDTH + "\n")
-        
-        # --- ДОПОЛНИТЕЛЬНАЯ ИНФОРМАЦИЯ ---
-        printer.text(f"Тип: {'✨ Оригинал' if order.is_original else '🔧 Не оригинал'}\n")
-        printer.text(f"Статус: {order.status.upper()}\n")
-        
-        if order.photo_url:
-            printer.text("📸 Фото прикреплено\n")
-        
-        printer.text("=" * RECEIPT_WIDTH + "\n")
-        
-        # --- ФУТЕР ---
-        printer.set(align='center')
-        printer.text("\nСпасибо за работу!\n")
-        printer.text("Felix Auto Service\n")
-        printer.text(f"Напечатано: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n")
-        printer.text("\n")
-        
-        # --- QR-код с ID заказа (опционально) ---
-        try:
-            printer.qr(f"FELIX-ORDER-{order.id}", size=6)
-        except Exception as e:
-            logger.warning(f"Не удалось напечатать QR-код: {e}")
-        
-        # Отрезать чек
-        printer.cut()
+        payload = render_order_receipt(order)
+        with get_printer_session().connection() as printer:
+            # Весь чек одной записью в сокет
+            printer._raw(payload)
         
         logger.info(f"Чек заказа №{order.id} успешно напечатан")
         return True
         
+    except PrinterOfflineError as e:
+        logger.warning(f"Чек заказа №{order.id} не напечатан: {e}")
+        return False
     except ImportError:
         logger.error("python-escpos не установлен. Установите: pip install python-escpos")
         return False
@@ -136,6 +259,135 @@ def print_order_receipt(order) -> bool:
         return False
 
 
+def render_order_receipt(order, printed_at: Optional[datetime] = None) -> bytes:
+    """
+    Собирает полный поток команд ESC/POS чека в один буфер без принтера.
+    
+    Args:
+        order: Объект Order
+        printed_at: Время печати для футера (по умолчанию текущее)
+        
+    Returns:
+        bytes: Команды ESC/POS, готовые к отправке одной записью
+    """
+    from escpos.printer import Dummy
+    
+    buffer = Dummy()
+    _write_order_receipt(buffer, order, printed_at or datetime.now())
+    return buffer.output
+
+
+def print_orders_batch(orders: Iterable) -> Dict[int, bool]:
+    """
+    Печатает несколько чеков через одно подключение к принтеру.
+    
+    Args:
+        orders: Объекты Order
+        
+    Returns:
+        dict: order.id -> True если чек отправлен на принтер
+    """
+    orders = list(orders)
+    results = {order.id: False for order in orders}
+    if not PRINTER_ENABLED:
+        logger.info("Печать отключена (PRINTER_ENABLED=false)")
+        return results
+    
+    payloads = []
+    for order in orders:
+        try:
+            payloads.append((order.id, render_order_receipt(order)))
+        except Exception as e:
+            logger.error(f"Ошибка подготовки чека заказа №{order.id}: {e}")
+    
+    if not payloads:
+        return results
+    
+    try:
+        with get_printer_session().connection() as printer:
+            for order_id, payload in payloads:
+                printer._raw(payload)
+                results[order_id] = True
+    except PrinterOfflineError as e:
+        logger.warning(f"Пакетная печать не выполнена: {e}")
+    except Exception as e:
+        logger.error(f"Ошибка пакетной печати: {e}")
+    
+    printed = sum(results.values())
+    logger.info(f"Пакетная печать: {printed} из {len(orders)} чеков отправлено")
+    return results
+
+
+def _write_order_receipt(printer, order, printed_at: datetime):
+    """Записать команды чека заказа в принтер (или в буфер Dummy)."""
+    # --- ЗАГОЛОВОК ---
+    printer.set(align='center', bold=True, double_height=True, double_width=True)
+    printer.text("СТО Felix\n")
+    
+    printer.set(align='center', bold=False, double_height=False, double_width=False)
+    printer.text("Автосервис премиум класса\n")
+    printer.text("=" * RECEIPT_WIDTH + "\n")
+    
+    # --- ИНФОРМАЦИЯ О ЗАКАЗЕ ---
+    printer.set(align='left', bold=True)
+    printer.text(f"Заказ №{order.id}\n")
+    
+    printer.set(bold=False)
+    printer.text(f"Дата: {order.created_at.strftime('%d.%m.%Y %H:%M')}\n")
+    printer.text(f"Механик: {order.mechanic_name}\n")
+    car_number_value = getattr(order, 'preferred_car_number', None) or getattr(order, 'car_number', None) or getattr(order, 'vin', None)
+    if car_number_value:
+        printer.text(f"Номер авто: {car_number_value}\n")
+    if getattr(order, 'vin', None) and order.vin != car_number_value:
+        printer.text(f"VIN: {order.vin}\n")
+    printer.text(f"Категория: {order.category}\n")
+    printer.text("=" * RECEIPT_WIDTH + "\n")
+    
+    # --- СПИСОК ДЕТАЛЕЙ ---
+    printer.set(bold=True)
+    printer.text("Запчасти:\n")
+    printer.set(bold=False)
+    
+    part_names = _extract_part_names(order)
+    for i, part in enumerate(part_names, 1):
+        # Перенос длинных названий
+        lines = wrap_text(part, RECEIPT_WIDTH - 4)
+        for j, line in enumerate(lines):
+            if j == 0:
+                printer.text(f"{i}. {line}\n")
+            else:
+                printer.text(f"   {line}\n")
+    if not part_names:
+        printer.text("—\n")
+    
+    printer.text("=" * RECEIPT_WIDTH + "\n")
+    
+    # --- ДОПОЛНИТЕЛЬНАЯ ИНФОРМАЦИЯ ---
+    printer.text(f"Тип: {'✨ Оригинал' if order.is_original else '🔧 Не оригинал'}\n")
+    printer.text(f"Статус: {order.status.upper()}\n")
+    
+    if order.photo_url:
+        printer.text("📸 Фото прикреплено\n")
+    
+    printer.text("=" * RECEIPT_WIDTH + "\n")
+    
+    # --- ФУТЕР ---
+    printer.set(align='center')
+    printer.text("\nСпасибо за работу!\n")
+    printer.text("Felix Auto Service\n")
+    printer.text(f"Напечатано: {printed_at.strftime('%d.%m.%Y %H:%M')}\n")
+    printer.text("\n")
+    
+    # --- QR-код с ID заказа (опционально) ---
+    try:
+        printer.qr(f"FELIX-ORDER-{order.id}", size=6)
+    except Exception as e:
+        logger.warning(f"Не удалось напечатать QR-код: {e}")
+    
+    # Отрезать чек
+    printer.cut()
+
+
 def wrap_text(text: str, width: int) -> list:
     """
     Переносит длинный текст на несколько строк.
@@ -147,6 +399,11 @@ def wrap_text(text: str, width: int) -> list:
     Returns:
         list: Список строк
     """
+    return list(_wrap_text_cached(text, width))
+
+
+@lru_cache(maxsize=1024)
+def _wrap_text_cached(text: str, width: int) -> tuple:
     words = text.split()
     lines = []
     current_line = ""
@@ -161,7 +418,7 @@ def wrap_text(text: str, width: int) -> list:
     if current_line:
         lines.append(current_line.strip())
     
-    return lines if lines else [text[:width]]
+    return tuple(lines) if lines else (text[:width],)
 
 
 def print_test_receipt() -> bool:
@@ -176,21 +433,18 @@ def print_test_receipt() -> bool:
         return False
     
     try:
-        from escpos.printer import Network
-        
-        printer = Network(PRINTER_IP, port=PRINTER_PORT)
-        
-        printer.set(align='center', bold=True, double_height=True)
-        printer.text("ТЕСТОВАЯ ПЕЧАТЬ\n")
-        
-        printer.set(align='center', bold=False, double_height=False)
-        printer.text("=" * RECEIPT_WIDTH + "\n")
-        printer.text("Принтер работает корректно\n")
-        printer.text(f"IP: {PRINTER_IP}:{PRINTER_PORT}\n")
-        printer.text(f"Дата: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n")
-        printer.text("=" * RECEIPT_WIDTH + "\n\n")
-        
-        printer.cut()
+        with get_printer_session().connection() as printer:
+            printer.set(align='center', bold=True, double_height=True)
+            printer.text("ТЕСТОВАЯ ПЕЧАТЬ\n")
+            
+            printer.set(align='center', bold=False, double_height=False)
+            printer.text("=" * RECEIPT_WIDTH + "\n")
+            printer.text("Принтер работает корректно\n")
+            printer.text(f"IP: {PRINTER_IP}:{PRINTER_PORT}\n")
+            printer.text(f"Дата: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n")
+            printer.text("=" * RECEIPT_WIDTH + "\n\n")
+            
+            printer.cut()
         
         logger.info("Тестовый чек напечатан")
         return True
@@ -206,6 +460,9 @@ def generate_order_pdf(order, output_path: Optional[str] = None) -> Optional[str
     """
     Генерирует PDF-чек для печати на обычном принтере.
     
+    Для отдачи по HTTP используйте utils.pdf_renderer.get_order_pdf -
+    он собирает PDF в памяти и кеширует результат.
+    
     Args:
         order: Объект Order
         output_path: Путь для сохранения PDF
@@ -215,82 +472,14 @@ def generate_order_pdf(order, output_path: Optional[str] = None) -> Optional[str
     """
     try:
         from reportlab.lib.pagesizes import A4
-        from reportlab.lib.units import mm
         from reportlab.pdfgen import canvas
-        from reportlab.lib.styles import getSampleStyleSheet
-        from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+        from utils.pdf_renderer import draw_receipt, order_snapshot, register_fonts
         
         if not output_path:
             output_path = f"/tmp/felix_order_{order.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
         
         c = canvas.Canvas(output_path, pagesize=A4)
-        width, height = A4
-        
-        y = height - 50*mm
-        
-        # Заголовок
-        c.setFont("Helvetica-Bold", 20)
-        c.drawCentredString(width/2, y, "СТО Felix")
-        y -= 10*mm
-        
-        c.setFont("Helvetica", 12)
-        c.drawCentredString(width/2, y, "Автосервис премиум класса")
-        y -= 15*mm
-        
-        # Информация о заказе
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(50*mm, y, f"Заказ №{order.id}")
-        y -= 8*mm
-        
-        c.setFont("Helvetica", 11)
-        c.drawString(50*mm, y, f"Дата: {order.created_at.strftime('%d.%m.%Y %H:%M')}")
-        y -= 6*mm
-        c.drawString(50*mm, y, f"Механик: {order.mechanic_name}")
-        y -= 6*mm
-        car_number_value = getattr(order, 'preferred_car_number', None) or getattr(order, 'car_number', None) or getattr(order, 'vin', None)
-        if car_number_value:
-            c.drawString(50*mm, y, f"Номер авто: {car_number_value}")
-            y -= 6*mm
-        if getattr(order, 'vin', None) and order.vin != car_number_value:
-            c.drawString(50*mm, y, f"VIN: {order.vin}")
-            y -= 6*mm
-        c.drawString(50*mm, y, f"Категория: {order.category}")
-        y -= 10*mm
-        
-        # Линия
-        c.line(50*mm, y, width-50*mm, y)
-        y -= 8*mm
-        
-        # Список деталей
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(50*mm, y, "Запчасти:")
-        y -= 8*mm
-        
-        c.setFont("Helvetica", 11)
-        part_names = _extract_part_names(order)
-        for i, part in enumerate(part_names, 1):
-            c.drawString(50*mm, y, f"{i}. {part}")
-            y -= 6*mm
-        if not part_names:
-            c.drawString(50*mm, y, "—")
-            y -= 6*mm
-        
-        y -= 5*mm
-        c.line(50*mm, y, width-50*mm, y)
-        y -= 8*mm
-        
-        # Дополнительная информация
-        c.drawString(50*mm, y, f"Тип: {'Оригинал' if order.is_original else 'Не оригинал'}")
-        y -= 6*mm
-        c.drawString(50*mm, y, f"Статус: {order.status.upper()}")
-        y -= 15*mm
-        
-        # Футер
-        c.setFont("Helvetica", 10)
-        c.drawCentredString(width/2, y, "Спасибо за работу!")
-        y -= 5*mm
-        c.drawCentredString(width/2, y, "Felix Auto Service")
-        
+        draw_receipt(c, order_snapshot(order), register_fonts())
         c.save()
         
         logger.info(f"PDF-чек для заказа №{order.id} создан: {output_path}")
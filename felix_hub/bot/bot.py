@@ -1,15 +1,25 @@
 import os
 import sys
+import time
+import json
+import asyncio
+import heapq
+import hashlib
 import logging
+import itertools
+from functools import lru_cache
+from collections import OrderedDict
 import requests
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application,
+    BaseUpdateProcessor,
     CommandHandler,
     CallbackQueryHandler,
     MessageHandler,
     ConversationHandler,
     ContextTypes,
+    TypeHandler,
     filters
 )
 
@@ -19,6 +29,12 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from config import (
     BOT_TOKEN,
     BACKEND_URL,
+    CONCURRENT_UPDATES,
+    CATALOG_SNAPSHOT_TTL,
+    PARTS_PAGE_SIZE,
+    SESSION_IDLE_SECONDS,
+    SESSION_MAX_USERS,
+    SESSION_SWEEP_INTERVAL,
     CATEGORIES,
     CATEGORY,
     PARTS_SELECTION,
@@ -81,6 +97,34 @@ def load_parts_from_api(category_id, lang='ru'):
         return None
 
 
+# Последний полученный документ каталога по языку: (ETag, документ)
+_catalog_documents = {}
+
+
+def load_catalog_document(lang='ru'):
+    """Весь каталог на языке lang одним запросом с проверкой ETag; None — API недоступен"""
+    cached = _catalog_documents.get(lang)
+    headers = {'If-None-Match': cached[0]} if cached and cached[0] else {}
+    try:
+        response = requests.get(
+            f"{BACKEND_URL}/api/catalog/snapshot",
+            params={'lang': lang},
+            headers=headers,
+            timeout=5
+        )
+        if response.status_code == 304 and cached:
+            return cached[1]
+        if response.ok:
+            document = response.json()
+            _catalog_documents[lang] = (response.headers.get('ETag'), document)
+            logger.info(f"Loaded catalog snapshot '{lang}' from API: {len(document['categories'])} categories")
+            return document
+        logger.warning("Failed to load catalog snapshot from API, using fallback")
+    except Exception as e:
+        logger.warning(f"Error loading catalog snapshot from API: {e}, using fallback")
+    return cached[1] if cached else None
+
+
 def get_categories_dict():
     """Get categories dictionary with API first, fallback to config"""
     api_categories = load_categories_from_api()
@@ -105,6 +149,133 @@ def get_parts_list(category_key, category_data, lang='ru'):
     return CATEGORIES.get(category_key, [])
 
 
+class CatalogSnapshot:
+    """
+    Снимок каталога, общий для всех механиков.
+
+    В user_data хранится только версия снимка и ключ категории, а не копия
+    каталога. user_data общие для воркеров, поэтому версия — это версия
+    каталога на backend (или хеш содержимого), одинаковая во всех
+    процессах. Запчасти категорий и готовые страницы их клавиатуры
+    кешируются в снимке по языку.
+    """
+
+    def __init__(self, version, categories, documents=None):
+        self.version = version
+        self.categories = categories
+        self.keys = list(categories)
+        self.loaded_at = time.monotonic()
+        # Документы /api/catalog/snapshot по языку (None — API был недоступен)
+        self._documents = dict(documents or {})
+        self._parts = {}
+        self._pages = {}
+
+    def category_key(self, index):
+        return self.keys[index] if 0 <= index < len(self.keys) else None
+
+    def parts(self, category_key, lang='ru'):
+        cache_key = (category_key, lang)
+        if cache_key not in self._parts:
+            category_data = self.categories.get(category_key, {})
+            parts = self._document_parts(category_data, lang)
+            if parts is None:
+                parts = get_parts_list(category_key, category_data, lang)
+            self._parts[cache_key] = parts
+        return self._parts[cache_key]
+
+    def _document_parts(self, category_data, lang):
+        if not isinstance(category_data, dict) or 'id' not in category_data:
+            return None
+        if lang not in self._documents:
+            self._documents[lang] = load_catalog_document(lang)
+        document = self._documents[lang]
+        if document:
+            for category in document['categories']:
+                if category['id'] == category_data['id']:
+                    return [part['name'] for part in category['parts']]
+        return None
+
+    def parts_pages(self, category_key, lang='ru'):
+        """Страницы клавиатуры запчастей без отметок: списки (запчасть, строка кнопок)"""
+        cache_key = (category_key, lang)
+        if cache_key not in self._pages:
+            rows = [
+                (part, (InlineKeyboardButton(part, callback_data=f'part_{index}'),))
+                for index, part in enumerate(self.parts(category_key, lang))
+            ]
+            self._pages[cache_key] = [
+                rows[start:start + PARTS_PAGE_SIZE] for start in range(0, len(rows), PARTS_PAGE_SIZE)
+            ] or [[]]
+        return self._pages[cache_key]
+
+
+# Несколько последних версий: кнопки уже отправленных сообщений ссылаются на номер категории
+CATALOG_SNAPSHOTS_KEPT = 3
+_catalog_snapshots = OrderedDict()
+
+
+def catalog_content_version(prefix, data):
+    """Версия по содержимому, если backend её не сообщил: одинакова во всех процессах"""
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return f"{prefix}-{hashlib.sha1(payload).hexdigest()[:16]}"
+
+
+def get_catalog_snapshot(version=None):
+    """
+    Снимок версии version, если он есть в этом процессе, иначе актуальный.
+
+    Актуальный снимок обновляется по TTL. Неизвестная версия могла прийти
+    из user_data, записанных другим воркером, поэтому каталог перечитывается
+    сразу; если версия уже сменилась, вернётся снимок с другой версией, и
+    вызывающий код должен это проверить.
+    """
+    if version is not None and version in _catalog_snapshots:
+        return _catalog_snapshots[version]
+    
+    current = next(reversed(_catalog_snapshots.values()), None)
+    if current is not None and version is None and time.monotonic() - current.loaded_at < CATALOG_SNAPSHOT_TTL:
+        return current
+    
+    document = load_catalog_document('ru')
+    if document:
+        categories = {
+            f"{category['icon']} {category['name_ru']}": {
+                'id': category['id'], 'name_ru': category['name_ru'], 'icon': category['icon']
+            }
+            for category in document['categories']
+        }
+        version = document.get('version') or catalog_content_version('content', document['categories'])
+        documents = {'ru': document}
+    else:
+        categories = get_categories_dict()
+        version = catalog_content_version('local', categories)
+        documents = None
+    
+    # Каталог не менялся: тот же снимок с уже построенными страницами запчастей
+    snapshot = _catalog_snapshots.get(version)
+    if snapshot is None:
+        snapshot = _catalog_snapshots[version] = CatalogSnapshot(version, categories, documents=documents)
+    else:
+        snapshot.loaded_at = time.monotonic()
+        _catalog_snapshots.move_to_end(version)
+    while len(_catalog_snapshots) > CATALOG_SNAPSHOTS_KEPT:
+        _catalog_snapshots.popitem(last=False)
+    return snapshot
+
+
+def categories_keyboard(context, lang):
+    """Клавиатура категорий актуального снимка; в user_data запоминается его версия"""
+    snapshot = get_catalog_snapshot()
+    context.user_data['catalog_version'] = snapshot.version
+    
+    keyboard = [
+        [InlineKeyboardButton(cat, callback_data=f'cat_{i}')] 
+        for i, cat in enumerate(snapshot.keys)
+    ]
+    keyboard.append([InlineKeyboardButton(get_text('cancel', lang), callback_data='cancel')])
+    return InlineKeyboardMarkup(keyboard)
+
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     context.user_data['mechanic_name'] = user.first_name
@@ -176,19 +347,9 @@ async def select_category(update: Update, context: ContextTypes.DEFAULT_TYPE):
     lang = context.user_data.get('language', 'ru')
     context.user_data['selected_parts'] = []
     
-    # Load categories from API or fallback to config
-    categories = get_categories_dict()
-    context.user_data['categories_cache'] = categories
-    
-    keyboard = [
-        [InlineKeyboardButton(cat, callback_data=f'cat_{i}')] 
-        for i, cat in enumerate(categories.keys())
-    ]
-    keyboard.append([InlineKeyboardButton(get_text('cancel', lang), callback_data='cancel')])
-    
     await query.message.reply_text(
         get_text('select_category', lang),
-        reply_markup=InlineKeyboardMarkup(keyboard)
+        reply_markup=categories_keyboard(context, lang)
     )
     return CATEGORY
 
@@ -198,44 +359,83 @@ async def select_parts(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
     
     cat_index = int(query.data.split('_')[1])
-    categories = context.user_data.get('categories_cache', get_categories_dict())
-    category_key = list(categories.keys())[cat_index]
-    category_data = categories[category_key]
+    version = context.user_data.get('catalog_version')
+    snapshot = get_catalog_snapshot(version)
+    category_key = snapshot.category_key(cat_index) if version in (None, snapshot.version) else None
+    if category_key is None:
+        # Кнопка из слишком старого снимка каталога: показать актуальные категории
+        lang = context.user_data.get('language', 'ru')
+        await query.message.edit_text(
+            get_text('select_category', lang),
+            reply_markup=categories_keyboard(context, lang)
+        )
+        return CATEGORY
     
+    context.user_data['catalog_version'] = snapshot.version
     context.user_data['category'] = category_key
-    context.user_data['category_data'] = category_data
+    context.user_data['parts_page'] = 0
     context.user_data['selected_parts'] = []
     
     await show_parts_keyboard(query, context)
     return PARTS_SELECTION
 
 
+@lru_cache(maxsize=None)
+def parts_control_rows(lang):
+    """Нижние кнопки клавиатуры запчастей (одинаковы для всех категорий)"""
+    return (
+        (InlineKeyboardButton(get_text('add_manual', lang), callback_data='manual'),),
+        (InlineKeyboardButton(get_text('next', lang), callback_data='next_vin'),),
+        (InlineKeyboardButton("◀️ " + get_text('back_to_categories', lang), callback_data='back_to_categories'),),
+        (InlineKeyboardButton(get_text('cancel', lang), callback_data='cancel'),),
+    )
+
+
+def build_parts_keyboard(snapshot, category_key, lang, selected, page=0):
+    """
+    Клавиатура одной страницы запчастей.
+
+    Берётся готовая страница из снимка; заново создаются только кнопки
+    отмеченных запчастей и строка навигации. Возвращает (клавиатуру, номер
+    страницы после приведения к допустимому диапазону).
+    """
+    pages = snapshot.parts_pages(category_key, lang)
+    page = max(0, min(page, len(pages) - 1))
+    selected = set(selected)
+    
+    keyboard = [
+        (InlineKeyboardButton(f"✅ {part}", callback_data=row[0].callback_data),) if part in selected else row
+        for part, row in pages[page]
+    ]
+    if len(pages) > 1:
+        navigation = []
+        if page > 0:
+            navigation.append(InlineKeyboardButton("◀️", callback_data=f'parts_page_{page - 1}'))
+        navigation.append(InlineKeyboardButton(f"{page + 1}/{len(pages)}", callback_data=f'parts_page_{page}'))
+        if page < len(pages) - 1:
+            navigation.append(InlineKeyboardButton("▶️", callback_data=f'parts_page_{page + 1}'))
+        keyboard.append(tuple(navigation))
+    keyboard.extend(parts_control_rows(lang))
+    return InlineKeyboardMarkup(keyboard), page
+
+
 async def show_parts_keyboard(query, context: ContextTypes.DEFAULT_TYPE):
     category_key = context.user_data['category']
-    category_data = context.user_data.get('category_data', {})
     lang = context.user_data.get('language', 'ru')
     
-    # Load parts from API or fallback to config
-    parts = get_parts_list(category_key, category_data, lang)
-    
+    # Load parts from API or fallback to config (страницы кешируются в общем снимке)
+    snapshot = get_catalog_snapshot(context.user_data.get('catalog_version'))
     selected = context.user_data.get('selected_parts', [])
-    keyboard = []
-    
-    for part in parts:
-        check = "✅ " if part in selected else ""
-        keyboard.append([InlineKeyboardButton(
-            f"{check}{part}", 
-            callback_data=f'part_{part}'
-        )])
-    
-    keyboard.append([InlineKeyboardButton(get_text('add_manual', lang), callback_data='manual')])
-    keyboard.append([InlineKeyboardButton(get_text('next', lang), callback_data='next_vin')])
-    keyboard.append([InlineKeyboardButton("◀️ " + get_text('back_to_categories', lang), callback_data='back_to_categories')])
-    keyboard.append([InlineKeyboardButton(get_text('cancel', lang), callback_data='cancel')])
+    reply_markup, page = build_parts_keyboard(
+        snapshot, category_key, lang, selected, context.user_data.get('parts_page', 0)
+    )
+    # Номера part_<i> на клавиатуре относятся к этой версии
+    context.user_data['catalog_version'] = snapshot.version
+    context.user_data['parts_page'] = page
     
     await query.message.edit_text(
         get_text('select_parts', lang, count=len(selected)),
-        reply_markup=InlineKeyboardMarkup(keyboard)
+        reply_markup=reply_markup
     )
 
 
@@ -243,7 +443,22 @@ async def toggle_part(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     
-    part = query.data.replace('part_', '')
+    value = query.data.replace('part_', '')
+    if value.isdigit():
+        # part_<номер> в списке запчастей категории (имя может не влезть в 64 байта callback_data)
+        version = context.user_data.get('catalog_version')
+        snapshot = get_catalog_snapshot(version)
+        parts = snapshot.parts(context.user_data['category'], context.user_data.get('language', 'ru'))
+        index = int(value)
+        if snapshot.version != version or index >= len(parts):
+            # Каталог сменился: номер указывает в другой список, показать актуальный
+            await show_parts_keyboard(query, context)
+            return PARTS_SELECTION
+        part = parts[index]
+    else:
+        # Кнопки сообщений, отправленных до перехода на номера
+        part = value
+    
     selected = context.user_data.get('selected_parts', [])
     
     if part in selected:
@@ -257,6 +472,21 @@ async def toggle_part(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return PARTS_SELECTION
 
 
+async def change_parts_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Перейти на другую страницу запчастей"""
+    query = update.callback_query
+    await query.answer()
+    
+    page = int(query.data.replace('parts_page_', ''))
+    if page == context.user_data.get('parts_page', 0):
+        # Кнопка с номером текущей страницы: сообщение не меняется
+        return PARTS_SELECTION
+    
+    context.user_data['parts_page'] = page
+    await show_parts_keyboard(query, context)
+    return PARTS_SELECTION
+
+
 async def manual_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -313,18 +543,9 @@ async def back_to_categories(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     # Сохранить выбранные запчасти - они уже в context.user_data['selected_parts']
     
-    # Загрузить категории
-    categories = context.user_data.get('categories_cache', get_categories_dict())
-    
-    keyboard = [
-        [InlineKeyboardButton(cat, callback_data=f'cat_{i}')] 
-        for i, cat in enumerate(categories.keys())
-    ]
-    keyboard.append([InlineKeyboardButton(get_text('cancel', lang), callback_data='cancel')])
-    
     await query.message.edit_text(
         get_text('select_category', lang),
-        reply_markup=InlineKeyboardMarkup(keyboard)
+        reply_markup=categories_keyboard(context, lang)
     )
     return CATEGORY
 
@@ -680,6 +901,127 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             logger.debug(f"Failed to serialize update {update_id}: {payload_error}")
 
 
+# Ключи user_data, которые переживают простой: настройки механика, а не шаги диалога
+SESSION_DURABLE_KEYS = ('language', 'mechanic_name', 'telegram_id')
+
+
+def approx_size(value):
+    """Примерный размер объекта в памяти вместе с вложенными dict/list"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approx_size(key) + approx_size(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(approx_size(item) for item in value)
+    return size
+
+
+class SessionTracker:
+    """
+    Учёт сессий механиков в памяти процесса бота.
+
+    Каждый апдейт отмечает активность пользователя. Раз в sweep_interval
+    секунд обрабатываются сессии, простаивающие дольше idle_seconds
+    (JobQueue не установлен, поэтому conversation_timeout сам не срабатывает).
+
+    Простой считается по апдейтам этого процесса. С общим хранилищем
+    механик мог продолжить диалог в другом воркере, поэтому сессия только
+    выгружается из памяти и ничего не записывается: при следующем апдейте
+    она загрузится из хранилища. Без хранилища сессия сокращается до
+    SESSION_DURABLE_KEYS, а её незавершённые диалоги закрываются; если
+    пользователей в памяти больше max_users, самые давно неактивные
+    выгружаются целиком.
+    """
+
+    def __init__(self, idle_seconds=SESSION_IDLE_SECONDS, max_users=SESSION_MAX_USERS,
+                 sweep_interval=SESSION_SWEEP_INTERVAL):
+        self.idle_seconds = idle_seconds
+        self.max_users = max_users
+        self.sweep_interval = sweep_interval
+        self._last_seen = {}
+        self._last_sweep = time.monotonic()
+        self.stats = {'users': 0, 'bytes': 0, 'trimmed': 0, 'evicted': 0}
+
+    async def track(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """TypeHandler группы -1: отметить активность и при необходимости подчистить память"""
+        now = time.monotonic()
+        if update.effective_user is not None:
+            self._last_seen[update.effective_user.id] = now
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            self.sweep(context.application, now)
+
+    def sweep(self, application, now=None):
+        now = time.monotonic() if now is None else now
+        # application.user_data — read-only proxy; выгрузка без удаления из хранилища
+        # возможна только через внутренний словарь
+        user_data = application._user_data
+        for user_id in list(self._last_seen):
+            if user_id not in user_data:
+                del self._last_seen[user_id]
+        
+        shared = application.persistence is not None
+        idle = []
+        for user_id, data in list(user_data.items()):
+            last_seen = self._last_seen.setdefault(user_id, now)
+            if now - last_seen < self.idle_seconds:
+                continue
+            if shared:
+                self._unload(application, user_id)
+            else:
+                idle.append(user_id)
+                if any(key not in SESSION_DURABLE_KEYS for key in data):
+                    self._trim(application, user_id, data)
+        
+        overflow = len(user_data) - self.max_users
+        if overflow > 0:
+            idle.sort(key=self._last_seen.get)
+            for user_id in idle[:overflow]:
+                self._unload(application, user_id)
+        
+        self.stats['users'] = len(user_data)
+        self.stats['bytes'] = sum(approx_size(data) for data in user_data.values())
+        logger.info(
+            f"🧹 Sessions: {self.stats['users']} user(s), ~{self.stats['bytes']} bytes of user_data, "
+            f"{self.stats['trimmed']} trimmed, {self.stats['evicted']} evicted in total"
+        )
+        return self.stats
+
+    @staticmethod
+    def _user_conversations(application, user_id):
+        """(диалог, ключ) незавершённых диалогов пользователя"""
+        for handlers in application.handlers.values():
+            for handler in handlers:
+                if isinstance(handler, ConversationHandler) and handler.per_user:
+                    position = 1 if handler.per_chat else 0
+                    for key in [key for key in handler._conversations if key[position] == user_id]:
+                        yield handler, key
+
+    def _trim(self, application, user_id, data):
+        for key in [key for key in data if key not in SESSION_DURABLE_KEYS]:
+            del data[key]
+        for handler, key in list(self._user_conversations(application, user_id)):
+            # Состояния диалогов хранятся во внутреннем словаре ConversationHandler
+            handler._conversations.pop(key, None)
+        self.stats['trimmed'] += 1
+
+    def _unload(self, application, user_id):
+        """Убрать сессию из памяти, не трогая хранилище"""
+        persistence = application.persistence
+        application._user_data.pop(user_id, None)
+        self._last_seen.pop(user_id, None)
+        forget_user_data = getattr(persistence, 'forget_user_data', None)
+        if forget_user_data:
+            forget_user_data(user_id)
+        forget_conversation = getattr(persistence, 'forget_conversation', None)
+        for handler, key in list(self._user_conversations(application, user_id)):
+            # С хранилищем это TrackingDict: через .data удаление не попадёт в запись
+            conversations = handler._conversations
+            getattr(conversations, 'data', conversations).pop(key, None)
+            if forget_conversation:
+                forget_conversation(handler.name, key)
+        self.stats['evicted'] += 1
+
+
 def setup_handlers(application):
     """Зарегистрировать все handlers (для использования в webhook или polling)"""
     
@@ -693,6 +1035,7 @@ def setup_handlers(application):
             ],
             PARTS_SELECTION: [
                 CallbackQueryHandler(toggle_part, pattern='^part_'),
+                CallbackQueryHandler(change_parts_page, pattern='^parts_page_'),
                 CallbackQueryHandler(input_vin, pattern='^next_vin$'),
                 CallbackQueryHandler(manual_input, pattern='^manual$'),
                 CallbackQueryHandler(continue_selection, pattern='^continue_selection$'),
@@ -717,9 +1060,15 @@ def setup_handlers(application):
         fallbacks=[CallbackQueryHandler(cancel, pattern='^cancel$')],
         conversation_timeout=300,  # 5 минут
         name="order_conversation",
-        persistent=False
+        # В webhook-режиме backend подключает общее хранилище состояния (bot_state)
+        persistent=application.persistence is not None
     )
     
+    # Учёт и очистка сессий в памяти: группа -1 выполняется перед остальными handlers
+    session_tracker = SessionTracker()
+    application.bot_data['session_tracker'] = session_tracker
+    application.add_handler(TypeHandler(Update, session_tracker.track), group=-1)
+    
     # Зарегистрировать все handlers
     application.add_handler(CommandHandler("start", start))
     application.add_handler(conv_handler)
@@ -735,6 +1084,109 @@ def setup_handlers(application):
     return application
 
 
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Параллельная обработка апдейтов с сохранением порядка внутри чата.
+
+    Апдейты разных механиков обрабатываются одновременно (до
+    max_concurrent_updates), а апдейты одного чата - по одному. Пока чат
+    занят, пришедшие апдейты ждут и запускаются по возрастанию update_id,
+    даже если дошли до процессора не в том порядке. Апдейт, пришедший в
+    свободный чат, запускается сразу: более ранний, ещё не дошедший апдейт
+    его не задержит. Порядок доставки - забота источника: polling и очередь
+    inbound_updates отдают апдейты чата по одному. Всё это действует в
+    пределах одного процесса.
+
+    Семафор базового класса берётся до do_process_update, и апдейты, ждущие
+    своего чата, занимали бы слоты других чатов. Поэтому базовый лимит не
+    ограничивает, а свой семафор берётся, когда очередь чата дошла до апдейта.
+    """
+
+    def __init__(self, max_concurrent_updates=CONCURRENT_UPDATES):
+        super().__init__(sys.maxsize)
+        self._max_concurrent_updates = max_concurrent_updates
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+        # ключ чата -> куча ожидающих (update_id, номер прихода, future); есть ключ - чат занят
+        self._chats = {}
+        self._arrivals = itertools.count()
+
+    @staticmethod
+    def update_key(update):
+        """Чат апдейта (или пользователь, если чата нет); None — порядок не важен"""
+        chat = getattr(update, 'effective_chat', None)
+        if chat is not None:
+            return ('chat', chat.id)
+        user = getattr(update, 'effective_user', None)
+        if user is not None:
+            return ('user', user.id)
+        return None
+
+    async def _wait_turn(self, key, update):
+        """Дождаться очереди апдейта в своём чате"""
+        waiting = self._chats.get(key)
+        if waiting is None:
+            self._chats[key] = []
+            return
+
+        turn = asyncio.get_running_loop().create_future()
+        entry = (update.update_id, next(self._arrivals), turn)
+        heapq.heappush(waiting, entry)
+        try:
+            await turn
+        except asyncio.CancelledError:
+            if turn.done() and not turn.cancelled():
+                # Очередь уже передана этому апдейту - передать её дальше
+                self._release(key)
+            else:
+                waiting.remove(entry)
+                heapq.heapify(waiting)
+            raise
+
+    def _release(self, key):
+        """Передать чат ожидающему апдейту с наименьшим update_id"""
+        waiting = self._chats[key]
+        while waiting:
+            _, _, turn = heapq.heappop(waiting)
+            if not turn.done():
+                turn.set_result(None)
+                return
+        del self._chats[key]
+
+    async def do_process_update(self, update, coroutine):
+        key = self.update_key(update)
+        if key is None:
+            async with self._slots:
+                await coroutine
+            return
+
+        await self._wait_turn(key, update)
+        try:
+            async with self._slots:
+                await coroutine
+        finally:
+            self._release(key)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @property
+    def active_chats(self):
+        return len(self._chats)
+
+
+def application_builder(token, persistence=None, max_concurrent_updates=CONCURRENT_UPDATES):
+    """ApplicationBuilder с параллельной обработкой апдейтов (для webhook и polling)"""
+    builder = Application.builder()\
+        .token(token)\
+        .concurrent_updates(ChatOrderedUpdateProcessor(max_concurrent_updates))
+    if persistence is not None:
+        builder = builder.persistence(persistence)
+    return builder
+
+
 def main():
     """Запустить бота в polling режиме (для локальной разработки)"""
     
@@ -743,7 +1195,7 @@ def main():
         return
     
     # Создать application
-    application = Application.builder().token(BOT_TOKEN).build()
+    application = application_builder(BOT_TOKEN).build()
     
     # Зарегистрировать handlers
     setup_handlers(application)
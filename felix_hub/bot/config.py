@@ -7,6 +7,21 @@ load_dotenv()
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN') or os.getenv('BOT_TOKEN')
 BACKEND_URL = os.getenv('BACKEND_URL', 'http://localhost:5000')
 
+# Сколько апдейтов обрабатывается одновременно (апдейты одного чата — по очереди)
+CONCURRENT_UPDATES = int(os.getenv('BOT_CONCURRENT_UPDATES', 16))
+
+# Общий снимок каталога обновляется не чаще, чем раз в CATALOG_SNAPSHOT_TTL секунд
+CATALOG_SNAPSHOT_TTL = int(os.getenv('BOT_CATALOG_TTL_SECONDS', 300))
+
+# Запчастей на одной странице клавиатуры (Telegram ограничивает размер клавиатуры)
+PARTS_PAGE_SIZE = int(os.getenv('BOT_PARTS_PAGE_SIZE', 8))
+
+# Сессии механиков в памяти: после SESSION_IDLE_SECONDS бездействия остаются
+# только настройки, сверх SESSION_MAX_USERS давно неактивные выгружаются целиком
+SESSION_IDLE_SECONDS = int(os.getenv('BOT_SESSION_IDLE_SECONDS', 1800))
+SESSION_MAX_USERS = int(os.getenv('BOT_SESSION_MAX_USERS', 500))
+SESSION_SWEEP_INTERVAL = int(os.getenv('BOT_SESSION_SWEEP_SECONDS', 60))
+
 # Admin IDs configuration
 ADMIN_IDS = [int(x) for x in os.getenv('ADMIN_IDS', '').split(',') if x.strip()]
 
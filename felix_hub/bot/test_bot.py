@@ -155,5 +155,350 @@ class TestBotAcceptanceCriteria(unittest.TestCase):
             self.assertEqual(len(parts), len(set(parts)), f"Category '{category}' has duplicate parts")
 
 
+
+class TestChatOrderedUpdateProcessor(unittest.IsolatedAsyncioTestCase):
+    
+    def _update(self, chat_id, update_id):
+        update = Mock()
+        update.update_id = update_id
+        update.effective_chat = Mock(id=chat_id)
+        return update
+    
+    async def _run(self, processor, updates):
+        import asyncio
+        events = []
+        running = {'now': 0, 'max': 0}
+        
+        async def handle(name):
+            running['now'] += 1
+            running['max'] = max(running['max'], running['now'])
+            events.append(('start', name))
+            await asyncio.sleep(0.01)
+            events.append(('end', name))
+            running['now'] -= 1
+        
+        # update_id по порядку прихода, если не задан явно
+        updates = [update if len(update) == 3 else (*update, number) for number, update in enumerate(updates)]
+        await asyncio.gather(*[
+            processor.process_update(self._update(chat_id, update_id), handle(name))
+            for name, chat_id, update_id in updates
+        ])
+        return events, running['max']
+    
+    async def test_same_chat_is_processed_in_order(self):
+        from bot import ChatOrderedUpdateProcessor
+        processor = ChatOrderedUpdateProcessor(8)
+        events, max_running = await self._run(processor, [('a1', 1), ('a2', 1), ('a3', 1)])
+        self.assertEqual(events, [('start', 'a1'), ('end', 'a1'), ('start', 'a2'), ('end', 'a2'),
+                                  ('start', 'a3'), ('end', 'a3')])
+        self.assertEqual(max_running, 1)
+        self.assertEqual(processor.active_chats, 0)
+    
+    async def test_other_chats_are_not_blocked(self):
+        from bot import ChatOrderedUpdateProcessor
+        processor = ChatOrderedUpdateProcessor(8)
+        events, max_running = await self._run(processor, [('a1', 1), ('b1', 2), ('a2', 1), ('c1', 3)])
+        self.assertEqual(max_running, 3)
+        self.assertLess(events.index(('end', 'a1')), events.index(('start', 'a2')))
+    
+    async def test_max_concurrent_updates_is_respected(self):
+        from bot import ChatOrderedUpdateProcessor
+        processor = ChatOrderedUpdateProcessor(2)
+        _, max_running = await self._run(processor, [(f"u{chat_id}", chat_id) for chat_id in range(5)])
+        self.assertEqual(max_running, 2)
+        self.assertEqual(processor.max_concurrent_updates, 2)
+    
+    async def test_waiting_updates_run_by_update_id(self):
+        from bot import ChatOrderedUpdateProcessor
+        processor = ChatOrderedUpdateProcessor(8)
+        # a3 дошёл до процессора раньше a2, пока чат был занят a1
+        updates = [('a1', 1, 10), ('a3', 1, 12), ('a2', 1, 11), ('b1', 2, 13)]
+        events, _ = await self._run(processor, updates)
+        started = [name for kind, name in events if kind == 'start' and name.startswith('a')]
+        self.assertEqual(started, ['a1', 'a2', 'a3'])
+        self.assertEqual(processor.active_chats, 0)
+    
+    async def test_cancelled_waiter_leaves_the_queue(self):
+        import asyncio
+        from bot import ChatOrderedUpdateProcessor
+        processor = ChatOrderedUpdateProcessor(8)
+        release = asyncio.Event()
+        finished = []
+        
+        async def handle(name, wait=False):
+            if wait:
+                await release.wait()
+            finished.append(name)
+        
+        first = asyncio.create_task(processor.process_update(self._update(1, 1), handle('a1', wait=True)))
+        await asyncio.sleep(0)
+        cancelled_handler = handle('a2')
+        cancelled = asyncio.create_task(processor.process_update(self._update(1, 2), cancelled_handler))
+        last = asyncio.create_task(processor.process_update(self._update(1, 3), handle('a3')))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        cancelled_handler.close()
+        release.set()
+        await asyncio.gather(first, last)
+        self.assertEqual(finished, ['a1', 'a3'])
+        self.assertEqual(processor.active_chats, 0)
+    
+    async def test_waiting_updates_do_not_hold_slots(self):
+        from bot import ChatOrderedUpdateProcessor
+        processor = ChatOrderedUpdateProcessor(2)
+        updates = [('a1', 1), ('a2', 1), ('a3', 1), ('a4', 1), ('b1', 2)]
+        events, max_running = await self._run(processor, updates)
+        # Очередь нажатий одного механика не задерживает другой чат
+        self.assertLess(events.index(('end', 'b1')), events.index(('end', 'a2')))
+        self.assertEqual(max_running, 2)
+
+
+
+class TestCatalogSnapshot(unittest.TestCase):
+    
+    def setUp(self):
+        import bot
+        bot._catalog_snapshots.clear()
+        # API каталога недоступен: проверяется запасной путь через /api/categories и config.py
+        no_document = patch('bot.load_catalog_document', return_value=None)
+        no_document.start()
+        self.addCleanup(no_document.stop)
+    
+    def test_snapshot_is_shared_within_ttl(self):
+        import bot
+        catalog = {"🔧 Тормоза": {'id': 1}, "⚙️ Двигатель": {'id': 2}}
+        with patch('bot.get_categories_dict', return_value=dict(catalog)) as get_categories_dict:
+            first = bot.get_catalog_snapshot()
+            second = bot.get_catalog_snapshot()
+        self.assertIs(first, second)
+        self.assertEqual(get_categories_dict.call_count, 1)
+        self.assertEqual(first.category_key(1), "⚙️ Двигатель")
+        self.assertIsNone(first.category_key(5))
+    
+    def test_changed_catalog_keeps_old_version_resolvable(self):
+        import bot
+        with patch('bot.get_categories_dict', return_value={"🔧 Тормоза": {'id': 1}}), patch('bot.CATALOG_SNAPSHOT_TTL', 0):
+            old = bot.get_catalog_snapshot()
+        with patch('bot.get_categories_dict', return_value={"⚡ Электрика": {'id': 4}}), patch('bot.CATALOG_SNAPSHOT_TTL', 0):
+            new = bot.get_catalog_snapshot()
+            self.assertNotEqual(old.version, new.version)
+            self.assertIs(bot.get_catalog_snapshot(old.version), old)
+            self.assertEqual(bot.get_catalog_snapshot(old.version).category_key(0), "🔧 Тормоза")
+    
+    def test_version_is_the_backend_catalog_version(self):
+        import bot
+        document = {'version': 'c0ffee', 'lang': 'ru', 'categories': [
+            {'id': 1, 'name': 'Тормоза', 'name_ru': 'Тормоза', 'icon': '🔧', 'parts': []}
+        ]}
+        with patch('bot.load_catalog_document', return_value=document):
+            self.assertEqual(bot.get_catalog_snapshot().version, 'c0ffee')
+        # Без версии на backend — хеш содержимого, одинаковый в любом процессе
+        unversioned = dict(document, version='')
+        with patch('bot.load_catalog_document', return_value=unversioned):
+            bot._catalog_snapshots.clear()
+            first = bot.get_catalog_snapshot().version
+            bot._catalog_snapshots.clear()
+            self.assertEqual(bot.get_catalog_snapshot().version, first)
+    
+    def test_unchanged_catalog_keeps_version_after_ttl(self):
+        import bot
+        document = {'version': 'v1', 'lang': 'ru', 'categories': [
+            {'id': 1, 'name': 'Тормоза', 'name_ru': 'Тормоза', 'icon': '🔧', 'parts': [{'id': 10, 'name': 'Колодки'}]}
+        ]}
+        with patch('bot.load_catalog_document', return_value=document) as load, patch('bot.CATALOG_SNAPSHOT_TTL', 0):
+            first = bot.get_catalog_snapshot()
+            pages = first.parts_pages("🔧 Тормоза")
+            second = bot.get_catalog_snapshot()
+        self.assertEqual(load.call_count, 2, "The TTL still re-checks the backend")
+        self.assertIs(second, first)
+        self.assertIs(second.parts_pages("🔧 Тормоза"), pages)
+        self.assertEqual(list(bot._catalog_snapshots), ['v1'])
+    
+    def test_unknown_version_reloads_catalog_within_ttl(self):
+        import bot
+        with patch('bot.get_categories_dict', return_value={"🔧 Тормоза": {'id': 1}}):
+            old = bot.get_catalog_snapshot()
+        with patch('bot.get_categories_dict', return_value={"⚡ Электрика": {'id': 4}}):
+            self.assertIs(bot.get_catalog_snapshot(), old, "Within the TTL the snapshot is reused")
+            # Версия из user_data другого воркера, которой этот процесс не видел
+            new = bot.get_catalog_snapshot('from-other-worker')
+        self.assertNotEqual(new.version, old.version)
+        self.assertEqual(new.category_key(0), "⚡ Электрика")
+    
+    def test_parts_are_cached_per_language(self):
+        import bot
+        with patch('bot.get_categories_dict', return_value={"🔧 Тормоза": {'id': 1}}):
+            snapshot = bot.get_catalog_snapshot()
+        with patch('bot.get_parts_list', return_value=['Колодки']) as get_parts_list:
+            snapshot.parts("🔧 Тормоза", 'ru')
+            snapshot.parts("🔧 Тормоза", 'ru')
+            snapshot.parts("🔧 Тормоза", 'en')
+        self.assertEqual(get_parts_list.call_count, 2)
+
+    
+    def test_snapshot_document_serves_categories_and_parts(self):
+        import bot
+        documents = {
+            'ru': {'version': 'v1', 'lang': 'ru', 'categories': [
+                {'id': 1, 'name': 'Тормоза', 'name_ru': 'Тормоза', 'icon': '🔧',
+                 'parts': [{'id': 10, 'name': 'Передние колодки'}]}
+            ]},
+            'en': {'version': 'v1', 'lang': 'en', 'categories': [
+                {'id': 1, 'name': 'Brakes', 'name_ru': 'Тормоза', 'icon': '🔧',
+                 'parts': [{'id': 10, 'name': 'Front pads'}]}
+            ]},
+        }
+        with patch('bot.load_catalog_document', side_effect=lambda lang='ru': documents[lang]) as load, \
+                patch('bot.get_categories_dict') as get_categories_dict, \
+                patch('bot.get_parts_list') as get_parts_list:
+            snapshot = bot.get_catalog_snapshot()
+            self.assertEqual(snapshot.keys, ["🔧 Тормоза"])
+            self.assertEqual(snapshot.parts("🔧 Тормоза", 'ru'), ['Передние колодки'])
+            self.assertEqual(snapshot.parts("🔧 Тормоза", 'en'), ['Front pads'])
+            self.assertEqual(snapshot.parts("🔧 Тормоза", 'en'), ['Front pads'])
+        self.assertEqual([call.args for call in load.call_args_list], [('ru',), ('en',)])
+        get_categories_dict.assert_not_called()
+        get_parts_list.assert_not_called()
+
+
+class TestSessionTracker(unittest.TestCase):
+    
+    def _application(self):
+        from telegram.ext import Application
+        from bot import setup_handlers
+        application = Application.builder().token('123456:TEST').build()
+        setup_handlers(application)
+        return application
+    
+    def test_idle_session_is_trimmed_and_conversation_ended(self):
+        from bot import SessionTracker
+        application = self._application()
+        tracker = SessionTracker(idle_seconds=60, max_users=10)
+        application.user_data[42].update({'language': 'en', 'selected_parts': ['Помпа'] * 50, 'catalog_version': 3})
+        conversation = application.handlers[0][1]
+        conversation._conversations[(42, 42)] = 1
+        
+        tracker._last_seen[42] = 0
+        stats = tracker.sweep(application, now=1000)
+        
+        self.assertEqual(dict(application.user_data[42]), {'language': 'en'})
+        self.assertNotIn((42, 42), conversation._conversations)
+        self.assertEqual(stats['trimmed'], 1)
+        self.assertEqual(stats['users'], 1)
+        self.assertGreater(stats['bytes'], 0)
+    
+    def test_idle_shared_session_is_unloaded_without_writing(self):
+        from bot import SessionTracker
+        application = self._application()
+        application.persistence = Mock()
+        tracker = SessionTracker(idle_seconds=60, max_users=10)
+        application.user_data[42].update({'language': 'en', 'selected_parts': ['Помпа']})
+        conversation = application.handlers[0][1]
+        # Так хранит состояния persistent ConversationHandler
+        from telegram.ext._utils.trackingdict import TrackingDict
+        conversation._conversations = TrackingDict()
+        conversation._conversations.update_no_track({(42, 42): 1})
+        
+        tracker._last_seen[42] = 0
+        stats = tracker.sweep(application, now=1000)
+        
+        # Механик мог продолжить диалог в другом воркере: устаревшая копия не записывается
+        self.assertNotIn(42, application.user_data)
+        self.assertNotIn((42, 42), conversation._conversations)
+        self.assertEqual(conversation._conversations.pop_accessed_keys(), set())
+        self.assertEqual(application._user_ids_to_be_updated_in_persistence, set())
+        application.persistence.forget_user_data.assert_called_once_with(42)
+        application.persistence.forget_conversation.assert_called_once_with(conversation.name, (42, 42))
+        self.assertEqual(stats['trimmed'], 0)
+        self.assertEqual(stats['evicted'], 1)
+    
+    def test_active_session_is_kept(self):
+        from bot import SessionTracker
+        application = self._application()
+        tracker = SessionTracker(idle_seconds=60, max_users=10)
+        application.user_data[7]['selected_parts'] = ['Свечи зажигания']
+        tracker._last_seen[7] = 990
+        tracker.sweep(application, now=1000)
+        self.assertEqual(application.user_data[7]['selected_parts'], ['Свечи зажигания'])
+    
+    def test_least_recent_idle_users_evicted_over_limit(self):
+        from bot import SessionTracker
+        application = self._application()
+        tracker = SessionTracker(idle_seconds=60, max_users=2)
+        for user_id, last_seen in ((1, 100), (2, 200), (3, 300), (4, 990)):
+            application.user_data[user_id]['language'] = 'ru'
+            tracker._last_seen[user_id] = last_seen
+        stats = tracker.sweep(application, now=1000)
+        self.assertEqual(sorted(application.user_data), [3, 4])
+        self.assertEqual(stats['evicted'], 2)
+
+
+
+class TestPartsKeyboard(unittest.TestCase):
+    
+    def _snapshot(self, count):
+        from bot import CatalogSnapshot
+        snapshot = CatalogSnapshot(1, {"🔧 Тормоза": {'id': 1}})
+        snapshot._parts[("🔧 Тормоза", 'ru')] = [f"Запчасть {number}" for number in range(count)]
+        return snapshot
+    
+    def _part_rows(self, markup):
+        return [row for row in markup.inline_keyboard if row[0].callback_data.startswith('part_')]
+    
+    def test_large_category_is_paged(self):
+        from bot import build_parts_keyboard
+        snapshot = self._snapshot(300)
+        markup, page = build_parts_keyboard(snapshot, "🔧 Тормоза", 'ru', [], page=1)
+        rows = self._part_rows(markup)
+        self.assertEqual(page, 1)
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(rows[0][0].callback_data, 'part_8')
+        navigation = [button.callback_data for button in markup.inline_keyboard[len(rows)]]
+        self.assertEqual(navigation, ['parts_page_0', 'parts_page_1', 'parts_page_2'])
+        self.assertLess(sum(len(row) for row in markup.inline_keyboard), 100)
+    
+    def test_page_is_clamped(self):
+        from bot import build_parts_keyboard
+        snapshot = self._snapshot(10)
+        markup, page = build_parts_keyboard(snapshot, "🔧 Тормоза", 'ru', [], page=7)
+        self.assertEqual(page, 1)
+        self.assertEqual(len(self._part_rows(markup)), 2)
+    
+    def test_toggle_only_patches_checkmarks(self):
+        from bot import build_parts_keyboard
+        snapshot = self._snapshot(20)
+        base_page = snapshot.parts_pages("🔧 Тормоза", 'ru')[0]
+        markup, _ = build_parts_keyboard(snapshot, "🔧 Тормоза", 'ru', ["Запчасть 3"], page=0)
+        rows = self._part_rows(markup)
+        self.assertEqual(rows[3][0].text, "✅ Запчасть 3")
+        self.assertEqual(rows[3][0].callback_data, 'part_3')
+        self.assertIs(rows[2], base_page[2][1], "Unselected rows must come from the cached page")
+        self.assertIs(snapshot.parts_pages("🔧 Тормоза", 'ru'), snapshot.parts_pages("🔧 Тормоза", 'ru'))
+
+
+
+class TestTogglePart(unittest.IsolatedAsyncioTestCase):
+    
+    async def _tap(self, data, user_data):
+        import bot
+        snapshot = bot.CatalogSnapshot('v2', {"🔧 Тормоза": {'id': 1}})
+        snapshot._parts[("🔧 Тормоза", 'ru')] = ["Колодки", "Диск"]
+        query = Mock(data=data, answer=AsyncMock(), message=Mock(edit_text=AsyncMock()))
+        context = Mock(user_data={'category': "🔧 Тормоза", 'selected_parts': [], **user_data})
+        with patch('bot.get_catalog_snapshot', return_value=snapshot):
+            await bot.toggle_part(Mock(callback_query=query), context)
+        query.message.edit_text.assert_awaited_once()
+        return context.user_data
+    
+    async def test_part_index_resolves_in_its_version(self):
+        user_data = await self._tap('part_1', {'catalog_version': 'v2'})
+        self.assertEqual(user_data['selected_parts'], ["Диск"])
+    
+    async def test_part_index_of_another_version_is_not_applied(self):
+        user_data = await self._tap('part_1', {'catalog_version': 'v1'})
+        self.assertEqual(user_data['selected_parts'], [], "An index into another catalog must not select a part")
+        self.assertEqual(user_data['catalog_version'], 'v2')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -7,12 +7,25 @@ export interface FetchOrdersParams {
   status?: string;
 }
 
+export interface OrdersSyncResponse {
+  orders: Order[];
+  deleted: number[];
+  cursor: string;
+  reset: boolean;
+}
+
 export const ordersApi = {
   fetchOrders: async (params?: FetchOrdersParams): Promise<Order[]> => {
     const response = await api.get('/mechanic/orders', { params });
     return response.data;
   },
 
+  syncOrders: async (updatedSince?: string | null): Promise<OrdersSyncResponse> => {
+    const params = updatedSince ? { updated_since: updatedSince } : undefined;
+    const response = await api.get('/mechanic/orders/sync', { params });
+    return response.data;
+  },
+
   fetchOrderDetails: async (id: string | number): Promise<OrderDetails> => {
     const response = await api.get(`/mechanic/orders/${id}`);
     return response.data;
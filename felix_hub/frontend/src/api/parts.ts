@@ -1,5 +1,5 @@
 import api from '@/lib/api';
-import type { Category, Part } from '@/types';
+import type { Category, Part, PartSearchResult } from '@/types';
 
 export const partsApi = {
   fetchCategories: async (): Promise<Category[]> => {
@@ -23,4 +23,11 @@ export const partsApi = {
     const response = await api.get(`/parts/${partId}`);
     return response.data;
   },
+
+  searchParts: async (query: string, categoryId?: number): Promise<PartSearchResult[]> => {
+    const response = await api.get('/parts/search', {
+      params: { q: query, category_id: categoryId },
+    });
+    return response.data.results;
+  },
 };
@@ -9,6 +9,7 @@ export interface Order {
   status: 'новый' | 'в работе' | 'готов' | 'выдан';
   work_status: 'новый' | 'в работе' | 'на паузе' | 'завершен';
   photo_url?: string;
+  photo_thumb_url?: string;
   created_at: string;
   updated_at: string;
   total_time_minutes: number;
@@ -130,6 +131,10 @@ export interface Part {
   created_at: string;
 }
 
+export type PartSearchResult =
+  | (Omit<Part, 'created_at'> & { type: 'part' })
+  | { type: 'part_number'; part_number: string; name: string; uses: number };
+
 export interface SelectedPart {
   id?: number;
   name: string;
@@ -0,0 +1,244 @@
+"""
+API Contract Tests for Batch PDF Export
+Tests GET /export/pdf with one receipt per page and the pick list layout.
+"""
+
+import sys
+import os
+import re
+import tempfile
+import json
+from unittest.mock import Mock, patch
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'felix_hub', 'backend'))
+
+os.environ.setdefault('ENABLE_CAR_NUMBER', 'true')
+os.environ.setdefault('ALLOW_ANY_CAR_NUMBER', 'false')
+
+PAGE_RE = re.compile(rb'/Type /Page\b(?!s)')
+
+
+def _create_orders(client):
+    orders = [
+        ('Тормоза', ['Передние колодки', 'Тормозная жидкость']),
+        ('Тормоза', ['Передние колодки']),
+        ('Двигатель', ['Масляный фильтр']),
+    ]
+    ids = []
+    for category, parts in orders:
+        response = client.post('/api/orders',
+            data=json.dumps({
+                'mechanic_name': 'Иван Петров',
+                'telegram_id': '123456',
+                'category': category,
+                'carNumber': 'AB1234CD',
+                'selected_parts': parts,
+                'is_original': False
+            }),
+            content_type='application/json'
+        )
+        assert response.status_code == 201, f"Expected 201, got {response.status_code}"
+        ids.append(json.loads(response.data)['id'])
+    return ids
+
+
+def _setup_app():
+    from app import app, db
+
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    return app, db, db_fd, db_path
+
+
+def test_export_receipts_one_per_page():
+    """Test receipts layout renders one page per order matching the filters"""
+    app, db, db_fd, db_path = _setup_app()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+        ids = _create_orders(client)
+
+        response = client.get('/export/pdf?layout=receipts')
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+        assert response.mimetype == 'application/pdf'
+        assert 'attachment' in response.headers.get('Content-Disposition', '')
+        data = response.get_data()
+        assert data.startswith(b'%PDF')
+        assert int(response.headers['Content-Length']) == len(data)
+        assert len(PAGE_RE.findall(data)) == len(ids)
+
+        client.patch(f'/api/orders/{ids[0]}',
+            data=json.dumps({'status': 'готов'}),
+            content_type='application/json'
+        )
+        filtered = client.get('/export/pdf?layout=receipts&status=готов')
+        assert len(PAGE_RE.findall(filtered.get_data())) == 1
+
+        empty = client.get('/export/pdf?layout=receipts&date=2000-01-01')
+        assert empty.status_code == 200
+        assert len(PAGE_RE.findall(empty.get_data())) == 1
+
+        response.close()
+        filtered.close()
+        empty.close()
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_export_receipts_one_per_page passed")
+
+
+def test_export_pick_list():
+    """Test pick list layout renders a PDF and rejects unknown layouts and dates"""
+    app, db, db_fd, db_path = _setup_app()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+        _create_orders(client)
+
+        response = client.get('/export/pdf?layout=picklist&days=1')
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+        assert response.get_data().startswith(b'%PDF')
+
+        bad_layout = client.get('/export/pdf?layout=poster')
+        assert bad_layout.status_code == 400
+
+        bad_date = client.get('/export/pdf?date=31.12.2024')
+        assert bad_date.status_code == 400
+
+        response.close()
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_export_pick_list passed")
+
+
+def test_collect_pick_list_groups_parts():
+    """Test pick list sums quantities per part and keeps the order references"""
+    from models import Order
+    from utils.pdf_renderer import collect_pick_list
+
+    orders = [
+        Order(id=1, category='Тормоза', selected_parts=[{'name': 'Колодки', 'quantity': 2}, 'Диск']),
+        Order(id=2, category='Тормоза', selected_parts=[{'name': 'Колодки', 'quantity': 1}]),
+        Order(id=3, category='Двигатель', selected_parts=['Фильтр']),
+    ]
+
+    pick_list = collect_pick_list(orders)
+
+    assert pick_list['Тормоза']['Колодки'] == {'quantity': 3, 'orders': [1, 2]}
+    assert pick_list['Тормоза']['Диск'] == {'quantity': 1, 'orders': [1]}
+    assert pick_list['Двигатель']['Фильтр'] == {'quantity': 1, 'orders': [3]}
+    print("✅ test_collect_pick_list_groups_parts passed")
+
+
+def test_export_receipts_split_into_documents():
+    """Test receipts are split into documents of PDF_EXPORT_MAX_ORDERS orders selected with ?page=N"""
+    app, db, db_fd, db_path = _setup_app()
+
+    with app.app_context(), patch('config.PDF_EXPORT_MAX_ORDERS', 2):
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+        _create_orders(client)
+
+        first = client.get('/export/pdf?layout=receipts')
+        assert first.status_code == 200, f"Expected 200, got {first.status_code}"
+        assert (first.headers['X-Page'], first.headers['X-Page-Count']) == ('1', '2')
+        assert '_1of2.pdf' in first.headers['Content-Disposition']
+        assert len(PAGE_RE.findall(first.get_data())) == 2
+
+        second = client.get('/export/pdf?layout=receipts&page=2')
+        assert second.headers['X-Page'] == '2'
+        assert len(PAGE_RE.findall(second.get_data())) == 1
+
+        assert client.get('/export/pdf?layout=receipts&page=3').status_code == 404
+        assert client.get('/export/pdf?layout=receipts&page=0').status_code == 400
+
+        first.close()
+        second.close()
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_export_receipts_split_into_documents passed")
+
+
+def test_long_receipt_continues_on_next_page():
+    """Test a receipt with 85 parts breaks the page instead of drawing below the margin"""
+    from reportlab.lib.units import mm
+    from utils.pdf_renderer import draw_receipt, render_receipt_pdf
+
+    snapshot = {
+        'id': 7, 'created_at': '01.01.2024 10:00', 'mechanic_name': 'Иван', 'car_number': 'AB1234CD',
+        'vin': None, 'category': 'Тормоза', 'parts': [f'Запчасть {i}' for i in range(85)],
+        'is_original': False, 'status': 'новый',
+    }
+
+    canvas = Mock()
+    draw_receipt(canvas, snapshot, ('Helvetica', 'Helvetica-Bold'))
+    lines = canvas.drawString.call_args_list + canvas.drawCentredString.call_args_list
+    lowest = min(call.args[1] for call in lines)
+    assert lowest >= 20*mm, f"Text drawn below the bottom margin: y={lowest:.0f}"
+    assert canvas.showPage.call_count >= 2, "85 parts must continue on further pages"
+    assert sum(1 for call in canvas.drawString.call_args_list if 'Запчасть' in call.args[2]) == 85
+
+    pages = len(PAGE_RE.findall(render_receipt_pdf(snapshot)))
+    assert pages == canvas.showPage.call_count + 1, f"Unexpected page count {pages}"
+
+    print("✅ test_long_receipt_continues_on_next_page passed")
+
+
+def run_all_tests():
+    """Run all batch PDF export tests"""
+    print("\n" + "=" * 60)
+    print("Running Batch PDF Export Tests")
+    print("=" * 60 + "\n")
+
+    tests = [
+        test_export_receipts_one_per_page,
+        test_export_pick_list,
+        test_collect_pick_list_groups_parts,
+        test_export_receipts_split_into_documents,
+        test_long_receipt_continues_on_next_page
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60 + "\n")
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
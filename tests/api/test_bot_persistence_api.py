@@ -0,0 +1,193 @@
+"""
+API Contract Tests for Shared Bot Conversation State
+Tests that conversation steps and user_data survive a switch between workers.
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+from unittest.mock import AsyncMock, patch
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'felix_hub', 'backend'))
+
+ASK_VIN = 1
+_message_id = 0
+
+
+def _build_worker(app, handled):
+    """Отдельный Application с тем же диалогом, как в другом воркере"""
+    from telegram.ext import Application, ConversationHandler, MessageHandler, filters
+    from services.bot_persistence import SQLPersistence
+
+    async def start_order(update, context):
+        context.user_data['selected_parts'] = ['Передние колодки']
+        handled.append(('start', update.message.text))
+        return ASK_VIN
+
+    async def save_vin(update, context):
+        context.user_data['vin'] = update.message.text
+        handled.append(('vin', list(context.user_data['selected_parts'])))
+        return ConversationHandler.END
+
+    application = Application.builder().token('123456:TEST').persistence(SQLPersistence(app)).build()
+    application.add_handler(ConversationHandler(
+        entry_points=[MessageHandler(filters.Regex('^new$'), start_order)],
+        states={ASK_VIN: [MessageHandler(filters.TEXT, save_vin)]},
+        fallbacks=[],
+        name='order_conversation',
+        persistent=True
+    ))
+    return application
+
+
+def _text_update(bot, text, user_id=42):
+    from telegram import Update
+    global _message_id
+    _message_id += 1
+    return Update.de_json({
+        'update_id': 10000 + _message_id,
+        'message': {
+            'message_id': _message_id, 'date': 0, 'text': text,
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': 'Механик'},
+        }
+    }, bot)
+
+
+def _setup_db():
+    from app import app, db
+
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    return app, db, db_fd, db_path
+
+
+def test_conversation_continues_on_another_worker():
+    """Test a conversation started on one worker continues on the other"""
+    from services.bot_persistence import process_update_with_state
+    from models import BotState
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+    handled_a, handled_b = [], []
+    worker_a = _build_worker(app, handled_a)
+    worker_b = _build_worker(app, handled_b)
+
+    async def run():
+        with patch('telegram.Bot.initialize', AsyncMock()):
+            await worker_a.initialize()
+            await worker_b.initialize()
+        await process_update_with_state(worker_a, _text_update(worker_a.bot, 'new'))
+        await process_update_with_state(worker_b, _text_update(worker_b.bot, 'WVWZZZ1JZXW000001'))
+        # Диалог завершён на B: повторный текст на A не должен попасть в шаг VIN
+        await process_update_with_state(worker_a, _text_update(worker_a.bot, 'WVWZZZ1JZXW000002'))
+
+    asyncio.run(run())
+
+    assert handled_a == [('start', 'new')], f"Unexpected worker A calls: {handled_a}"
+    assert handled_b == [('vin', ['Передние колодки'])], f"Worker B must see A's step and user_data: {handled_b}"
+
+    with app.app_context():
+        user_row = db.session.get(BotState, ('user', '42'))
+        assert user_row is not None, "user_data must be stored"
+        assert 'WVWZZZ1JZXW000001' in user_row.data
+        assert BotState.query.filter_by(kind='conversation').count() == 0, "Ended conversation must be deleted"
+
+    print("✅ test_conversation_continues_on_another_worker passed")
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def test_writes_are_coalesced_and_reads_cached():
+    """Test one transaction per update and no data reload for an unchanged row"""
+    from services.bot_persistence import SQLPersistence, process_update_with_state
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+    handled = []
+    worker = _build_worker(app, handled)
+    persistence = worker.persistence
+
+    writes = []
+    reads = []
+    original_write = SQLPersistence._write
+    original_read = SQLPersistence._read
+
+    def counting_write(self, batch):
+        writes.append(sorted(kind for kind, _ in batch))
+        return original_write(self, batch)
+
+    def counting_read(self, keys, known):
+        result = original_read(self, keys, known)
+        reads.append(sorted(kind for kind, _ in result))
+        return result
+
+    async def run():
+        with patch('telegram.Bot.initialize', AsyncMock()):
+            await worker.initialize()
+        with patch.object(SQLPersistence, '_write', counting_write), \
+                patch.object(SQLPersistence, '_read', counting_read):
+            await process_update_with_state(worker, _text_update(worker.bot, 'new', user_id=77))
+            await process_update_with_state(worker, _text_update(worker.bot, 'VIN-77', user_id=77))
+
+    asyncio.run(run())
+
+    assert writes == [['conversation', 'user'], ['conversation', 'user']], \
+        f"Expected user_data and conversation written together once per update, got {writes}"
+    assert reads == [[], []], f"Rows written by this worker must not be reloaded, got {reads}"
+    assert handled[-1] == ('vin', ['Передние колодки'])
+    assert not persistence._pending
+
+    print("✅ test_writes_are_coalesced_and_reads_cached passed")
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def run_all_tests():
+    """Run all bot persistence tests"""
+    print("\n🧪 Running Shared Bot State Tests...\n")
+
+    tests = [
+        test_conversation_continues_on_another_worker,
+        test_writes_are_coalesced_and_reads_cached,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60 + "\n")
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
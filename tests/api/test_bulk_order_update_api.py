@@ -0,0 +1,218 @@
+"""
+API Contract Tests for Bulk Order Update
+Tests PATCH /api/orders/bulk: one transaction, batched prints and one notification per recipient.
+"""
+
+import sys
+import os
+import tempfile
+import json
+from unittest.mock import patch
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'felix_hub', 'backend'))
+
+os.environ.setdefault('ENABLE_CAR_NUMBER', 'true')
+os.environ.setdefault('ALLOW_ANY_CAR_NUMBER', 'false')
+
+
+def _create_order(client, telegram_id='123456'):
+    response = client.post('/api/orders',
+        data=json.dumps({
+            'mechanic_name': 'Test Mechanic',
+            'telegram_id': telegram_id,
+            'category': 'Тормоза',
+            'carNumber': 'AB1234CD',
+            'selected_parts': ['Передние колодки'],
+            'is_original': False
+        }),
+        content_type='application/json'
+    )
+    assert response.status_code == 201, f"Expected 201, got {response.status_code}"
+    return json.loads(response.data)['id']
+
+
+def _setup_db():
+    from app import app, db
+
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    return app, db, db_fd, db_path
+
+
+def _bulk(client, payload):
+    return client.patch('/api/orders/bulk',
+        data=json.dumps(payload),
+        content_type='application/json'
+    )
+
+
+def test_bulk_ready_queues_prints_and_collapses_notifications():
+    """Test bulk 'готов' queues one print job per order and one message per recipient"""
+    from models import PrintJob, OrderEvent
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+        first = [_create_order(client, '111') for _ in range(3)]
+        second = _create_order(client, '222')
+
+        with patch('utils.notifier.send_telegram_notification', return_value=True) as mock_send, \
+                patch('app.notify_order_ready') as mock_single:
+            response = _bulk(client, {'order_ids': first + [second, 99999], 'status': 'готов'})
+            assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+            mock_single.assert_not_called()
+
+        result = json.loads(response.data)
+        assert result['updated'] == first + [second]
+        assert result['not_found'] == [99999]
+        assert len(result['print_jobs']) == 4
+        assert result['notifications']['customers'] == 2
+
+        # Одно сообщение на получателя, три заказа свёрнуты в сводку
+        assert mock_send.call_count == 2
+        messages = {call.args[0]: call.args[1] for call in mock_send.call_args_list}
+        assert 'Изменён статус заказов: 3' in messages['111']
+        assert f'Заказ №{second}' in messages['222']
+
+        assert PrintJob.query.count() == 4
+        assert OrderEvent.query.filter_by(event_type='updated').count() == 4
+
+        # Повтор ничего не меняет и не дублирует задания печати
+        with patch('utils.notifier.send_telegram_notification', return_value=True) as mock_send:
+            repeat = json.loads(_bulk(client, {'order_ids': first, 'status': 'готов'}).data)
+            mock_send.assert_not_called()
+        assert repeat['updated'] == []
+        assert repeat['unchanged'] == first
+        assert PrintJob.query.count() == 4
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_bulk_ready_queues_prints_and_collapses_notifications passed")
+
+
+def test_bulk_notifies_each_mechanic_once():
+    """Test assigned mechanics get one digest each with a NotificationLog row per order"""
+    from models import Mechanic, Order, NotificationLog
+    from werkzeug.security import generate_password_hash
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+        mechanic = Mechanic(
+            email='bulk@example.com',
+            password_hash=generate_password_hash('password'),
+            name='Bulk',
+            telegram_id='555',
+            active=True
+        )
+        db.session.add(mechanic)
+        db.session.commit()
+
+        order_ids = [_create_order(client) for _ in range(5)]
+        Order.query.filter(Order.id.in_(order_ids)).update(
+            {'assigned_mechanic_id': mechanic.id}, synchronize_session=False
+        )
+        db.session.commit()
+
+        with patch('config.ENABLE_TG_MECH_NOTIFS', True), \
+                patch('services.telegram._get_bot_token', return_value='token'), \
+                patch('services.telegram._send_telegram_message', return_value=True) as mock_send, \
+                patch('utils.notifier.send_telegram_notification', return_value=True):
+            response = _bulk(client, {'order_ids': order_ids, 'status': 'выдан'})
+            assert response.status_code == 200
+
+        mock_send.assert_called_once()
+        assert mock_send.call_args.args[0] == '555'
+        assert 'Статус заказов изменён: 5' in mock_send.call_args.args[1]
+        assert json.loads(response.data)['print_jobs'] == []
+
+        logs = NotificationLog.query.filter_by(notification_type='mechanic_status_change').all()
+        assert sorted(log.order_id for log in logs) == order_ids
+        assert all(log.success for log in logs)
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_bulk_notifies_each_mechanic_once passed")
+
+
+def test_bulk_validation():
+    """Test invalid payloads are rejected without touching orders"""
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+        order_id = _create_order(client)
+
+        assert _bulk(client, {'order_ids': [order_id], 'status': 'потерян'}).status_code == 400
+        assert _bulk(client, {'order_ids': [], 'status': 'готов'}).status_code == 400
+        assert _bulk(client, {'order_ids': ['1'], 'status': 'готов'}).status_code == 400
+        assert _bulk(client, {'order_ids': list(range(1, 502)), 'status': 'готов'}).status_code == 400
+
+        order = json.loads(client.get(f'/api/orders/{order_id}').data)
+        assert order['status'] == 'новый'
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_bulk_validation passed")
+
+
+def run_all_tests():
+    """Run all bulk order update tests"""
+    print("\n" + "=" * 60)
+    print("Running Bulk Order Update Tests")
+    print("=" * 60 + "\n")
+
+    tests = [
+        test_bulk_ready_queues_prints_and_collapses_notifications,
+        test_bulk_notifies_each_mechanic_once,
+        test_bulk_validation
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60 + "\n")
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
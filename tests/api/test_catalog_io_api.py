@@ -0,0 +1,267 @@
+"""
+API Contract Tests for Bulk Catalog Import/Export
+Tests POST /api/catalog/import (CSV/JSON upsert), streaming GET /api/catalog/export
+and fingerprinted seeding of the canonical catalog.
+"""
+
+import sys
+import os
+import io
+import csv
+import time
+import tempfile
+import json
+from unittest.mock import patch
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'felix_hub', 'backend'))
+
+os.environ.setdefault('ENABLE_CAR_NUMBER', 'true')
+os.environ.setdefault('ALLOW_ANY_CAR_NUMBER', 'false')
+
+CSV_CATALOG = (
+    "category,category_he,category_en,category_icon,name_ru,name_he,name_en,is_common,sort_order\n"
+    "Тормоза,בלמים,Brakes,🛑,Передние колодки,רפידות קדמיות,Front pads,true,1\n"
+    "Тормоза,,,,Задние колодки,,Rear pads,,\n"
+    "Двигатель,מנוע,Engine,⚙️,Масляный фильтр,מסנן שמן,Oil filter,false,\n"
+    ",,,,Без категории,,,,\n"
+)
+
+
+def _setup_db():
+    from app import app, db
+
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    return app, db, db_fd, db_path
+
+
+def _import(client, body, fmt, dry_run=False):
+    url = f'/api/catalog/import?format={fmt}' + ('&dry_run=1' if dry_run else '')
+    return client.post(url, data=body, content_type='text/csv' if fmt == 'csv' else 'application/json')
+
+
+def test_import_csv_upserts_categories_and_parts():
+    """Test CSV import creates rows with translations and re-import updates in place"""
+    from models import Category, Part
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+
+        response = _import(client, CSV_CATALOG.encode('utf-8'), 'csv', dry_run=True)
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+        assert json.loads(response.data)['parts_created'] == 3
+        assert Part.query.count() == 0, "Dry run must not save anything"
+
+        response = _import(client, CSV_CATALOG.encode('utf-8'), 'csv')
+        stats = json.loads(response.data)
+        assert stats['categories_created'] == 2
+        assert stats['parts_created'] == 3
+        assert len(stats['errors']) == 1 and stats['errors'][0]['row'] == 4
+
+        brakes = Category.query.filter_by(name_ru='Тормоза').one()
+        assert (brakes.name_he, brakes.name_en, brakes.icon) == ('בלמים', 'Brakes', '🛑')
+        rear = Part.query.filter_by(name_ru='Задние колодки').one()
+        assert rear.category_id == brakes.id
+        assert rear.name_en == 'Rear pads'
+        assert rear.is_common is True
+        assert Part.query.filter_by(name_ru='Масляный фильтр').one().is_common is False
+
+        update = json.dumps([
+            {'category': 'Тормоза', 'name_ru': 'Задние колодки', 'name_he': 'רפידות אחוריות'},
+            {'category': 'Тормоза', 'name_ru': 'Передние колодки'},
+            {'category': 'Подвеска', 'category_en': 'Suspension', 'name_ru': 'Стойки', 'name_en': 'Struts'}
+        ])
+        stats = json.loads(_import(client, update, 'json').data)
+        assert stats['categories_created'] == 1
+        assert stats['parts_created'] == 1
+        assert stats['parts_updated'] == 1
+        assert stats['parts_unchanged'] == 1
+
+        db.session.expire_all()
+        rear = Part.query.filter_by(name_ru='Задние колодки').one()
+        assert rear.name_he == 'רפידות אחוריות'
+        assert rear.name_en == 'Rear pads', "Empty cells must not overwrite values"
+        assert Category.query.count() == 3
+        assert Part.query.count() == 4
+
+        assert _import(client, b'name;category', 'csv').status_code == 400
+        assert _import(client, b'{"parts": 1}', 'json').status_code == 400
+        assert client.post('/api/catalog/import?format=xml', data=b'<a/>').status_code == 400
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_import_csv_upserts_categories_and_parts passed")
+
+
+def test_export_round_trip():
+    """Test streamed CSV/JSON export can be imported back without changes"""
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+        _import(client, CSV_CATALOG.encode('utf-8'), 'csv')
+
+        response = client.get('/api/catalog/export?format=csv')
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert 'attachment' in response.headers['Content-Disposition']
+        exported = response.get_data()
+        rows = list(csv.DictReader(io.StringIO(exported.decode('utf-8-sig'))))
+        assert len(rows) == 3
+        assert rows[0]['category'] == 'Тормоза' and rows[0]['name_he'] == 'רפידות קדמיות'
+
+        stats = json.loads(_import(client, exported, 'csv').data)
+        assert stats['parts_unchanged'] == 3
+        assert stats['parts_created'] == 0 and stats['parts_updated'] == 0
+
+        response = client.get('/api/catalog/export?format=json')
+        rows = json.loads(response.get_data())
+        assert [row['name_ru'] for row in rows][:2] == ['Передние колодки', 'Задние колодки']
+
+        assert client.get('/api/catalog/export?format=xlsx').status_code == 400
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_export_round_trip passed")
+
+
+def test_import_large_supplier_catalog():
+    """Test 20k parts import in a few seconds"""
+    from models import Part
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        rows = [
+            {'category': f'Категория {i % 40}', 'name_ru': f'Деталь {i}', 'name_en': f'Part {i}'}
+            for i in range(20000)
+        ]
+        client = app.test_client()
+
+        started = time.monotonic()
+        stats = json.loads(_import(client, json.dumps(rows), 'json').data)
+        elapsed = time.monotonic() - started
+
+        assert stats['parts_created'] == 20000
+        assert stats['categories_created'] == 40
+        assert Part.query.count() == 20000
+        assert elapsed < 15, f"Import took {elapsed:.1f}s"
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print(f"✅ test_import_large_supplier_catalog passed ({elapsed:.1f}s)")
+
+
+def test_seed_catalog_fingerprint():
+    """Test canonical seeding runs once per fingerprint and unknown partIds fail fast"""
+    from app import ensure_part_catalog_seeded, _canonical_catalog_rows
+    from models import Category, Part, CatalogMeta
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        rows = _canonical_catalog_rows()
+        assert ensure_part_catalog_seeded() is True
+        assert Part.query.count() == len({(row['category'], row['name_ru']) for row in rows})
+        assert db.session.get(CatalogMeta, 'canonical_catalog_fingerprint') is not None
+        brakes = Category.query.filter_by(name_ru='Тормоза').one()
+        assert brakes.sort_order == 1
+
+        with patch('services.catalog_io.import_catalog') as mock_import:
+            assert ensure_part_catalog_seeded() is False
+            mock_import.assert_not_called()
+
+        # Изменённый каталог применяется пакетно, без дублей
+        changed = rows + [dict(rows[0], name_ru='Новая деталь', sort_order=99)]
+        with patch('app._canonical_catalog_rows', return_value=changed):
+            assert ensure_part_catalog_seeded() is True
+        assert Part.query.filter_by(category_id=brakes.id, name_ru='Новая деталь').count() == 1
+        assert Category.query.filter_by(name_ru='Тормоза').count() == 1
+
+        parts_before = Part.query.count()
+        client = app.test_client()
+        response = client.post('/api/orders',
+            data=json.dumps({
+                'mechanic_name': 'Test Mechanic',
+                'telegram_id': '123456',
+                'category': 'Тормоза',
+                'carNumber': 'AB1234CD',
+                'parts': [{'partId': 99999, 'quantity': 1}]
+            }),
+            content_type='application/json'
+        )
+        assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+        assert Part.query.count() == parts_before, "Unknown partId must not trigger a reseed"
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_seed_catalog_fingerprint passed")
+
+
+def run_all_tests():
+    """Run all catalog import/export tests"""
+    print("\n" + "=" * 60)
+    print("Running Catalog Import/Export Tests")
+    print("=" * 60 + "\n")
+
+    tests = [
+        test_import_csv_upserts_categories_and_parts,
+        test_export_round_trip,
+        test_import_large_supplier_catalog,
+        test_seed_catalog_fingerprint
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60 + "\n")
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,220 @@
+"""
+API Contract Tests for the Catalog Snapshot
+Tests GET /api/catalog/snapshot: one localized document with common parts,
+ETag revalidation and server-side caching per catalog version.
+"""
+
+import sys
+import os
+import json
+import tempfile
+from unittest.mock import patch
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'felix_hub', 'backend'))
+
+
+def _setup_db():
+    from app import app, db
+    from services.catalog_snapshot import clear_catalog_documents
+
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    clear_catalog_documents()
+    return app, db, db_fd, db_path
+
+
+def _post(client, url, payload):
+    response = client.post(url, data=json.dumps(payload), content_type='application/json')
+    assert response.status_code == 201, f"Expected 201 from {url}, got {response.status_code}"
+    return json.loads(response.data)['id']
+
+
+def _seed(client):
+    brakes = _post(client, '/api/categories', {'name_ru': 'Тормоза', 'name_en': 'Brakes', 'icon': '🔧'})
+    engine = _post(client, '/api/categories', {'name_ru': 'Двигатель', 'icon': '⚙️', 'sort_order': 1})
+    _post(client, '/api/parts', {'category_id': brakes, 'name_ru': 'Передние колодки', 'name_en': 'Front pads'})
+    _post(client, '/api/parts', {'category_id': brakes, 'name_ru': 'Суппорт', 'is_common': False})
+    _post(client, '/api/parts', {'category_id': engine, 'name_ru': 'Помпа'})
+    return brakes, engine
+
+
+def test_snapshot_is_localized_and_filtered():
+    """Test the snapshot holds every category with its common parts in the requested language"""
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        client = app.test_client()
+        brakes, engine = _seed(client)
+
+        response = client.get('/api/catalog/snapshot?lang=en')
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+        assert response.headers.get('ETag'), "Snapshot must carry an ETag"
+        body = response.get_data()
+        assert b': ' not in body and b', ' not in body, "Snapshot must be compact JSON"
+
+        document = json.loads(body)
+        assert document['lang'] == 'en'
+        assert document['version'] == response.headers['X-Catalog-Version']
+        assert [c['id'] for c in document['categories']] == [brakes, engine]
+        assert document['categories'][0]['name'] == 'Brakes'
+        assert document['categories'][0]['name_ru'] == 'Тормоза'
+        assert document['categories'][0]['icon'] == '🔧'
+        assert [p['name'] for p in document['categories'][0]['parts']] == ['Front pads'], \
+            "Only common parts, in the requested language"
+        assert document['categories'][1]['name'] == 'Двигатель', "Missing translation falls back to ru"
+        assert [p['name'] for p in document['categories'][1]['parts']] == ['Помпа']
+
+        assert client.get('/api/catalog/snapshot?lang=de').status_code == 400
+
+        print("✅ test_snapshot_is_localized_and_filtered passed")
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def test_snapshot_revalidates_with_etag():
+    """Test If-None-Match gets 304 until the catalog changes"""
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        client = app.test_client()
+        brakes, _ = _seed(client)
+
+        first = client.get('/api/catalog/snapshot?lang=ru')
+        etag = first.headers['ETag']
+
+        not_modified = client.get('/api/catalog/snapshot?lang=ru', headers={'If-None-Match': etag})
+        assert not_modified.status_code == 304, f"Expected 304, got {not_modified.status_code}"
+        assert not_modified.get_data() == b''
+
+        other_language = client.get('/api/catalog/snapshot?lang=en', headers={'If-None-Match': etag})
+        assert other_language.status_code == 200, "ETag must differ between languages"
+
+        client.patch(f'/api/categories/{brakes}', data=json.dumps({'name_ru': 'Тормозная система'}),
+                     content_type='application/json')
+        changed = client.get('/api/catalog/snapshot?lang=ru', headers={'If-None-Match': etag})
+        assert changed.status_code == 200, "A renamed category must invalidate the snapshot"
+        assert changed.headers['ETag'] != etag
+        assert json.loads(changed.data)['categories'][0]['name'] == 'Тормозная система'
+
+        print("✅ test_snapshot_revalidates_with_etag passed")
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def test_compressed_snapshot_revalidates():
+    """Test the weak ETag of a gzipped snapshot, sent back as-is, gets 304"""
+    import gzip
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context(), patch('config.COMPRESSION_MIN_SIZE', 0):
+        db.drop_all()
+        db.create_all()
+        client = app.test_client()
+        _seed(client)
+
+        # Как бот через requests: Accept-Encoding: gzip в каждом запросе
+        headers = {'Accept-Encoding': 'gzip'}
+        first = client.get('/api/catalog/snapshot?lang=ru', headers=headers)
+        assert first.headers.get('Content-Encoding') == 'gzip'
+        etag = first.headers['ETag']
+        assert etag.startswith('W/'), f"Expected weak ETag, got {etag}"
+        json.loads(gzip.decompress(first.data))
+
+        revalidated = client.get('/api/catalog/snapshot?lang=ru', headers={**headers, 'If-None-Match': etag})
+        assert revalidated.status_code == 304, f"Expected 304, got {revalidated.status_code}"
+        assert revalidated.get_data() == b''
+
+        print("✅ test_compressed_snapshot_revalidates passed")
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def test_serialized_snapshot_is_cached_per_version():
+    """Test the document is built once per language and catalog version"""
+    import services.catalog_snapshot as catalog_snapshot
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        client = app.test_client()
+        brakes, _ = _seed(client)
+
+        with patch.object(catalog_snapshot, 'build_catalog_document',
+                          wraps=catalog_snapshot.build_catalog_document) as build:
+            for _ in range(3):
+                assert client.get('/api/catalog/snapshot?lang=ru').status_code == 200
+            client.get('/api/catalog/snapshot?lang=he')
+            assert build.call_count == 2, f"Expected one build per language, got {build.call_count}"
+
+            _post(client, '/api/parts', {'category_id': brakes, 'name_ru': 'Задние колодки'})
+            document = json.loads(client.get('/api/catalog/snapshot?lang=ru').data)
+            assert build.call_count == 3, "A new part must rebuild the snapshot"
+            assert 'Задние колодки' in [p['name'] for p in document['categories'][0]['parts']]
+
+        print("✅ test_serialized_snapshot_is_cached_per_version passed")
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def run_all_tests():
+    """Run all catalog snapshot tests"""
+    print("\n🧪 Running Catalog Snapshot Tests...\n")
+
+    tests = [
+        test_snapshot_is_localized_and_filtered,
+        test_snapshot_revalidates_with_etag,
+        test_compressed_snapshot_revalidates,
+        test_serialized_snapshot_is_cached_per_version,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60 + "\n")
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
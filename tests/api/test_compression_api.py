@@ -0,0 +1,175 @@
+"""
+API Contract Tests for Response Compression
+Tests gzip negotiation for JSON responses and precompressed static assets.
+"""
+
+import sys
+import os
+import gzip
+import tempfile
+import json
+from unittest.mock import patch
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'felix_hub', 'backend'))
+
+# Set environment variables before importing app
+os.environ.setdefault('ENABLE_CAR_NUMBER', 'true')
+os.environ.setdefault('ALLOW_ANY_CAR_NUMBER', 'false')
+
+
+def _create_orders(client, count):
+    for i in range(count):
+        client.post('/api/orders',
+            data=json.dumps({
+                'mechanic_name': f'Mechanic {i}',
+                'telegram_id': f'10000{i}',
+                'category': 'Тормоза',
+                'carNumber': f'AB{i:04d}CD',
+                'selected_parts': ['Передние колодки', 'Диски передние', 'Тормозная жидкость'],
+                'is_original': False
+            }),
+            content_type='application/json'
+        )
+
+
+def test_json_list_gzip():
+    """Test GET /api/orders is gzip-compressed when client accepts gzip"""
+    from app import app, db
+
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+        _create_orders(client, 20)
+
+        plain = client.get('/api/orders')
+        assert plain.status_code == 200
+        assert 'Content-Encoding' not in plain.headers, "Response without Accept-Encoding must not be compressed"
+
+        response = client.get('/api/orders', headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        assert response.headers.get('Content-Encoding') == 'gzip', f"Expected gzip, got {response.headers.get('Content-Encoding')}"
+        assert 'Accept-Encoding' in response.headers.get('Vary', '')
+
+        body = gzip.decompress(response.data)
+        assert json.loads(body) == json.loads(plain.data)
+        assert len(response.data) * 3 < len(plain.data), \
+            f"Expected at least 3x reduction, got {len(plain.data)} -> {len(response.data)}"
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_json_list_gzip passed")
+
+
+def test_small_response_not_compressed():
+    """Test responses below COMPRESSION_MIN_SIZE are sent as-is"""
+    from app import app
+
+    client = app.test_client()
+    response = client.get('/api/config/feature-flags', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+    json.loads(response.data)
+    print("✅ test_small_response_not_compressed passed")
+
+
+def test_static_asset_precompressed():
+    """Test static admin assets are served precompressed with weak ETag"""
+    from app import app
+
+    client = app.test_client()
+
+    plain = client.get('/static/admin.js')
+    assert plain.status_code == 200
+    assert 'Content-Encoding' not in plain.headers
+
+    response = client.get('/static/admin.js', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.status_code == 200
+    assert response.headers.get('Content-Encoding') == 'gzip'
+    assert gzip.decompress(response.data) == plain.data
+    assert int(response.headers['Content-Length']) == len(response.data)
+
+    etag = response.headers.get('ETag')
+    assert etag and etag.startswith('W/'), f"Expected weak ETag, got {etag}"
+
+    cached = client.get('/static/admin.js', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert cached.status_code == 304, f"Expected 304, got {cached.status_code}"
+
+    plain.close()
+    response.close()
+    cached.close()
+    print("✅ test_static_asset_precompressed passed")
+
+
+def test_encoding_honours_q_values():
+    """Test Accept-Encoding q-values win over the br preference, which only breaks ties"""
+    from werkzeug.http import parse_accept_header
+    from werkzeug.datastructures import Accept
+    import utils.compression as compression
+
+    def choose(header):
+        return compression.choose_encoding(parse_accept_header(header, Accept))
+
+    with patch.object(compression, 'BROTLI_AVAILABLE', True):
+        assert choose('gzip;q=1.0, br;q=0.5') == 'gzip'
+        assert choose('gzip, br') == 'br'
+        assert choose('br;q=0.8, gzip;q=0.8') == 'br'
+        assert choose('br;q=0, gzip') == 'gzip'
+        assert choose('identity') is None
+
+    with patch.object(compression, 'BROTLI_AVAILABLE', False):
+        assert choose('br') is None
+        assert choose('br, gzip;q=0.1') == 'gzip'
+
+    print("✅ test_encoding_honours_q_values passed")
+
+
+def run_all_tests():
+    """Run all compression tests"""
+    print("\n" + "=" * 60)
+    print("Running Response Compression Tests")
+    print("=" * 60 + "\n")
+
+    tests = [
+        test_json_list_gzip,
+        test_small_response_not_compressed,
+        test_static_asset_precompressed,
+        test_encoding_honours_q_values
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60 + "\n")
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
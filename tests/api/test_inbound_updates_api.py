@@ -0,0 +1,353 @@
+"""
+API Contract Tests for the Inbound Telegram Update Queue
+Tests that /webhook only stores updates in queue mode and the consumer drains them.
+"""
+
+import sys
+import os
+import json
+import asyncio
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'felix_hub', 'backend'))
+
+
+class _FakeTelegramApp:
+    """Заменяет telegram Application: записывает обработанные update_id"""
+
+    def __init__(self, failing=()):
+        from telegram import Bot
+        self.bot = Bot('123456:TEST')
+        self.failing = set(failing)
+        self.processed = []
+        self.running = 0
+        self.max_running = 0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def process_update(self, update):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(0.02)
+            if update.update_id in self.failing:
+                raise RuntimeError('handler crashed')
+            self.processed.append(update.update_id)
+        finally:
+            self.running -= 1
+
+
+class _FailOnceTelegramApp(_FakeTelegramApp):
+    """Падает только на первой попытке апдейтов из failing"""
+
+    async def process_update(self, update):
+        if update.update_id in self.failing:
+            self.failing.discard(update.update_id)
+            raise RuntimeError('handler crashed')
+        await super().process_update(update)
+
+
+def _message(update_id, chat_id):
+    return {'update_id': update_id, 'message': {'message_id': update_id, 'date': 0,
+            'chat': {'id': chat_id, 'type': 'private'}, 'text': str(update_id)}}
+
+
+def _setup_db():
+    from app import app, db
+
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    return app, db, db_fd, db_path
+
+
+def _drain(app, fake_app, parallelism, expected_rows):
+    """Запустить consumer и остановить, когда все строки завершены"""
+    from models import InboundUpdate
+    from services.inbound_updates import consume_updates
+
+    async def run():
+        stop = asyncio.Event()
+
+        async def watch():
+            while True:
+                await asyncio.sleep(0.02)
+                done = await asyncio.to_thread(_finished_count, app, InboundUpdate)
+                if done >= expected_rows:
+                    stop.set()
+                    return
+
+        watcher = asyncio.create_task(watch())
+        await asyncio.wait_for(consume_updates(app, fake_app, parallelism, stop), timeout=10)
+        await watcher
+
+    asyncio.run(run())
+
+
+def _finished_count(app, model):
+    from models import db
+    with app.app_context():
+        try:
+            return model.query.filter(model.status.in_(('done', 'failed'))).count()
+        finally:
+            db.session.remove()
+
+
+def test_webhook_queue_mode_stores_raw_update():
+    """Test /webhook stores the raw JSON without a running bot and skips duplicates"""
+    import app as app_module
+    from models import InboundUpdate
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        payload = {'update_id': 5001, 'message': {'message_id': 1, 'date': 0,
+                   'chat': {'id': 42, 'type': 'private'}, 'text': 'привет'}}
+        with patch.object(app_module.config, 'WEBHOOK_PROCESSING', 'queue'), \
+                patch.object(app_module, 'telegram_app', None), \
+                patch.object(app_module, 'telegram_loop', None):
+            client = app.test_client()
+            response = client.post('/webhook', data=json.dumps(payload), content_type='application/json')
+            assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+            assert json.loads(response.data).get('queued') is True
+
+            duplicate = client.post('/webhook', data=json.dumps(payload), content_type='application/json')
+            assert json.loads(duplicate.data).get('duplicate') is True
+
+            health = json.loads(client.get('/health').data)
+            assert health['webhook'] == {'mode': 'queue', 'queued': 1}, f"Unexpected health: {health['webhook']}"
+
+        rows = InboundUpdate.query.all()
+        assert len(rows) == 1, f"Expected one queued row, got {len(rows)}"
+        assert rows[0].status == 'queued'
+        assert rows[0].update_id == 5001
+        assert json.loads(rows[0].payload) == payload, "Payload must be stored as received"
+
+        print("✅ test_webhook_queue_mode_stores_raw_update passed")
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def test_consumer_drains_queue_in_parallel():
+    """Test the consumer processes queued updates concurrently and retries failures"""
+    from models import InboundUpdate
+    from services.inbound_updates import enqueue_update
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for update_id in range(6001, 6007):
+            enqueue_update({'update_id': update_id})
+        db.session.commit()
+
+    fake_app = _FakeTelegramApp(failing={6003})
+    with patch('config.INBOUND_UPDATE_MAX_ATTEMPTS', 2), patch('config.INBOUND_UPDATE_POLL_INTERVAL', 0.01), \
+            patch('config.INBOUND_UPDATE_RETRY_BACKOFF_SECONDS', 0):
+        _drain(app, fake_app, parallelism=3, expected_rows=6)
+
+    with app.app_context():
+        assert sorted(fake_app.processed) == [6001, 6002, 6004, 6005, 6006]
+        assert fake_app.max_running > 1, "Expected updates processed concurrently"
+        assert fake_app.max_running <= 3, f"Parallelism exceeded: {fake_app.max_running}"
+
+        failed = InboundUpdate.query.filter_by(update_id=6003).one()
+        assert failed.status == 'failed', f"Expected failed, got {failed.status}"
+        assert failed.attempts == 2, f"Expected 2 attempts, got {failed.attempts}"
+        assert 'handler crashed' in failed.last_error
+        assert InboundUpdate.query.filter_by(status='done').count() == 5
+
+        print("✅ test_consumer_drains_queue_in_parallel passed")
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def test_stale_claims_are_requeued_and_finished_rows_pruned():
+    """Test a claim abandoned by a dead consumer returns to the queue"""
+    from models import InboundUpdate
+    from services.inbound_updates import (enqueue_update, claim_next_update, finish_update,
+                                          requeue_stale_updates, prune_finished_updates, queue_depth)
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        enqueue_update({'update_id': 7001})
+        enqueue_update({'update_id': 7002})
+        db.session.commit()
+
+        first = claim_next_update()
+        second = claim_next_update()
+        assert (first.update_id, second.update_id) == (7001, 7002), "Expected claims in arrival order"
+        assert claim_next_update() is None, "A claimed update must not be claimed twice"
+
+        first.claimed_at = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+        assert requeue_stale_updates() == 1
+        assert queue_depth() == 1
+
+        second_id = second.id
+        finish_update(second_id)
+        second = db.session.get(InboundUpdate, second_id)
+        second.finished_at = datetime.utcnow() - timedelta(days=2)
+        db.session.commit()
+        assert prune_finished_updates() == 1
+        assert db.session.get(InboundUpdate, second_id) is None
+
+        print("✅ test_stale_claims_are_requeued_and_finished_rows_pruned passed")
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def test_updates_of_one_chat_keep_their_order():
+    """Test a slow claim or a retry never lets a later update of the same chat run first"""
+    import services.inbound_updates as inbound_updates
+    from models import InboundUpdate
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for update_id, chat_id in ((8001, 42), (8002, 42), (8003, 77)):
+            inbound_updates.enqueue_update(_message(update_id, chat_id))
+        db.session.commit()
+        assert [row.chat_id for row in InboundUpdate.query.order_by(InboundUpdate.id)] == [42, 42, 77]
+
+    claim_next_update = inbound_updates.claim_next_update
+    slowed = []
+
+    def slow_first_claim():
+        entry = claim_next_update()
+        if entry is not None and entry.update_id == 8001 and not slowed:
+            # Поток первого consumer задерживается уже после захвата строки
+            slowed.append(entry.update_id)
+            time.sleep(0.2)
+        return entry
+
+    fake_app = _FailOnceTelegramApp(failing={8001})
+    with patch.object(inbound_updates, 'claim_next_update', slow_first_claim), \
+            patch('config.INBOUND_UPDATE_POLL_INTERVAL', 0.01), \
+            patch('config.INBOUND_UPDATE_RETRY_BACKOFF_SECONDS', 0):
+        _drain(app, fake_app, parallelism=3, expected_rows=3)
+
+    with app.app_context():
+        assert fake_app.processed[0] == 8003, "Other chats must not wait for a slow claim"
+        assert [u for u in fake_app.processed if u != 8003] == [8001, 8002], \
+            f"Same-chat updates reordered: {fake_app.processed}"
+        retried = InboundUpdate.query.filter_by(update_id=8001).one()
+        assert (retried.status, retried.attempts) == ('done', 2)
+
+        print("✅ test_updates_of_one_chat_keep_their_order passed")
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def test_failed_update_waits_for_backoff():
+    """Test a failed update is retried only after the backoff and holds back its chat"""
+    from models import InboundUpdate
+    from services.inbound_updates import enqueue_update, claim_next_update, finish_update
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        enqueue_update(_message(9001, 42))
+        enqueue_update(_message(9002, 42))
+        db.session.commit()
+
+        first = claim_next_update()
+        assert first.update_id == 9001
+        assert claim_next_update() is None, "The next update of the chat must wait for the running one"
+
+        with patch('config.INBOUND_UPDATE_RETRY_BACKOFF_SECONDS', 60):
+            finish_update(first.id, 'handler crashed')
+        first = db.session.get(InboundUpdate, first.id)
+        assert first.status == 'queued'
+        assert first.next_attempt_at > datetime.utcnow() + timedelta(seconds=30)
+        assert claim_next_update() is None, "Neither the backed-off update nor its successor is claimable"
+
+        first.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+        assert claim_next_update().update_id == 9001
+
+        print("✅ test_failed_update_waits_for_backoff passed")
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def test_worker_never_polls_next_to_a_webhook():
+    """Test the Procfile worker picks one receiver: queue, idle next to a webhook, or polling"""
+    import update_worker
+
+    with patch.object(update_worker.config, 'WEBHOOK_PROCESSING', 'queue'), \
+            patch.dict(os.environ, {'WEBHOOK_URL': 'https://example.com'}):
+        assert update_worker.worker_mode() == 'queue'
+
+    with patch.object(update_worker.config, 'WEBHOOK_PROCESSING', 'inline'):
+        with patch.dict(os.environ, {'WEBHOOK_URL': 'https://example.com'}):
+            assert update_worker.worker_mode() == 'webhook', "Polling would delete the webhook"
+        with patch.dict(os.environ, {'WEBHOOK_URL': ''}):
+            assert update_worker.worker_mode() == 'polling'
+
+    print("✅ test_worker_never_polls_next_to_a_webhook passed")
+
+
+def run_all_tests():
+    """Run all inbound update queue tests"""
+    print("\n🧪 Running Inbound Update Queue Tests...\n")
+
+    tests = [
+        test_webhook_queue_mode_stores_raw_update,
+        test_consumer_drains_queue_in_parallel,
+        test_stale_claims_are_requeued_and_finished_rows_pruned,
+        test_updates_of_one_chat_keep_their_order,
+        test_failed_update_waits_for_backoff,
+        test_worker_never_polls_next_to_a_webhook,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60 + "\n")
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,178 @@
+"""
+API Contract Tests for Mechanic Delta Sync
+Tests GET /api/mechanic/orders/sync with updated_since cursor and tombstones.
+"""
+
+import sys
+import os
+import tempfile
+import json
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'felix_hub', 'backend'))
+
+os.environ.setdefault('ENABLE_CAR_NUMBER', 'true')
+os.environ.setdefault('ALLOW_ANY_CAR_NUMBER', 'false')
+
+
+def _create_mechanic(db, email):
+    from models import Mechanic
+    from werkzeug.security import generate_password_hash
+
+    mechanic = Mechanic(
+        email=email,
+        password_hash=generate_password_hash('password'),
+        name=email.split('@')[0],
+        active=True
+    )
+    db.session.add(mechanic)
+    db.session.commit()
+    return mechanic.id
+
+
+def _auth(mechanic_id):
+    from auth import generate_jwt_token
+    return {'Authorization': f'Bearer {generate_jwt_token(mechanic_id)}'}
+
+
+def _sync(client, mechanic_id, cursor=None):
+    url = '/api/mechanic/orders/sync'
+    if cursor:
+        url += f'?updated_since={cursor}'
+    response = client.get(url, headers=_auth(mechanic_id))
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    return json.loads(response.data)
+
+
+def test_delta_sync_with_tombstones():
+    """Test full snapshot, empty delta, and tombstone after reassignment"""
+    from app import app, db
+    import config
+
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+
+    original_overlap = config.MECHANIC_SYNC_OVERLAP_SECONDS
+    config.MECHANIC_SYNC_OVERLAP_SECONDS = 0
+
+    try:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+
+            client = app.test_client()
+            first_id = _create_mechanic(db, 'first@example.com')
+            second_id = _create_mechanic(db, 'second@example.com')
+
+            response = client.post('/api/orders',
+                data=json.dumps({
+                    'mechanic_name': 'Test Mechanic',
+                    'telegram_id': '123456',
+                    'category': 'Тормоза',
+                    'carNumber': 'AB1234CD',
+                    'selected_parts': ['Передние колодки'],
+                    'is_original': False
+                }),
+                content_type='application/json'
+            )
+            order_id = json.loads(response.data)['id']
+            client.post(f'/api/admin/orders/{order_id}/assign',
+                data=json.dumps({'mechanic_id': first_id}),
+                content_type='application/json'
+            )
+
+            snapshot = _sync(client, first_id)
+            assert snapshot['reset'] is True
+            assert [o['id'] for o in snapshot['orders']] == [order_id]
+            assert snapshot['deleted'] == []
+
+            second_snapshot = _sync(client, second_id)
+            assert second_snapshot['orders'] == []
+
+            idle = _sync(client, first_id, snapshot['cursor'])
+            assert idle['reset'] is False
+            assert idle['orders'] == []
+            assert idle['deleted'] == []
+
+            response = client.patch(f'/api/mechanic/orders/{order_id}/status',
+                data=json.dumps({'status': 'в работе'}),
+                content_type='application/json',
+                headers=_auth(first_id)
+            )
+            assert response.status_code == 200
+
+            delta = _sync(client, first_id, idle['cursor'])
+            assert [o['id'] for o in delta['orders']] == [order_id]
+            assert delta['orders'][0]['work_status'] == 'в работе'
+
+            client.post(f'/api/admin/orders/{order_id}/reassign',
+                data=json.dumps({'mechanic_id': second_id}),
+                content_type='application/json'
+            )
+
+            removed = _sync(client, first_id, delta['cursor'])
+            assert removed['orders'] == []
+            assert removed['deleted'] == [order_id]
+
+            received = _sync(client, second_id, second_snapshot['cursor'])
+            assert [o['id'] for o in received['orders']] == [order_id]
+            assert received['deleted'] == []
+
+            db.session.remove()
+            db.drop_all()
+    finally:
+        config.MECHANIC_SYNC_OVERLAP_SECONDS = original_overlap
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_delta_sync_with_tombstones passed")
+
+
+def test_invalid_cursor():
+    """Test malformed updated_since is rejected"""
+    from app import app
+
+    client = app.test_client()
+    response = client.get('/api/mechanic/orders/sync?updated_since=yesterday', headers=_auth(1))
+    assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+    print("✅ test_invalid_cursor passed")
+
+
+def run_all_tests():
+    """Run all mechanic sync tests"""
+    print("\n" + "=" * 60)
+    print("Running Mechanic Delta Sync Tests")
+    print("=" * 60 + "\n")
+
+    tests = [
+        test_delta_sync_with_tombstones,
+        test_invalid_cursor
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60 + "\n")
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,163 @@
+"""
+API Contract Tests for Order Change Feed
+Tests GET /api/orders/changes versioning on order create/update/delete.
+"""
+
+import sys
+import os
+import tempfile
+import json
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'felix_hub', 'backend'))
+
+# Set environment variables before importing app
+os.environ.setdefault('ENABLE_CAR_NUMBER', 'true')
+os.environ.setdefault('ALLOW_ANY_CAR_NUMBER', 'false')
+
+
+def _create_order(client):
+    response = client.post('/api/orders',
+        data=json.dumps({
+            'mechanic_name': 'Test Mechanic',
+            'telegram_id': '123456',
+            'category': 'Тормоза',
+            'carNumber': 'AB1234CD',
+            'selected_parts': ['Передние колодки'],
+            'is_original': False
+        }),
+        content_type='application/json'
+    )
+    assert response.status_code == 201, f"Expected 201, got {response.status_code}"
+    return json.loads(response.data)['id']
+
+
+def test_change_feed_versions():
+    """Test version grows on create/update/delete and events are returned"""
+    from app import app, db
+
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+
+        response = client.get('/api/orders/changes')
+        assert response.status_code == 200
+        start = json.loads(response.data)
+        assert start['version'] == 0
+        assert start['changed'] is False
+
+        order_id = _create_order(client)
+        client.patch(f'/api/orders/{order_id}',
+            data=json.dumps({'status': 'в работе'}),
+            content_type='application/json'
+        )
+
+        response = client.get(f"/api/orders/changes?since={start['version']}")
+        feed = json.loads(response.data)
+        assert feed['changed'] is True
+        assert feed['truncated'] is False
+        assert [e['event_type'] for e in feed['events']] == ['created', 'updated']
+        assert all(e['order_id'] == order_id for e in feed['events'])
+        assert feed['version'] == feed['events'][-1]['version']
+
+        # Без изменений - пустой ответ
+        response = client.get(f"/api/orders/changes?since={feed['version']}")
+        idle = json.loads(response.data)
+        assert idle['changed'] is False
+        assert idle['events'] == []
+        assert idle['version'] == feed['version']
+
+        client.delete(f'/api/orders/{order_id}')
+        response = client.get(f"/api/orders/changes?since={feed['version']}")
+        deleted = json.loads(response.data)
+        assert deleted['changed'] is True
+        assert [e['event_type'] for e in deleted['events']] == ['deleted']
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_change_feed_versions passed")
+
+
+def test_change_feed_truncated():
+    """Test truncated flag when more events than CHANGE_FEED_MAX_EVENTS"""
+    from app import app, db
+    import config
+
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+
+    original_limit = config.CHANGE_FEED_MAX_EVENTS
+    config.CHANGE_FEED_MAX_EVENTS = 2
+
+    try:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+
+            client = app.test_client()
+            for _ in range(3):
+                _create_order(client)
+
+            response = client.get('/api/orders/changes?since=0')
+            feed = json.loads(response.data)
+            assert feed['truncated'] is True
+            assert len(feed['events']) == 2
+            assert feed['version'] == 3
+
+            db.session.remove()
+            db.drop_all()
+    finally:
+        config.CHANGE_FEED_MAX_EVENTS = original_limit
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_change_feed_truncated passed")
+
+
+def run_all_tests():
+    """Run all change feed tests"""
+    print("\n" + "=" * 60)
+    print("Running Order Change Feed Tests")
+    print("=" * 60 + "\n")
+
+    tests = [
+        test_change_feed_versions,
+        test_change_feed_truncated
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60 + "\n")
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,261 @@
+"""
+API Contract Tests for Order Photos
+Tests that photos uploaded with POST /api/mechanic/orders are compressed and
+thumbnailed by the photo worker, deduplicated by content hash and served from
+/media/photos with long-lived cache headers.
+"""
+
+import io
+import sys
+import os
+import json
+import shutil
+import tempfile
+from unittest.mock import patch
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'felix_hub', 'backend'))
+
+
+def _setup_db():
+    from app import app, db
+
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    return app, db, db_fd, db_path
+
+
+def _photo_bytes(size=(3000, 2000), orientation=None):
+    """JPEG как с телефона: крупный, с поворотом в EXIF"""
+    from PIL import Image
+
+    image = Image.effect_noise(size, 40).convert('RGB')
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=95, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def _seed(db):
+    from models import Mechanic, Category, Part
+    from auth import generate_jwt_token
+    from werkzeug.security import generate_password_hash
+
+    mechanic = Mechanic(email='photo@example.com', password_hash=generate_password_hash('x'), name='Фото', active=True)
+    category = Category(name_ru='Тормоза')
+    db.session.add_all([mechanic, category])
+    db.session.flush()
+    part = Part(category_id=category.id, name_ru='Передние колодки')
+    db.session.add(part)
+    db.session.commit()
+    return {'Authorization': f'Bearer {generate_jwt_token(mechanic.id)}'}, category.id, part.id
+
+
+def _create_order(client, headers, category_id, part_id, photo, filename='IMG_0001.jpg'):
+    response = client.post('/api/mechanic/orders', data={
+        'category_id': str(category_id),
+        'part_ids': json.dumps([part_id]),
+        'vin': 'WVWZZZ1KZAW000001',
+        'part_type': 'original',
+        'photo': (io.BytesIO(photo), filename),
+    }, headers=headers, content_type='multipart/form-data')
+    assert response.status_code == 201, f"Expected 201, got {response.status_code}: {response.data}"
+    return json.loads(response.data)
+
+
+def _with_photo_dirs(test):
+    """Каталоги загрузок и обработанных фото — временные"""
+    import services.photo_pipeline as photo_pipeline
+
+    def wrapper():
+        uploads = tempfile.mkdtemp()
+        photos = tempfile.mkdtemp()
+        try:
+            with patch.object(photo_pipeline, 'UPLOAD_DIR', uploads), \
+                    patch('config.PHOTO_STORAGE_DIR', photos):
+                test(uploads, photos)
+        finally:
+            shutil.rmtree(uploads, ignore_errors=True)
+            shutil.rmtree(photos, ignore_errors=True)
+
+    wrapper.__name__ = test.__name__
+    wrapper.__doc__ = test.__doc__
+    return wrapper
+
+
+@_with_photo_dirs
+def test_photo_is_processed_off_request_path(uploads, photos):
+    """Test the upload is stored as-is and replaced by a compressed image and thumbnail"""
+    from PIL import Image
+    from models import Order, PhotoJob, OrderEvent
+    from services.photo_pipeline import process_next_photo_job
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        client = app.test_client()
+        headers, category_id, part_id = _seed(db)
+
+        photo = _photo_bytes(orientation=6)
+        created = _create_order(client, headers, category_id, part_id, photo)
+        assert created['photo_url'].startswith('/static/uploads/'), "The raw upload is served until processed"
+        assert created['photo_thumb_url'] is None
+        assert PhotoJob.query.filter_by(order_id=created['id'], status='queued').count() == 1
+        assert len(os.listdir(uploads)) == 1
+
+        job = process_next_photo_job()
+        assert job.status == 'done', f"Expected done, got {job.status}: {job.last_error}"
+        assert process_next_photo_job() is None
+
+        order = db.session.get(Order, created['id'])
+        assert order.photo_url == f'/media/photos/{job.content_hash}.jpg'
+        assert order.photo_thumb_url == f'/media/photos/{job.content_hash}_240.jpg'
+        assert os.listdir(uploads) == [], "The raw upload must be removed after processing"
+        assert OrderEvent.query.filter_by(order_id=order.id, event_type='updated').count() == 1, \
+            "Clients must see the new photo URLs through the change feed"
+
+        main_path = os.path.join(photos, f'{job.content_hash}.jpg')
+        with Image.open(main_path) as main:
+            assert main.size == (1067, 1600), f"EXIF rotation and downscale expected, got {main.size}"
+            assert not main.getexif(), "EXIF must not be copied into the processed image"
+        with Image.open(os.path.join(photos, f'{job.content_hash}_240.jpg')) as thumbnail:
+            assert max(thumbnail.size) == 240
+        assert os.path.getsize(main_path) < len(photo)
+
+        print("✅ test_photo_is_processed_off_request_path passed")
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+@_with_photo_dirs
+def test_same_photo_is_stored_once_and_cached(uploads, photos):
+    """Test identical uploads share files and are served with immutable cache headers"""
+    import services.photo_pipeline as photo_pipeline
+    from models import Order
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        client = app.test_client()
+        headers, category_id, part_id = _seed(db)
+
+        photo = _photo_bytes(size=(800, 600))
+        first = _create_order(client, headers, category_id, part_id, photo, 'a.jpg')
+        second = _create_order(client, headers, category_id, part_id, photo, 'b.jpg')
+
+        with patch.object(photo_pipeline, 'render_photo', wraps=photo_pipeline.render_photo) as render:
+            assert len(photo_pipeline.process_photo_jobs()) == 2
+            assert render.call_count == 1, f"Identical content must be rendered once, got {render.call_count}"
+
+        first_order = db.session.get(Order, first['id'])
+        second_order = db.session.get(Order, second['id'])
+        assert first_order.photo_url == second_order.photo_url
+        assert first_order.photo_thumb_url == second_order.photo_thumb_url
+        assert len(os.listdir(photos)) == 2
+
+        orders = json.loads(client.get('/api/orders').data)
+        assert all(o['photo_thumb_url'] == first_order.photo_thumb_url for o in orders), \
+            "The admin list must carry the thumbnail URL"
+
+        response = client.get(first_order.photo_thumb_url)
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+        assert response.mimetype == 'image/jpeg'
+        cache_control = response.headers['Cache-Control']
+        assert 'public' in cache_control and 'immutable' in cache_control, cache_control
+        assert 'max-age=31536000' in cache_control, cache_control
+        response.close()
+
+        assert client.get('/media/photos/missing.jpg').status_code == 404
+
+        print("✅ test_same_photo_is_stored_once_and_cached passed")
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+@_with_photo_dirs
+def test_unreadable_photo_keeps_original(uploads, photos):
+    """Test a file Pillow cannot read fails the job without retries and keeps the upload"""
+    from models import Order
+    from services.photo_pipeline import process_next_photo_job
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        client = app.test_client()
+        headers, category_id, part_id = _seed(db)
+
+        created = _create_order(client, headers, category_id, part_id, b'not an image', 'scan.jpg')
+
+        job = process_next_photo_job()
+        assert job.status == 'failed', f"Expected failed, got {job.status}"
+        assert job.attempts == 1
+        assert job.last_error
+
+        order = db.session.get(Order, created['id'])
+        assert order.photo_url == created['photo_url']
+        assert order.photo_thumb_url is None
+        assert len(os.listdir(uploads)) == 1
+        assert os.listdir(photos) == []
+
+        print("✅ test_unreadable_photo_keeps_original passed")
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def run_all_tests():
+    """Run all order photo tests"""
+    print("\n🧪 Running Order Photo Tests...\n")
+
+    tests = [
+        test_photo_is_processed_off_request_path,
+        test_same_photo_is_stored_once_and_cached,
+        test_unreadable_photo_keeps_original,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60 + "\n")
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,240 @@
+"""
+API Contract Tests for Order Search
+Tests GET /api/orders/search over car number/VIN fragments, parts and comments,
+and that search documents follow order writes in the same transaction.
+"""
+
+import sys
+import os
+import time
+import tempfile
+import json
+from datetime import datetime
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'felix_hub', 'backend'))
+
+os.environ.setdefault('ENABLE_CAR_NUMBER', 'true')
+os.environ.setdefault('ALLOW_ANY_CAR_NUMBER', 'false')
+
+
+def _setup_db():
+    from app import app, db
+
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    return app, db, db_fd, db_path
+
+
+def _create_order(client, car_number, parts, vin=None):
+    payload = {
+        'mechanic_name': 'Test Mechanic',
+        'telegram_id': '123456',
+        'category': 'Тормоза',
+        'carNumber': car_number,
+        'selected_parts': parts,
+        'is_original': False
+    }
+    if vin:
+        payload['vin'] = vin
+    response = client.post('/api/orders', data=json.dumps(payload), content_type='application/json')
+    assert response.status_code == 201, f"Expected 201, got {response.status_code}"
+    return json.loads(response.data)['id']
+
+
+def _search(client, query, **params):
+    response = client.get('/api/orders/search', query_string={'q': query, **params})
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    return [order['id'] for order in json.loads(response.data)['orders']]
+
+
+def test_search_by_plate_vin_parts_and_comments():
+    """Test fragments of plates, VINs, part names and comment phrases"""
+    from models import Mechanic
+    from auth import generate_jwt_token
+    from werkzeug.security import generate_password_hash
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+        brakes = _create_order(client, '1234567', ['Передние колодки', 'Тормозной диск'])
+        oil = _create_order(client, 'AB1234CD', ['Масляный фильтр'], vin='WVWZZZ1KZ8W123456')
+
+        mechanic = Mechanic(email='search@example.com', password_hash=generate_password_hash('x'), name='S', active=True)
+        db.session.add(mechanic)
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {generate_jwt_token(mechanic.id)}'}
+        response = client.post(f'/api/mechanic/orders/{oil}/comments',
+            data=json.dumps({'comment': 'Клиент просил заменить ещё и масло в коробке'}),
+            content_type='application/json', headers=headers)
+        assert response.status_code == 201
+
+        assert _search(client, '34567') == [brakes]
+        assert _search(client, '4-567') == [brakes]
+        assert _search(client, 'ab12') == [oil]
+        assert _search(client, 'zzz1kz8') == [oil]
+        assert _search(client, 'колод') == [brakes]
+        assert _search(client, 'ДИСК') == [brakes]
+        assert _search(client, 'еще масло') == [oil], "ё folds to е, terms match anywhere"
+        assert _search(client, '"масло в коробке"') == [oil]
+        assert _search(client, '"коробке масло"') == []
+        assert _search(client, f'#{brakes} колодки') == [brakes]
+        assert _search(client, 'фильтр', status='готов') == []
+        assert _search(client, 'Test') == [oil, brakes], "Newest orders come first"
+        assert _search(client, 'фи') == [oil], "Short terms fall back to LIKE"
+
+        assert client.get('/api/orders/search').status_code == 400
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_search_by_plate_vin_parts_and_comments passed")
+
+
+def test_documents_follow_order_writes():
+    """Test updates, deletes and status-only changes of orders"""
+    from models import Order, OrderSearchDocument
+    from services.order_search import backfill_order_search_documents
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+        order_id = _create_order(client, 'AB1234CD', ['Свечи зажигания'])
+        document = db.session.get(OrderSearchDocument, order_id)
+        assert document is not None and 'свечи' in document.document
+        indexed_at = document.updated_at
+
+        client.patch(f'/api/orders/{order_id}',
+            data=json.dumps({'carNumber': 'XY9876ZT'}), content_type='application/json')
+        assert _search(client, 'xy98') == [order_id]
+
+        db.session.expire_all()
+        indexed_at = db.session.get(OrderSearchDocument, order_id).updated_at
+        client.patch(f'/api/orders/{order_id}',
+            data=json.dumps({'status': 'в работе'}), content_type='application/json')
+        db.session.expire_all()
+        assert db.session.get(OrderSearchDocument, order_id).updated_at == indexed_at, \
+            "Status changes do not rebuild the document"
+
+        # Откат транзакции не оставляет документа
+        db.session.add(Order(mechanic_name='Rollback', telegram_id='1', category='X', selected_parts=['Ремень']))
+        db.session.flush()
+        db.session.rollback()
+        assert _search(client, 'ремень') == []
+
+        client.delete(f'/api/orders/{order_id}')
+        assert _search(client, 'xy98') == []
+        assert OrderSearchDocument.query.count() == 0
+
+        # Заказы, созданные до появления поиска, индексируются при деплое
+        db.session.execute(Order.__table__.insert(), [
+            {'mechanic_name': 'Legacy', 'telegram_id': '1', 'category': 'Двигатель',
+             'selected_parts': ['Помпа'], 'created_at': datetime.utcnow()}
+        ])
+        db.session.commit()
+        assert _search(client, 'помпа') == []
+        assert backfill_order_search_documents() == 1
+        assert len(_search(client, 'помпа')) == 1
+        assert backfill_order_search_documents() == 0
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_documents_follow_order_writes passed")
+
+
+def test_search_latency():
+    """Test lookups over 100k indexed orders stay in milliseconds"""
+    from models import Order, OrderSearchDocument
+    from services.order_search import search_orders, normalize_search_text
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        parts = ['Передние колодки', 'Масляный фильтр', 'Ремень ГРМ', 'Свечи зажигания', 'Помпа']
+        now = datetime.utcnow()
+        orders = []
+        documents = []
+        for i in range(1, 100001):
+            car_number = f'{i:07d}'
+            orders.append({'id': i, 'mechanic_name': f'Mechanic {i % 40}', 'telegram_id': '1',
+                           'category': 'Тормоза', 'car_number': car_number,
+                           'selected_parts': [parts[i % len(parts)]], 'created_at': now})
+            documents.append({'order_id': i, 'document': normalize_search_text(
+                f'#{i} Mechanic {i % 40} тормоза {car_number} {parts[i % len(parts)]}')})
+        db.session.execute(Order.__table__.insert(), orders)
+        db.session.execute(OrderSearchDocument.__table__.insert(), documents)
+        db.session.commit()
+
+        queries = ['0054321', '12345', 'mechanic 17 грм', '"свечи зажигания" 9999']
+        started = time.perf_counter()
+        for query in queries:
+            results, _ = search_orders(query, limit=50)
+            assert results, f"No results for {query}"
+        per_query_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+        assert [o.id for o in search_orders('0054321')[0]] == [54321]
+        assert per_query_ms < 100, f"Search took {per_query_ms:.1f}ms per query"
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print(f"✅ test_search_latency passed ({per_query_ms:.1f}ms per query)")
+
+
+def run_all_tests():
+    """Run all order search tests"""
+    print("\n" + "=" * 60)
+    print("Running Order Search Tests")
+    print("=" * 60 + "\n")
+
+    tests = [
+        test_search_by_plate_vin_parts_and_comments,
+        test_documents_follow_order_writes,
+        test_search_latency
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60 + "\n")
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
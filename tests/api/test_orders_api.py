@@ -202,6 +202,60 @@ def test_order_validation():
     print("✅ test_order_validation passed")
 
 
+def test_parts_payload_single_query():
+    """Test catalog partIds of an order are resolved with one SELECT on parts"""
+    from app import app, db
+    from models import Category, Part
+    from api.orders import sanitize_parts_payload
+    from sqlalchemy import event
+    
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        
+        category = Category(name_ru='Тормоза')
+        db.session.add(category)
+        db.session.flush()
+        parts = [Part(category_id=category.id, name_ru=f'Деталь {i}') for i in range(15)]
+        db.session.add_all(parts)
+        db.session.commit()
+        
+        payload = [{'partId': part.id, 'quantity': 1} for part in parts]
+        payload.append({'name': 'Своя деталь', 'isCustom': True})
+        
+        statements = []
+        def count_parts_selects(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('SELECT') and 'FROM parts' in statement:
+                statements.append(statement)
+        
+        event.listen(db.engine, 'before_cursor_execute', count_parts_selects)
+        try:
+            sanitized = sanitize_parts_payload(payload)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count_parts_selects)
+        
+        assert len(statements) == 1, f"Expected 1 SELECT on parts, got {len(statements)}"
+        assert [item['name'] for item in sanitized[:15]] == [f'Деталь {i}' for i in range(15)]
+        assert sanitized[-1]['name'] == 'Своя деталь'
+        
+        try:
+            sanitize_parts_payload([{'partId': parts[0].id}, {'partId': 99999}])
+            assert False, "Unknown partId must be rejected"
+        except ValueError as e:
+            assert '99999' in str(e)
+        
+        db.session.remove()
+        db.drop_all()
+    
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_parts_payload_single_query passed")
+
+
 def run_all_tests():
     """Run all order API tests"""
     print("\n" + "=" * 60)
@@ -212,7 +266,8 @@ def run_all_tests():
         test_create_order,
         test_list_orders,
         test_update_order_status,
-        test_order_validation
+        test_order_validation,
+        test_parts_payload_single_query
     ]
     
     passed = 0
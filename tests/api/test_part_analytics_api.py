@@ -0,0 +1,246 @@
+"""
+API Contract Tests for Part Analytics
+Tests that order_parts follows Order.selected_parts on every write and the
+/api/analytics/parts/* aggregates by period and category.
+"""
+
+import sys
+import os
+import tempfile
+import json
+from datetime import datetime
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'felix_hub', 'backend'))
+
+os.environ.setdefault('ENABLE_CAR_NUMBER', 'true')
+os.environ.setdefault('ALLOW_ANY_CAR_NUMBER', 'false')
+
+
+def _setup_db():
+    from app import app, db
+
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    return app, db, db_fd, db_path
+
+
+def _rows(order_id):
+    from models import OrderPart
+    return sorted(
+        (row.name, row.part_id, row.quantity, row.is_custom, row.category)
+        for row in OrderPart.query.filter_by(order_id=order_id).all()
+    )
+
+
+def test_order_parts_follow_order_writes():
+    """Test create, update, delete and backfill of order_parts"""
+    from models import Order, Part, Category
+    from services.order_parts import backfill_order_parts
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        category = Category(name_ru='Тормоза')
+        db.session.add(category)
+        db.session.flush()
+        pads = Part(category_id=category.id, name_ru='Передние колодки')
+        db.session.add(pads)
+        db.session.commit()
+
+        client = app.test_client()
+        response = client.post('/api/orders',
+            data=json.dumps({
+                'mechanic_name': 'Test Mechanic',
+                'telegram_id': '123456',
+                'category': 'Тормоза',
+                'carNumber': 'AB1234CD',
+                'parts': [
+                    {'partId': pads.id, 'quantity': 2},
+                    {'name': 'Болт M8', 'isCustom': True, 'quantity': 4, 'price': 1.5}
+                ]
+            }),
+            content_type='application/json'
+        )
+        assert response.status_code == 201
+        order_id = json.loads(response.data)['id']
+        assert _rows(order_id) == [
+            ('Болт M8', None, 4, True, 'Тормоза'),
+            ('Передние колодки', pads.id, 2, False, 'Тормоза'),
+        ]
+
+        client.patch(f'/api/orders/{order_id}',
+            data=json.dumps({'selected_parts': ['Тормозной диск'], 'category': 'Подвеска'}),
+            content_type='application/json')
+        assert _rows(order_id) == [('Тормозной диск', None, 1, False, 'Подвеска')]
+
+        client.delete(f'/api/orders/{order_id}')
+        assert _rows(order_id) == []
+
+        # Заказы до появления таблицы переносятся при деплое
+        db.session.execute(Order.__table__.insert(), [
+            {'mechanic_name': 'Legacy', 'telegram_id': '1', 'category': 'Двигатель',
+             'selected_parts': ['Помпа', 'Ремень ГРМ'], 'created_at': datetime(2024, 1, 5)}
+        ])
+        db.session.commit()
+        legacy_id = db.session.query(db.func.max(Order.id)).scalar()
+        assert _rows(legacy_id) == []
+        assert backfill_order_parts() == 2
+        assert len(_rows(legacy_id)) == 2
+        assert backfill_order_parts() == 0
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_order_parts_follow_order_writes passed")
+
+
+def test_part_demand_endpoints():
+    """Test demand by period, top parts and demand by category"""
+    from models import Order
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        def add_order(created_at, category, parts):
+            db.session.add(Order(mechanic_name='M', telegram_id='1', category=category,
+                                 selected_parts=parts, created_at=created_at))
+
+        pads = {'partId': 7, 'name': 'Передние колодки', 'quantity': 2}
+        add_order(datetime(2026, 3, 2, 9), 'Тормоза', [pads, 'Тормозной диск'])
+        add_order(datetime(2026, 3, 2, 15), 'Тормоза', [dict(pads, quantity=1)])
+        add_order(datetime(2026, 3, 10, 12), 'Тормоза', [dict(pads, quantity=4)])
+        add_order(datetime(2026, 3, 11, 12), 'Двигатель', ['Помпа'])
+        add_order(datetime(2026, 4, 1, 12), 'Тормоза', [pads])
+        db.session.commit()
+
+        client = app.test_client()
+
+        response = client.get('/api/analytics/parts/demand?period=day&start=2026-03-01&end=2026-03-31&part_id=7')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['start'] == '2026-03-01' and data['end'] == '2026-03-31'
+        assert data['series'] == [
+            {'period': '2026-03-02', 'quantity': 3, 'orders': 2},
+            {'period': '2026-03-10', 'quantity': 4, 'orders': 1},
+        ]
+
+        data = json.loads(client.get(
+            '/api/analytics/parts/demand?period=week&start=2026-03-01&end=2026-03-31&category=Тормоза').data)
+        assert data['series'] == [
+            {'period': '2026-03-02', 'quantity': 4, 'orders': 2},
+            {'period': '2026-03-09', 'quantity': 4, 'orders': 1},
+        ]
+
+        data = json.loads(client.get('/api/analytics/parts/demand?period=month&start=2026-03-01&end=2026-04-30').data)
+        assert data['series'] == [
+            {'period': '2026-03', 'quantity': 9, 'orders': 4},
+            {'period': '2026-04', 'quantity': 2, 'orders': 1},
+        ]
+
+        data = json.loads(client.get('/api/analytics/parts/top?start=2026-03-01&end=2026-03-31').data)
+        assert data['parts'][0] == {'part_id': 7, 'name': 'Передние колодки', 'quantity': 7, 'orders': 3}
+        assert [p['name'] for p in data['parts'][1:]] == ['Помпа', 'Тормозной диск']
+
+        data = json.loads(client.get('/api/analytics/parts/categories?start=2026-03-01&end=2026-03-31').data)
+        assert data['categories'] == [
+            {'category': 'Тормоза', 'quantity': 8, 'orders': 3},
+            {'category': 'Двигатель', 'quantity': 1, 'orders': 1},
+        ]
+
+        assert client.get('/api/analytics/parts/demand?period=year').status_code == 400
+        assert client.get('/api/analytics/parts/top?start=01.03.2026').status_code == 400
+        assert client.get('/api/analytics/parts/categories?start=2026-03-05&end=2026-03-01').status_code == 400
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_part_demand_endpoints passed")
+
+
+def test_demand_queries_use_indexes():
+    """Test the demand aggregate is an index range scan, not a table scan"""
+    from services.order_parts import part_demand
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('SELECT'):
+                statements.append((statement, parameters))
+
+        from sqlalchemy import event
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        try:
+            part_demand(datetime(2026, 3, 1), datetime(2026, 4, 1), part_id=7)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capture)
+
+        statement, parameters = statements[-1]
+        plan = ' '.join(
+            row[-1] for row in db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)
+        )
+        assert 'idx_order_parts_part' in plan, plan
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_demand_queries_use_indexes passed")
+
+
+def run_all_tests():
+    """Run all part analytics tests"""
+    print("\n" + "=" * 60)
+    print("Running Part Analytics Tests")
+    print("=" * 60 + "\n")
+
+    tests = [
+        test_order_parts_follow_order_writes,
+        test_part_demand_endpoints,
+        test_demand_queries_use_indexes
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60 + "\n")
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,244 @@
+"""
+API Contract Tests for Parts Search
+Tests GET /api/parts/search prefix lookups over ru/he/en names and part numbers,
+incremental index updates on catalog edits and rebuilds after foreign writes.
+"""
+
+import sys
+import os
+import time
+import tempfile
+import json
+from unittest.mock import patch
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'felix_hub', 'backend'))
+
+os.environ.setdefault('ENABLE_CAR_NUMBER', 'true')
+os.environ.setdefault('ALLOW_ANY_CAR_NUMBER', 'false')
+
+
+def _setup_db():
+    from app import app, db
+    from services.part_search import invalidate_part_index
+
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    invalidate_part_index()
+    return app, db, db_fd, db_path
+
+
+def _search(client, query, **params):
+    response = client.get('/api/parts/search', query_string={'q': query, **params})
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    return json.loads(response.data)['results']
+
+
+def _create_part(client, category_id, name_ru, name_he=None, name_en=None):
+    response = client.post('/api/parts',
+        data=json.dumps({'category_id': category_id, 'name_ru': name_ru, 'name_he': name_he, 'name_en': name_en}),
+        content_type='application/json'
+    )
+    assert response.status_code == 201
+    return json.loads(response.data)['id']
+
+
+def test_search_by_prefix_in_all_languages():
+    """Test prefix search over ru/he/en names with ranking and category filter"""
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+        brakes = json.loads(client.post('/api/categories',
+            data=json.dumps({'name_ru': 'Тормоза'}), content_type='application/json').data)['id']
+        engine = json.loads(client.post('/api/categories',
+            data=json.dumps({'name_ru': 'Двигатель'}), content_type='application/json').data)['id']
+
+        pads = _create_part(client, brakes, 'Передние колодки', 'רפידות קדמיות', 'Front pads')
+        _create_part(client, brakes, 'Задние колодки', 'רפידות אחוריות', 'Rear pads')
+        oil_filter = _create_part(client, engine, 'Масляный фильтр', 'מסנן שמן', 'Oil filter')
+        _create_part(client, engine, 'Ёмкость омывателя')
+
+        assert {r['id'] for r in _search(client, 'колод')} == {pads, pads + 1}
+        assert [r['id'] for r in _search(client, 'пер кол')] == [pads]
+        assert [r['id'] for r in _search(client, 'רפידות ק')] == [pads]
+        assert [r['id'] for r in _search(client, 'OIL')] == [oil_filter]
+        assert _search(client, 'емкость')[0]['name_ru'] == 'Ёмкость омывателя'
+        assert [r['id'] for r in _search(client, 'pads', category_id=engine)] == []
+        # Точное совпадение названия выше совпадения по префиксу
+        assert _search(client, 'задние колодки')[0]['name_ru'] == 'Задние колодки'
+        assert _search(client, 'zzz') == []
+
+        assert client.get('/api/parts/search').status_code == 400
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_search_by_prefix_in_all_languages passed")
+
+
+def test_index_follows_catalog_edits():
+    """Test part create/update/delete and other-process writes reach the index"""
+    from models import Part, CatalogMeta
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+        category = json.loads(client.post('/api/categories',
+            data=json.dumps({'name_ru': 'Подвеска'}), content_type='application/json').data)['id']
+        part_id = _create_part(client, category, 'Стойки', name_en='Struts')
+        assert [r['id'] for r in _search(client, 'стой')] == [part_id]
+
+        with patch('services.part_search.rebuild_part_index') as mock_rebuild:
+            client.patch(f'/api/parts/{part_id}',
+                data=json.dumps({'name_ru': 'Амортизаторы'}), content_type='application/json')
+            assert _search(client, 'стой') == []
+            assert [r['id'] for r in _search(client, 'аморт')] == [part_id]
+            client.delete(f'/api/parts/{part_id}')
+            assert _search(client, 'аморт') == []
+            mock_rebuild.assert_not_called()
+
+        # Запись другого процесса: новая версия каталога в БД
+        db.session.add(Part(category_id=category, name_ru='Сайлентблоки'))
+        db.session.get(CatalogMeta, 'catalog_version').value = 'other-process'
+        db.session.commit()
+        assert _search(client, 'сайл') == [], "Within the check interval the index is not re-read"
+        with patch('config.PART_SEARCH_VERSION_CHECK_SECONDS', 0):
+            assert len(_search(client, 'сайл')) == 1
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_index_follows_catalog_edits passed")
+
+
+def test_search_part_numbers():
+    """Test part numbers of custom parts are found regardless of separators"""
+    from models import Mechanic, Order
+    from auth import generate_jwt_token
+    from services.part_search import invalidate_part_index, read_catalog_version
+    from werkzeug.security import generate_password_hash
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        mechanic = Mechanic(email='pn@example.com', password_hash=generate_password_hash('x'), name='PN', active=True)
+        order = Order(mechanic_name='PN', telegram_id='1', category='Тормоза', selected_parts=['Диск'])
+        db.session.add_all([mechanic, order])
+        db.session.commit()
+
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {generate_jwt_token(mechanic.id)}'}
+        _search(client, 'warm-up')
+        catalog_version = read_catalog_version()
+        for name in ('Диск тормозной', 'Диск тормозной VAG'):
+            response = client.post(f'/api/mechanic/orders/{order.id}/custom-parts',
+                data=json.dumps({'name': name, 'part_number': '1K0-615 301'}),
+                content_type='application/json', headers=headers)
+            assert response.status_code == 201
+
+        assert read_catalog_version() == catalog_version, \
+            "Part numbers must not invalidate the catalog (and its snapshots)"
+
+        results = _search(client, '1k0615')
+        assert len(results) == 1
+        assert results[0]['type'] == 'part_number'
+        assert results[0]['name'] == 'Диск тормозной VAG'
+        assert results[0]['uses'] == 2
+        assert _search(client, '1K0-615-3')[0]['part_number'] == '1K0-615 301'
+
+        # Полная пересборка: одинаковые номера из нескольких строк сливаются в один документ
+        invalidate_part_index()
+        response = client.get('/api/parts/search?q=1k0')
+        assert response.status_code == 200, f"Expected 200 after rebuild, got {response.status_code}"
+        results = json.loads(response.data)['results']
+        assert len(results) == 1
+        assert results[0]['name'] == 'Диск тормозной VAG'
+        assert results[0]['uses'] == 2
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_search_part_numbers passed")
+
+
+def test_search_latency():
+    """Test lookups over a 5k part index stay under a millisecond"""
+    from services.part_search import PartSearchIndex
+
+    index = PartSearchIndex()
+    words = ['колодки', 'фильтр', 'диск', 'ремень', 'датчик', 'насос', 'шланг', 'прокладка']
+    for i in range(5000):
+        name = f'{words[i % len(words)]} {words[(i // 8) % len(words)]} {i}'
+        index.add(('part', i), {'type': 'part', 'id': i}, texts=[name, f'part {i}'],
+                  keep_sorted=False)
+    index.resort()
+
+    queries = ['кол', 'фильтр дат', 'part 1999', 'насос шл', 'прок']
+    started = time.perf_counter()
+    for _ in range(20):
+        for query in queries:
+            index.search(query, limit=20)
+    per_query_ms = (time.perf_counter() - started) * 1000 / (20 * len(queries))
+
+    assert [r['id'] for r in index.search('part 4999')] == [4999]
+    assert per_query_ms < 1, f"Search took {per_query_ms:.2f}ms per query"
+    print(f"✅ test_search_latency passed ({per_query_ms:.3f}ms per query)")
+
+
+def run_all_tests():
+    """Run all parts search tests"""
+    print("\n" + "=" * 60)
+    print("Running Parts Search Tests")
+    print("=" * 60 + "\n")
+
+    tests = [
+        test_search_by_prefix_in_all_languages,
+        test_index_follows_catalog_edits,
+        test_search_part_numbers,
+        test_search_latency
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60 + "\n")
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,306 @@
+"""
+API Contract Tests for Print Queue
+Tests that printing is queued off the request path, retried and falls back to PDF.
+"""
+
+import sys
+import os
+import tempfile
+import json
+from datetime import datetime
+from unittest.mock import patch
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'felix_hub', 'backend'))
+
+os.environ.setdefault('ENABLE_CAR_NUMBER', 'true')
+os.environ.setdefault('ALLOW_ANY_CAR_NUMBER', 'false')
+
+
+def _create_order(client):
+    response = client.post('/api/orders',
+        data=json.dumps({
+            'mechanic_name': 'Test Mechanic',
+            'telegram_id': '123456',
+            'category': 'Тормоза',
+            'carNumber': 'AB1234CD',
+            'selected_parts': ['Передние колодки'],
+            'is_original': False
+        }),
+        content_type='application/json'
+    )
+    assert response.status_code == 201, f"Expected 201, got {response.status_code}"
+    return json.loads(response.data)['id']
+
+
+def _setup_db():
+    from app import app, db
+
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    return app, db, db_fd, db_path
+
+
+def test_ready_status_queues_print():
+    """Test PATCH to 'готов' returns without printing and the worker falls back to PDF"""
+    from services.print_queue import process_next_print_job
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+        order_id = _create_order(client)
+
+        with patch('utils.printer.print_orders_batch') as mock_receipt:
+            response = client.patch(f'/api/orders/{order_id}',
+                data=json.dumps({'status': 'готов'}),
+                content_type='application/json'
+            )
+            assert response.status_code == 200
+            assert json.loads(response.data)['printed'] is False
+            mock_receipt.assert_not_called()
+
+        response = client.get(f'/api/orders/{order_id}/print-jobs')
+        jobs = json.loads(response.data)
+        assert len(jobs) == 1
+        assert jobs[0]['status'] == 'queued'
+
+        with patch('utils.printer.PRINTER_ENABLED', False), \
+                patch('utils.pdf_renderer.get_order_pdf', return_value=b'%PDF-1.4') as mock_pdf:
+            job = process_next_print_job()
+        mock_pdf.assert_called_once()
+        assert job is not None
+        assert process_next_print_job() is None
+
+        response = client.get(f"/api/print-jobs/{jobs[0]['id']}")
+        assert response.status_code == 200
+        job_data = json.loads(response.data)
+        assert job_data['status'] == 'pdf_fallback'
+        assert job_data['pdf_path'] == f'/api/orders/{order_id}/receipt.pdf'
+
+        response = client.get(f'/api/orders/{order_id}')
+        assert json.loads(response.data)['printed'] is True
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_ready_status_queues_print passed")
+
+
+def test_pdf_fallback_caches_current_receipt():
+    """Test the PDF rendered by the fallback is cached under the receipt ETag of the printed order"""
+    from models import Order
+    from services.print_queue import process_next_print_job
+    from utils import pdf_renderer
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+        order_id = _create_order(client)
+        client.post(f'/api/orders/{order_id}/print')
+
+        with pdf_renderer._cache_lock:
+            pdf_renderer._cache.clear()
+        with patch('utils.printer.PRINTER_ENABLED', False), \
+                patch('utils.pdf_renderer.render_snapshot', return_value=b'%PDF-1.4') as mock_render:
+            job = process_next_print_job()
+            assert job.status == 'pdf_fallback', f"Expected pdf_fallback, got {job.status}"
+            db.session.expire_all()
+            order = db.session.get(Order, order_id)
+            assert order.printed is True
+            assert pdf_renderer.receipt_etag(order) in pdf_renderer._cache, \
+                "The fallback must warm the cache for the receipt admins will download"
+
+            response = client.get(f'/api/orders/{order_id}/receipt.pdf')
+            assert response.status_code == 200
+            assert mock_render.call_count == 1, "Download must be served from the warmed cache"
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_pdf_fallback_caches_current_receipt passed")
+
+
+def test_manual_print_retries_then_prints():
+    """Test POST /print returns 202, deduplicates and retries a failed thermal print"""
+    from services.print_queue import process_next_print_job
+    from models import PrintJob
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+        order_id = _create_order(client)
+
+        response = client.post(f'/api/orders/{order_id}/print')
+        assert response.status_code == 202, f"Expected 202, got {response.status_code}"
+        job_id = json.loads(response.data)['job']['id']
+
+        # Повторный клик не создаёт второе задание
+        response = client.post(f'/api/orders/{order_id}/print')
+        assert json.loads(response.data)['job']['id'] == job_id
+
+        with patch('utils.printer.PRINTER_ENABLED', True), \
+                patch('utils.printer.print_orders_batch', side_effect=lambda orders: {o.id: False for o in orders}):
+            process_next_print_job()
+
+        job = db.session.get(PrintJob, job_id)
+        assert job.status == 'queued'
+        assert job.attempts == 1
+        assert job.next_attempt_at > datetime.utcnow()
+        assert job.last_error
+
+        # Следующая попытка ещё не наступила
+        assert process_next_print_job() is None
+
+        job.next_attempt_at = datetime.utcnow()
+        db.session.commit()
+
+        with patch('utils.printer.PRINTER_ENABLED', True), \
+                patch('utils.printer.print_orders_batch', side_effect=lambda orders: {o.id: True for o in orders}):
+            process_next_print_job()
+
+        job = db.session.get(PrintJob, job_id)
+        assert job.status == 'done'
+        assert job.attempts == 2
+        assert job.finished_at is not None
+
+        response = client.get('/api/print-jobs/99999')
+        assert response.status_code == 404
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_manual_print_retries_then_prints passed")
+
+
+def test_batch_print_single_pass():
+    """Test POST /api/orders/print-batch queues jobs that the worker prints in one batch"""
+    from services.print_queue import process_print_jobs
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+        order_ids = [_create_order(client) for _ in range(3)]
+
+        # Активные задания всех заказов ищутся одним запросом, а не по одному
+        with patch('app.enqueue_print_job', side_effect=AssertionError('enqueue_print_job called per order')):
+            response = client.post('/api/orders/print-batch',
+                data=json.dumps({'order_ids': order_ids[:2]}),
+                content_type='application/json'
+            )
+        assert response.status_code == 202, f"Expected 202, got {response.status_code}"
+        assert len(json.loads(response.data)['jobs']) == 2
+
+        response = client.post('/api/orders/print-batch',
+            data=json.dumps({'order_ids': 'all'}),
+            content_type='application/json'
+        )
+        assert response.status_code == 400
+
+        with patch('utils.printer.PRINTER_ENABLED', True), \
+                patch('utils.printer.print_orders_batch',
+                      side_effect=lambda orders: {o.id: True for o in orders}) as mock_batch:
+            jobs = process_print_jobs()
+
+        mock_batch.assert_called_once()
+        assert sorted(o.id for o in mock_batch.call_args.args[0]) == order_ids[:2]
+        assert [job.status for job in jobs] == ['done', 'done']
+
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_batch_print_single_pass passed")
+
+
+def test_worker_thread_drains_queue_on_wake():
+    """Test the shared job worker starts once per process and drains its queue when woken"""
+    import threading
+    from app import app
+    from services.job_queue import JobWorker
+
+    batches = [['job-1', 'job-2'], ['job-3'], []]
+    drained = threading.Event()
+
+    def process():
+        batch = batches.pop(0) if batches else []
+        if not batches:
+            drained.set()
+        return batch
+
+    worker = JobWorker('test', process, lambda: 60)
+    worker.ensure_started(app)
+    thread = worker._thread
+    worker.ensure_started(app)
+    assert worker._thread is thread, "A second start must reuse the running thread"
+
+    worker.wake()
+    assert drained.wait(5), "The worker must process batches until the queue is empty"
+    assert batches == []
+
+    print("✅ test_worker_thread_drains_queue_on_wake passed")
+
+
+def run_all_tests():
+    """Run all print queue tests"""
+    print("\n" + "=" * 60)
+    print("Running Print Queue Tests")
+    print("=" * 60 + "\n")
+
+    tests = [
+        test_ready_status_queues_print,
+        test_pdf_fallback_caches_current_receipt,
+        test_manual_print_retries_then_prints,
+        test_batch_print_single_pass,
+        test_worker_thread_drains_queue_on_wake
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60 + "\n")
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
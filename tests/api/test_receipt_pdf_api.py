@@ -0,0 +1,148 @@
+"""
+API Contract Tests for PDF Receipts
+Tests GET /api/orders/<id>/receipt.pdf rendering, ETag caching and the render pool.
+"""
+
+import sys
+import os
+import tempfile
+import json
+from unittest.mock import patch
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'felix_hub', 'backend'))
+
+os.environ.setdefault('ENABLE_CAR_NUMBER', 'true')
+os.environ.setdefault('ALLOW_ANY_CAR_NUMBER', 'false')
+
+
+def test_receipt_pdf_etag():
+    """Test receipt.pdf is served with ETag, revalidated with 304 and refreshed on update"""
+    from app import app, db
+
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+
+    with app.app_context(), patch('config.PDF_RENDER_WORKERS', 0):
+        db.drop_all()
+        db.create_all()
+
+        client = app.test_client()
+        response = client.post('/api/orders',
+            data=json.dumps({
+                'mechanic_name': 'Иван Петров',
+                'telegram_id': '123456',
+                'category': 'Тормоза',
+                'carNumber': 'AB1234CD',
+                'selected_parts': ['Передние колодки', 'Тормозная жидкость'],
+                'is_original': False
+            }),
+            content_type='application/json'
+        )
+        order_id = json.loads(response.data)['id']
+
+        response = client.get(f'/api/orders/{order_id}/receipt.pdf')
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+        assert response.mimetype == 'application/pdf'
+        assert response.data.startswith(b'%PDF')
+        etag = response.headers.get('ETag')
+        assert etag, "Response must carry an ETag"
+
+        with patch('utils.pdf_renderer.render_snapshot') as mock_render:
+            cached = client.get(f'/api/orders/{order_id}/receipt.pdf', headers={'If-None-Match': etag})
+            assert cached.status_code == 304, f"Expected 304, got {cached.status_code}"
+
+            # Прокси или сжатие ослабляют ETag - ревалидация всё равно срабатывает
+            weak = client.get(f'/api/orders/{order_id}/receipt.pdf', headers={'If-None-Match': f'W/{etag}'})
+            assert weak.status_code == 304, f"Expected 304 for weak ETag, got {weak.status_code}"
+
+            repeat = client.get(f'/api/orders/{order_id}/receipt.pdf')
+            assert repeat.data == response.data
+            mock_render.assert_not_called()
+
+        client.patch(f'/api/orders/{order_id}',
+            data=json.dumps({'status': 'в работе'}),
+            content_type='application/json'
+        )
+        updated = client.get(f'/api/orders/{order_id}/receipt.pdf', headers={'If-None-Match': etag})
+        assert updated.status_code == 200
+        assert updated.headers.get('ETag') != etag
+
+        missing = client.get('/api/orders/99999/receipt.pdf')
+        assert missing.status_code == 404
+
+        response.close()
+        repeat.close()
+        updated.close()
+        db.session.remove()
+        db.drop_all()
+
+    os.close(db_fd)
+    os.unlink(db_path)
+    print("✅ test_receipt_pdf_etag passed")
+
+
+def test_render_pool_matches_inline():
+    """Test rendering in the process pool gives the same bytes as inline rendering"""
+    from utils import pdf_renderer
+
+    snapshot = {
+        'id': 7,
+        'created_at': '29.10.2023 14:30',
+        'mechanic_name': 'Иван Петров',
+        'car_number': 'AB1234CD',
+        'vin': None,
+        'category': 'Тормоза',
+        'parts': ['Передние колодки'],
+        'is_original': True,
+        'status': 'готов',
+    }
+
+    inline = pdf_renderer.render_receipt_pdf(snapshot)
+    with patch('config.PDF_RENDER_WORKERS', 1):
+        pooled = pdf_renderer.render_snapshot(snapshot)
+    pdf_renderer._reset_executor()
+
+    assert inline.startswith(b'%PDF')
+    assert pooled == inline
+    print("✅ test_render_pool_matches_inline passed")
+
+
+def run_all_tests():
+    """Run all PDF receipt tests"""
+    print("\n" + "=" * 60)
+    print("Running PDF Receipt Tests")
+    print("=" * 60 + "\n")
+
+    tests = [
+        test_receipt_pdf_etag,
+        test_render_pool_matches_inline
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60 + "\n")
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,200 @@
+"""
+API Contract Tests for Webhook Update Deduplication
+Tests that accepted update ids are shared between workers and expire after the TTL.
+"""
+
+import sys
+import os
+import json
+import tempfile
+from datetime import datetime, timedelta
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'felix_hub', 'backend'))
+
+
+class _FakeRedis:
+    """Локальная замена Redis: SET NX EX и DELETE"""
+
+    def __init__(self):
+        self.values = {}
+
+    def set(self, name, value, nx=False, ex=None):
+        if nx and name in self.values:
+            return None
+        self.values[name] = (value, ex)
+        return True
+
+    def delete(self, name):
+        return 1 if self.values.pop(name, None) else 0
+
+
+class _RunningLoopStub:
+    def is_running(self):
+        return True
+
+
+def _setup_db():
+    from app import app, db
+
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    return app, db, db_fd, db_path
+
+
+def test_database_store_is_shared_between_workers():
+    """Test two database stores (two workers) see each other's updates"""
+    from services.update_dedup import DatabaseUpdateStore
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        worker_a = DatabaseUpdateStore(ttl=900, prune_interval=60)
+        worker_b = DatabaseUpdateStore(ttl=900, prune_interval=60)
+
+        assert worker_a.register('1001') is True, "First delivery must be accepted"
+        assert worker_b.register('1001') is False, "Redelivery to another worker must be rejected"
+        assert worker_a.register('1001') is False, "Redelivery to the same worker must be rejected"
+
+        worker_a.release('1001')
+        assert worker_b.register('1001') is True, "Released update must be accepted again"
+
+        worker_a.clear()
+        assert worker_b.register('1001') is False, "clear() must not drop shared entries"
+
+        print("✅ test_database_store_is_shared_between_workers passed")
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def test_database_store_expires_and_prunes():
+    """Test expired update ids are accepted again and pruned"""
+    from models import ProcessedUpdate
+    from services.update_dedup import DatabaseUpdateStore
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        store = DatabaseUpdateStore(ttl=900, prune_interval=0)
+        assert store.register('2001') is True
+        assert store.register('2002') is True
+
+        stale = datetime.utcnow() - timedelta(hours=1)
+        ProcessedUpdate.query.filter_by(update_id='2001').update({'received_at': stale})
+        db.session.commit()
+
+        assert store.register('2001') is True, "Expired update must be accepted again"
+        assert store.register('2001') is False
+
+        ProcessedUpdate.query.filter_by(update_id='2002').update({'received_at': stale})
+        db.session.commit()
+        store.register('2003')
+        assert db.session.get(ProcessedUpdate, '2002') is None, "Expired rows must be pruned"
+
+        print("✅ test_database_store_expires_and_prunes passed")
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def test_redis_store_and_backend_selection():
+    """Test the Redis store with a stand-in client and the backend factory"""
+    from services.update_dedup import (RedisUpdateStore, MemoryUpdateStore, DatabaseUpdateStore,
+                                       create_update_store)
+
+    client = _FakeRedis()
+    worker_a = RedisUpdateStore(ttl=900, client=client)
+    worker_b = RedisUpdateStore(ttl=900, client=client)
+    assert worker_a.register('3001') is True
+    assert worker_b.register('3001') is False
+    assert client.values['felix:update:3001'][1] == 900, "Expected TTL passed as EX"
+    worker_b.release('3001')
+    assert worker_a.register('3001') is True
+
+    assert isinstance(create_update_store('memory'), MemoryUpdateStore)
+    assert isinstance(create_update_store('database'), DatabaseUpdateStore)
+    assert isinstance(create_update_store('unknown'), DatabaseUpdateStore)
+
+    print("✅ test_redis_store_and_backend_selection passed")
+
+
+def test_webhook_rejects_update_seen_by_another_worker():
+    """Test /webhook answers duplicate for an update registered by another worker"""
+    import app as app_module
+    from services.update_dedup import DatabaseUpdateStore
+
+    app, db, db_fd, db_path = _setup_db()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        saved = (app_module.update_store, app_module.telegram_app, app_module.telegram_loop)
+        app_module.update_store = DatabaseUpdateStore(ttl=900, prune_interval=60)
+        # Цикл не запущен: до обработки дело не дойдёт, проверяется только фильтр
+        app_module.telegram_app = object()
+        app_module.telegram_loop = _RunningLoopStub()
+        try:
+            DatabaseUpdateStore(ttl=900, prune_interval=60).register('4001')
+
+            client = app.test_client()
+            response = client.post('/webhook',
+                data=json.dumps({'update_id': 4001}),
+                content_type='application/json'
+            )
+            assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+            assert json.loads(response.data).get('duplicate') is True, "Expected duplicate answer"
+        finally:
+            app_module.update_store, app_module.telegram_app, app_module.telegram_loop = saved
+
+        print("✅ test_webhook_rejects_update_seen_by_another_worker passed")
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def run_all_tests():
+    """Run all update deduplication tests"""
+    print("\n🧪 Running Webhook Update Deduplication Tests...\n")
+
+    tests = [
+        test_database_store_is_shared_between_workers,
+        test_database_store_expires_and_prunes,
+        test_redis_store_and_backend_selection,
+        test_webhook_rejects_update_seen_by_another_worker,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60 + "\n")
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
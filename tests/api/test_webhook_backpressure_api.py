@@ -0,0 +1,192 @@
+"""
+API Contract Tests for Telegram Webhook Backpressure
+Tests that the webhook caps in-flight updates, queues a bounded number and sheds the rest with 429.
+"""
+
+import sys
+import os
+import time
+import json
+import asyncio
+import tempfile
+from threading import Event, Thread
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'felix_hub', 'backend'))
+
+
+class _FakeTelegramApp:
+    """Заменяет telegram Application: обработка ждёт, пока тест не откроет gate"""
+
+    def __init__(self):
+        from telegram import Bot
+        self.bot = Bot('123456:TEST')
+        self.gate = Event()
+        self.started = []
+        self.finished = []
+
+    async def process_update(self, update):
+        self.started.append(update.update_id)
+        while not self.gate.is_set():
+            await asyncio.sleep(0.005)
+        self.finished.append(update.update_id)
+
+
+def _setup_webhook(max_in_flight, max_queue):
+    import app as app_module
+    from services.webhook_dispatch import UpdateDispatcher
+
+    db_fd, db_path = tempfile.mkstemp()
+    app_module.app.config['TESTING'] = True
+    app_module.app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    with app_module.app.app_context():
+        app_module.db.drop_all()
+        app_module.db.create_all()
+
+    loop = asyncio.new_event_loop()
+    Thread(target=loop.run_forever, daemon=True).start()
+    while not loop.is_running():
+        time.sleep(0.001)
+
+    fake_app = _FakeTelegramApp()
+    dispatcher = UpdateDispatcher(max_in_flight, max_queue)
+    dispatcher.bind(loop)
+
+    saved = (app_module.telegram_app, app_module.telegram_loop, app_module.webhook_dispatcher)
+    app_module.telegram_app = fake_app
+    app_module.telegram_loop = loop
+    app_module.webhook_dispatcher = dispatcher
+
+    def teardown():
+        fake_app.gate.set()
+        _wait_for(lambda: dispatcher.stats()['in_flight'] == 0)
+        app_module.telegram_app, app_module.telegram_loop, app_module.webhook_dispatcher = saved
+        loop.call_soon_threadsafe(loop.stop)
+        os.close(db_fd)
+        os.unlink(db_path)
+
+    return app_module.app.test_client(), fake_app, dispatcher, teardown
+
+
+def _post_update(client, update_id):
+    return client.post('/webhook',
+        data=json.dumps({'update_id': update_id}),
+        content_type='application/json'
+    )
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_webhook_sheds_load_when_queue_is_full():
+    """Test updates beyond in-flight + queue limits get 429 with Retry-After"""
+    client, fake_app, dispatcher, teardown = _setup_webhook(max_in_flight=2, max_queue=2)
+    try:
+        statuses = [_post_update(client, 7000 + i).status_code for i in range(4)]
+        assert statuses == [200] * 4, f"Expected first 4 updates admitted, got {statuses}"
+
+        response = _post_update(client, 7004)
+        assert response.status_code == 429, f"Expected 429, got {response.status_code}"
+        assert response.headers.get('Retry-After'), "Expected Retry-After header"
+
+        assert _wait_for(lambda: len(fake_app.started) == 2), "Expected exactly 2 updates running"
+        stats = dispatcher.stats()
+        assert stats['in_flight'] == 2, f"Expected 2 in flight, got {stats}"
+        assert stats['queued'] == 2, f"Expected 2 queued, got {stats}"
+        assert stats['rejected'] == 1, f"Expected 1 rejected, got {stats}"
+        assert len(fake_app.started) == 2, "Queued updates must not start before a slot frees"
+
+        fake_app.gate.set()
+        assert _wait_for(lambda: len(fake_app.finished) == 4), "Expected all admitted updates processed"
+        assert _wait_for(lambda: dispatcher.stats()['in_flight'] == 0), "Expected slots to be released"
+        assert 7004 not in fake_app.started
+
+        print("✅ test_webhook_sheds_load_when_queue_is_full passed")
+    finally:
+        teardown()
+
+
+def test_rejected_update_is_accepted_on_redelivery():
+    """Test a 429-rejected update is not remembered as a duplicate"""
+    client, fake_app, dispatcher, teardown = _setup_webhook(max_in_flight=1, max_queue=0)
+    try:
+        assert _post_update(client, 8000).status_code == 200
+        assert _post_update(client, 8001).status_code == 429
+
+        duplicate = _post_update(client, 8000)
+        assert json.loads(duplicate.data).get('duplicate') is True, "Expected admitted update to be deduplicated"
+
+        fake_app.gate.set()
+        assert _wait_for(lambda: dispatcher.stats()['in_flight'] == 0)
+
+        redelivered = _post_update(client, 8001)
+        assert redelivered.status_code == 200, f"Expected redelivery accepted, got {redelivered.status_code}"
+        assert not json.loads(redelivered.data).get('duplicate')
+        assert _wait_for(lambda: 8001 in fake_app.finished), "Expected redelivered update processed"
+
+        print("✅ test_rejected_update_is_accepted_on_redelivery passed")
+    finally:
+        teardown()
+
+
+def test_health_reports_webhook_queue_depth():
+    """Test /health exposes dispatcher depth counters"""
+    client, fake_app, dispatcher, teardown = _setup_webhook(max_in_flight=1, max_queue=5)
+    try:
+        for i in range(3):
+            assert _post_update(client, 9000 + i).status_code == 200
+        assert _wait_for(lambda: len(fake_app.started) == 1)
+
+        webhook = json.loads(client.get('/health').data)['webhook']
+        assert webhook['in_flight'] == 1, f"Expected 1 in flight, got {webhook}"
+        assert webhook['queued'] == 2, f"Expected 2 queued, got {webhook}"
+        assert webhook['max_queue'] == 5
+        assert webhook['max_queue_depth'] == 2
+
+        print("✅ test_health_reports_webhook_queue_depth passed")
+    finally:
+        teardown()
+
+
+def run_all_tests():
+    """Run all webhook backpressure tests"""
+    print("\n🧪 Running Telegram Webhook Backpressure Tests...\n")
+
+    tests = [
+        test_webhook_sheds_load_when_queue_is_full,
+        test_rejected_update_is_accepted_on_redelivery,
+        test_health_reports_webhook_queue_depth,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60 + "\n")
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,213 @@
+"""
+API Contract Tests for Inline Webhook Replies
+Tests that a button tap's answerCallbackQuery is returned in the /webhook response body.
+"""
+
+import sys
+import os
+import time
+import json
+import asyncio
+import tempfile
+from threading import Thread
+from unittest.mock import patch
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'felix_hub', 'backend'))
+
+_BOT_USER = {'id': 123456, 'is_bot': True, 'first_name': 'Felix', 'username': 'felix_parts_bot'}
+
+
+def _recording_request():
+    """Заменяет HTTPXRequest: записывает исходящие вызовы Bot API вместо сети"""
+    from telegram.request import BaseRequest
+
+    class RecordingRequest(BaseRequest):
+        def __init__(self):
+            self.calls = []
+
+        @property
+        def read_timeout(self):
+            return 5.0
+
+        async def initialize(self):
+            pass
+
+        async def shutdown(self):
+            pass
+
+        async def do_request(self, url, method, request_data=None, **timeouts):
+            endpoint = url.rsplit('/', 1)[-1]
+            self.calls.append(endpoint)
+            result = _BOT_USER if endpoint == 'getMe' else True
+            return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+    return RecordingRequest()
+
+
+def _setup_webhook(handler):
+    import app as app_module
+    from telegram.ext import Application, CallbackQueryHandler
+    from services.inline_reply import InlineReplyRequest
+    from services.webhook_dispatch import UpdateDispatcher
+
+    db_fd, db_path = tempfile.mkstemp()
+    app_module.app.config['TESTING'] = True
+    app_module.app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    with app_module.app.app_context():
+        app_module.db.drop_all()
+        app_module.db.create_all()
+
+    loop = asyncio.new_event_loop()
+    Thread(target=loop.run_forever, daemon=True).start()
+    while not loop.is_running():
+        time.sleep(0.001)
+
+    recorder = _recording_request()
+    application = Application.builder().token('123456:TEST').request(InlineReplyRequest(recorder)).build()
+    application.add_handler(CallbackQueryHandler(handler))
+    asyncio.run_coroutine_threadsafe(application.initialize(), loop).result(timeout=5)
+    recorder.calls.clear()
+
+    dispatcher = UpdateDispatcher(4, 10)
+    dispatcher.bind(loop)
+
+    saved = (app_module.telegram_app, app_module.telegram_loop, app_module.webhook_dispatcher)
+    app_module.telegram_app = application
+    app_module.telegram_loop = loop
+    app_module.webhook_dispatcher = dispatcher
+
+    def teardown():
+        _wait_for(lambda: dispatcher.stats()['in_flight'] == 0)
+        asyncio.run_coroutine_threadsafe(application.shutdown(), loop).result(timeout=5)
+        app_module.telegram_app, app_module.telegram_loop, app_module.webhook_dispatcher = saved
+        loop.call_soon_threadsafe(loop.stop)
+        os.close(db_fd)
+        os.unlink(db_path)
+
+    return app_module.app.test_client(), recorder, dispatcher, teardown
+
+
+def _post_tap(client, update_id):
+    return client.post('/webhook', data=json.dumps({
+        'update_id': update_id,
+        'callback_query': {
+            'id': f'cbq-{update_id}', 'chat_instance': 'ci', 'data': 'my_orders',
+            'from': {'id': 42, 'is_bot': False, 'first_name': 'Механик'},
+            'message': {'message_id': 5, 'date': 0, 'text': 'Меню', 'chat': {'id': 42, 'type': 'private'}},
+        }
+    }), content_type='application/json')
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_fast_answer_is_returned_inline():
+    """Test answerCallbackQuery goes into the HTTP response and the edit goes out normally"""
+    async def handler(update, context):
+        await update.callback_query.answer(text='Загрузка...')
+        await update.callback_query.edit_message_text('📋 Мои заказы')
+
+    client, recorder, dispatcher, teardown = _setup_webhook(handler)
+    try:
+        with patch('config.WEBHOOK_INLINE_REPLY_BUDGET_MS', 2000):
+            response = _post_tap(client, 9101)
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+        body = json.loads(response.data)
+        assert body['method'] == 'answerCallbackQuery', f"Expected inline method, got {body}"
+        assert body['callback_query_id'] == 'cbq-9101'
+        assert body['text'] == 'Загрузка...'
+
+        assert _wait_for(lambda: dispatcher.stats()['completed'] == 1)
+        assert recorder.calls == ['editMessageText'], f"Unexpected outbound calls: {recorder.calls}"
+
+        print("✅ test_fast_answer_is_returned_inline passed")
+    finally:
+        teardown()
+
+
+def test_slow_handler_falls_back_to_outbound_call():
+    """Test the answer is sent normally once the budget has run out"""
+    async def handler(update, context):
+        await asyncio.sleep(0.2)
+        await update.callback_query.answer()
+
+    client, recorder, dispatcher, teardown = _setup_webhook(handler)
+    try:
+        with patch('config.WEBHOOK_INLINE_REPLY_BUDGET_MS', 20):
+            response = _post_tap(client, 9201)
+        assert json.loads(response.data) == {'ok': True}, f"Unexpected body: {response.data}"
+
+        assert _wait_for(lambda: dispatcher.stats()['completed'] == 1)
+        assert recorder.calls == ['answerCallbackQuery'], f"Unexpected outbound calls: {recorder.calls}"
+
+        print("✅ test_slow_handler_falls_back_to_outbound_call passed")
+    finally:
+        teardown()
+
+
+def test_only_first_call_is_considered():
+    """Test a first call that is not answerCallbackQuery disables the inline reply"""
+    async def handler(update, context):
+        await update.callback_query.edit_message_text('🌐 Язык')
+        await update.callback_query.answer()
+
+    client, recorder, dispatcher, teardown = _setup_webhook(handler)
+    try:
+        started = time.time()
+        with patch('config.WEBHOOK_INLINE_REPLY_BUDGET_MS', 2000):
+            response = _post_tap(client, 9301)
+        assert json.loads(response.data) == {'ok': True}, f"Unexpected body: {response.data}"
+        assert time.time() - started < 1.5, "The webhook must not wait for the whole budget"
+
+        assert _wait_for(lambda: dispatcher.stats()['completed'] == 1)
+        assert recorder.calls == ['editMessageText', 'answerCallbackQuery'], \
+            f"Unexpected outbound calls: {recorder.calls}"
+
+        print("✅ test_only_first_call_is_considered passed")
+    finally:
+        teardown()
+
+
+def run_all_tests():
+    """Run all inline webhook reply tests"""
+    print("\n🧪 Running Inline Webhook Reply Tests...\n")
+
+    tests = [
+        test_fast_answer_is_returned_inline,
+        test_slow_handler_falls_back_to_outbound_call,
+        test_only_first_call_is_considered,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__} failed: {e}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__} error: {e}")
+            import traceback
+            traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed} passed, {failed} failed")
+    print("=" * 60 + "\n")
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    success = run_all_tests()
+    sys.exit(0 if success else 1)